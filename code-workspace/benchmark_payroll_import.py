@@ -0,0 +1,174 @@
+"""
+Offline throughput benchmark for import_payroll_bland_david.py: synthetic Allocated Week workbooks
+(payroll_synthetic_week.py) imported against the local PostgREST mock (payroll_mock_postgrest.py).
+
+For each size the mock is reset to the matching reference tables, and the importer's own main() runs
+(--week 1 --profile-json) in a fresh child process, so peak RSS is that run's alone. Sheets stop at the
+importer's MAX_ROW_CAP (the 20,000 size has 19,999 data rows, rows 2-20,000). Reported per size:
+rows / second (sheet rows over the import's wall time, workbook load included), HTTP requests per imported
+row (as counted by the mock, retries included), peak RSS, and the three slowest stages of the --profile trace.
+Then checks that the mock holds exactly the importable rows as time periods.
+
+Importer options after -- are passed through (e.g. -- --rpc, -- --workers 1). Latency and failures are the
+mock's (see payroll_mock_postgrest.py); with failures, rows can go missing and the check reports them.
+
+Usage:
+  python code-workspace/benchmark_payroll_import.py                      # 500, 5,000 and 20,000 rows, 20 ms latency
+  python code-workspace/benchmark_payroll_import.py 5000 --latency-ms 60 --jitter-ms 30
+  python code-workspace/benchmark_payroll_import.py 500 5000 --fail-rate 0.02 -- --workers 1
+  python code-workspace/benchmark_payroll_import.py 5000 --fail time_periods:upsert:42P10   # fallback path
+  python code-workspace/benchmark_payroll_import.py 5000 --json bench.json -- --rpc
+  python code-workspace/benchmark_payroll_import.py 5000 --latency-ms 80 -- --async --in-flight 16
+"""
+
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time as time_mod
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent))
+import import_payroll_bland_david as imp  # noqa: E402
+import payroll_synthetic_week as synthetic  # noqa: E402
+from payroll_mock_postgrest import MockPostgrest, mock_url, serve  # noqa: E402
+
+try:
+    import resource  # peak RSS (Unix)
+except ImportError:
+    resource = None
+
+DEFAULT_LATENCY_MS = 20.0  # a round trip to the hosted project is tens of ms
+
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def _child(log_path: str, importer_args: List[str]) -> None:
+    """Child process: run the importer's main() with importer_args (environment set by the parent), print JSON."""
+    sys.argv = ["import_payroll_bland_david.py"] + importer_args
+    with open(log_path, "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+        t0 = time_mod.perf_counter()
+        imp.main()
+        seconds = time_mod.perf_counter() - t0
+    print(json.dumps({"seconds": seconds, "peak_rss_mb": _peak_rss_mb()}))
+
+
+def run_size(mock: MockPostgrest, url: str, n: int, work: Path, importer_args: List[str]) -> Dict[str, Any]:
+    rows, importable = synthetic.synthetic_week(min(n, imp.MAX_ROW_CAP - imp.MIN_ROW + 1), 1)
+    workbook = work / f"Synthetic {n}.xlsx"
+    synthetic.write_workbook(str(workbook), {1: rows})
+    mock.reset(synthetic.synthetic_reference(synthetic.employee_count(n)))
+    trace = work / f"trace {n}.json"
+    log = work / f"import {n}.log"
+    env = dict(
+        os.environ,
+        SUPABASE_URL=url,
+        SUPABASE_SERVICE_ROLE_KEY="mock",
+        STAFF_HOURS_EXCEL=str(workbook),
+        PAYROLL_IMPORT_LEDGER=str(work / f"ledger {n}.sqlite"),
+        PAYROLL_REFERENCE_CACHE=str(work / f"reference {n}.sqlite"),
+    )
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", str(log), "--week", "1", "--profile-json", str(trace), *importer_args],
+        capture_output=True, text=True, env=env,
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"importer failed for {n} rows:\n{out.stderr[-2000:]}")
+    child = json.loads(out.stdout.strip().splitlines()[-1])
+    stats = mock.stats()
+    periods = stats["rows"]["time_periods"]
+    stages = json.loads(trace.read_text(encoding="utf-8"))["summary"]["stages"]
+    return {
+        "rows": len(rows),
+        "importable": importable,
+        "time_periods": periods,
+        "seconds": child["seconds"],
+        "rows_per_second": len(rows) / child["seconds"],
+        "requests": stats["requests"],
+        "requests_per_row": stats["requests"] / max(periods, 1),
+        "statuses": stats["statuses"],
+        "calls": stats["calls"],
+        "peak_rss_mb": child["peak_rss_mb"],
+        "stages": sorted(stages, key=lambda s: -s["seconds"]),
+        "log": str(log),
+    }
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    if argv[:1] == ["--child"]:
+        _child(argv[1], argv[2:])
+        return
+    importer_args: List[str] = []
+    if "--" in argv:
+        importer_args = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+    sizes: List[int] = []
+    mock_kwargs: Dict[str, Any] = {"latency_ms": DEFAULT_LATENCY_MS, "fail_rules": []}
+    json_path = None
+    keep = None
+    i = 0
+    while i < len(argv):
+        a = argv[i]
+        value = argv[i + 1] if i + 1 < len(argv) else None
+        if a == "--latency-ms" and value:
+            mock_kwargs["latency_ms"] = float(value)
+        elif a == "--jitter-ms" and value:
+            mock_kwargs["jitter_ms"] = float(value)
+        elif a == "--fail-rate" and value:
+            mock_kwargs["fail_rate"] = float(value)
+        elif a == "--fail" and value:
+            mock_kwargs["fail_rules"].append(value)
+        elif a == "--json" and value:
+            json_path = value
+        elif a == "--keep" and value:
+            keep = value  # directory for the workbooks, traces and importer logs
+        else:
+            if a.isdigit():
+                sizes.append(int(a))
+            i += 1
+            continue
+        i += 2
+    sizes = sizes or list(synthetic.SYNTHETIC_SIZES)
+
+    mock = MockPostgrest(seed=1, **mock_kwargs)
+    server = serve(mock, port=0)
+    url = mock_url(server)
+    print(f"Mock PostgREST on {url}: latency {mock.latency_ms:g} ms (+0-{mock.jitter_ms:g}), "
+          f"fail rate {mock.fail_rate:g}, rules {mock_kwargs['fail_rules'] or 'none'}; importer args: {' '.join(importer_args) or '(default)'}")
+    results = []
+    problems = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(keep or tmp)
+        work.mkdir(parents=True, exist_ok=True)
+        print(f"  {'Rows':>7} {'Seconds':>8} {'Rows/s':>8} {'Requests':>8} {'Req/row':>8} {'Peak RSS':>9}  Slowest stages")
+        for n in sizes:
+            r = run_size(mock, url, n, work, importer_args)
+            results.append(r)
+            slow = ", ".join(f"{s['stage']} {s['seconds']:.2f}s" for s in r["stages"][:3])
+            print(f"  {r['rows']:7d} {r['seconds']:8.2f} {r['rows_per_second']:8.0f} {r['requests']:8d} "
+                  f"{r['requests_per_row']:8.3f} {r['peak_rss_mb']:7.1f}MB  {slow}")
+            if r["time_periods"] != r["importable"]:
+                problems += 1
+                print(f"    {r['time_periods']} time period(s) in the mock, {r['importable']} importable row(s); "
+                      f"HTTP statuses {r['statuses']}" + (f"; log: {r['log']}" if keep else ""))
+    server.shutdown()
+    if json_path:
+        Path(json_path).write_text(json.dumps({"mock": mock_kwargs, "importer_args": importer_args,
+                                               "results": results}, indent=1), encoding="utf-8")
+        print(f"Results written to {json_path}")
+    print("Check: " + ("every importable row imported once" if problems == 0 else f"{problems} size(s) with missing or extra rows"))
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
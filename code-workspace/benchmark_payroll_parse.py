@@ -0,0 +1,161 @@
+"""
+Parity check and benchmark for the importer's columnar parse (_parse_columns) against the per-cell helpers
+(_parse_date, _parse_time, _parse_break_minutes, _parse_hours_to_minutes, _travel_minutes).
+
+Builds a synthetic Allocated Week sheet (default 20,000 rows = the AH1 cap) mixing the cell forms openpyxl and
+CSV exports produce: datetime/time objects, Excel serial dates, day fractions, "HH:MM" and DD/MM/YYYY strings,
+blanks and junk. Every row must parse identically both ways; then both paths are timed.
+
+Usage:
+  python code-workspace/benchmark_payroll_parse.py            # 20,000 rows
+  python code-workspace/benchmark_payroll_parse.py 5000 --repeat 5
+"""
+
+import random
+import sys
+import time as time_mod
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Any, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+import import_payroll_bland_david as imp  # noqa: E402
+
+# Forms a Date cell takes in real sheets (openpyxl datetime, CSV string, Excel serial, ...)
+_DATE_FORMS = [
+    lambda d: datetime.combine(d, time(0, 0)),
+    lambda d: d.strftime("%d/%m/%Y"),
+    lambda d: (d - imp._EXCEL_EPOCH).days,
+    lambda d: float((d - imp._EXCEL_EPOCH).days) + 0.5,
+    lambda d: d.strftime("%d-%m-%y"),
+    lambda d: d,
+]
+_EDGE_DATES = [None, "", "  ", "abc", 0, -3, 0.0, float("nan"), float("inf"), True, False, "Total", 3e6, 10 ** 20]
+_EDGE_TIMES = [None, "", "abc", 1, 1.0, 0.99999999, -0.1, float("nan"), float("inf"), True, False, "9:5", "07:00 am", 0]
+_EDGE_MINUTES = [None, "", "abc", 0, 30, 30.0, 0.75, -15, 1.5, float("nan"), True, False, "0:30", " 1:00 ", "45", "12.5", time(0, 45)]
+
+
+def _time_cell(rng: random.Random, t: time) -> Any:
+    form = rng.randrange(4)
+    if form == 0:
+        return t
+    if form == 1:
+        return t.strftime("%H:%M")
+    if form == 2:
+        return f"{t.hour}:{t.minute:02d}"
+    return (t.hour * 3600 + t.minute * 60) / 86400.0
+
+
+def _minutes_cell(rng: random.Random, minutes: int, hours_column: bool = False) -> Any:
+    form = rng.randrange(4)
+    if form == 0:
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+    if form == 1:
+        return time(minutes // 60, minutes % 60)
+    if form == 2:
+        return minutes // 60 if hours_column else minutes
+    return float(minutes // 60) if hours_column else float(minutes)
+
+
+def synthetic_rows(n: int, seed: int = 1) -> List[Tuple[Any, ...]]:
+    """n rows in Allocated Week layout (33 columns) with mixed cell types in the parsed columns."""
+    rng = random.Random(seed)
+    monday = date(2026, 1, 5)
+    rows: List[Tuple[Any, ...]] = []
+    for i in range(n):
+        row: List[Any] = [None] * (imp.MAX_COL - imp.MIN_COL + 1)
+        d = monday + timedelta(days=rng.randrange(7))
+        start = time(rng.choice([5, 6, 7, 8, 9, 10, 13]), rng.choice([0, 15, 30, 45]))
+        finish = time(min(start.hour + rng.randrange(1, 10), 23), rng.choice([0, 15, 30, 45]))
+        worked = (finish.hour * 60 + finish.minute) - (start.hour * 60 + start.minute)
+        row[imp.COL_DATE] = rng.choice(_DATE_FORMS)(d)
+        row[imp.COL_EMPLOYEE] = f"Employee {i % 40}, Test"
+        row[imp.COL_START] = _time_cell(rng, start)
+        row[imp.COL_FINISH] = _time_cell(rng, finish)
+        row[imp.COL_BREAK] = _minutes_cell(rng, rng.choice([0, 15, 30, 45, 60])) if rng.random() < 0.6 else None
+        row[imp.COL_HOURS] = _minutes_cell(rng, max(worked, 0), hours_column=True)
+        row[imp.COL_TRAVEL] = _minutes_cell(rng, rng.choice([0, 15, 30])) if rng.random() < 0.3 else None
+        if rng.random() < 0.02:  # sprinkle edge cases through every parsed column
+            row[imp.COL_DATE] = rng.choice(_EDGE_DATES)
+            row[imp.COL_START] = rng.choice(_EDGE_TIMES)
+            row[imp.COL_FINISH] = rng.choice(_EDGE_TIMES)
+            row[imp.COL_BREAK] = rng.choice(_EDGE_MINUTES)
+            row[imp.COL_HOURS] = rng.choice(_EDGE_MINUTES)
+            row[imp.COL_TRAVEL] = rng.choice(_EDGE_MINUTES)
+        rows.append(tuple(row))
+    return rows
+
+
+def scalar_parse(rows: List[Tuple[Any, ...]]) -> List[Tuple[Any, ...]]:
+    """Per-cell parse exactly as the row loop did before _parse_columns."""
+    out = []
+    for row in rows:
+        out.append((
+            imp._parse_date(imp._cell_value(row, imp.COL_DATE)),
+            imp._parse_time(imp._cell_value(row, imp.COL_START)),
+            imp._parse_time(imp._cell_value(row, imp.COL_FINISH)),
+            imp._parse_break_minutes(imp._cell_value(row, imp.COL_BREAK)),
+            imp._parse_hours_to_minutes(imp._cell_value(row, imp.COL_HOURS)),
+            imp._travel_minutes(imp._cell_value(row, imp.COL_TRAVEL)) if len(row) > imp.COL_TRAVEL else 0,
+        ))
+    return out
+
+
+def check_parity(rows: List[Tuple[Any, ...]]) -> int:
+    """Return the number of rows where the columnar parse differs from the scalar helpers (printing the first few)."""
+    expected = scalar_parse(rows)
+    cols = imp._parse_columns(rows)
+    mismatches = 0
+    for i, exp in enumerate(expected):
+        got = (cols["work_date"][i], cols["start"][i], cols["finish"][i], cols["break_min"][i], cols["hours_min"][i], cols["travel_min"][i])
+        if got != exp or type(got[3]) is not int or type(got[4]) is not int:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  Mismatch row {i}: cells={[rows[i][c] for c in (0, 5, 7, 6, 8, 26)]!r} scalar={exp!r} columnar={got!r}")
+        if imp.np is not None:
+            no_date = exp[0] is None
+            if bool(cols["no_date"][i]) != no_date or bool(cols["no_work"][i]) != (exp[4] <= 0):
+                mismatches += 1
+            if not no_date and int(cols["work_day"][i]) != exp[0].toordinal():
+                mismatches += 1
+    return mismatches
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time_mod.perf_counter()
+        fn()
+        best = min(best, time_mod.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    n = 20000
+    repeat = 3
+    i = 1
+    while i < len(sys.argv):
+        a = sys.argv[i]
+        if a == "--repeat" and i + 1 < len(sys.argv):
+            repeat = int(sys.argv[i + 1])
+            i += 2
+            continue
+        if a.isdigit():
+            n = int(a)
+        i += 1
+    rows = synthetic_rows(n)
+    print(f"Synthetic sheet: {n} rows; NumPy: {'yes (' + imp.np.__version__ + ')' if imp.np is not None else 'no (scalar fallback per unique)'}")
+
+    mismatches = check_parity(rows)
+    print(f"Parity: {'OK' if mismatches == 0 else f'{mismatches} mismatch(es)'}")
+
+    t_scalar = _best_of(lambda: scalar_parse(rows), repeat)
+    t_columnar = _best_of(lambda: imp._parse_columns(rows), repeat)
+    print(f"Scalar helpers : {t_scalar * 1000:8.1f} ms  ({n / t_scalar:,.0f} rows/s)")
+    print(f"Columnar parse : {t_columnar * 1000:8.1f} ms  ({n / t_columnar:,.0f} rows/s)  x{t_scalar / t_columnar:.1f}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
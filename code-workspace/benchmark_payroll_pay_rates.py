@@ -0,0 +1,190 @@
+"""
+Parity check and benchmark for the pay-rate engine (payroll_pay_rates.py).
+
+1. Hours.csv parity: each employee row of the Hours tab (Start / Break / Finish per day) becomes one time period
+   per day; the engine's Worked / FT / TH / DT per day must equal the spreadsheet's columns.
+2. Synthetic year: employees x 52 weeks of 1-3 periods a day with breaks; the NumPy split must equal the
+   scalar fallback, then both are timed.
+
+Usage:
+  python code-workspace/benchmark_payroll_pay_rates.py                 # Hours.csv + 300 employees x 52 weeks
+  python code-workspace/benchmark_payroll_pay_rates.py path/to/Hours.csv 500 --repeat 3
+"""
+
+import csv
+import random
+import sys
+import time as time_mod
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+import payroll_pay_rates as pr  # noqa: E402
+
+HOURS_CSV = Path(__file__).resolve().parent.parent / "Hours.csv"
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+# Hours tab category (header row 1) -> engine result compared per day
+_COMPARED = {"Worked Hours": "worked", "Flat Time (FT) Hours": "ft", "Time & Half (TH) Hours": "th", "Double Time (DT) Hours": "dt"}
+
+
+def _hm(value: str) -> Optional[int]:
+    """'7:30' -> 450 minutes, '' -> 0, anything else -> None."""
+    value = (value or "").strip()
+    if not value:
+        return 0
+    h, _, m = value.partition(":")
+    if not h.isdigit() or not m.isdigit():
+        return None
+    return int(h) * 60 + int(m)
+
+
+def hours_csv_periods(path: Path, monday: date = date(2026, 1, 5)) -> Dict[str, Any]:
+    """Periods (one per employee-day with a Start and Finish) and the expected minutes per (employee, day, column)."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    categories: Dict[str, int] = {}
+    for i, name in enumerate(rows[0]):
+        if name and name not in categories:
+            categories[name] = i
+    first_day = categories["Monday"] - 1  # Start column of Monday (the category header sits on Break)
+    periods: List[Dict[str, Any]] = []
+    expected: Dict[tuple, int] = {}
+    for row in rows[2:]:
+        if not row or not row[0].strip():
+            continue
+        employee = row[0].strip()
+        for d, day_name in enumerate(DAYS):
+            start, brk, finish = (row[first_day + 3 * d + k] if first_day + 3 * d + k < len(row) else "" for k in range(3))
+            for category, key in _COMPARED.items():
+                col = categories.get(category)
+                if col is not None and col + d < len(row):
+                    expected[(employee, day_name, key)] = _hm(row[col + d])
+            if not start.strip() or not finish.strip():
+                continue
+            day = monday + timedelta(days=d)
+            t_start = datetime.combine(day, datetime.strptime(start.strip(), "%H:%M").time())
+            t_finish = datetime.combine(day, datetime.strptime(finish.strip(), "%H:%M").time())
+            breaks = []
+            if _hm(brk):
+                b_start = t_start + (t_finish - t_start) / 2  # only the length matters; keep it inside the period
+                breaks.append({"break_start": b_start.isoformat(), "break_finish": (b_start + timedelta(minutes=_hm(brk))).isoformat()})
+            periods.append({
+                "id": f"{employee}|{day_name}",
+                "user_id": employee,
+                "work_date": day.isoformat(),
+                "start_time": t_start.isoformat(),
+                "finish_time": t_finish.isoformat(),
+                "time_period_breaks": breaks,
+            })
+    return {"periods": periods, "expected": expected}
+
+
+def check_hours_csv(path: Path) -> int:
+    """Mismatches between the engine and the Hours tab (printing each)."""
+    data = hours_csv_periods(path)
+    cols = pr.periods_to_columns(data["periods"])
+    split = pr.split_pay_rates(cols)
+    got: Dict[tuple, int] = {}
+    for i, tp_id in enumerate(cols["id"]):
+        employee, day_name = tp_id.split("|")
+        for t in pr.PAY_RATE_TYPES:
+            got[(employee, day_name, t)] = got.get((employee, day_name, t), 0) + split[t][i]
+        got[(employee, day_name, "worked")] = got.get((employee, day_name, "worked"), 0) + sum(split[t][i] for t in pr.PAY_RATE_TYPES)
+    mismatches = 0
+    for key, want in sorted(data["expected"].items()):
+        if want != got.get(key, 0):
+            mismatches += 1
+            print(f"  Mismatch {key}: Hours.csv {want} min, engine {got.get(key, 0)} min")
+    employees = len({k[0] for k in data["expected"]})
+    print(f"Hours.csv: {employees} employee(s), {len(data['expected'])} day value(s) compared, "
+          f"{'OK' if mismatches == 0 else f'{mismatches} mismatch(es)'}")
+    return mismatches
+
+
+def synthetic_periods(employees: int, weeks: int = 52, seed: int = 1) -> List[Dict[str, Any]]:
+    """1-3 periods per employee-day (weekends sometimes), quarter-hour times, a break on most days."""
+    rng = random.Random(seed)
+    first = date(2026, 1, 5)
+    out: List[Dict[str, Any]] = []
+    for e in range(employees):
+        for day_n in range(weeks * 7):
+            day = first + timedelta(days=day_n)
+            if day.weekday() >= 5 and rng.random() < 0.8:
+                continue
+            t = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.choice([300, 360, 390, 420, 480]))
+            for p in range(rng.randint(1, 3)):
+                length = timedelta(minutes=15 * rng.randint(4, 24))
+                breaks = []
+                if p == 0 and rng.random() < 0.7:
+                    b = t + timedelta(minutes=60)
+                    breaks.append({"break_start": b.isoformat(), "break_finish": (b + timedelta(minutes=rng.choice([15, 30, 45, 60]))).isoformat()})
+                out.append({
+                    "id": f"{e}-{day_n}-{p}",
+                    "user_id": f"user-{e}",
+                    "work_date": day.isoformat(),
+                    "start_time": t.isoformat() + "Z",
+                    "finish_time": (t + length).isoformat() + "Z",
+                    "time_period_breaks": breaks,
+                })
+                t += length
+    return out
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time_mod.perf_counter()
+        fn()
+        best = min(best, time_mod.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    path = HOURS_CSV
+    employees = 300
+    repeat = 3
+    i = 1
+    while i < len(sys.argv):
+        a = sys.argv[i]
+        if a == "--repeat" and i + 1 < len(sys.argv):
+            repeat = int(sys.argv[i + 1])
+            i += 2
+            continue
+        if a.isdigit():
+            employees = int(a)
+        elif a.lower().endswith(".csv"):
+            path = Path(a)
+        i += 1
+
+    mismatches = check_hours_csv(path) if path.exists() else 0
+    if not path.exists():
+        print(f"Hours.csv not found ({path}); parity against the spreadsheet skipped")
+
+    periods = synthetic_periods(employees)
+    print(f"Synthetic year: {employees} employees x 52 weeks = {len(periods)} periods; "
+          f"NumPy: {'yes (' + pr.np.__version__ + ')' if pr.np is not None else 'no (scalar fallback)'}")
+    t_cols = _best_of(lambda: pr.periods_to_columns(periods), 1)
+    cols = pr.periods_to_columns(periods)
+    if pr.np is not None:
+        vec = pr.split_pay_rates(cols)
+        scalar = pr._split_pay_rates_scalar(cols, pr.DEFAULT_RULES)
+        same = vec == scalar
+        if not same:
+            mismatches += 1
+        print(f"NumPy vs scalar split: {'OK' if same else 'DIFFERENT'}")
+        t_vec = _best_of(lambda: pr.split_pay_rates(cols), repeat)
+    t_scalar = _best_of(lambda: pr._split_pay_rates_scalar(cols, pr.DEFAULT_RULES), repeat)
+    t_rows = _best_of(lambda: pr.pay_rate_rows(cols["id"], pr.split_pay_rates(cols)), 1)
+    n = len(cols["id"])
+    print(f"Columns (parse timestamps): {t_cols * 1000:8.1f} ms")
+    print(f"Scalar split             : {t_scalar * 1000:8.1f} ms  ({n / t_scalar:,.0f} periods/s)")
+    if pr.np is not None:
+        print(f"NumPy split              : {t_vec * 1000:8.1f} ms  ({n / t_vec:,.0f} periods/s)  x{t_scalar / t_vec:.1f}")
+    print(f"Split + pay-rate rows    : {t_rows * 1000:8.1f} ms  ({n * len(pr.PAY_RATE_TYPES):,} rows)")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
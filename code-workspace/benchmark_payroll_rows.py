@@ -0,0 +1,162 @@
+"""
+Memory benchmark for the importer's row store (payroll_rows.SheetRows) against rows kept as tuples.
+
+Builds a synthetic full-year workbook in memory: 52 Allocated Week sheets x 20,000 rows (the AH1 cap), cells as
+openpyxl read-only returns them (datetime dates, time Start / Break / Finish / Hours, int / float plant numbers
+and quantities, shared strings for Contract / Location / Section / Employee / Material). Each layout is held in a
+fresh child process and its peak RSS and build time reported (for the store, also the time spent in
+SheetRows() itself; the rest is generating the synthetic cells, common to both). First checks, on one sheet, that the store reads back every cell
+with its type, parses the same (_parse_columns) and hashes the same (import ledger).
+
+Usage:
+  python code-workspace/benchmark_payroll_rows.py               # 52 sheets x 20,000 rows
+  python code-workspace/benchmark_payroll_rows.py 5000 --sheets 10
+"""
+
+import json
+import random
+import subprocess
+import sys
+import time as time_mod
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+import import_payroll_bland_david as imp  # noqa: E402
+from payroll_import_ledger import row_hash  # noqa: E402
+from payroll_rows import SheetRows  # noqa: E402
+
+try:
+    import resource  # peak RSS (Unix)
+except ImportError:
+    resource = None
+
+WIDTH = imp.MAX_COL - imp.MIN_COL + 1
+
+
+def synthetic_sheet(week: int, n: int, seed: int = 1) -> List[Tuple[Any, ...]]:
+    """n Allocated Week rows for ISO week `week` (2026), new objects per cell except shared strings."""
+    rng = random.Random(seed * 1000 + week)
+    monday = date.fromisocalendar(2026, week, 1)
+    strings: Dict[str, str] = {}  # the workbook's shared-string table: one str object per distinct text
+
+    def text(s: str) -> str:
+        return strings.setdefault(s, s)
+
+    rows = []
+    for i in range(n):
+        row: List[Any] = [None] * WIDTH
+        start = rng.choice([300, 360, 390, 420, 480])
+        length = 15 * rng.randint(8, 44)
+        brk = rng.choice([0, 0, 15, 30, 30, 45, 60])
+        row[imp.COL_DATE] = datetime.combine(monday + timedelta(days=rng.randrange(7)), time(0, 0))
+        row[imp.COL_CONTRACT] = text(f"Client {rng.randrange(60)}")
+        row[imp.COL_LOCATION] = text(f"Town {rng.randrange(120)}")
+        row[imp.COL_SECTION] = text(f"Section {rng.randrange(400)}" if rng.random() < 0.8 else f"Fleet No {rng.randrange(900)}")
+        row[imp.COL_EMPLOYEE] = text(f"Surname{i % 700}, Forename")
+        row[imp.COL_START] = time(*divmod(start, 60))
+        row[imp.COL_BREAK] = time(*divmod(brk, 60)) if brk else None
+        row[imp.COL_FINISH] = time(*divmod(min(start + length, 1439), 60))
+        row[imp.COL_HOURS] = time(*divmod(min(length - brk, 1439), 60))
+        for c in range(imp.COL_PLANT_START, imp.COL_PLANT_START + rng.choice([0, 0, 1, 1, 2, 3])):
+            row[c] = rng.randrange(100, 1000)
+        if rng.random() < 0.2:
+            row[imp.COL_MOB_START] = float(rng.randrange(100, 1000))
+        if rng.random() < 0.05:
+            row[imp.COL_MATERIAL] = text(rng.choice(["C30", "C35", "Lean mix"]))
+            row[imp.COL_QTY] = rng.choice([1.0, 2.5, 6.0])
+        row[21] = time(*divmod(min(length - brk, 480), 60))  # FT
+        if rng.random() < 0.3:
+            row[imp.COL_TRAVEL] = time(0, rng.choice([15, 30, 45]))
+        rows.append(tuple(row))
+    return rows
+
+
+def check_parity(rows: List[Tuple[Any, ...]]) -> int:
+    """Differences between the tuples and the store (cells, _parse_columns, row hashes)."""
+    store = SheetRows(WIDTH, rows)
+    problems = 0
+    for i, row in enumerate(rows):
+        view = store[i]
+        if tuple(view) != row or any(a.__class__ is not b.__class__ for a, b in zip(view, row)) or len(view) != len(row):
+            problems += 1
+        elif row_hash("bench", view) != row_hash("bench", row):
+            problems += 1
+    a = imp._parse_columns(rows)
+    b = imp._parse_columns(store)
+    for key in a:
+        same = a[key] == b[key] if isinstance(a[key], list) else bool((a[key] == b[key]).all())
+        if not same:
+            problems += 1
+            print(f"  _parse_columns[{key!r}] differs")
+    return problems
+
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def _hold(layout: str, sheets: int, n: int) -> None:
+    """Child process: hold the whole year in one layout, print JSON (seconds in all and in SheetRows(), peak RSS)."""
+    baseline = _peak_rss_mb()
+    t0 = time_mod.perf_counter()
+    store_seconds = 0.0
+    year = []
+    for week in range(1, sheets + 1):
+        rows = synthetic_sheet(week, n)
+        if layout == "tuples":
+            year.append(rows)
+        else:
+            t1 = time_mod.perf_counter()
+            year.append(SheetRows(WIDTH, rows))
+            store_seconds += time_mod.perf_counter() - t1
+        del rows
+    print(json.dumps({"seconds": time_mod.perf_counter() - t0, "store_seconds": store_seconds,
+                      "peak_rss_mb": _peak_rss_mb(), "baseline_mb": baseline, "rows": sum(len(s) for s in year)}))
+
+
+def main() -> None:
+    n = 20000
+    sheets = 52
+    i = 1
+    while i < len(sys.argv):
+        a = sys.argv[i]
+        if a == "--hold" and i + 1 < len(sys.argv):
+            _hold(sys.argv[i + 1], sheets, n)
+            return
+        if a == "--sheets" and i + 1 < len(sys.argv):
+            sheets = int(sys.argv[i + 1])
+            i += 2
+            continue
+        if a.isdigit():
+            n = int(a)
+        i += 1
+
+    problems = check_parity(synthetic_sheet(1, min(n, 5000)))
+    print(f"Parity (one sheet): {'OK' if problems == 0 else f'{problems} problem(s)'}")
+    if resource is None:
+        print("Peak RSS needs the resource module (Unix); sizes not measured")
+    else:
+        print(f"Full year: {sheets} sheets x {n} rows")
+        results = {}
+        for layout in ("tuples", "store"):
+            out = subprocess.run(
+                [sys.executable, __file__, str(n), "--sheets", str(sheets), "--hold", layout],
+                capture_output=True, text=True, check=True,
+            )
+            results[layout] = r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"  {layout:6}: peak RSS {r['peak_rss_mb']:8.1f} MB (start {r['baseline_mb']:.1f} MB), "
+                  f"built in {r['seconds']:.1f}s" + (f" ({r['store_seconds']:.1f}s in SheetRows)" if layout == "store" else ""))
+        held = {k: r["peak_rss_mb"] - r["baseline_mb"] for k, r in results.items()}
+        print(f"  Rows held: {held['tuples']:.1f} MB as tuples, {held['store']:.1f} MB in SheetRows "
+              f"(x{held['tuples'] / max(held['store'], 0.1):.1f} smaller)")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Round-trip check for payroll_export_allocated.py against the importer (import_payroll_bland_david.py).
+
+For each week of the range: export the periods to Allocated Week rows, plan those rows with the importer
+(_iter_planned_rows) and compare every plan with the period it came from (times, project / plant / workshop
+target, breaks, used / mobilised fleet, concrete, travel, on call, misc). Then run the importer in diagnose mode
+on the rows: every row must be a duplicate, i.e. re-importing the export is a no-op. Reads only.
+
+Usage:
+  python code-workspace/check_payroll_allocated_roundtrip.py --from 2026-01-05 --to 2026-03-29
+"""
+
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from time import monotonic
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+import import_payroll_bland_david as imp  # noqa: E402
+import payroll_export_allocated as allocated  # noqa: E402
+import payroll_export_hours as hours_export  # noqa: E402
+import payroll_pay_rates as pay_rates  # noqa: E402
+
+
+def _fleet(p: Dict[str, Any], table: str) -> List[str]:
+    return sorted(str(f.get("large_plant_id")) for f in p.get(table) or [])
+
+
+def _break_minutes(p: Dict[str, Any]) -> int:
+    total = 0
+    for b in p.get("time_period_breaks") or []:
+        bs = pay_rates._epoch_minutes(b.get("break_start"))
+        bf = pay_rates._epoch_minutes(b.get("break_finish"))
+        if bs is not None and bf is not None and bf > bs:
+            total += bf - bs
+    return total
+
+
+def compare(period: Dict[str, Any], plan: Dict[str, Any]) -> List[str]:
+    """Fields where the re-planned row differs from the exported period."""
+    payload = plan["payload"]
+    diffs = []
+    checks = [
+        ("user_id", str(period.get("user_id")), str(plan["user_id"])),
+        ("work_date", str(period.get("work_date"))[:10], payload["work_date"]),
+        ("start_time", pay_rates._epoch_minutes(period.get("start_time")), pay_rates._epoch_minutes(payload.get("start_time"))),
+        ("finish_time", pay_rates._epoch_minutes(period.get("finish_time")), pay_rates._epoch_minutes(payload.get("finish_time"))),
+        ("large_plant_id", period.get("large_plant_id"), plan["large_plant_id"]),
+        ("workshop_tasks_id", period.get("workshop_tasks_id") if not period.get("large_plant_id") else None,
+         plan["workshop_tasks_id"] if not plan["large_plant_id"] else None),
+        ("project_id", period.get("project_id") if not (period.get("large_plant_id") or period.get("workshop_tasks_id")) else None,
+         plan["project_id"]),
+        ("break_min", _break_minutes(period), round(plan["break_min"] / 15) * 15 if plan["break_min"] else 0),
+        ("used_fleet", _fleet(period, "time_period_used_fleet"), sorted(pid for _, pid in plan["used_fleet"])),
+        ("mobilised_fleet", _fleet(period, "time_period_mobilised_fleet"), sorted(pid for _, pid in plan["mobilised_fleet"])),
+        ("concrete_mix_type", period.get("concrete_mix_type") or None, payload.get("concrete_mix_type")),
+        ("concrete_qty", None if period.get("concrete_qty") is None else float(period["concrete_qty"]), payload.get("concrete_qty")),
+        ("concrete_ticket_no", period.get("concrete_ticket_no"), payload.get("concrete_ticket_no")),
+        ("travel_min", int(period.get("travel_to_site_min") or 0) + int(period.get("travel_from_site_min") or 0),
+         int(payload.get("travel_to_site_min") or 0)),
+        ("on_call", bool(period.get("on_call")), bool(payload.get("on_call"))),
+        ("misc_allowance_min", int(period.get("misc_allowance_min") or 0), int(payload.get("misc_allowance_min") or 0)),
+    ]
+    for name, want, got in checks:
+        if want != got:
+            diffs.append(f"{name}: {want!r} -> {got!r}")
+    return diffs
+
+
+def check(sb: Any, date_from: date, date_to: date, show: int = 10) -> int:
+    """Number of problems (field differences, rows the importer skips, rows it would insert)."""
+    refs = allocated.load_reference_maps(sb)
+    imp_refs = imp._load_reference_data(sb)
+    user_cache: Dict[str, str] = {}
+    resolve_user_id = imp._make_user_resolver(sb, user_cache, imp_refs["names"])
+    problems = 0
+    exported = 0
+    t0 = monotonic()
+    for monday, pairs in allocated.iter_weeks(sb, date_from, date_to, refs, pay_rates.DEFAULT_RULES["exclude_statuses"]):
+        if not pairs:
+            continue
+        n = hours_export.week_number(monday)
+        rows = [tuple(row) for _, row in pairs]
+        exported += len(rows)
+        counters = imp._new_counters()
+        planned = {
+            plan["row_number"] - imp.MIN_ROW: plan
+            for plan in imp._iter_planned_rows(rows, imp_refs, resolve_user_id, counters, emit=lambda _: None)
+        }
+        for i, (period, _) in enumerate(pairs):
+            plan = planned.get(i)
+            diffs = ["not planned by the importer (skipped)"] if plan is None else compare(period, plan)
+            if diffs:
+                problems += 1
+                if problems <= show:
+                    print(f"  Week ({n}) row {i + imp.MIN_ROW} (time period {period['id']}): " + "; ".join(diffs))
+        result = imp._run_import(
+            sb, rows, imp_refs, week_num=n, selected_employees=None, diagnose=True, minimal_payload=False,
+            user_cache=user_cache, emit=lambda _: None,
+        )
+        would_insert = result["counters"]["inserted"]
+        problems += would_insert
+        print(f"Allocated Week ({n}): {len(rows)} row(s) exported, {len(planned)} planned, "
+              f"{result['counters']['skipped_duplicate']} duplicate(s), {would_insert} would insert")
+    print(f"Round trip: {exported} row(s) in {monotonic() - t0:.1f}s, {'OK' if problems == 0 else f'{problems} problem(s)'}")
+    return problems
+
+
+def main() -> None:
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    i = 1
+    while i < len(sys.argv):
+        a = sys.argv[i]
+        if a in ("--from", "--to") and i + 1 < len(sys.argv):
+            d = date.fromisoformat(sys.argv[i + 1])
+            if a == "--from":
+                date_from = d
+            else:
+                date_to = d
+            i += 2
+            continue
+        i += 1
+    if date_from is None:
+        print("Usage: check_payroll_allocated_roundtrip.py --from YYYY-MM-DD [--to YYYY-MM-DD]")
+        return
+    if date_to is None:
+        date_to = hours_export.week_monday(date_from) + timedelta(days=6)
+    if check(imp.create_client(imp.SUPABASE_URL, imp.SUPABASE_KEY), date_from, date_to):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
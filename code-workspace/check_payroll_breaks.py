@@ -0,0 +1,101 @@
+"""
+Checks and timing for the break-placement engine (payroll_breaks.py) used by the payroll importer.
+
+1. Cases from PAYROLL_IMPORT_MAPPING.md (Breaks): one break at 13:00 / 10:00, two breaks with the larger at
+   13:00, start / end of the period closest to 10:00 or 13:00, quarter-hour rounding, shifts over midnight.
+2. Column placement (place_breaks_column, as _parse_columns calls it) equals place_breaks row by row.
+3. Timing of a 20,000-row sheet with and without the memo.
+
+Usage:
+  python code-workspace/check_payroll_breaks.py
+  python code-workspace/check_payroll_breaks.py 100000
+"""
+
+import random
+import sys
+import time as time_mod
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import payroll_breaks as pb  # noqa: E402
+
+
+def _m(hhmm: str) -> int:
+    h, m = hhmm.split(":")
+    return int(h) * 60 + int(m)
+
+
+def _fmt(intervals) -> str:
+    return ", ".join(f"{s // 60 % 24:02d}:{s % 60:02d}-{f // 60 % 24:02d}:{f % 60:02d}" for s, f in intervals) or "-"
+
+
+# (start, finish, break minutes) -> expected intervals
+CASES = [
+    (("07:00", "17:00", 30), "13:00-13:30"),  # holds 13:00
+    (("07:00", "12:00", 30), "10:00-10:30"),  # holds 10:00 only
+    (("07:00", "12:00", 20), "10:00-10:15"),  # 20 -> 15 (nearest quarter hour)
+    (("07:00", "12:00", 25), "10:00-10:30"),  # 25 -> 30
+    (("14:00", "18:00", 30), "14:00-14:30"),  # start is closest to 13:00
+    (("06:00", "09:00", 15), "08:45-09:00"),  # end is closest to 10:00
+    (("11:00", "12:30", 30), "12:00-12:30"),  # end (30 min from 13:00) is closer than start (1h from 10:00)
+    (("07:00", "17:00", 45), "10:00-10:15, 13:00-13:30"),  # two breaks, larger at 13:00
+    (("07:00", "17:00", 60), "10:00-10:30, 13:00-13:30"),
+    (("07:00", "17:00", 90), "10:00-10:45, 13:00-13:45"),
+    (("14:00", "18:00", 60), "14:00-14:30, 14:30-15:00"),  # both at the start: back to back
+    (("06:00", "09:00", 45), "08:15-08:30, 08:30-09:00"),  # both at the end
+    (("22:00", "06:00", 30), "22:00-22:30"),  # over midnight
+    ((None, None, 30), "13:00-13:30"),  # no times
+    (("07:00", "17:00", 0), "-"),
+    (("07:00", "17:00", 7), "-"),  # rounds to 0
+]
+
+
+def check_cases() -> int:
+    failures = 0
+    for (start, finish, brk), want in CASES:
+        got = _fmt(pb.place_breaks(_m(start) if start else None, _m(finish) if finish else None, brk))
+        if got != want:
+            failures += 1
+            print(f"  {start}-{finish} break {brk}: expected {want}, got {got}")
+    print(f"Mapping cases: {len(CASES)}, {'OK' if failures == 0 else f'{failures} failure(s)'}")
+    return failures
+
+
+def synthetic_columns(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    starts, finishes, breaks = [], [], []
+    for _ in range(n):
+        start = rng.choice([360, 390, 420, 450, 480, 780, 840])
+        starts.append(start if rng.random() > 0.01 else -1)
+        finishes.append(min(start + 15 * rng.randint(4, 44), 1439))
+        breaks.append(rng.choice([0, 0, 15, 20, 30, 30, 45, 60, 90]))
+    return starts, finishes, breaks
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 20000
+    failures = check_cases()
+    starts, finishes, breaks = synthetic_columns(n)
+    column = pb.place_breaks_column(starts, finishes, breaks)
+    rowwise = [pb.place_breaks.__wrapped__(s if s >= 0 else None, f, b) for s, f, b in zip(starts, finishes, breaks)]
+    same = column == rowwise
+    failures += not same
+    print(f"Column vs row by row ({n} rows): {'OK' if same else 'DIFFERENT'}")
+
+    pb.place_breaks.cache_clear()
+    t0 = time_mod.perf_counter()
+    pb.place_breaks_column(starts, finishes, breaks)
+    t_memo = time_mod.perf_counter() - t0
+    t0 = time_mod.perf_counter()
+    for s, f, b in zip(starts, finishes, breaks):
+        pb.place_breaks.__wrapped__(s if s >= 0 else None, f, b)
+    t_plain = time_mod.perf_counter() - t0
+    info = pb.place_breaks.cache_info()
+    print(f"Memoized column: {t_memo * 1000:7.1f} ms ({info.currsize} distinct patterns, {info.hits} hits)")
+    print(f"Without memo   : {t_plain * 1000:7.1f} ms  x{t_plain / t_memo:.1f}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 Import first user (Bland, David) from Staff Hours (2026).xlsm or from projects.csv
 (Allocated Week tab exported as CSV). Sheet/CSV: Date, Contract, Location, Section, Employee, Start, Break, Finish, ...
 
-Run from repo root or code-workspace. Requires: pip install openpyxl supabase
+Run from repo root or code-workspace. Requires: pip install openpyxl supabase (numpy optional, speeds up parsing)
 
 Usage:
   python code-workspace/import_payroll_bland_david.py
@@ -11,21 +11,80 @@ Usage:
   python code-workspace/import_payroll_bland_david.py --minimal   # only core columns (if 42703 persists)
   python code-workspace/import_payroll_bland_david.py --fix-imported   # fix already-imported rows: set large_plant_id/workshop_tasks_id when project short_description matches plant/task
   python code-workspace/import_payroll_bland_david.py --list-employees --week 1   # output JSON list of employees for week (excludes Site 1-20)
-  python code-workspace/import_payroll_bland_david.py --week 1 --employees "Name1,Name2"   # import only selected employees for that week; skips duplicates
+  python code-workspace/import_payroll_bland_david.py --week 1 --employees "Name1,Name2"   # import only selected employees for that week; skips duplicates (time_periods import key)
+  python code-workspace/import_payroll_bland_david.py --week 1 --preview --offset 100 --limit 50   # JSON page of the rows that would be written (resolved lazily)
+  python code-workspace/import_payroll_bland_david.py --week 1 --accept-fuzzy   # also import rows whose employee only matched by initials / fuzzy spelling
+  python code-workspace/import_payroll_bland_david.py --week 1 --rpc   # each batch in one transaction via import_time_periods_batch()
+  python code-workspace/import_payroll_bland_david.py --week 1 --workers 6   # batches written in parallel (default 4; 1 = serial)
+  python code-workspace/import_payroll_bland_david.py --week 1 --async   # async writes over one HTTP/2 connection pool, 8 requests in flight
+  python code-workspace/import_payroll_bland_david.py --week 1 --in-flight 16   # same, with up to 16 requests in flight
+  python code-workspace/import_payroll_bland_david.py --week 1 --resume   # skip rows already in the local import ledger (e.g. after a failed run)
+  python code-workspace/import_payroll_bland_david.py --week 1 --changes   # JSON: rows new / changed / removed since the last import (local only)
+  python code-workspace/import_payroll_bland_david.py --week 1 --incremental   # insert new rows, update periods of edited rows (time_period_revisions)
+  python code-workspace/import_payroll_bland_david.py --week 1 --incremental --delete-removed   # also delete periods of rows removed from the sheet
+  python code-workspace/import_payroll_bland_david.py --week 1 --reconcile   # then compare the week with its Week (1) tab (payroll_reconcile.py)
+  python code-workspace/import_payroll_bland_david.py --workbooks "Staff Hours (2024).xlsm" "Staff Hours (2025).xlsm"   # every Allocated Week sheet, one process per workbook
+  python code-workspace/import_payroll_bland_david.py --years 2019-2025 --weeks 1-26 --processes 4   # STAFF_HOURS_EXCEL_TEMPLATE for each year ({year})
+  python code-workspace/import_payroll_bland_david.py --week 1 --refresh-reference   # revalidate the local reference cache before the import
+  python code-workspace/import_payroll_bland_david.py --week 1 --no-reference-cache   # read the reference tables from Supabase, not the cache
+  python code-workspace/import_payroll_bland_david.py --week 1 --profile   # time each stage and count Supabase calls by table and verb
+  python code-workspace/import_payroll_bland_david.py --week 1 --profile-json trace.json   # same, plus a JSON trace (chrome://tracing / Perfetto)
+  python code-workspace/import_payroll_bland_david.py --serve   # JSON-RPC on stdin/stdout (one request per line) for the Import Payroll screen
+
+--serve methods: list_employees {week}, preview {week|csv, employees?, offset?, limit?, accept_fuzzy?}, diagnose / import {week|csv, employees?, minimal?,
+rpc?, workers?, in_flight?, ledger?, resume?, incremental?, delete_removed?, accept_fuzzy?}, changes {week|csv}, queue_import {week|weeks, workbook?, employees?, at?, start?,
+job_workers?, + import options}, jobs {limit?}, cancel_job {id}, refresh, ping, shutdown. Workbook sheets, reference tables and resolved users
+are kept warm between requests.
+
+Employee names resolve exactly, through the alias map (payroll_name_aliases.json) or after normalising case,
+spacing and punctuation; initials and fuzzy spellings are only proposed (listed for review, rows skipped) unless
+--accept-fuzzy. See payroll_names.py.
+
+Every import records each row's outcome in the local import ledger (payroll_import_ledger.py; --no-ledger to
+turn off), which --resume, --changes and --incremental read. projects, large_plant, workshop_tasks and users_setup
+come from the local reference cache (payroll_reference_cache.py), so a run soon after another reads none of them.
+Unattended loads (several weeks, overnight) go through the job queue: payroll_import_jobs.py.
 """
 
+import asyncio
+import atexit
 import csv
 import json
 import os
 import re
 import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, date, time, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from time import monotonic
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import openpyxl
 from supabase import create_client
 
+from payroll_import_jobs import JOB_OPTIONS, JOB_WORKERS, JobQueue, JobStatusTable, parse_start_time, start_runner
+from payroll_import_ledger import (
+    OUTCOME_DUPLICATE,
+    OUTCOME_INSERTED,
+    OUTCOME_SKIPPED,
+    ImportLedger,
+    row_hashes,
+    sheet_row_hashes,
+    source_id,
+)
+from payroll_async_http import ASYNC_IN_FLIGHT, AsyncPostgrest
+from payroll_breaks import place_breaks_column
+from payroll_names import NameIndex
+from payroll_profile import ImportProfile, stage
+from payroll_reference_cache import REFERENCE_CACHE_TTL_SECONDS, ReferenceCache, build_index, plant_no_key
+from payroll_rows import SheetRows
+
+try:
+    import numpy as np  # optional: bulk parse of numeric cells in _parse_columns
+except ImportError:
+    np = None
+
 # Supabase (use service_role to bypass RLS for import)
 SUPABASE_URL = os.environ.get("SUPABASE_URL", "https://ifvbajmmjkkuvhigcgad.supabase.co")
 SUPABASE_KEY = os.environ.get(
@@ -39,7 +98,9 @@ SHEET_NAME = "Allocated Week (1)"
 MIN_ROW = 2
 MAX_ROW_DEFAULT = 13
 MAX_ROW_IMPORT = 500  # when loading by week for import or list-employees
+MAX_ROW_CAP = 20000  # last sheet row read, whatever AH1 says
 MIN_COL, MAX_COL = 1, 33
+DEFAULT_EMPLOYEE = "Bland, David"  # single-user mode when the first row's Employee is not in users_setup
 
 # CSV column headers (must match projects.csv header row)
 CSV_HEADERS = [
@@ -58,6 +119,12 @@ COL_MOB_START, COL_MOB_END = 15, 18      # 15-18 = Mob 1-4
 COL_MATERIAL, COL_QTY = 19, 20
 COL_TRAVEL, COL_ON_CALL, COL_MISC = 26, 27, 28
 
+# Mob 4 (col 18): a whole number of at least CONCRETE_TICKET_MIN_DIGITS digits that is not a large_plant.plant_no
+# is the concrete ticket number (time_periods.concrete_ticket_no, an integer column) instead of a fleet entry
+COL_CONCRETE_TICKET = COL_MOB_END
+CONCRETE_TICKET_MIN_DIGITS = 4
+CONCRETE_TICKET_MAX = 2 ** 31 - 1
+
 
 def _cell_value(row: tuple, idx: int) -> Any:
     """Get cell value at 0-based column index (row is 1-based openpyxl row)."""
@@ -211,9 +278,226 @@ def _to_iso_date(d: date) -> str:
     return d.isoformat()
 
 
-def _load_rows_from_csv(csv_path: str) -> List[Tuple[Any, ...]]:
-    """Load data rows from projects.csv; return list of tuples (same column order as Excel: 0=Date, 1=Contract, ...)."""
-    rows = []
+# ---------------------------------------------------------------------------
+# Columnar parse of Date / Start / Break / Finish / Hours / Travel
+# ---------------------------------------------------------------------------
+# A week sheet repeats the same few dates and times thousands of times, so each column is factorized into its
+# unique cells first. Numeric uniques (Excel serial dates, day fractions, minute counts) are parsed in bulk with
+# NumPy; strings ("HH:MM", DD/MM/YYYY) and date/time objects go through the scalar helpers above once per unique
+# value, which keeps semantics identical to the per-cell helpers. Results are broadcast back to every row.
+
+_EXCEL_MAX_SERIAL = (date.max - _EXCEL_EPOCH).days  # 9999-12-31; larger serials overflow in _parse_date
+_INT_SAFE = 2 ** 53  # floats beyond this are left to the scalar helpers
+
+
+def _factorize(rows: List[Tuple[Any, ...]], idx: int) -> Tuple[Sequence[int], List[Any]]:
+    """Codes per row and unique cell values for column idx (cells as _cell_value returns them).
+    Keys include the type so 1, 1.0 and True stay distinct (the helpers treat them differently).
+    A SheetRows is already encoded this way: its codes are used as they are (blank strings stay separate
+    uniques that read as None)."""
+    if isinstance(rows, SheetRows):
+        codes, values = rows.column(idx)
+        return codes, [_cell_value((v,), 0) for v in values]
+    index: Dict[Tuple[type, Any], int] = {}
+    uniques: List[Any] = []
+    codes: List[int] = []
+    for row in rows:
+        v = _cell_value(row, idx)
+        key = (v.__class__, v)
+        code = index.get(key)
+        if code is None:
+            code = index[key] = len(uniques)
+            uniques.append(v)
+        codes.append(code)
+    return codes, uniques
+
+
+def _numeric_uniques(uniques: List[Any]) -> Tuple[List[int], List[float]]:
+    """Positions and float values of the plain int/float uniques that NumPy can handle exactly."""
+    pos: List[int] = []
+    vals: List[float] = []
+    for i, v in enumerate(uniques):
+        if v.__class__ is float or v.__class__ is int:
+            try:
+                x = float(v)
+            except OverflowError:
+                continue
+            if x != x or abs(x) < _INT_SAFE:  # NaN handled in bulk; +/-inf and huge values stay scalar
+                pos.append(i)
+                vals.append(x)
+    return pos, vals
+
+
+def _unique_dates(uniques: List[Any]) -> List[Optional[date]]:
+    out: List[Optional[date]] = [None] * len(uniques)
+    done = set()
+    if np is not None:
+        pos, vals = _numeric_uniques(uniques)
+        if pos:
+            x = np.array(vals, dtype=np.float64)
+            finite = np.isfinite(x)
+            serial = np.trunc(np.where(finite, x, 0.0)).astype(np.int64)  # int(float(v)) truncates toward zero
+            valid = finite & (serial > 0) & (serial <= _EXCEL_MAX_SERIAL)
+            for p, ok, s in zip(pos, valid.tolist(), serial.tolist()):
+                out[p] = _EXCEL_EPOCH + timedelta(days=s) if ok else None
+            done.update(pos)
+    for i, v in enumerate(uniques):
+        if i not in done:
+            out[i] = _parse_date(v)
+    return out
+
+
+def _unique_times(uniques: List[Any]) -> List[Optional[time]]:
+    out: List[Optional[time]] = [None] * len(uniques)
+    done = set()
+    if np is not None:
+        pos, vals = _numeric_uniques(uniques)
+        if pos:
+            x = np.array(vals, dtype=np.float64)
+            frac = (x >= 0) & (x < 1)
+            total_secs = np.round(np.where(frac, x, 0.0) * 24 * 3600).astype(np.int64)  # round-half-even like round()
+            h = total_secs // 3600
+            m = (total_secs % 3600) // 60
+            valid = frac & (h < 24)  # x close to 1 rounds to 24:00, which time() rejects
+            for p, ok, hh, mm in zip(pos, valid.tolist(), h.tolist(), m.tolist()):
+                out[p] = time(hh, mm) if ok else None
+            done.update(pos)
+    for i, v in enumerate(uniques):
+        if i not in done:
+            out[i] = _parse_time(v)
+    return out
+
+
+def _unique_minutes(uniques: List[Any], scalar: Callable[[Any], int], numeric_factor: int) -> List[int]:
+    """Minutes for Break / Travel (numeric_factor=1) or Hours (numeric_factor=60). Numbers never match the
+    "HH:MM" pattern, so numeric cells are int(float(v)) * numeric_factor, with NaN -> 0."""
+    out: List[int] = [0] * len(uniques)
+    done = set()
+    if np is not None:
+        pos, vals = _numeric_uniques(uniques)
+        if pos:
+            x = np.array(vals, dtype=np.float64)
+            minutes = np.where(np.isnan(x), 0, np.trunc(np.nan_to_num(x)).astype(np.int64) * numeric_factor)
+            for p, mins in zip(pos, minutes.tolist()):
+                out[p] = mins
+            done.update(pos)
+    for i, v in enumerate(uniques):
+        if i not in done:
+            out[i] = scalar(v)
+    return out
+
+
+def _parse_columns(rows: List[Tuple[Any, ...]]) -> Dict[str, Any]:
+    """Parse Date, Start, Break, Finish, Hours and Travel for all rows at once (same results as _parse_date,
+    _parse_time, _parse_break_minutes, _parse_hours_to_minutes and _travel_minutes per cell).
+
+    Returns per-row lists "work_date", "start", "finish" (date/time objects or None) and "break_min", "hours_min",
+    "travel_min" (ints) for the row loop, plus typed arrays when NumPy is installed: "work_day" (date.toordinal(),
+    0 = no date), "start_min" / "finish_min" (minutes after midnight, -1 = none), "break_min_arr",
+    "hours_min_arr", "travel_min_arr", and the invalid masks "no_date" and "no_work" (hours <= 0). "breaks" holds
+    each row's break intervals (payroll_breaks.place_breaks: minutes after midnight of the work date)."""
+    date_codes, date_uniques = _factorize(rows, COL_DATE)
+    start_codes, start_uniques = _factorize(rows, COL_START)
+    finish_codes, finish_uniques = _factorize(rows, COL_FINISH)
+    break_codes, break_uniques = _factorize(rows, COL_BREAK)
+    hours_codes, hours_uniques = _factorize(rows, COL_HOURS)
+    travel_codes, travel_uniques = _factorize(rows, COL_TRAVEL)
+
+    dates = _unique_dates(date_uniques)
+    starts = _unique_times(start_uniques)
+    finishes = _unique_times(finish_uniques)
+    breaks = _unique_minutes(break_uniques, _parse_break_minutes, 1)
+    hours = _unique_minutes(hours_uniques, _parse_hours_to_minutes, 60)
+    travels = _unique_minutes(travel_uniques, _travel_minutes, 1)
+
+    cols: Dict[str, Any] = {
+        "work_date": [dates[c] for c in date_codes],
+        "start": [starts[c] for c in start_codes],
+        "finish": [finishes[c] for c in finish_codes],
+        "break_min": [breaks[c] for c in break_codes],
+        "hours_min": [hours[c] for c in hours_codes],
+        "travel_min": [travels[c] for c in travel_codes],
+    }
+    if np is not None:
+        def take(values: List[int], codes: List[int]) -> Any:
+            return np.asarray(values, dtype=np.int64).take(np.asarray(codes, dtype=np.int64)) if codes else np.zeros(0, dtype=np.int64)
+
+        def minutes_of(t: Optional[time]) -> int:
+            return t.hour * 60 + t.minute if t is not None else -1
+
+        cols["work_day"] = take([d.toordinal() if d is not None else 0 for d in dates], date_codes)
+        cols["start_min"] = take([minutes_of(t) for t in starts], start_codes)
+        cols["finish_min"] = take([minutes_of(t) for t in finishes], finish_codes)
+        cols["break_min_arr"] = take(breaks, break_codes)
+        cols["hours_min_arr"] = take(hours, hours_codes)
+        cols["travel_min_arr"] = take(travels, travel_codes)
+        cols["no_date"] = cols["work_day"] == 0
+        cols["no_work"] = cols["hours_min_arr"] <= 0
+        cols["breaks"] = place_breaks_column(cols["start_min"], cols["finish_min"], cols["break_min_arr"])
+    else:
+        cols["no_date"] = [d is None for d in cols["work_date"]]
+        cols["no_work"] = [m <= 0 for m in cols["hours_min"]]
+        cols["breaks"] = place_breaks_column(
+            [t.hour * 60 + t.minute if t is not None else None for t in cols["start"]],
+            [t.hour * 60 + t.minute if t is not None else None for t in cols["finish"]],
+            cols["break_min"],
+        )
+    return cols
+
+
+def _concrete_ticket(key: str) -> Optional[int]:
+    """Concrete ticket number of a Mob 4 cell's plant_no_key that matched no plant, or None."""
+    if len(key) >= CONCRETE_TICKET_MIN_DIGITS and key.isascii() and key.isdigit() and int(key) <= CONCRETE_TICKET_MAX:
+        return int(key)
+    return None
+
+
+def _code_hits(codes: Sequence[int], values: List[Any]) -> Iterator[Tuple[int, Any]]:
+    """(row index, values[code]) for the rows whose code maps to a value that is not None."""
+    if np is not None:
+        mask = np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+        if not mask.any():
+            return
+        code_arr = np.asarray(codes, dtype=np.int64)
+        for row_idx in np.flatnonzero(mask[code_arr]).tolist():
+            yield row_idx, values[code_arr[row_idx]]
+        return
+    for row_idx, code in enumerate(codes):
+        if values[code] is not None:
+            yield row_idx, values[code]
+
+
+def _fleet_columns(rows: List[Tuple[Any, ...]], plant_by_no_key: Dict[str, str]) -> Dict[str, List[Any]]:
+    """Classify the Plant 1-6 / Mob 1-4 cells of all rows at once. Each column's distinct cells are matched once on
+    their plant_no_key (so "0382", "382" and 382.0 are the same plant); only the rows holding a match are visited.
+
+    Returns per-row lists "used_fleet" and "mobilised_fleet" ([(display_order, large_plant_id)], a plant only at
+    its first column since the fleet tables are unique per (period, plant); None = no fleet) and
+    "concrete_ticket_no" (Mob 4 ticket number or None)."""
+    n = len(rows)
+    out: Dict[str, List[Any]] = {"used_fleet": [None] * n, "mobilised_fleet": [None] * n, "concrete_ticket_no": [None] * n}
+    for name, first, last in (("used_fleet", COL_PLANT_START, COL_PLANT_END), ("mobilised_fleet", COL_MOB_START, COL_MOB_END)):
+        fleet = out[name]
+        for i in range(first, last + 1):
+            codes, uniques = _factorize(rows, i)
+            keys = [plant_no_key(v) for v in uniques]
+            pids = [plant_by_no_key.get(k) if k else None for k in keys]
+            if i == COL_CONCRETE_TICKET:
+                tickets = [_concrete_ticket(k) if pid is None else None for k, pid in zip(keys, pids)]
+                for row_idx, ticket in _code_hits(codes, tickets):
+                    out["concrete_ticket_no"][row_idx] = ticket
+            for row_idx, pid in _code_hits(codes, pids):
+                row_fleet = fleet[row_idx]
+                if row_fleet is None:
+                    fleet[row_idx] = [(i - first, pid)]
+                elif all(pid != p for _, p in row_fleet):
+                    row_fleet.append((i - first, pid))
+    return out
+
+
+def _load_rows_from_csv(csv_path: str) -> SheetRows:
+    """Load data rows from projects.csv (same column order as Excel: 0=Date, 1=Contract, ...)."""
+    rows = SheetRows(MAX_COL - MIN_COL + 1)
     path = Path(csv_path)
     if not path.exists():
         return rows
@@ -229,7 +513,7 @@ def _load_rows_from_csv(csv_path: str) -> List[Tuple[Any, ...]]:
                 continue
             # Pad or trim to match expected column count (at least 33 for Travel/On Call/Misc)
             padded = list(row) + [None] * max(0, 33 - len(row))
-            rows.append(tuple(padded[:33]))
+            rows.append(padded[:33])
     return rows
 
 
@@ -237,9 +521,9 @@ def _load_rows_from_csv(csv_path: str) -> List[Tuple[Any, ...]]:
 AH1_COL = 34  # openpyxl: A=1, ..., AH=34
 
 
-def _load_rows_from_excel_week(week_num: int, max_row: int = MAX_ROW_IMPORT) -> List[Tuple[Any, ...]]:
+def _load_rows_from_excel_week(week_num: int, max_row: int = MAX_ROW_IMPORT) -> SheetRows:
     """Load data rows from Excel sheet 'Allocated Week (N)'. Row count taken from cell AH1 if present."""
-    rows: List[Tuple[Any, ...]] = []
+    rows = SheetRows(MAX_COL - MIN_COL + 1)
     if not Path(EXCEL_PATH).exists():
         return rows
     sheet_name = f"Allocated Week ({week_num})"
@@ -247,20 +531,52 @@ def _load_rows_from_excel_week(week_num: int, max_row: int = MAX_ROW_IMPORT) ->
     if sheet_name not in wb.sheetnames:
         wb.close()
         return rows
-    ws = wb[sheet_name]
+    rows = _sheet_rows(wb[sheet_name], max_row)
+    wb.close()
+    return rows
+
+
+def _sheet_rows(ws: Any, max_row: int = MAX_ROW_IMPORT) -> SheetRows:
+    """Data rows of an open Allocated Week worksheet, up to the row in AH1 (if set) or max_row."""
     # AH1 = last row number with data; ensure we read all rows
     try:
         ah1_val = ws.cell(row=1, column=AH1_COL).value
         if ah1_val is not None:
             last_row = int(float(ah1_val))
             if last_row >= MIN_ROW:
-                max_row = min(max(last_row, MIN_ROW), 20000)  # cap at 20k
+                max_row = min(max(last_row, MIN_ROW), MAX_ROW_CAP)
     except (TypeError, ValueError):
         pass
-    for row in ws.iter_rows(min_row=MIN_ROW, max_row=max_row, min_col=MIN_COL, max_col=MAX_COL, values_only=True):
-        rows.append(tuple(row))
-    wb.close()
-    return rows
+    return SheetRows(MAX_COL - MIN_COL + 1, ws.iter_rows(min_row=MIN_ROW, max_row=max_row, min_col=MIN_COL, max_col=MAX_COL, values_only=True))
+
+
+_ALLOCATED_WEEK_SHEET = re.compile(r"^Allocated Week \((\d+)\)$")
+
+
+def _iter_week_sheets(path: str, weeks: Optional[set] = None, max_row: int = MAX_ROW_IMPORT) -> Iterator[Tuple[int, str, SheetRows]]:
+    """(week, source id, rows) for each Allocated Week (n) sheet of a workbook (weeks: only those), in week order.
+    The workbook is opened once."""
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheets = sorted((int(m.group(1)), name) for name in wb.sheetnames for m in [_ALLOCATED_WEEK_SHEET.match(name)] if m)
+        for week, name in sheets:
+            if weeks is None or week in weeks:
+                yield week, source_id(path, name), _sheet_rows(wb[name], max_row)
+    finally:
+        wb.close()
+
+
+def _parse_range(spec: str) -> set:
+    """"1-26,30" -> {1, ..., 26, 30} (weeks or years)"""
+    values = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part:
+            a, b = part.split("-", 1)
+            values.update(range(int(a), int(b) + 1))
+        elif part:
+            values.add(int(part))
+    return values
 
 
 def _to_iso_timestamp(d: date, t: Optional[time], tz_offset_hours: int = 0) -> Optional[str]:
@@ -273,12 +589,8 @@ def _to_iso_timestamp(d: date, t: Optional[time], tz_offset_hours: int = 0) -> O
     return dt.strftime("%Y-%m-%dT%H:%M:%S") + ("Z" if tz_offset_hours == 0 else "")
 
 
-def _list_employees_for_week(week_num: int) -> None:
-    """Output JSON array of unique Employee names for the week, excluding Site 1-20. For Flutter to parse."""
-    rows = _load_rows_from_excel_week(week_num)
-    if not rows:
-        print(json.dumps({"employees": [], "error": "No data or sheet not found"}))
-        return
+def _employees_in_rows(rows: List[Tuple[Any, ...]]) -> List[str]:
+    """Unique Employee names in rows (sorted), excluding empty cells and Site 1-20."""
     seen: set = set()
     for row in rows:
         if len(row) <= COL_EMPLOYEE:
@@ -290,29 +602,43 @@ def _list_employees_for_week(week_num: int) -> None:
         if not name or _is_site_placeholder(name):
             continue
         seen.add(name)
-    out = sorted(seen)
-    print(json.dumps({"employees": out}))
+    return sorted(seen)
 
 
-def _fix_imported_project_to_plant(sb: Any) -> None:
-    """One-time fix: for time_periods with status='imported' and project_id set, if that project's
-    short_description matches a large_plant (plant_no or plant_description) or workshop_tasks.task,
-    set large_plant_id or workshop_tasks_id and clear project_id. Matching is exact then case-insensitive."""
-    # Load imported periods with project_id
-    r = sb.table("time_periods").select("id, project_id").eq("status", "imported").not_.is_("project_id", "null").execute()
-    rows = r.data or []
+def _list_employees_for_week(week_num: int) -> None:
+    """Output JSON array of unique Employee names for the week, excluding Site 1-20. For Flutter to parse."""
+    rows = _load_rows_from_excel_week(week_num)
     if not rows:
-        print("No imported time_periods with project_id found. Nothing to fix.")
+        print(json.dumps({"employees": [], "error": "No data or sheet not found"}))
         return
-    print(f"Found {len(rows)} imported time_period(s) with project_id set.")
+    print(json.dumps({"employees": _employees_in_rows(rows)}))
+
+
+# --fix-imported reads candidates in keyset pages and fixes them with one update per (column, target) group
+FIX_IMPORTED_PAGE_SIZE = 1000
+FIX_IMPORTED_UPDATE_CHUNK = 150  # ids per in_() update (keeps the request URL short)
+
+
+def _fix_imported_project_to_plant(sb: Any, cache: Optional[ReferenceCache] = None) -> None:
+    """One-time fix: for time_periods with status='imported' and project_id set, if that project's
+    short_description matches a large_plant (plant_no or plant_description) or workshop_tasks.task,
+    set large_plant_id or workshop_tasks_id and clear project_id. Matching is exact then case-insensitive.
+    Periods are grouped by (column, target id) so each group is fixed with a few in_("id", ...) updates.
+    projects, large_plant and workshop_tasks come from the reference cache when one is given."""
+    started = monotonic()
+    if cache is not None:
+        tables = cache.load(sb, ("projects", "large_plant", "workshop_tasks"))
+        projects, plant_list, workshop_list = tables["projects"], tables["large_plant"], tables["workshop_tasks"]
+    else:
+        projects = sb.table("projects").select("id, short_description").execute().data or []
+        plant_list = sb.table("large_plant").select("id, plant_no, plant_description").execute().data or []
+        workshop_list = sb.table("workshop_tasks").select("id, task").execute().data or []
     # Load projects (id -> short_description)
-    proj_r = sb.table("projects").select("id, short_description").execute()
-    projects_by_id = {str(p["id"]): str(p.get("short_description") or "").strip() for p in (proj_r.data or [])}
+    projects_by_id = {str(p["id"]): str(p.get("short_description") or "").strip() for p in projects}
     # Section -> large_plant id (exact key); also build lowercase key -> id for case-insensitive
-    plant_r = sb.table("large_plant").select("id, plant_no, plant_description").execute()
     section_to_plant: Dict[str, str] = {}
     section_to_plant_lower: Dict[str, str] = {}
-    for p in (plant_r.data or []):
+    for p in plant_list:
         pid = p.get("id")
         if not pid:
             continue
@@ -321,10 +647,9 @@ def _fix_imported_project_to_plant(sb: Any) -> None:
                 section_to_plant[key] = pid
                 section_to_plant_lower[key.lower()] = pid
     # Section -> workshop_tasks id (exact + lowercase)
-    wr = sb.table("workshop_tasks").select("id, task").execute()
     section_to_workshop: Dict[str, str] = {}
     section_to_workshop_lower: Dict[str, str] = {}
-    for w in (wr.data or []):
+    for w in workshop_list:
         wid = w.get("id")
         key = str(w.get("task") or "").strip()
         if wid and key:
@@ -347,27 +672,83 @@ def _fix_imported_project_to_plant(sb: Any) -> None:
                 return pid
         return None
 
-    updated_plant = 0
-    updated_workshop = 0
+    # Target per project (not per period): (column, id) or None
+    target_by_project: Dict[str, Optional[Tuple[str, str]]] = {}
+
+    def _target(project_id: str) -> Optional[Tuple[str, str]]:
+        if project_id not in target_by_project:
+            short_desc = projects_by_id.get(project_id) or ""
+            plant_id = _plant_id_for_short_desc(short_desc) if short_desc else None
+            workshop_id = (section_to_workshop.get(short_desc) or section_to_workshop_lower.get(short_desc.lower())) if short_desc else None
+            if plant_id:
+                target_by_project[project_id] = ("large_plant_id", plant_id)
+            elif workshop_id:
+                target_by_project[project_id] = ("workshop_tasks_id", workshop_id)
+            else:
+                target_by_project[project_id] = None
+        return target_by_project[project_id]
+
+    # Page through imported periods with project_id (keyset on id: PostgREST caps responses at max-rows)
+    groups: Dict[Tuple[str, str], List[str]] = {}
     short_descs_seen: set = set()
-    for row in rows:
-        tp_id = row.get("id")
-        project_id = row.get("project_id")
-        if not tp_id or not project_id:
-            continue
-        short_desc = projects_by_id.get(str(project_id)) or ""
-        short_descs_seen.add(short_desc or "(empty)")
-        if not short_desc:
-            continue
-        plant_id = _plant_id_for_short_desc(short_desc)
-        workshop_id = section_to_workshop.get(short_desc) or section_to_workshop_lower.get(short_desc.lower())
-        if plant_id:
-            sb.table("time_periods").update({"large_plant_id": plant_id, "project_id": None}).eq("id", tp_id).execute()
-            updated_plant += 1
-        elif workshop_id:
-            sb.table("time_periods").update({"workshop_tasks_id": workshop_id, "project_id": None}).eq("id", tp_id).execute()
-            updated_workshop += 1
-    print(f"Fix-imported: updated {updated_plant} row(s) to large_plant_id, {updated_workshop} row(s) to workshop_tasks_id.")
+    read = 0
+    calls = 0
+    last_id: Optional[str] = None
+    while True:
+        q = sb.table("time_periods").select("id, project_id").eq("status", "imported").not_.is_("project_id", "null")
+        if last_id is not None:
+            q = q.gt("id", last_id)
+        page = q.order("id").limit(FIX_IMPORTED_PAGE_SIZE).execute().data or []
+        calls += 1
+        for row in page:
+            tp_id = row.get("id")
+            project_id = row.get("project_id")
+            if not tp_id or not project_id:
+                continue
+            short_descs_seen.add(projects_by_id.get(str(project_id)) or "(empty)")
+            target = _target(str(project_id))
+            if target:
+                groups.setdefault(target, []).append(tp_id)
+        read += len(page)
+        if page:
+            print(f"  Read {read} imported time_period(s) with project_id...")
+        if len(page) < FIX_IMPORTED_PAGE_SIZE:
+            break
+        last_id = page[-1]["id"]
+    if not read:
+        print("No imported time_periods with project_id found. Nothing to fix.")
+        return
+    to_fix = sum(len(ids) for ids in groups.values())
+    print(f"Found {read} imported time_period(s) with project_id set; {to_fix} to fix in {len(groups)} group(s).")
+
+    updated = {"large_plant_id": 0, "workshop_tasks_id": 0}
+    failed = 0
+    for (column, target_id), ids in sorted(groups.items()):
+        for i in range(0, len(ids), FIX_IMPORTED_UPDATE_CHUNK):
+            chunk = ids[i:i + FIX_IMPORTED_UPDATE_CHUNK]
+            try:
+                r = (
+                    sb.table("time_periods")
+                    .update({column: target_id, "project_id": None})
+                    .in_("id", chunk)
+                    .eq("status", "imported")
+                    .execute()
+                )
+                updated[column] += len(r.data or [])
+            except Exception as e:
+                failed += len(chunk)
+                print(f"  API error ({column} = {target_id}, {len(chunk)} row(s)): {_format_api_error(e)}")
+            calls += 1
+            done = sum(updated.values()) + failed
+            if done < to_fix:
+                print(f"  Fixed {done}/{to_fix}...")
+    elapsed = monotonic() - started
+    fixed = sum(updated.values())
+    print(f"Fix-imported: updated {updated['large_plant_id']} row(s) to large_plant_id, {updated['workshop_tasks_id']} row(s) to workshop_tasks_id.")
+    print(f"  {calls} time_periods request(s) in {elapsed:.1f}s ({fixed / elapsed if elapsed > 0 else 0:,.0f} rows/s)."
+          + (f" {failed} row(s) failed." if failed else ""))
+    updated_plant = updated["large_plant_id"]
+    updated_workshop = updated["workshop_tasks_id"]
     if updated_plant == 0 and updated_workshop == 0 and short_descs_seen:
         print("Diagnostic: project short_description(s) on imported rows:", sorted(short_descs_seen))
         plant_keys = sorted(set(section_to_plant.keys()))[:20]
@@ -377,156 +758,129 @@ def _fix_imported_project_to_plant(sb: Any) -> None:
         print("(Match requires project short_description to equal one of these. If Section in CSV was different, re-import with the updated script or align short_description in projects.)")
 
 
-def main() -> None:
-    diagnose = "--diagnose" in sys.argv
-    minimal_payload = "--minimal" in sys.argv
-    fix_imported = "--fix-imported" in sys.argv
-    list_employees = "--list-employees" in sys.argv
-    week_num: Optional[int] = None
-    employees_arg: Optional[str] = None
-    i = 1
-    while i < len(sys.argv):
-        a = sys.argv[i]
-        if a == "--week" and i + 1 < len(sys.argv):
-            try:
-                week_num = int(sys.argv[i + 1])
-            except ValueError:
-                pass
-            i += 2
-            continue
-        if a == "--employees" and i + 1 < len(sys.argv):
-            employees_arg = sys.argv[i + 1]
-            i += 2
-            continue
-        i += 1
-    csv_path = None
-    for a in sys.argv[1:]:
-        if a not in ("--diagnose", "--minimal", "--fix-imported", "--list-employees", "--week", "--employees") and not a.startswith("-") and not a.isdigit():
-            csv_path = a
-            break
-    if csv_path is None and Path(PROJECTS_CSV).exists() and not week_num:
-        csv_path = PROJECTS_CSV
-
-    if list_employees and week_num is not None:
-        _list_employees_for_week(week_num)
-        return
+USERS_PAGE_SIZE = 1000  # users_setup rows per keyset page (PostgREST max-rows)
+
+
+def _load_users(sb: Any) -> List[Dict[str, Any]]:
+    """users_setup (user_id, display_name) in keyset pages on user_id."""
+    users: List[Dict[str, Any]] = []
+    last: Optional[str] = None
+    while True:
+        q = sb.table("users_setup").select("user_id, display_name")
+        if last is not None:
+            q = q.gt("user_id", last)
+        page = q.order("user_id").limit(USERS_PAGE_SIZE).execute().data or []
+        users.extend(page)
+        if len(page) < USERS_PAGE_SIZE:
+            return users
+        last = page[-1]["user_id"]
+
+
+def _load_reference_data(sb: Any, cache: Optional[ReferenceCache] = None, refresh: bool = False) -> Dict[str, Any]:
+    """Load projects, large_plant, workshop_tasks and users_setup and build the lookups used to resolve each row.
+    With a reference cache (payroll_reference_cache.py) the tables and their lookups come from it, and a fresh
+    cache costs no request; refresh revalidates it first."""
+    if cache is not None:
+        tables = cache.load(sb, refresh=refresh)
+        refs = _reference_data(
+            tables["projects"], tables["large_plant"], tables["workshop_tasks"], tables["users_setup"],
+            indexes=cache.indexes(("plant_by_no", "plant_by_no_key", "section_to_plant_id", "section_to_workshop_id")),
+        )
+        refs["reference_cache"] = (sb, cache)  # for _revalidate_reference_misses
+        return refs
+    # Prefer projects by short_description; need projects list for lookup
+    projects_response = sb.table("projects").select("id, client_name, town, short_description").execute()
+    plant_response = sb.table("large_plant").select("id, plant_no, plant_description").execute()
+    workshop_response = sb.table("workshop_tasks").select("id, task").execute()
+    return _reference_data(projects_response.data or [], plant_response.data or [], workshop_response.data or [], _load_users(sb))
 
-    sb = create_client(SUPABASE_URL, SUPABASE_KEY)
-    if fix_imported:
-        _fix_imported_project_to_plant(sb)
-        return
 
-    rows: List[Tuple[Any, ...]] = []
-    if week_num is not None and Path(EXCEL_PATH).exists():
-        rows = _load_rows_from_excel_week(week_num)
-        print(f"Loaded {len(rows)} data row(s) from Excel week {week_num}: {EXCEL_PATH}")
-    if not rows and csv_path and Path(csv_path).exists():
-        rows = _load_rows_from_csv(csv_path)
-        print(f"Loaded {len(rows)} data row(s) from CSV: {csv_path}")
-    if not rows and Path(EXCEL_PATH).exists() and week_num is None:
-        wb = openpyxl.load_workbook(EXCEL_PATH, read_only=True, data_only=True)
-        if SHEET_NAME in wb.sheetnames:
-            ws = wb[SHEET_NAME]
-            for row in ws.iter_rows(min_row=MIN_ROW, max_row=MAX_ROW_DEFAULT, min_col=MIN_COL, max_col=MAX_COL, values_only=True):
-                rows.append(tuple(row))
-            wb.close()
-            print(f"Loaded {len(rows)} data row(s) from Excel: {EXCEL_PATH}")
-        else:
-            print(f"Sheet '{SHEET_NAME}' not found. Available: {wb.sheetnames}")
-            wb.close()
-            return
-    if not rows:
-        if week_num is not None:
-            print(f"No data for week {week_num}. Check Excel path and sheet 'Allocated Week ({week_num})'.")
-        elif csv_path or Path(PROJECTS_CSV).exists():
-            print(f"No data rows in {csv_path or PROJECTS_CSV}")
-        else:
-            print(f"File not found: {EXCEL_PATH} (and no {PROJECTS_CSV})")
-        return
+# The reference cache can serve tables up to REFERENCE_CACHE_MAX_STALE_SECONDS old (revalidated in the background),
+# so a user, project or plant added since then is a miss, not an unknown. Before any row is counted unresolved,
+# the tables behind the sheet's misses are revalidated once and the lookups rebuilt.
+_USER_TABLES = ("users_setup",)
+_SECTION_TABLES = ("projects", "large_plant", "workshop_tasks")
 
-    # Selected employees filter (from --employees "Name1,Name2" or "Name1|Name2" for names containing commas)
-    selected_employees: Optional[set] = None
-    if employees_arg:
-        sep = "|" if "|" in employees_arg else ","
-        selected_employees = {n.strip() for n in employees_arg.split(sep) if n.strip()}
 
-    # Cache: display_name -> user_id (for multi-employee import)
-    user_cache: Dict[str, str] = {}
-    def resolve_user_id(display_name_raw: Any) -> Optional[str]:
-        if display_name_raw is None:
-            return None
-        name = str(display_name_raw).strip()
-        if not name or _is_site_placeholder(name):
-            return None
-        if name in user_cache:
-            return user_cache[name]
-        us = sb.table("users_setup").select("user_id").eq("display_name", name).limit(1).execute()
-        if us.data and len(us.data) > 0:
-            user_cache[name] = us.data[0]["user_id"]
-            return user_cache[name]
-        return None
-
-    user_id: Optional[str] = None  # used in single-user mode and for existing_keys
-    # When --week is set, always resolve user per row (so all 6 users get correct user_id). Single-user only when no --week and no --employees.
-    use_multi_employee = week_num is not None or selected_employees is not None
-    if use_multi_employee:
-        # Pre-resolve all unique employee names that appear in the sheet (for duplicate check and per-row resolution)
-        if selected_employees is not None:
-            for name in selected_employees:
-                resolve_user_id(name)
-            print(f"Selected employees: {len(selected_employees)}")
-        else:
-            # --week set but no --employees: resolve every unique Employee in the sheet
-            seen_emp = set()
-            for row in rows:
-                if len(row) <= COL_EMPLOYEE:
-                    continue
-                emp = _cell_value(row, COL_EMPLOYEE)
-                if emp is None or _is_site_placeholder(emp):
-                    continue
-                name = str(emp).strip()
-                if name and name not in seen_emp:
-                    seen_emp.add(name)
-                    resolve_user_id(name)
-            print(f"Unique employees in sheet: {len(seen_emp)} (all will be imported per row)")
-    else:
-        # Single-user mode: first row employee only (legacy CSV/single-sheet run without --week)
-        display_name = None
-        for row in rows:
-            if len(row) > COL_EMPLOYEE:
-                candidate = _cell_value(row, COL_EMPLOYEE)
-                if candidate and str(candidate).strip() and not _is_site_placeholder(candidate):
-                    display_name = str(candidate).strip()
-                    break
-        candidates = [display_name] if display_name else []
-        candidates += ["Bland, David", "Blank, David"]
-        display_name = None
-        for name in candidates:
-            if not name:
+def _reference_misses(
+    refs: Dict[str, Any], rows: Sequence[Tuple[Any, ...]], selected_employees: Optional[set] = None,
+) -> Tuple[List[str], List[str]]:
+    """(employee names, Section / plant number values) in rows that the lookups do not resolve. A name that is
+    only proposed (initials / fuzzy) is a miss too: the user may have been added since."""
+    names: NameIndex = refs["names"]
+    missed_names = []
+    for name in _employees_in_rows(rows):
+        if selected_employees is not None and name not in selected_employees:
+            continue
+        match = names.lookup(name)
+        if match is None or match.proposed:
+            missed_names.append(name)
+    project_sections = {str(p.get("short_description") or "").strip() for p in refs["projects"]}
+    section_to_plant_id = refs["section_to_plant_id"]
+    missed_sections = []
+    for section in _factorize(rows, COL_SECTION)[1]:
+        key = str(section).strip() if section else ""
+        if not key or key in section_to_plant_id or key in refs["section_to_workshop_id"] or key in project_sections:
+            continue
+        if key.lower().startswith("fleet no ") and len(key) > 9:
+            fleet_no = key[9:].strip()
+            if section_to_plant_id.get(fleet_no) or refs["plant_by_no"].get(fleet_no) or refs["plant_by_no_key"].get(plant_no_key(fleet_no)):
                 continue
-            us = sb.table("users_setup").select("user_id").eq("display_name", name).limit(1).execute()
-            if us.data and len(us.data) > 0:
-                user_id = us.data[0]["user_id"]
-                display_name = name
-                break
-        if not user_id:
-            print("User not found in users_setup. Tried:", candidates)
-            print("First row Employee (col E):", repr(_cell_value(rows[0], COL_EMPLOYEE)) if rows else "n/a")
-            return
-        def _single_user_resolve(_: Any) -> Optional[str]:
-            return user_id
-        resolve_user_id = _single_user_resolve
-        print(f"User: {display_name} -> {user_id}")
-    print(f"Rows read: {len(rows)}")
-
-    # Prefer projects by short_description; need projects list for lookup
-    projects_response = sb.table("projects").select("id, client_name, town, short_description").execute()
-    projects: List[Dict] = projects_response.data or []
-
+        missed_sections.append(key)
+    # Plant 1-6 / Mob 1-3 cells holding a plant number (Mob 4 can be a concrete ticket number instead)
+    for i in range(COL_PLANT_START, COL_CONCRETE_TICKET):
+        for value in _factorize(rows, i)[1]:
+            key = plant_no_key(value)
+            if key.isdigit() and key not in refs["plant_by_no_key"]:
+                missed_sections.append(key)
+    return missed_names, missed_sections
+
+
+def _revalidate_reference_misses(
+    refs: Dict[str, Any], rows: Sequence[Tuple[Any, ...]], selected_employees: Optional[set] = None,
+    emit: Callable[[str], None] = print,
+) -> bool:
+    """Revalidate the cached tables behind rows' lookup misses now and rebuild refs' lookups in place, so the
+    misses are retried before their rows are counted unresolved. Each miss is tried once per refs (a name that
+    is still unknown does not revalidate again). No-op for refs not read through the reference cache.
+    Returns True if refs were rebuilt."""
+    source = refs.get("reference_cache")
+    if source is None:
+        return False
+    sb, cache = source
+    tried: set = refs.setdefault("misses_revalidated", set())
+    missed_names, missed_sections = _reference_misses(refs, rows, selected_employees)
+    missed_names = [n for n in missed_names if ("name", n) not in tried]
+    missed_sections = [v for v in set(missed_sections) if ("section", v) not in tried]
+    tables = (list(_USER_TABLES) if missed_names else []) + (list(_SECTION_TABLES) if missed_sections else [])
+    if not tables:
+        return False
+    tried.update(("name", n) for n in missed_names)
+    tried.update(("section", v) for v in missed_sections)
+    emit(f"Not in the reference cache: {len(missed_names)} employee name(s), {len(missed_sections)} Section / plant "
+         f"value(s); revalidating {', '.join(tables)}")
+    cache.revalidate(sb, tables)
+    fresh = cache.load(sb)
+    refs.update(_reference_data(
+        fresh["projects"], fresh["large_plant"], fresh["workshop_tasks"], fresh["users_setup"],
+        indexes=cache.indexes(("plant_by_no", "plant_by_no_key", "section_to_plant_id", "section_to_workshop_id")),
+    ))
+    return True
+
+
+def _reference_data(
+    projects: List[Dict[str, Any]], plant_list: List[Dict[str, Any]], workshop_list: List[Dict[str, Any]], users: List[Dict[str, Any]],
+    indexes: Optional[Dict[str, Dict[str, str]]] = None,
+) -> Dict[str, Any]:
+    """Lookups used to resolve each row, from the reference tables' rows (however they were read).
+    indexes: plant_by_no, plant_by_no_key, section_to_plant_id and section_to_workshop_id already built (the
+    reference cache's)."""
+    if indexes is not None:
+        return {"projects": projects, **indexes, "names": NameIndex(users), "loaded_at": monotonic()}
     # large_plant: by plant_no -> id (for Plant 1-6 / Mob 1-4), and Section -> id (for time_periods.large_plant_id)
-    plant_response = sb.table("large_plant").select("id, plant_no, plant_description").execute()
-    plant_list = plant_response.data or []
     plant_by_no: Dict[str, str] = {str(p["plant_no"]).strip(): p["id"] for p in plant_list if p.get("plant_no")}
+    # Plant / Mob cells: same, on normalised plant numbers (Excel floats and leading zeros)
+    plant_by_no_key = build_index(plant_list, ("plant_no",), "id", plant_no_key)
     # Section (col 3) can match plant_no or plant_description -> use for time_periods.large_plant_id
     section_to_plant_id: Dict[str, str] = {}
     for p in plant_list:
@@ -538,102 +892,161 @@ def main() -> None:
                 section_to_plant_id[key] = pid
 
     # workshop_tasks: Section can match task -> time_periods.workshop_tasks_id
-    workshop_response = sb.table("workshop_tasks").select("id, task").execute()
     section_to_workshop_id: Dict[str, str] = {}
-    for w in (workshop_response.data or []):
+    for w in workshop_list:
         wid = w.get("id")
         key = str(w.get("task") or "").strip()
         if wid and key:
             section_to_workshop_id[key] = wid
 
-    def _dup_key(uid: str, wd: str, st: Any) -> Optional[Tuple[str, str, str]]:
-        """Normalize (user_id, work_date, start_time) for duplicate check so DB format matches."""
-        if not uid or not wd or not st:
+    return {
+        "projects": projects,
+        "plant_by_no": plant_by_no,
+        "plant_by_no_key": plant_by_no_key,
+        "section_to_plant_id": section_to_plant_id,
+        "section_to_workshop_id": section_to_workshop_id,
+        "names": NameIndex(users),
+        "loaded_at": monotonic(),
+    }
+
+
+def _make_user_resolver(
+    sb: Any, user_cache: Dict[str, str], names: Optional[NameIndex] = None, accept_fuzzy: bool = False,
+) -> Callable[[Any], Optional[str]]:
+    """Return resolve_user_id(display_name) backed by user_cache (display_name -> user_id). With a NameIndex
+    (refs["names"]) names resolve in memory, exact, aliased or normalised; initials / fuzzy proposals only with
+    accept_fuzzy (and then are not put in user_cache, which later runs share). Without one, by an exact
+    display_name query per new name."""
+    def resolve_user_id(display_name_raw: Any) -> Optional[str]:
+        if display_name_raw is None:
             return None
-        w = str(wd)[:10]
-        s = str(st).strip()
-        if not s:
+        name = str(display_name_raw).strip()
+        if not name or _is_site_placeholder(name):
             return None
-        # Normalize to YYYY-MM-DDTHH:MM:SSZ so DB variants (.000Z, +00, etc.) match
-        if len(s) >= 19:
-            s = s[:19].replace(" ", "T") + "Z"
-        elif not s.endswith("Z"):
-            s = s + "Z"
-        return (str(uid), w, s)
-
-    # Build set of existing (user_id, work_date, start_time) to avoid duplicates
-    existing_keys: set = set()
-    dates_in_rows = []
-    for row in rows:
-        if len(row) < 9:
-            continue
-        d = _parse_date(_cell_value(row, COL_DATE))
-        if d:
-            dates_in_rows.append(d)
-    if dates_in_rows:
-        min_date = min(dates_in_rows)
-        max_date = max(dates_in_rows)
-        user_ids_to_check = list(user_cache.values()) if user_cache else []
-        if not use_multi_employee and user_id is not None:
-            user_ids_to_check = [user_id]
-        if user_ids_to_check:
-            try:
-                r = sb.table("time_periods").select("user_id, work_date, start_time").gte("work_date", min_date.isoformat()).lte("work_date", max_date.isoformat()).in_("user_id", user_ids_to_check).execute()
-                for x in (r.data or []):
-                    k = _dup_key(str(x.get("user_id") or ""), str(x.get("work_date") or ""), x.get("start_time"))
-                    if k:
-                        existing_keys.add(k)
-            except Exception:
-                pass
+        if name in user_cache:
+            return user_cache[name]
+        if names is not None:
+            match = names.resolve(name, accept_proposed=accept_fuzzy)
+            if match is None:
+                return None
+            if not match.proposed:
+                user_cache[name] = match.user_id
+            return match.user_id
+        us = sb.table("users_setup").select("user_id").eq("display_name", name).limit(1).execute()
+        if us.data and len(us.data) > 0:
+            user_cache[name] = us.data[0]["user_id"]
+            return user_cache[name]
+        return None
+    return resolve_user_id
 
-    inserted = 0
-    skipped_no_date = 0
-    skipped_no_work = 0
-    skipped_site_placeholder = 0
-    skipped_unknown_employee = 0
-    skipped_not_selected = 0
-    skipped_duplicate = 0
-    errors: List[str] = []
+
+def _dup_key(uid: str, wd: str, st: Any) -> Optional[Tuple[str, str, str]]:
+    """Normalize (user_id, work_date, start_time) for duplicate check so DB format matches."""
+    if not uid or not wd or not st:
+        return None
+    w = str(wd)[:10]
+    s = str(st).strip()
+    if not s:
+        return None
+    # Normalize to YYYY-MM-DDTHH:MM:SSZ so DB variants (.000Z, +00, etc.) match
+    if len(s) >= 19:
+        s = s[:19].replace(" ", "T") + "Z"
+    elif not s.endswith("Z"):
+        s = s + "Z"
+    return (str(uid), w, s)
+
+
+def _new_counters() -> Dict[str, int]:
+    return {
+        "inserted": 0,
+        "skipped_no_date": 0,
+        "skipped_no_work": 0,
+        "skipped_site_placeholder": 0,
+        "skipped_unknown_employee": 0,
+        "skipped_not_selected": 0,
+        "skipped_duplicate": 0,
+        "skipped_ledger": 0,
+        "skipped_unchanged": 0,
+        "skipped_locked": 0,
+        "updated": 0,
+        "deleted": 0,
+    }
+
+
+def _iter_planned_rows(
+    rows: List[Tuple[Any, ...]],
+    refs: Dict[str, Any],
+    resolve_user_id: Callable[[Any], Optional[str]],
+    counters: Dict[str, int],
+    *,
+    selected_employees: Optional[set] = None,
+    diagnose: bool = False,
+    minimal_payload: bool = False,
+    emit: Callable[[str], None] = print,
+    cols: Optional[Dict[str, Any]] = None,
+    skip_rows: Optional[set] = None,
+    only_rows: Optional[set] = None,
+    first_row: int = 0,
+) -> Iterator[Dict[str, Any]]:
+    """Resolve each sheet row into an insert plan (payload + breaks + fleet). Skipped rows are counted in
+    counters and not yielded. Lazy, so callers can write (or print) each plan as soon as it is resolved.
+    cols is the _parse_columns result for rows (computed here if not given); skip_rows holds row indexes
+    already in the import ledger (skipped before any lookup); only_rows, if given, limits the rows looked at.
+    first_row: sheet index of rows[0] when rows is a slice of the sheet (for row numbers)."""
+    projects = refs["projects"]
+    plant_by_no = refs["plant_by_no"]
+    plant_by_no_key = refs["plant_by_no_key"]
+    section_to_plant_id = refs["section_to_plant_id"]
+    section_to_workshop_id = refs["section_to_workshop_id"]
+    if cols is None:
+        cols = _parse_columns(rows)
+    col_date, col_start, col_finish = cols["work_date"], cols["start"], cols["finish"]
+    col_break, col_hours, col_travel = cols["break_min"], cols["hours_min"], cols["travel_min"]
+    col_breaks = cols["breaks"]
+    fleet = _fleet_columns(rows, plant_by_no_key)
+    col_used_fleet, col_mobilised_fleet, col_ticket = fleet["used_fleet"], fleet["mobilised_fleet"], fleet["concrete_ticket_no"]
 
     for row_idx, row in enumerate(rows):
-        if len(row) < 9:
+        if len(row) < 9 or (only_rows is not None and row_idx not in only_rows):
+            continue
+        if skip_rows is not None and row_idx in skip_rows:
+            counters["skipped_ledger"] += 1
             continue
         employee_cell = _cell_value(row, COL_EMPLOYEE)
         if _is_site_placeholder(employee_cell):
-            skipped_site_placeholder += 1
+            counters["skipped_site_placeholder"] += 1
             continue
         row_user_id = resolve_user_id(employee_cell)
         if row_user_id is None:
-            skipped_unknown_employee += 1
+            counters["skipped_unknown_employee"] += 1
             continue
         if selected_employees is not None:
             emp_name = str(employee_cell).strip()
             if emp_name not in selected_employees:
-                skipped_not_selected += 1
+                counters["skipped_not_selected"] += 1
                 continue
-        raw_date = _cell_value(row, COL_DATE)
-        work_date = _parse_date(raw_date)
+        work_date = col_date[row_idx]
         if work_date is None:
-            skipped_no_date += 1
-            if row_idx < 3:
-                print(f"  [Skip row {row_idx + MIN_ROW}] no date parsed from col A: {repr(raw_date)}")
+            counters["skipped_no_date"] += 1
+            if first_row + row_idx < 3:
+                emit(f"  [Skip row {first_row + row_idx + MIN_ROW}] no date parsed from col A: {repr(_cell_value(row, COL_DATE))}")
             continue
         # Skip rows with no hours (column 8 "Hours" empty or 00:00) – only import rows with worked time
-        hours_min = _parse_hours_to_minutes(_cell_value(row, COL_HOURS))
+        hours_min = col_hours[row_idx]
         if hours_min <= 0:
-            skipped_no_work += 1
+            counters["skipped_no_work"] += 1
             if diagnose:
-                print(f"  Row {row_idx + 2}: {work_date} skip (no hours in column 8: {repr(_cell_value(row, COL_HOURS))})")
+                emit(f"  Row {first_row + row_idx + MIN_ROW}: {work_date} skip (no hours in column 8: {repr(_cell_value(row, COL_HOURS))})")
             continue
-        start_t = _parse_time(_cell_value(row, COL_START))
-        finish_t = _parse_time(_cell_value(row, COL_FINISH))
+        start_t = col_start[row_idx]
+        finish_t = col_finish[row_idx]
         contract = _cell_value(row, COL_CONTRACT)
         location = _cell_value(row, COL_LOCATION)
         section = _cell_value(row, COL_SECTION)
-        break_min = _parse_break_minutes(_cell_value(row, COL_BREAK))
+        break_min = col_break[row_idx]
         material = _cell_value(row, COL_MATERIAL)
         qty = _parse_num(_cell_value(row, COL_QTY))
-        travel_min = _travel_minutes(_cell_value(row, COL_TRAVEL)) if len(row) > COL_TRAVEL else 0
+        travel_min = col_travel[row_idx]
         on_call_val = _cell_value(row, COL_ON_CALL) if len(row) > COL_ON_CALL else None
         misc_min = _parse_int(_cell_value(row, COL_MISC)) if len(row) > COL_MISC else 0
         if misc_min is None:
@@ -643,8 +1056,8 @@ def main() -> None:
         section_str = str(section).strip() if section else ""
         large_plant_id = section_to_plant_id.get(section_str) if section_str else None
         if not large_plant_id and section_str and section_str.lower().startswith("fleet no ") and len(section_str) > 9:
-            plant_no_key = section_str[9:].strip()
-            large_plant_id = section_to_plant_id.get(plant_no_key) or (plant_by_no.get(plant_no_key) if plant_no_key in plant_by_no else None)
+            fleet_no = section_str[9:].strip()
+            large_plant_id = section_to_plant_id.get(fleet_no) or plant_by_no.get(fleet_no) or plant_by_no_key.get(plant_no_key(fleet_no))
         workshop_tasks_id = section_to_workshop_id.get(section_str) if section_str else None
         project_id = None
         if not large_plant_id and not workshop_tasks_id:
@@ -677,12 +1090,7 @@ def main() -> None:
             else:
                 on_call = str(on_call_val).strip().upper() in ("1", "YES", "TRUE", "Y")
 
-        # Skip if already imported (avoid duplicates)
         work_date_str = _to_iso_date(work_date)
-        dup_k = _dup_key(row_user_id, work_date_str, start_time_iso)
-        if dup_k and dup_k in existing_keys:
-            skipped_duplicate += 1
-            continue
 
         # Build payload. Use --minimal if you get 42703 (undefined column) to send only core columns.
         payload: Dict[str, Any] = {
@@ -691,6 +1099,7 @@ def main() -> None:
             "start_time": start_time_iso,
             "finish_time": finish_time_iso,
             "status": "imported",
+            "import_source": IMPORT_SOURCE,
         }
         if not minimal_payload:
             payload["submitted_by"] = row_user_id
@@ -710,138 +1119,1917 @@ def main() -> None:
             payload["concrete_mix_type"] = str(material)
         if qty is not None and not minimal_payload:
             payload["concrete_qty"] = qty
+        concrete_ticket_no = col_ticket[row_idx]
+        if concrete_ticket_no is not None and not minimal_payload:
+            payload["concrete_ticket_no"] = concrete_ticket_no
 
-        if diagnose:
-            dest = f"project_id={project_id}" if project_id else (f"large_plant_id={large_plant_id}" if large_plant_id else f"workshop_tasks_id={workshop_tasks_id}")
-            if not (project_id or large_plant_id or workshop_tasks_id):
-                dest = "no match (project/plant/task)"
-            print(f"  Row {row_idx + 2}: {work_date} {start_t}-{finish_t} | {contract or '-'} / {section or '-'} -> {dest} | would insert")
-            inserted += 1
-            continue
+        # Used fleet (Plant 1-6): cols 9-14; Mobilised fleet (Mob 1-4): cols 15-18 -> (display_order, large_plant_id)
+        used_fleet: List[Tuple[int, str]] = col_used_fleet[row_idx] or []
+        mobilised_fleet: List[Tuple[int, str]] = col_mobilised_fleet[row_idx] or []
+
+        yield {
+            "row_number": first_row + row_idx + MIN_ROW,
+            "employee": str(employee_cell).strip(),
+            "user_id": row_user_id,
+            "work_date": work_date,
+            "start_t": start_t,
+            "finish_t": finish_t,
+            "break_min": break_min,
+            "breaks": col_breaks[row_idx],
+            "contract": contract,
+            "section": section,
+            "project_id": project_id,
+            "large_plant_id": large_plant_id,
+            "workshop_tasks_id": workshop_tasks_id,
+            "concrete_ticket_no": concrete_ticket_no,
+            "payload": payload,
+            "dup_key": _dup_key(row_user_id, work_date_str, start_time_iso),
+            "used_fleet": used_fleet,
+            "mobilised_fleet": mobilised_fleet,
+        }
+
+
+def _plan_destination(plan: Dict[str, Any]) -> str:
+    """Human-readable target of a planned row (as printed by --diagnose)."""
+    project_id = plan["project_id"]
+    large_plant_id = plan["large_plant_id"]
+    workshop_tasks_id = plan["workshop_tasks_id"]
+    if not (project_id or large_plant_id or workshop_tasks_id):
+        return "no match (project/plant/task)"
+    return f"project_id={project_id}" if project_id else (f"large_plant_id={large_plant_id}" if large_plant_id else f"workshop_tasks_id={workshop_tasks_id}")
+
+
+def _break_timestamp(work_date: date, minutes: int) -> str:
+    """Minutes after midnight of work_date (over 1440 = next day) as a time_period_breaks timestamp."""
+    days, minutes = divmod(minutes, 1440)
+    day = work_date + timedelta(days=days) if days else work_date
+    return f"{day.isoformat()}T{minutes // 60:02d}:{minutes % 60:02d}:00.000Z"
+
+
+def _child_rows(plan: Dict[str, Any], tp_id: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Breaks / used fleet / mobilised fleet rows of a planned time_period, keyed by table. The break intervals
+    were placed for the whole sheet in _parse_columns (payroll_breaks)."""
+    work_date = plan["work_date"]
+    breaks = [
+        {
+            "time_period_id": tp_id,
+            "break_start": _break_timestamp(work_date, b_start),
+            "break_finish": _break_timestamp(work_date, b_finish),
+            "display_order": i,
+        }
+        for i, (b_start, b_finish) in enumerate(plan["breaks"])
+    ]
+    return {
+        "time_period_breaks": breaks,
+        "time_period_used_fleet": [
+            {"time_period_id": tp_id, "large_plant_id": pid, "display_order": display_order}
+            for display_order, pid in plan["used_fleet"]
+        ],
+        "time_period_mobilised_fleet": [
+            {"time_period_id": tp_id, "large_plant_id": pid, "display_order": display_order}
+            for display_order, pid in plan["mobilised_fleet"]
+        ],
+    }
+
+
+def _insert_child_rows(sb: Any, child_rows: Dict[str, List[Dict[str, Any]]]) -> None:
+    """One insert per child table (skipping empty ones)."""
+    for table, table_rows in child_rows.items():
+        if table_rows:
+            sb.table(table).insert(table_rows).execute()
+
+
+def _write_plan(sb: Any, plan: Dict[str, Any], with_import_source: bool = True) -> Optional[str]:
+    """Insert one planned time_period and its breaks / used fleet / mobilised fleet. Returns the new id (None if
+    the insert returned no data). with_import_source=False drops import_source (column not migrated yet)."""
+    payload = plan["payload"]
+    if not with_import_source:
+        payload = {k: v for k, v in payload.items() if k != "import_source"}
+    ins = sb.table("time_periods").insert(payload).execute()
+    if not ins.data or len(ins.data) == 0:
+        return None
+    tp_id = ins.data[0]["id"]
+    _insert_child_rows(sb, _child_rows(plan, tp_id))
+    return tp_id
+
+
+# Idempotent writes: time_periods_import_key = UNIQUE (user_id, work_date, start_time, import_source), see
+# supabase/migrations/20260221000000_time_periods_import_key.sql. Batches are inserted with ON CONFLICT DO
+# NOTHING, so rows already imported (by an earlier or a concurrent run) are skipped by the database and no
+# existing keys have to be read first.
+IMPORT_SOURCE = "allocated_week"  # time_periods.import_source of rows written by this script
+IMPORT_KEY_COLUMNS = "user_id,work_date,start_time,import_source"
+IMPORT_BATCH_SIZE = 200
+IMPORT_KEY_MIGRATION = "supabase/migrations/20260221000000_time_periods_import_key.sql"
+# 42P10: no unique constraint matches ON CONFLICT; 42703 / PGRST204: import_source column missing (only when the
+# error names it: any other undefined column is a real error)
+_IMPORT_KEY_MISSING_CODES = ("42P10", "42703", "PGRST204")
+
+
+def _import_key_missing(e: Exception, code: str) -> bool:
+    """Whether a failed import-key write means IMPORT_KEY_MIGRATION is not applied (see _IMPORT_KEY_MISSING_CODES)."""
+    if code not in _IMPORT_KEY_MISSING_CODES:
+        return False
+    return code == "42P10" or "import_source" in _format_api_error(e)
+
+
+def _upsert_request(sb: Any, plans: List[Dict[str, Any]]) -> Any:
+    """The upsert-ignore request of a batch of plans on the import key (sync or async client)."""
+    return sb.table("time_periods").upsert(
+        [p["payload"] for p in plans], on_conflict=IMPORT_KEY_COLUMNS, ignore_duplicates=True, default_to_null=False,
+    )
 
+
+def _match_upserted(plans: List[Dict[str, Any]], returned: List[Dict[str, Any]]) -> Tuple[List[Tuple[Dict[str, Any], str]], int]:
+    """Pair the rows an upsert-ignore returned with the batch's plans: ([(plan, new id)], plans skipped)."""
+    # Match returned rows to plans by key; rows without a start_time never conflict and come back in order.
+    by_key: Dict[Tuple[str, str, str], List[str]] = {}
+    unkeyed: List[str] = []
+    for r in returned:
+        k = _dup_key(str(r.get("user_id") or ""), str(r.get("work_date") or ""), r.get("start_time"))
+        if k:
+            by_key.setdefault(k, []).append(r["id"])
+        else:
+            unkeyed.append(r["id"])
+    unkeyed.reverse()
+    written: List[Tuple[Dict[str, Any], str]] = []
+    for plan in plans:
+        k = plan["dup_key"]
+        ids = by_key.get(k) if k else unkeyed
+        if ids:
+            written.append((plan, ids.pop(0) if k else ids.pop()))
+    return written, len(plans) - len(written)
+
+
+def _write_plans_idempotent(sb: Any, plans: List[Dict[str, Any]]) -> Tuple[List[Tuple[Dict[str, Any], str]], int]:
+    """Upsert-ignore a batch of plans on the import key (one request). Returns ([(plan, new id)], number of
+    plans skipped as already imported). Raises if the write fails, in which case nothing of the batch is written.
+    Children are not written here: see _batch_child_rows."""
+    return _match_upserted(plans, _upsert_request(sb, plans).execute().data or [])
+
+
+# --rpc: whole batches through public.import_time_periods_batch (20260222000000_import_time_periods_batch.sql, with
+# concrete_ticket_no from 20260223000000), which inserts periods, breaks and fleet in one transaction and returns
+# per-row outcomes.
+IMPORT_RPC = "import_time_periods_batch"
+IMPORT_RPC_MIGRATION = "supabase/migrations/20260225000000_time_periods_import_existing_periods.sql"
+# 42883 / PGRST202: function not found
+_IMPORT_RPC_MISSING_CODES = ("42883", "PGRST202")
+IMPORT_WORKERS = 4  # batches written concurrently (--workers N; 1 = serial)
+
+
+def _rpc_request(sb: Any, plans: List[Dict[str, Any]]) -> Any:
+    """The IMPORT_RPC call for a batch of plans (periods + children), sync or async client."""
+    p_rows = []
+    for plan in plans:
+        item: Dict[str, Any] = {"row": plan["row_number"], "period": plan["payload"]}
+        for table, table_rows in _child_rows(plan, "").items():
+            item[table[len("time_period_"):]] = [{k: v for k, v in r.items() if k != "time_period_id"} for r in table_rows]
+        p_rows.append(item)
+    return sb.rpc(IMPORT_RPC, {"p_rows": p_rows})
+
+
+def _match_rpc(plans: List[Dict[str, Any]], returned: List[Dict[str, Any]]) -> Tuple[List[Tuple[Dict[str, Any], str]], int]:
+    """([(plan, new id)], plans skipped) from IMPORT_RPC's per-row outcomes."""
+    by_row = {plan["row_number"]: plan for plan in plans}
+    written: List[Tuple[Dict[str, Any], str]] = []
+    for r in returned:
+        if r.get("outcome") == "inserted" and r.get("source_row") in by_row:
+            written.append((by_row[r["source_row"]], r["period_id"]))
+    return written, len(plans) - len(written)
+
+
+def _write_plans_rpc(sb: Any, plans: List[Dict[str, Any]]) -> Tuple[List[Tuple[Dict[str, Any], str]], int]:
+    """Send a batch of plans (periods + children) to IMPORT_RPC in one call. All-or-nothing: raises if any row
+    fails. Returns ([(plan, new id)], number of plans skipped as already imported)."""
+    return _match_rpc(plans, _rpc_request(sb, plans).execute().data or [])
+
+
+def _batch_child_rows(written: List[Tuple[Dict[str, Any], str]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Child rows of all written plans, merged per table (so a batch needs one insert per child table)."""
+    child_rows: Dict[str, List[Dict[str, Any]]] = {}
+    for plan, tp_id in written:
+        for table, table_rows in _child_rows(plan, tp_id).items():
+            child_rows.setdefault(table, []).extend(table_rows)
+    return child_rows
+
+
+def _format_api_error(e: Exception) -> str:
+    err_msg = str(e)
+    # PostgREST 42703 returns JSON with "message" naming the missing column; try to get it
+    if hasattr(e, "details") and getattr(e, "details", None):
+        err_msg += f" | details: {e.details}"
+    if hasattr(e, "message") and getattr(e, "message", None):
+        err_msg += f" | message: {e.message}"
+    if hasattr(e, "response") and e.response is not None:
         try:
-            ins = sb.table("time_periods").insert(payload).execute()
-            if not ins.data or len(ins.data) == 0:
-                errors.append(f"Row {row_idx + MIN_ROW}: insert returned no data")
-                continue
-            tp_id = ins.data[0]["id"]
-            inserted += 1
-            # Prevent same run from inserting duplicate rows if sheet has repeated rows
-            if dup_k:
-                existing_keys.add(dup_k)
+            body = getattr(e.response, "text", None) or getattr(e.response, "body", None)
+            if body:
+                err_msg += f" | body: {body}"
+        except Exception:
+            pass
+    return err_msg
 
-            # Breaks: 15-30 min = one break at 13:00 or nearest; 45-60 = two (larger at 13:00). Round to 15 min.
-            if break_min > 0:
-                break_min_15 = round(break_min / 15) * 15
-                if break_min_15 <= 30:
-                    # One break: 13:00 for break_min_15 minutes (or at period end if period doesn't include 13:00)
-                    break_start = datetime.combine(work_date, time(13, 0))
-                    break_finish = break_start + timedelta(minutes=break_min_15)
-                    if start_t and finish_t:
-                        period_start = datetime.combine(work_date, start_t)
-                        period_end = datetime.combine(work_date, finish_t)
-                        if break_start < period_start or break_start > period_end:
-                            # Place at end of period, rounded to 15 min
-                            end_rounded = (period_end.minute // 15) * 15
-                            break_finish = period_end.replace(minute=end_rounded, second=0, microsecond=0)
-                            break_start = break_finish - timedelta(minutes=break_min_15)
-                    sb.table("time_period_breaks").insert({
-                        "time_period_id": tp_id,
-                        "break_start": break_start.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
-                        "break_finish": break_finish.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
-                        "display_order": 0,
-                    }).execute()
-                else:
-                    # Two breaks: larger at 13:00
-                    b1 = (break_min_15 + 1) // 2
-                    b2 = break_min_15 - b1
-                    if b1 < b2:
-                        b1, b2 = b2, b1
-                    for i, mins in enumerate([b2, b1]):
-                        start_br = datetime.combine(work_date, time(10 if i == 0 else 13, 0))
-                        end_br = start_br + timedelta(minutes=mins)
-                        sb.table("time_period_breaks").insert({
-                            "time_period_id": tp_id,
-                            "break_start": start_br.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
-                            "break_finish": end_br.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
-                            "display_order": i,
-                        }).execute()
-
-            # Used fleet (Plant 1-6): cols 9-14
-            for i in range(COL_PLANT_START, COL_PLANT_END + 1):
-                if i >= len(row):
-                    break
-                val = _cell_value(row, i)
-                if val is None:
+
+# --async: sheet-order batches written over one pooled HTTP/2 client (payroll_async_http.py) with at most
+# --in-flight requests at a time. A batch's breaks / fleet go out as soon as its ids come back, while later
+# batches are still being written, instead of each worker thread waiting on one request after another.
+
+
+def _import_batches(plans: Iterable[Dict[str, Any]], size: int = IMPORT_BATCH_SIZE) -> List[List[Dict[str, Any]]]:
+    """Plans in sheet order, size per batch. A plan repeating an earlier plan's import key goes in that plan's
+    batch (after it), so concurrent batches never race for a key and the sheet's first row is the one kept."""
+    batches: List[List[Dict[str, Any]]] = []
+    batch_of_key: Dict[Tuple[str, str, str], int] = {}
+    for plan in plans:
+        k = plan["dup_key"]
+        if k and k in batch_of_key:
+            batches[batch_of_key[k]].append(plan)
+            continue
+        if not batches or len(batches[-1]) >= size:
+            batches.append([])
+        batches[-1].append(plan)
+        if k:
+            batch_of_key[k] = len(batches) - 1
+    return batches
+
+
+async def _write_batches_async(
+    db: AsyncPostgrest,
+    batches: List[List[Dict[str, Any]]],
+    *,
+    use_rpc: bool,
+    counters: Dict[str, int],
+    errors: List[str],
+    record_outcomes: Callable[[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str]]], None],
+    emit: Callable[[str], None] = print,
+    should_stop: Callable[[], bool] = lambda: False,
+) -> List[List[Dict[str, Any]]]:
+    """Write batches concurrently through db, with the outcomes of _run_import's write_batch: duplicates skipped,
+    a failing batch retried row by row to report just the bad rows, --rpc falling back to upserts when the
+    function is missing. The first batch is written alone, so a missing import key or function costs one
+    request. At most db.in_flight batches are under way at a time; once should_stop() is true no further batch
+    starts. Returns the batches not written because the import key is missing (for the caller's fallback)."""
+    rpc = {"use": use_rpc}
+    key_missing: List[List[Dict[str, Any]]] = []
+    slots = asyncio.Semaphore(db.in_flight)
+
+    async def write_children(written: List[Tuple[Dict[str, Any], str]]) -> None:
+        child_rows = {t: r for t, r in _batch_child_rows(written).items() if r}
+        results = await asyncio.gather(
+            *(db.send(db.table(table).insert(table_rows)) for table, table_rows in child_rows.items()), return_exceptions=True,
+        )
+        for e in results:
+            if isinstance(e, Exception):
+                err_msg = _format_api_error(e)
+                rows_txt = ", ".join(str(plan["row_number"]) for plan, _ in written)
+                errors.append(f"Rows {rows_txt}: time periods inserted but breaks/fleet failed: {err_msg}")
+                emit(f"  API error (breaks/fleet for rows {rows_txt}): {err_msg}")
+
+    async def write(batch: List[Dict[str, Any]]) -> None:
+        batch_rpc = rpc["use"]
+        try:
+            if batch_rpc:
+                res = await db.send(_rpc_request(db, batch))
+                written, skipped = _match_rpc(batch, res.data or [])
+            else:
+                res = await db.send(_upsert_request(db, batch))
+                written, skipped = _match_upserted(batch, res.data or [])
+        except Exception as e:
+            code = str(getattr(e, "code", "") or "")
+            if batch_rpc and code in _IMPORT_RPC_MISSING_CODES:
+                if rpc["use"]:
+                    emit(f"  {IMPORT_RPC}() not found ({code}); apply {IMPORT_RPC_MIGRATION}. Using batched upserts.")
+                rpc["use"] = False
+                await write(batch)
+                return
+            if _import_key_missing(e, code):
+                key_missing.append(batch)
+                return
+            if len(batch) > 1:
+                # One bad row fails the whole statement (or RPC transaction): retry one row at a time to report just
+                # that row, in sheet order so a repeated import key goes to its first row (as write_batch does)
+                for plan in batch:
+                    await write([plan])
+                return
+            err_msg = _format_api_error(e)
+            plan = batch[0]
+            errors.append(f"Row {plan['row_number']} ({plan['work_date']}): {err_msg}")
+            emit(f"  API error (row {plan['row_number']}): {err_msg}")
+            return
+        counters["inserted"] += len(written)
+        counters["skipped_duplicate"] += skipped
+        record_outcomes(batch, written)
+        if not batch_rpc and written:
+            await write_children(written)
+
+    async def write_next(batch: List[Dict[str, Any]]) -> None:
+        async with slots:
+            if not should_stop():
+                await write(batch)
+
+    if not batches or should_stop():
+        return []
+    await write(batches[0])
+    if key_missing:
+        return batches
+    await asyncio.gather(*(write_next(batch) for batch in batches[1:]))
+    return key_missing
+
+
+def _resolve_import_users(
+    sb: Any,
+    rows: List[Tuple[Any, ...]],
+    user_cache: Dict[str, str],
+    *,
+    week_num: Optional[int],
+    selected_employees: Optional[set],
+    names: Optional[NameIndex] = None,
+    emit: Callable[[str], None] = print,
+    accept_fuzzy: bool = False,
+) -> Tuple[Optional[Callable[[Any], Optional[str]]], List[str]]:
+    """Pick the per-row user resolver and the user_ids whose existing periods must be checked for duplicates.
+    Returns (None, []) when single-user mode cannot find the user. Names matched other than exactly, proposed
+    near misses (unresolved unless accept_fuzzy) and unknown names with their closest users are listed for review."""
+    resolve_user_id = _make_user_resolver(sb, user_cache, names, accept_fuzzy)
+    # When --week is set, always resolve user per row (so all 6 users get correct user_id). Single-user only when no --week and no --employees.
+    use_multi_employee = week_num is not None or selected_employees is not None
+    if use_multi_employee:
+        # Pre-resolve all unique employee names that appear in the sheet (for duplicate check and per-row resolution)
+        if selected_employees is not None:
+            run_names = set(selected_employees)
+            for name in selected_employees:
+                resolve_user_id(name)
+            emit(f"Selected employees: {len(selected_employees)}")
+        else:
+            # --week set but no --employees: resolve every unique Employee in the sheet
+            seen_emp = set()
+            for row in rows:
+                if len(row) <= COL_EMPLOYEE:
                     continue
-                plant_no = str(val).strip()
-                if not plant_no:
+                emp = _cell_value(row, COL_EMPLOYEE)
+                if emp is None or _is_site_placeholder(emp):
                     continue
-                pid = plant_by_no.get(plant_no)
-                if pid:
-                    sb.table("time_period_used_fleet").insert({
-                        "time_period_id": tp_id,
-                        "large_plant_id": pid,
-                        "display_order": i - COL_PLANT_START,
-                    }).execute()
-
-            # Mobilised fleet (Mob 1-4): cols 15-18 (col 18 can be concrete_ticket_no if numeric 4+ digits and not plant)
-            for i in range(COL_MOB_START, COL_MOB_END + 1):
-                if i >= len(row):
-                    break
-                val = _cell_value(row, i)
-                if val is None:
+                name = str(emp).strip()
+                if name and name not in seen_emp:
+                    seen_emp.add(name)
+                    resolve_user_id(name)
+            emit(f"Unique employees in sheet: {len(seen_emp)} (all will be imported per row)")
+            run_names = seen_emp
+        if names is not None:
+            review = names.review_lines(run_names, accept_proposed=accept_fuzzy)
+            if review:
+                emit(f"Employee names to review ({len(review)}):")
+                for line in review:
+                    emit(line)
+        # Only this run's employees (the cache can hold others, e.g. from earlier --serve requests)
+        return resolve_user_id, sorted({uid for uid in map(resolve_user_id, run_names) if uid})
+
+    # Single-user mode: first row employee only (legacy CSV/single-sheet run without --week)
+    user_id: Optional[str] = None
+    display_name = None
+    for row in rows:
+        if len(row) > COL_EMPLOYEE:
+            candidate = _cell_value(row, COL_EMPLOYEE)
+            if candidate and str(candidate).strip() and not _is_site_placeholder(candidate):
+                display_name = str(candidate).strip()
+                break
+    candidates = [display_name] if display_name else []
+    candidates.append(DEFAULT_EMPLOYEE)
+    display_name = None
+    for name in candidates:
+        if names is not None:
+            match = names.resolve(name, accept_proposed=accept_fuzzy)
+            if match is not None:
+                user_id, display_name = match.user_id, match.display_name
+                if match.how != "exact":
+                    emit(f"Employee {name!r} matched to {match.display_name!r} ({match.how}); check this is right")
+                break
+            proposed = names.lookup(name)
+            if proposed is not None:
+                emit(f"Employee {name!r} may be {proposed.display_name!r} ({proposed.how}); not used without --accept-fuzzy")
+            continue
+        us = sb.table("users_setup").select("user_id").eq("display_name", name).limit(1).execute()
+        if us.data and len(us.data) > 0:
+            user_id = us.data[0]["user_id"]
+            display_name = name
+            break
+    if not user_id:
+        emit(f"User not found in users_setup. Tried: {candidates}")
+        emit(f"First row Employee (col E): {repr(_cell_value(rows[0], COL_EMPLOYEE)) if rows else 'n/a'}")
+        return None, []
+
+    def _single_user_resolve(_: Any) -> Optional[str]:
+        return user_id
+    emit(f"User: {display_name} -> {user_id}")
+    return _single_user_resolve, [user_id]
+
+
+# Duplicate prefetch. PostgREST caps every response at max-rows (1000 on Supabase) without signalling
+# truncation, so existing keys are read in keyset pages (order by id, id > last id) per chunk of users.
+EXISTING_KEYS_PAGE_SIZE = 1000
+EXISTING_KEYS_USER_CHUNK = 25  # user_ids per in_() filter (keeps the request URL short)
+EXISTING_KEYS_WORKERS = 4
+
+
+class DuplicateCheckError(Exception):
+    """The existing time_periods keys could not be read, so duplicates cannot be ruled out."""
+
+
+def _fetch_existing_keys_chunk(sb: Any, user_ids: List[str], min_date: date, max_date: date) -> set:
+    """All (user_id, work_date, start_time) keys for user_ids in the date range, paging until the exact count
+    is reached (or a page comes back empty)."""
+    keys: set = set()
+    fetched = 0
+    total: Optional[int] = None
+    last_id: Optional[str] = None
+    while True:
+        q = (
+            sb.table("time_periods")
+            .select("id, user_id, work_date, start_time", count="exact" if total is None else None)
+            .gte("work_date", min_date.isoformat())
+            .lte("work_date", max_date.isoformat())
+            .in_("user_id", user_ids)
+        )
+        if last_id is not None:
+            q = q.gt("id", last_id)
+        r = q.order("id").limit(EXISTING_KEYS_PAGE_SIZE).execute()
+        page = r.data or []
+        if total is None:
+            total = r.count
+        for x in page:
+            k = _dup_key(str(x.get("user_id") or ""), str(x.get("work_date") or ""), x.get("start_time"))
+            if k:
+                keys.add(k)
+        fetched += len(page)
+        if not page or (total is not None and fetched >= total):
+            return keys
+        last_id = page[-1]["id"]
+
+
+def _fetch_existing_keys(sb: Any, rows: List[Tuple[Any, ...]], user_ids_to_check: List[str], cols: Dict[str, Any]) -> set:
+    """Set of existing (user_id, work_date, start_time) keys for the rows' date range, to avoid duplicates.
+    Fetched once per run (user chunks in parallel); raises DuplicateCheckError if any page fails."""
+    existing_keys: set = set()
+    dates_in_rows = [d for row, d in zip(rows, cols["work_date"]) if d and len(row) >= 9]
+    user_ids = sorted(set(user_ids_to_check))
+    if not dates_in_rows or not user_ids:
+        return existing_keys
+    min_date = min(dates_in_rows)
+    max_date = max(dates_in_rows)
+    chunks = [user_ids[i:i + EXISTING_KEYS_USER_CHUNK] for i in range(0, len(user_ids), EXISTING_KEYS_USER_CHUNK)]
+    try:
+        if len(chunks) == 1:
+            existing_keys |= _fetch_existing_keys_chunk(sb, chunks[0], min_date, max_date)
+        else:
+            with ThreadPoolExecutor(max_workers=min(EXISTING_KEYS_WORKERS, len(chunks))) as pool:
+                for keys in pool.map(lambda chunk: _fetch_existing_keys_chunk(sb, chunk, min_date, max_date), chunks):
+                    existing_keys |= keys
+    except Exception as e:
+        raise DuplicateCheckError(
+            f"Could not read existing time_periods for {min_date}..{max_date} ({len(user_ids)} user(s)): {_format_api_error(e)}"
+        ) from e
+    return existing_keys
+
+
+def _run_import(
+    sb: Any,
+    rows: List[Tuple[Any, ...]],
+    refs: Dict[str, Any],
+    *,
+    week_num: Optional[int] = None,
+    selected_employees: Optional[set] = None,
+    diagnose: bool = False,
+    minimal_payload: bool = False,
+    use_rpc: bool = False,
+    workers: int = IMPORT_WORKERS,
+    ledger: Optional[ImportLedger] = None,
+    source: Optional[str] = None,
+    resume: bool = False,
+    only_rows: Optional[set] = None,
+    user_cache: Optional[Dict[str, str]] = None,
+    emit: Callable[[str], None] = print,
+    profile: Optional[ImportProfile] = None,
+    in_flight: int = 0,
+    cols: Optional[Dict[str, Any]] = None,
+    seen_keys: Optional[set] = None,
+    progress: Optional[Callable[[int], None]] = None,
+    accept_fuzzy: bool = False,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Dict[str, Any]:
+    """Import rows into time_periods (or only report what would be written when diagnose=True).
+    The existing (user_id, work_date, start_time) keys of the rows' users and dates are prefetched first and
+    rows matching one are skipped as duplicates: periods entered in the app (import_source NULL) never conflict
+    with the import key. The rest are written in batches of IMPORT_BATCH_SIZE with upsert-ignore on the import
+    key, so a row imported meanwhile (or repeated in the sheet) is skipped by the database; without that key
+    (migration not applied) rows are inserted one by one. use_rpc=True sends each batch to IMPORT_RPC instead
+    (periods and children in one transaction). With workers > 1 the same sheet-order batches are written by a
+    pool of that many threads; in_flight > 0 (--async) writes them through the async client instead, with at
+    most in_flight requests at a time.
+    With a ledger and source, the outcome of every row is recorded in it; resume=True skips the rows it
+    already holds (from the first row not in the ledger on) without any lookup. only_rows (row indexes)
+    restricts the run to those rows; the others are skipped silently. With a profile (--profile) each stage is
+    timed in it. cols: the _parse_columns result, if already parsed (e.g. in a --workbooks process). seen_keys:
+    import keys planned earlier in the same run (--workbooks); plans repeating one are counted as duplicates
+    without a request, the others added to it. progress: called (from the writing thread) with the number of rows
+    settled by each write, inserted or found already imported. accept_fuzzy: employee names proposed as
+    initials / fuzzy matches resolve to the proposal (otherwise their rows are skipped and listed for review).
+    should_stop: checked before each batch is written; once it returns True no further batch starts (a batch
+    under way is finished, breaks and fleet included) and the result has "stopped": True.
+    Returns {"counters": {...}, "errors": [...], "user_found": bool}; progress lines go to emit."""
+    counters = _new_counters()
+    errors: List[str] = []
+    if user_cache is None:
+        user_cache = {}
+    hashes: Optional[List[Tuple[str, str]]] = None
+    skip_rows: Optional[set] = None
+    if ledger is not None and source:
+        with stage(profile, "ledger hashes"):
+            hashes = row_hashes(source, rows)
+        if resume:
+            known = ledger.known_hashes(source)
+            skip_rows = {i for i, (h, _) in enumerate(hashes) if h in known}
+            first = next((i for i in range(len(rows)) if i not in skip_rows), len(rows))
+            emit(f"Resuming {source} at row {first + MIN_ROW} ({len(skip_rows)} row(s) in the import ledger)")
+    resolve_rows = rows
+    if skip_rows or only_rows is not None:
+        resolve_rows = [
+            r for i, r in enumerate(rows)
+            if not (skip_rows and i in skip_rows) and (only_rows is None or i in only_rows)
+        ]
+    with stage(profile, "reference misses"):
+        _revalidate_reference_misses(refs, resolve_rows, selected_employees, emit)
+    with stage(profile, "user resolution"):
+        resolve_user_id, user_ids_to_check = _resolve_import_users(
+            sb, resolve_rows, user_cache, week_num=week_num, selected_employees=selected_employees, names=refs.get("names"), emit=emit,
+            accept_fuzzy=accept_fuzzy,
+        )
+    if resolve_user_id is None:
+        return {"counters": counters, "errors": errors, "user_found": False}
+    emit(f"Rows read: {len(rows)}")
+
+    if cols is None:
+        with stage(profile, "parse"):
+            cols = _parse_columns(rows)
+    plans = _iter_planned_rows(
+        rows, refs, resolve_user_id, counters,
+        selected_employees=selected_employees, diagnose=diagnose, minimal_payload=minimal_payload, emit=emit, cols=cols,
+        skip_rows=skip_rows, only_rows=only_rows,
+    )
+
+    def record_outcomes(batch: List[Dict[str, Any]], written: List[Tuple[Dict[str, Any], str]]) -> None:
+        # Ledger entry per written plan: inserted (with its id) or duplicate (already in time_periods)
+        if hashes is not None and not diagnose:
+            ids = {plan["row_number"]: tp_id for plan, tp_id in written}
+            ledger.record(source, [
+                (n, hashes[n - MIN_ROW], OUTCOME_INSERTED if n in ids else OUTCOME_DUPLICATE, ids.get(n))
+                for n in (plan["row_number"] for plan in batch)
+            ])
+        if progress is not None:
+            progress(len(batch))
+
+    if seen_keys is not None:
+        def unseen(planned: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            # Already planned by an earlier sheet of this run (e.g. a week straddling two workbooks' years)
+            for plan in planned:
+                k = plan["dup_key"]
+                if k and k in seen_keys:
+                    counters["skipped_duplicate"] += 1
+                    record_outcomes([plan], [])
                     continue
-                plant_no = str(val).strip()
-                if not plant_no:
+                if k:
+                    seen_keys.add(k)
+                yield plan
+        plans = unseen(plans)
+
+    # Existing (user_id, work_date, start_time) keys, imported or entered in the app
+    try:
+        with stage(profile, "duplicate prefetch"):
+            existing_keys = _fetch_existing_keys(sb, rows, user_ids_to_check, cols)
+    except DuplicateCheckError as e:
+        # Without the existing keys every row could be a duplicate: stop before writing anything
+        errors.append(f"Duplicate check failed, nothing imported: {e}")
+        emit(f"  {errors[-1]}")
+        return {"counters": counters, "errors": errors, "user_found": True}
+
+    if diagnose:
+        with stage(profile, "plan"):
+            for plan in plans:
+                dup_k = plan["dup_key"]
+                if dup_k and dup_k in existing_keys:
+                    counters["skipped_duplicate"] += 1
                     continue
-                pid = plant_by_no.get(plant_no)
-                if pid:
-                    sb.table("time_period_mobilised_fleet").insert({
-                        "time_period_id": tp_id,
-                        "large_plant_id": pid,
-                        "display_order": i - COL_MOB_START,
-                    }).execute()
-                # Col 18 (index 18): if numeric >= 4 digits and not in plant_no -> concrete_ticket_no (already in payload if we wanted)
+                emit(f"  Row {plan['row_number']}: {plan['work_date']} {plan['start_t']}-{plan['finish_t']} | {plan['contract'] or '-'} / {plan['section'] or '-'} -> {_plan_destination(plan)} | would insert")
+                counters["inserted"] += 1
+                if dup_k:
+                    existing_keys.add(dup_k)
+        return {"counters": counters, "errors": errors, "user_found": True}
+
+    def not_existing(planned: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for plan in planned:
+            k = plan["dup_key"]
+            if k and k in existing_keys:
+                counters["skipped_duplicate"] += 1
+                record_outcomes([plan], [])
+                continue
+            yield plan
+    plans = not_existing(plans)
+
+    stop = threading.Event()
+
+    def stop_requested() -> bool:
+        if not stop.is_set() and should_stop is not None and should_stop():
+            stop.set()
+        return stop.is_set()
 
+    with_import_source = True
+    keyed_writes = True  # False once the import key turns out not to be migrated
+    fallback_lock = threading.Lock()
+
+    def write_rowwise(plan: Dict[str, Any], counters_w: Dict[str, int], errors_w: List[str]) -> None:
+        # Fallback when the import key is not migrated: prefetched keys (kept up to date) + one insert per row
+        dup_k = plan["dup_key"]
+        if dup_k and dup_k in existing_keys:
+            counters_w["skipped_duplicate"] += 1
+            record_outcomes([plan], [])
+            return
+        try:
+            tp_id = _write_plan(sb, plan, with_import_source=with_import_source)
+            if tp_id is None:
+                errors_w.append(f"Row {plan['row_number']}: insert returned no data")
+                return
+            counters_w["inserted"] += 1
+            record_outcomes([plan], [(plan, tp_id)])
+            # Prevent same run from inserting duplicate rows if sheet has repeated rows
+            if dup_k:
+                existing_keys.add(dup_k)
+        except Exception as e:
+            err_msg = _format_api_error(e)
+            errors_w.append(f"Row {plan['row_number']} ({plan['work_date']}): {err_msg}")
+            emit(f"  API error (row {plan['row_number']}): {err_msg}")
+
+    def write_batch(batch: List[Dict[str, Any]], counters_w: Dict[str, int], errors_w: List[str]) -> bool:
+        # Returns False (nothing written) when the import key is not migrated
+        nonlocal with_import_source, use_rpc
+        batch_rpc = use_rpc
+        try:
+            if batch_rpc:
+                written, skipped = _write_plans_rpc(sb, batch)
+            else:
+                written, skipped = _write_plans_idempotent(sb, batch)
         except Exception as e:
-            err_msg = str(e)
-            # PostgREST 42703 returns JSON with "message" naming the missing column; try to get it
-            if hasattr(e, "details") and getattr(e, "details", None):
-                err_msg += f" | details: {e.details}"
-            if hasattr(e, "message") and getattr(e, "message", None):
-                err_msg += f" | message: {e.message}"
-            if hasattr(e, "response") and e.response is not None:
-                try:
-                    body = getattr(e.response, "text", None) or getattr(e.response, "body", None)
-                    if body:
-                        err_msg += f" | body: {body}"
-                except Exception:
-                    pass
-            errors.append(f"Row {row_idx + 2} ({work_date}): {err_msg}")
-            print(f"  API error (row {row_idx + 2}): {err_msg}")
-
-    if skipped_no_date:
-        print(f"Skipped {skipped_no_date} row(s) with no parseable date.")
-    if skipped_no_work:
-        print(f"Skipped {skipped_no_work} row(s) with no hours (column 8 empty or 00:00).")
-    if skipped_site_placeholder:
-        print(f"Skipped {skipped_site_placeholder} row(s) (Employee is Site 1–20).")
-    if skipped_unknown_employee:
-        print(f"Skipped {skipped_unknown_employee} row(s) (employee not in users_setup).")
-    if skipped_not_selected:
-        print(f"Skipped {skipped_not_selected} row(s) (employee not in selected list).")
-    if skipped_duplicate:
-        print(f"Skipped {skipped_duplicate} row(s) (already imported).")
-    print(f"Inserted {inserted} time period(s)." + (" (diagnose: no DB write)" if diagnose else ""))
+            code = str(getattr(e, "code", "") or "")
+            if batch_rpc and code in _IMPORT_RPC_MISSING_CODES:
+                if use_rpc:
+                    emit(f"  {IMPORT_RPC}() not found ({code}); apply {IMPORT_RPC_MIGRATION}. Using batched upserts.")
+                use_rpc = False
+                return write_batch(batch, counters_w, errors_w)
+            if _import_key_missing(e, code):
+                with_import_source = code == "42P10"
+                return False
+            if len(batch) > 1:
+                # One bad row fails the whole statement (or RPC transaction): retry one row at a time to report just that row
+                return all(write_batch([plan], counters_w, errors_w) for plan in batch)
+            err_msg = _format_api_error(e)
+            plan = batch[0]
+            errors_w.append(f"Row {plan['row_number']} ({plan['work_date']}): {err_msg}")
+            emit(f"  API error (row {plan['row_number']}): {err_msg}")
+            return True
+        counters_w["inserted"] += len(written)
+        counters_w["skipped_duplicate"] += skipped
+        record_outcomes(batch, written)
+        if batch_rpc:
+            return True  # children written by the function
+        try:
+            _insert_child_rows(sb, _batch_child_rows(written))
+        except Exception as e:
+            err_msg = _format_api_error(e)
+            rows_txt = ", ".join(str(plan["row_number"]) for plan, _ in written)
+            errors_w.append(f"Rows {rows_txt}: time periods inserted but breaks/fleet failed: {err_msg}")
+            emit(f"  API error (breaks/fleet for rows {rows_txt}): {err_msg}")
+        return True
+
+    def flush(batch: List[Dict[str, Any]], counters_w: Dict[str, int], errors_w: List[str]) -> None:
+        nonlocal keyed_writes
+        if keyed_writes:
+            if write_batch(batch, counters_w, errors_w):
+                return
+            with fallback_lock:  # reported once, by the first worker to hit the missing key
+                if keyed_writes:
+                    emit(f"  time_periods import key not found; apply {IMPORT_KEY_MIGRATION}")
+                    emit("  Falling back to row-by-row inserts.")
+                    keyed_writes = False
+        for plan in batch:
+            write_rowwise(plan, counters_w, errors_w)
+
+    def write_plans(employee_plans: Iterable[Dict[str, Any]], counters_w: Dict[str, int], errors_w: List[str]) -> None:
+        # In sheet order, IMPORT_BATCH_SIZE plans per write
+        batch: List[Dict[str, Any]] = []
+        for plan in employee_plans:
+            batch.append(plan)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                if stop_requested():
+                    return
+                flush(batch, counters_w, errors_w)
+                batch = []
+        if batch and not stop_requested():
+            flush(batch, counters_w, errors_w)
+
+    def write_parallel(plans: Iterable[Dict[str, Any]]) -> None:
+        # Full IMPORT_BATCH_SIZE batches across all employees (_import_batches: sheet order, a repeated import key
+        # in its first row's batch, so concurrent batches never race for a key), written by a bounded pool.
+        # Counters and errors are merged once all are done.
+        batches = _import_batches(plans)
+        if not batches:
+            return
+        n_workers = min(workers, len(batches))
+        emit(f"Writing {len(batches)} batch(es) with {n_workers} worker(s)")
+
+        def write_one(batch: List[Dict[str, Any]]) -> Tuple[Dict[str, int], List[str]]:
+            counters_w: Dict[str, int] = {"inserted": 0, "skipped_duplicate": 0}
+            errors_w: List[str] = []
+            if not stop_requested():
+                flush(batch, counters_w, errors_w)
+            return counters_w, errors_w
+
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(write_one, batches))
+        for counters_w, errors_w in results:
+            for k, v in counters_w.items():
+                counters[k] += v
+            errors.extend(errors_w)
+
+    def write_async() -> None:
+        batches = _import_batches(plans)
+        if not batches:
+            return
+        emit(f"Writing {len(batches)} batch(es) with up to {in_flight} request(s) in flight")
+
+        async def run() -> List[List[Dict[str, Any]]]:
+            async with AsyncPostgrest(SUPABASE_URL, SUPABASE_KEY, in_flight, profile) as db:
+                left = await _write_batches_async(
+                    db, batches, use_rpc=use_rpc, counters=counters, errors=errors, record_outcomes=record_outcomes, emit=emit,
+                    should_stop=stop_requested,
+                )
+                emit(f"  Async writes: {db.summary()}")
+                return left
+
+        # Batches left when the import key is missing are written as without --async: flush() falls back to
+        # row-by-row inserts
+        left = [plan for batch in asyncio.run(run()) for plan in batch]
+        if workers <= 1:
+            write_plans(left, counters, errors)
+        else:
+            write_parallel(left)
+
+    with stage(profile, "plan and write"):
+        if in_flight > 0:
+            write_async()
+        elif workers <= 1:
+            write_plans(plans, counters, errors)
+        else:
+            write_parallel(plans)
+
+    if hashes is not None:
+        # Rows that can never be imported from their contents (Site 1-20, no date, no hours) go in the ledger
+        # too, so --resume passes over them
+        ledger.record(source, [
+            (i + MIN_ROW, hashes[i], OUTCOME_SKIPPED, None)
+            for i, row in enumerate(rows)
+            if len(row) >= 9 and not (skip_rows and i in skip_rows) and (only_rows is None or i in only_rows) and (
+                _is_site_placeholder(_cell_value(row, COL_EMPLOYEE)) or cols["work_date"][i] is None or cols["hours_min"][i] <= 0
+            )
+        ])
+    result = {"counters": counters, "errors": errors, "user_found": True}
+    if stop.is_set():
+        result["stopped"] = True
+    return result
+
+
+# --incremental: only rows whose contents changed since the last import of the sheet (import ledger) touch the
+# database. New rows are imported as usual; changed rows update the period they created, with one
+# time_period_revisions row per changed field; removed rows are reported (deleted with --delete-removed).
+INCREMENTAL_UPDATE_FIELDS = (
+    "work_date", "start_time", "finish_time", "travel_to_site_min", "travel_from_site_min", "on_call",
+    "misc_allowance_min", "project_id", "large_plant_id", "workshop_tasks_id", "concrete_mix_type", "concrete_qty",
+    "concrete_ticket_no",
+)
+_TARGET_FIELDS = ("project_id", "large_plant_id", "workshop_tasks_id")
+IMPORT_CHANGED_BY = os.environ.get("PAYROLL_IMPORT_USER_ID")  # revisions.changed_by; default: the period's user
+IMPORT_READ_CHUNK = 100  # ids per in_() read (children: up to 6 rows per period stay under max-rows)
+
+
+def _read_by_ids(sb: Any, table: str, columns: str, column: str, ids: List[str]) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for i in range(0, len(ids), IMPORT_READ_CHUNK):
+        r = sb.table(table).select(columns).in_(column, ids[i:i + IMPORT_READ_CHUNK]).execute()
+        out.extend(r.data or [])
+    return out
+
+
+def _same_value(old: Any, new: Any) -> bool:
+    """Compare a time_periods value read back from PostgREST with the value the importer would send."""
+    if old is None or new is None:
+        return old is None and new is None
+    if isinstance(old, bool) or isinstance(new, bool):
+        return bool(old) == bool(new)
+    try:
+        return float(old) == float(new)
+    except (TypeError, ValueError):
+        pass
+    o = str(old).strip()
+    n = str(new).strip()
+    if len(o) >= 19 and len(n) >= 19 and o[10:11] in ("T", " ") and n[10:11] in ("T", " "):
+        return o[:19].replace(" ", "T") == n[:19].replace(" ", "T")  # timestamps: .000Z vs +00:00
+    return o == n
+
+
+def _children_text(child_rows: List[Dict[str, Any]]) -> str:
+    """Breaks ("10:00-10:15") or fleet (large_plant_id) of one period in display order, for comparison / revisions."""
+    parts = []
+    for r in sorted(child_rows, key=lambda r: r.get("display_order") or 0):
+        if "break_start" in r:
+            parts.append(f"{str(r.get('break_start') or '')[11:16]}-{str(r.get('break_finish') or '')[11:16]}")
+        else:
+            parts.append(str(r.get("large_plant_id")))
+    return ", ".join(parts)
+
+
+def _update_changed_rows(
+    sb: Any,
+    rows: List[Tuple[Any, ...]],
+    refs: Dict[str, Any],
+    update_ids: Dict[int, str],
+    current: Dict[int, Tuple[str, str]],
+    previous: Dict[int, Tuple[str, str]],
+    counters: Dict[str, int],
+    errors: List[str],
+    *,
+    source: str,
+    week_num: Optional[int],
+    selected_employees: Optional[set],
+    minimal_payload: bool,
+    user_cache: Dict[str, str],
+    emit: Callable[[str], None],
+    accept_fuzzy: bool = False,
+) -> Tuple[List[Tuple[int, Tuple[str, str], str, Optional[str]]], List[int], List[int]]:
+    """Update the periods of changed rows ({row_number: time_period_id}) and replace their children where they
+    differ. Returns (ledger entries, rows no longer importable, rows whose period no longer exists)."""
+    entries: List[Tuple[int, Tuple[str, str], str, Optional[str]]] = []
+    changed_rows = [rows[n - MIN_ROW] for n in update_ids]
+    _revalidate_reference_misses(refs, changed_rows, selected_employees, emit)
+    resolve_user_id, _ = _resolve_import_users(
+        sb, changed_rows, user_cache,
+        week_num=week_num, selected_employees=selected_employees, names=refs.get("names"), emit=lambda _: None,
+        accept_fuzzy=accept_fuzzy,
+    )
+    if resolve_user_id is None:
+        return entries, [], []
+    plans = list(_iter_planned_rows(
+        rows, refs, resolve_user_id, counters,
+        selected_employees=selected_employees, minimal_payload=minimal_payload, emit=emit,
+        only_rows={n - MIN_ROW for n in update_ids},
+    ))
+    planned = {plan["row_number"] for plan in plans}
+    gone = sorted(n for n in update_ids if n not in planned)
+    ids = [update_ids[plan["row_number"]] for plan in plans]
+    periods = {
+        r["id"]: r
+        for r in _read_by_ids(sb, "time_periods", "id, user_id, status, revision_number, " + ", ".join(INCREMENTAL_UPDATE_FIELDS), "id", ids)
+    }
+    children: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    for table, columns in (
+        ("time_period_breaks", "time_period_id, break_start, break_finish, display_order"),
+        ("time_period_used_fleet", "time_period_id, large_plant_id, display_order"),
+        ("time_period_mobilised_fleet", "time_period_id, large_plant_id, display_order"),
+    ):
+        children[table] = {}
+        for r in _read_by_ids(sb, table, columns, "time_period_id", ids):
+            children[table].setdefault(r["time_period_id"], []).append(r)
+
+    missing: List[int] = []
+    revisions: List[Dict[str, Any]] = []
+    replace: Dict[str, List[str]] = {table: [] for table in children}
+    new_children: Dict[str, List[Dict[str, Any]]] = {table: [] for table in children}
+    row_of: Dict[str, int] = {}
+    for plan in plans:
+        n = plan["row_number"]
+        tp_id = update_ids[n]
+        period = periods.get(tp_id)
+        if period is None:
+            missing.append(n)  # deleted in the app since the import
+            continue
+        if period.get("status") != "imported":
+            counters["skipped_locked"] += 1
+            emit(f"  Row {n}: time period {tp_id} is {period.get('status')}; not updated")
+            entries.append((n, previous[n], OUTCOME_INSERTED, tp_id))  # stays "changed" for the next run
+            continue
+        payload = plan["payload"]
+        fields = {
+            k: payload.get(k) for k in INCREMENTAL_UPDATE_FIELDS
+            if k in payload or not minimal_payload or k in _TARGET_FIELDS
+        }
+        diffs = [(k, period.get(k), v) for k, v in fields.items() if not _same_value(period.get(k), v)]
+        child_diffs: List[str] = []
+        for table, table_rows in _child_rows(plan, tp_id).items():
+            old_text = _children_text(children[table].get(tp_id, []))
+            new_text = _children_text(table_rows)
+            if old_text != new_text:
+                diffs.append((table[len("time_period_"):], old_text or None, new_text or None))
+                child_diffs.append(table)
+                new_children[table].extend(table_rows)
+        if not diffs:
+            # Sheet edit that does not change the period (e.g. Contract text with the same project)
+            counters["skipped_unchanged"] += 1
+            entries.append((n, current[n], OUTCOME_INSERTED, tp_id))
+            continue
+        revision = int(period.get("revision_number") or 0) + 1
+        update = {k: fields[k] for k, _, _ in diffs if k in fields}
+        update["revision_number"] = revision
+        try:
+            sb.table("time_periods").update(update).eq("id", tp_id).eq("status", "imported").execute()
+        except Exception as e:
+            err_msg = _format_api_error(e)
+            errors.append(f"Row {n} (update {tp_id}): {err_msg}")
+            emit(f"  API error (row {n}): {err_msg}")
+            for table in child_diffs:
+                new_children[table] = [r for r in new_children[table] if r["time_period_id"] != tp_id]
+            entries.append((n, previous[n], OUTCOME_INSERTED, tp_id))  # stays "changed" for the next run
+            continue
+        counters["updated"] += 1
+        row_of[tp_id] = n
+        entries.append((n, current[n], OUTCOME_INSERTED, tp_id))
+        for table in child_diffs:
+            replace[table].append(tp_id)
+        revisions.extend({
+            "time_period_id": tp_id,
+            "revision_number": revision,
+            "changed_by": IMPORT_CHANGED_BY or period.get("user_id"),
+            "changed_by_name": "Payroll import",
+            "change_type": "admin_edit",
+            "workflow_stage": "submitted",
+            "field_name": field,
+            "old_value": None if old is None else str(old),
+            "new_value": None if new is None else str(new),
+            "change_reason": f"{source} row {n} edited after import",
+            "is_revision": True,
+            "is_approval": False,
+            "is_edit": True,
+            "original_submission": False,
+        } for field, old, new in diffs)
+
+    # Children: delete the old rows of the periods whose breaks / fleet changed, then one insert per table
+    for table, tp_ids in replace.items():
+        if not tp_ids:
+            continue
+        try:
+            for i in range(0, len(tp_ids), IMPORT_READ_CHUNK):
+                sb.table(table).delete().in_("time_period_id", tp_ids[i:i + IMPORT_READ_CHUNK]).execute()
+            if new_children[table]:
+                sb.table(table).insert(new_children[table]).execute()
+        except Exception as e:
+            err_msg = _format_api_error(e)
+            rows_txt = ", ".join(str(row_of[t]) for t in tp_ids)
+            errors.append(f"Rows {rows_txt}: time periods updated but {table} failed: {err_msg}")
+            emit(f"  API error ({table} for rows {rows_txt}): {err_msg}")
+            failed = set(rows_txt.split(", "))
+            entries = [(n, previous[n] if str(n) in failed else h, o, t) for n, h, o, t in entries]
+    if revisions:
+        try:
+            sb.table("time_period_revisions").insert(revisions).execute()
+        except Exception as e:
+            err_msg = _format_api_error(e)
+            errors.append(f"time_period_revisions ({len(revisions)} row(s)): {err_msg}")
+            emit(f"  API error (time_period_revisions): {err_msg}")
+    return entries, gone, missing
+
+
+def _run_incremental(
+    sb: Any,
+    rows: List[Tuple[Any, ...]],
+    refs: Dict[str, Any],
+    *,
+    ledger: ImportLedger,
+    source: str,
+    week_num: Optional[int] = None,
+    selected_employees: Optional[set] = None,
+    diagnose: bool = False,
+    minimal_payload: bool = False,
+    delete_removed: bool = False,
+    use_rpc: bool = False,
+    workers: int = IMPORT_WORKERS,
+    user_cache: Optional[Dict[str, str]] = None,
+    emit: Callable[[str], None] = print,
+    profile: Optional[ImportProfile] = None,
+    in_flight: int = 0,
+    progress: Optional[Callable[[int], None]] = None,
+    accept_fuzzy: bool = False,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Dict[str, Any]:
+    """Re-import a sheet against its last import in the ledger: new rows are inserted, changed rows update the
+    period they created (time_period_revisions records each field), removed rows are listed or, with
+    delete_removed, their periods deleted (only while still 'imported'). Unchanged rows cost nothing.
+    progress: as for _run_import (inserted rows only); accept_fuzzy, should_stop: as for _run_import (should_stop
+    stops the inserts; updates and deletes are few requests and run in full). Same result shape as _run_import."""
+    counters = _new_counters()
+    errors: List[str] = []
+    if user_cache is None:
+        user_cache = {}
+    with stage(profile, "change detection"):
+        current = sheet_row_hashes(source, rows, MIN_ROW)
+        snap = ledger.snapshot(source)
+        ch = ledger.changes(source, current)
+    update_ids = {n: snap[o][3] for n, o in ch["replaces"].items() if snap[o][3]}
+    insert_numbers = set(ch["new"]) | (set(ch["changed"]) - set(update_ids))
+    removed_ids = {o: snap[o][3] for o in ch["removed"] if snap[o][3]}
+    counters["skipped_unchanged"] = len(ch["unchanged"])
+    emit(f"{source}: {len(ch['new'])} new, {len(ch['changed'])} changed, {len(ch['removed'])} removed, "
+         f"{len(ch['unchanged'])} unchanged row(s) since the last import")
+    if not snap:
+        emit("  No earlier import of this sheet in the ledger: every row is new.")
+    if diagnose:
+        for n in sorted(insert_numbers):
+            emit(f"  Row {n}: insert")
+        for n, tp_id in sorted(update_ids.items()):
+            emit(f"  Row {n}: update time period {tp_id} (row {ch['replaces'][n]} at the last import)")
+        for o, tp_id in sorted(removed_ids.items()):
+            emit(f"  Row {o} (last import): removed, time period {tp_id} " + ("would be deleted" if delete_removed else "kept"))
+        return {"counters": counters, "errors": errors, "user_found": True}
+
+    # Unchanged rows keep their ledger entry under their current row number
+    entries = [(n, current[n], snap[o][2], snap[o][3]) for n, o in ch["same"].items()]
+    if update_ids:
+        previous = {n: snap[ch["replaces"][n]][:2] for n in update_ids}
+        with stage(profile, "updates"):
+            updated, gone, missing = _update_changed_rows(
+                sb, rows, refs, update_ids, current, previous, counters, errors,
+                source=source, week_num=week_num, selected_employees=selected_employees,
+                minimal_payload=minimal_payload, user_cache=user_cache, emit=emit, accept_fuzzy=accept_fuzzy,
+            )
+        entries += updated
+        insert_numbers |= set(missing)
+        for n in gone:
+            removed_ids[ch["replaces"][n]] = update_ids[n]  # edited so it is no longer importable
+    stopped = False
+    if insert_numbers:
+        result = _run_import(
+            sb, rows, refs,
+            week_num=week_num, selected_employees=selected_employees, minimal_payload=minimal_payload,
+            use_rpc=use_rpc, workers=workers, ledger=ledger, source=source,
+            only_rows={n - MIN_ROW for n in insert_numbers}, user_cache=user_cache, emit=emit, profile=profile,
+            in_flight=in_flight, progress=progress, accept_fuzzy=accept_fuzzy, should_stop=should_stop,
+        )
+        for k, v in result["counters"].items():
+            counters[k] += v
+        errors.extend(result["errors"])
+        stopped = bool(result.get("stopped"))
+        after = ledger.snapshot(source)
+        entries += [(n, current[n], after[n][2], after[n][3]) for n in sorted(insert_numbers) if n in after and after[n][0] == current[n][0]]
+
+    if removed_ids and delete_removed:
+        ids = sorted(set(removed_ids.values()))
+        try:
+            with stage(profile, "deletes"):
+                for i in range(0, len(ids), IMPORT_READ_CHUNK):
+                    r = sb.table("time_periods").delete().in_("id", ids[i:i + IMPORT_READ_CHUNK]).eq("status", "imported").execute()
+                    counters["deleted"] += len(r.data or [])
+        except Exception as e:
+            err_msg = _format_api_error(e)
+            errors.append(f"Delete of removed rows' time periods: {err_msg}")
+            emit(f"  API error (delete removed): {err_msg}")
+        kept = len(ids) - counters["deleted"]
+        if kept > 0:
+            emit(f"  {kept} time period(s) of removed rows kept (no longer 'imported' or delete failed).")
+    elif removed_ids:
+        # Reported once: the ledger forgets removed rows, so rerun with --delete-removed before the next import
+        emit(f"  {len(removed_ids)} removed row(s) still have a time period (not deleted without --delete-removed): "
+             + ", ".join(sorted(set(removed_ids.values()))))
+    ledger.replace_source(source, entries)
+    result = {"counters": counters, "errors": errors, "user_found": True}
+    if stopped:
+        result["stopped"] = True
+    return result
+
+
+def _summary_lines(result: Dict[str, Any], diagnose: bool = False) -> List[str]:
+    """Skip / insert / error summary printed at the end of an import."""
+    c = result["counters"]
+    errors = result["errors"]
+    lines: List[str] = []
+    if c["skipped_no_date"]:
+        lines.append(f"Skipped {c['skipped_no_date']} row(s) with no parseable date.")
+    if c["skipped_no_work"]:
+        lines.append(f"Skipped {c['skipped_no_work']} row(s) with no hours (column 8 empty or 00:00).")
+    if c["skipped_site_placeholder"]:
+        lines.append(f"Skipped {c['skipped_site_placeholder']} row(s) (Employee is Site 1–20).")
+    if c["skipped_unknown_employee"]:
+        lines.append(f"Skipped {c['skipped_unknown_employee']} row(s) (employee not in users_setup).")
+    if c["skipped_not_selected"]:
+        lines.append(f"Skipped {c['skipped_not_selected']} row(s) (employee not in selected list).")
+    if c["skipped_duplicate"]:
+        lines.append(f"Skipped {c['skipped_duplicate']} row(s) (already imported).")
+    if c["skipped_ledger"]:
+        lines.append(f"Skipped {c['skipped_ledger']} row(s) (in the local import ledger, --resume).")
+    if c["skipped_unchanged"]:
+        lines.append(f"Skipped {c['skipped_unchanged']} row(s) (unchanged since the last import).")
+    if c["skipped_locked"]:
+        lines.append(f"Skipped {c['skipped_locked']} changed row(s) (time period no longer 'imported', not updated).")
+    if c["updated"]:
+        lines.append(f"Updated {c['updated']} time period(s)." + (" (diagnose: no DB write)" if diagnose else ""))
+    if c["deleted"]:
+        lines.append(f"Deleted {c['deleted']} time period(s) of removed rows." + (" (diagnose: no DB write)" if diagnose else ""))
+    lines.append(f"Inserted {c['inserted']} time period(s)." + (" (diagnose: no DB write)" if diagnose else ""))
     if errors:
-        print("Errors:")
+        lines.append("Errors:")
         for e in errors:
-            print("  ", e)
+            lines.append(f"   {e}")
         if any("clocking_distance" in str(e) for e in errors):
-            print("\nIf errors mention 'clocking_distance', apply the migration that fixes the trigger:")
-            print("  supabase/migrations/20260207180000_fix_clocking_distance_trigger.sql")
-            print("Then re-run this script.")
+            lines.append("\nIf errors mention 'clocking_distance', apply the migration that fixes the trigger:")
+            lines.append("  supabase/migrations/20260207180000_fix_clocking_distance_trigger.sql")
+            lines.append("Then re-run this script.")
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# --serve: newline-delimited JSON-RPC on stdin/stdout for the Import Payroll screen
+# ---------------------------------------------------------------------------
+
+# Warm reference lookups are rebuilt from the reference cache (which revalidates itself) after this many seconds
+SERVE_REFERENCE_TTL_SECONDS = REFERENCE_CACHE_TTL_SECONDS
+
+
+class _RpcError(Exception):
+    """Error returned to the client as a JSON-RPC error object."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _serve_client(state: Dict[str, Any]) -> Any:
+    if state["sb"] is None:
+        state["sb"] = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return state["sb"]
+
+
+def _serve_refs(state: Dict[str, Any]) -> Dict[str, Any]:
+    refs = state["refs"]
+    if refs is None or monotonic() - refs["loaded_at"] > SERVE_REFERENCE_TTL_SECONDS:
+        if state["reference_cache"] is None:
+            state["reference_cache"] = ReferenceCache()
+        # After "refresh" the cache is revalidated before it is used; otherwise stale tables refresh in the background
+        refs = _load_reference_data(_serve_client(state), state["reference_cache"], refresh=state["refresh_refs"])
+        state["refs"] = refs
+        state["refresh_refs"] = False
+    return refs
+
+
+def _serve_rows(state: Dict[str, Any], params: Dict[str, Any]) -> Sequence[Tuple[Any, ...]]:
+    """Rows for params {"week": n} (Excel) or {"csv": path}; cached until the source file's mtime changes.
+    The workbook itself is closed after each read so Excel can still save over it while the server runs."""
+    week = params.get("week")
+    csv_path = params.get("csv")
+    if week is not None:
+        try:
+            week = int(week)
+        except (TypeError, ValueError):
+            raise _RpcError(-32602, f"Invalid week: {week!r}")
+        path, key = EXCEL_PATH, ("week", week)
+    elif csv_path:
+        path, key = str(csv_path), ("csv", str(csv_path))
+    else:
+        raise _RpcError(-32602, 'Expected "week" or "csv" parameter')
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return []
+    cached = state["sheets"].get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    rows = _load_rows_from_excel_week(week) if key[0] == "week" else _load_rows_from_csv(path)
+    state["sheets"][key] = (mtime, rows)
+    return rows
+
+
+def _serve_source(params: Dict[str, Any]) -> str:
+    """Import ledger source of the rows _serve_rows returns for params."""
+    if params.get("week") is not None:
+        return source_id(EXCEL_PATH, f"Allocated Week ({int(params['week'])})")
+    return source_id(str(params.get("csv")))
+
+
+def _serve_ledger(state: Dict[str, Any]) -> ImportLedger:
+    if state["ledger"] is None:
+        state["ledger"] = ImportLedger()
+    return state["ledger"]
+
+
+def _serve_selected(params: Dict[str, Any]) -> Optional[set]:
+    employees = params.get("employees")
+    if employees is None:
+        return None
+    if isinstance(employees, str):
+        sep = "|" if "|" in employees else ","
+        employees = employees.split(sep)
+    return {str(n).strip() for n in employees if str(n).strip()}
+
+
+def _rpc_list_employees(state: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    rows = _serve_rows(state, params)
+    if not rows:
+        return {"employees": [], "error": "No data or sheet not found"}
+    return {"employees": _employees_in_rows(rows)}
+
+
+# preview: pages (offset / limit) of the rows an import would write. The sheet is resolved lazily,
+# PREVIEW_CHUNK_ROWS rows at a time (parse, plan, duplicate check for that chunk's users and dates), only as far as
+# the pages asked for need, so the first page of a large week comes back at once; later pages resume where the
+# last one stopped. Previews stay cached per sheet / employee selection until the sheet changes or an import runs.
+PREVIEW_PAGE_SIZE = 100
+PREVIEW_CHUNK_ROWS = 250
+PREVIEW_CACHE_SIZE = 8  # previews kept (oldest dropped)
+
+
+def _clock_text(minutes: int) -> str:
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+def _preview_entry(plan: Dict[str, Any], duplicate: bool) -> Dict[str, Any]:
+    """JSON preview of a planned row."""
+    if plan["large_plant_id"]:
+        target = {"kind": "plant", "id": plan["large_plant_id"]}
+    elif plan["workshop_tasks_id"]:
+        target = {"kind": "task", "id": plan["workshop_tasks_id"]}
+    elif plan["project_id"]:
+        target = {"kind": "project", "id": plan["project_id"]}
+    else:
+        target = {"kind": None, "id": None}
+    return {
+        "row": plan["row_number"],
+        "employee": plan["employee"],
+        "user_id": plan["user_id"],
+        "work_date": plan["work_date"].isoformat(),
+        "start": plan["start_t"].strftime("%H:%M") if plan["start_t"] else None,
+        "finish": plan["finish_t"].strftime("%H:%M") if plan["finish_t"] else None,
+        "break_min": plan["break_min"],
+        "breaks": [f"{_clock_text(b_start)}-{_clock_text(b_finish)}" for b_start, b_finish in plan["breaks"]],
+        "contract": plan["contract"],
+        "section": plan["section"],
+        "target": target,
+        "project_id": plan["project_id"],
+        "large_plant_id": plan["large_plant_id"],
+        "workshop_tasks_id": plan["workshop_tasks_id"],
+        "used_fleet": [pid for _, pid in plan["used_fleet"]],
+        "mobilised_fleet": [pid for _, pid in plan["mobilised_fleet"]],
+        "concrete_ticket_no": plan["concrete_ticket_no"],
+        "duplicate": duplicate,
+    }
+
+
+class _PreviewCursor:
+    """Lazily resolved preview of one sheet (see PREVIEW_CHUNK_ROWS)."""
+
+    def __init__(
+        self, sb: Any, rows: Sequence[Tuple[Any, ...]], refs: Dict[str, Any], user_cache: Dict[str, str],
+        *, week_num: Optional[int], selected_employees: Optional[set], accept_fuzzy: bool = False,
+    ) -> None:
+        self.sb = sb
+        self.rows = rows
+        self.refs = refs
+        self.selected_employees = selected_employees
+        self.counters = _new_counters()
+        self.output: List[str] = []
+        self.entries: List[Dict[str, Any]] = []
+        self.scanned = 0  # sheet rows resolved so far
+        self._planned_keys: set = set()  # a later row repeating one is a duplicate too
+        _revalidate_reference_misses(refs, rows, selected_employees, self.output.append)
+        self.resolve_user_id, _ = _resolve_import_users(
+            sb, rows, user_cache, week_num=week_num, selected_employees=selected_employees, names=refs.get("names"),
+            emit=self.output.append, accept_fuzzy=accept_fuzzy,
+        )
+        # Near-miss employee names for the screen to confirm (their rows are left out unless accept_fuzzy)
+        names = refs.get("names")
+        self.name_proposals = [
+            {"name": m.name, "user_id": m.user_id, "display_name": m.display_name, "how": m.how, "score": m.score,
+             "accepted": accept_fuzzy}
+            for m in (names.proposals(_employees_in_rows(rows)) if names is not None else [])
+            if selected_employees is None or m.name in selected_employees
+        ]
+
+    @property
+    def complete(self) -> bool:
+        return self.scanned >= len(self.rows)
+
+    def _resolve_chunk(self) -> None:
+        start, end = self.scanned, min(self.scanned + PREVIEW_CHUNK_ROWS, len(self.rows))
+        chunk = self.rows[start:end]
+        cols = _parse_columns(chunk)
+        plans = list(_iter_planned_rows(
+            chunk, self.refs, self.resolve_user_id, self.counters,
+            selected_employees=self.selected_employees, emit=self.output.append, cols=cols, first_row=start,
+        ))
+        existing_keys = _fetch_existing_keys(self.sb, chunk, [p["user_id"] for p in plans], cols) if plans else set()
+        for plan in plans:
+            k = plan["dup_key"]
+            duplicate = bool(k and (k in existing_keys or k in self._planned_keys))
+            if duplicate:
+                self.counters["skipped_duplicate"] += 1
+            elif k:
+                self._planned_keys.add(k)
+            self.entries.append(_preview_entry(plan, duplicate))
+        self.scanned = end
+
+    def page(self, offset: int, limit: int) -> Dict[str, Any]:
+        while len(self.entries) < offset + limit and not self.complete:
+            self._resolve_chunk()
+        return {
+            "rows": self.entries[offset:offset + limit],
+            "offset": offset,
+            "limit": limit,
+            "complete": self.complete,
+            "total": len(self.entries) if self.complete else None,  # rows to write, once the whole sheet is resolved
+            "resolved": len(self.entries),
+            "sheet_rows": len(self.rows),
+            "scanned_rows": self.scanned,
+            "counters": dict(self.counters),
+            "output": list(self.output),
+            "name_proposals": self.name_proposals,
+        }
+
+
+def _page_params(params: Dict[str, Any]) -> Tuple[int, int]:
+    try:
+        offset = max(0, int(params.get("offset") or 0))
+        limit = max(1, int(params.get("limit") or PREVIEW_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise _RpcError(-32602, "offset and limit must be integers")
+    return offset, limit
+
+
+def _rpc_preview(state: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """One page {offset?, limit?} of the rows that would be written, each with its target and duplicate flag, and
+    the sheet's proposed (initials / fuzzy) employee matches, included only with accept_fuzzy."""
+    rows = _serve_rows(state, params)
+    offset, limit = _page_params(params)
+    if not rows:
+        return {"rows": [], "offset": offset, "limit": limit, "complete": True, "total": 0, "counters": _new_counters(),
+                "error": "No data or sheet not found"}
+    refs = _serve_refs(state)
+    selected = _serve_selected(params)
+    accept_fuzzy = bool(params.get("accept_fuzzy"))
+    key = (params.get("week"), params.get("csv"), tuple(sorted(selected)) if selected is not None else None, accept_fuzzy)
+    previews: Dict[Any, _PreviewCursor] = state["previews"]
+    cursor = previews.pop(key, None)
+    if cursor is None or cursor.rows is not rows or cursor.refs is not refs:
+        cursor = _PreviewCursor(
+            _serve_client(state), rows, refs, state["user_cache"],
+            week_num=int(params["week"]) if params.get("week") is not None else None, selected_employees=selected,
+            accept_fuzzy=accept_fuzzy,
+        )
+    previews[key] = cursor  # most recently used last
+    while len(previews) > PREVIEW_CACHE_SIZE:
+        previews.pop(next(iter(previews)))
+    if cursor.resolve_user_id is None:
+        return {"rows": [], "offset": offset, "limit": limit, "complete": True, "total": 0, "counters": cursor.counters,
+                "output": cursor.output, "name_proposals": cursor.name_proposals}
+    return cursor.page(offset, limit)
+
+
+def _rpc_run(state: Dict[str, Any], params: Dict[str, Any], diagnose: bool) -> Dict[str, Any]:
+    rows = _serve_rows(state, params)
+    if not diagnose:
+        state["previews"].clear()  # their duplicate flags are out of date
+    if not rows:
+        return {"output": ["No data or sheet not found"], "counters": _new_counters(), "errors": []}
+    output: List[str] = []
+    week = params.get("week")
+    if params.get("incremental"):
+        result = _run_incremental(
+            _serve_client(state),
+            rows,
+            _serve_refs(state),
+            ledger=_serve_ledger(state),
+            source=_serve_source(params),
+            week_num=int(week) if week is not None else None,
+            selected_employees=_serve_selected(params),
+            diagnose=diagnose,
+            minimal_payload=bool(params.get("minimal")),
+            delete_removed=bool(params.get("delete_removed")),
+            use_rpc=bool(params.get("rpc")),
+            workers=int(params.get("workers") or IMPORT_WORKERS),
+            user_cache=state["user_cache"],
+            emit=output.append,
+            in_flight=int(params.get("in_flight") or 0),
+            accept_fuzzy=bool(params.get("accept_fuzzy")),
+        )
+        output.extend(_summary_lines(result, diagnose=diagnose))
+        return {"output": output, "counters": result["counters"], "errors": result["errors"]}
+    result = _run_import(
+        _serve_client(state),
+        rows,
+        _serve_refs(state),
+        week_num=int(week) if week is not None else None,
+        selected_employees=_serve_selected(params),
+        diagnose=diagnose,
+        minimal_payload=bool(params.get("minimal")),
+        use_rpc=bool(params.get("rpc")),
+        workers=int(params.get("workers") or IMPORT_WORKERS),
+        ledger=_serve_ledger(state) if params.get("ledger", True) else None,
+        source=_serve_source(params),
+        resume=bool(params.get("resume")),
+        user_cache=state["user_cache"],
+        emit=output.append,
+        in_flight=int(params.get("in_flight") or 0),
+        accept_fuzzy=bool(params.get("accept_fuzzy")),
+    )
+    if result["user_found"]:
+        output.extend(_summary_lines(result, diagnose=diagnose))
+    return {"output": output, "counters": result["counters"], "errors": result["errors"]}
+
+
+def _rpc_changes(state: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Rows of the sheet that are new / changed / removed since its last import (local ledger only)."""
+    rows = _serve_rows(state, params)
+    source = _serve_source(params)
+    return {"source": source, **_serve_ledger(state).changes(source, sheet_row_hashes(source, rows, MIN_ROW))}
+
+
+def _serve_jobs(state: Dict[str, Any]) -> JobQueue:
+    if state["jobs"] is None:
+        state["jobs"] = JobQueue()
+    return state["jobs"]
+
+
+def _rpc_queue_import(state: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Queue one job per week ({week} or {weeks: "1-4"}) of params["workbook"] (default the Staff Hours workbook)
+    for the job runner (payroll_import_jobs.py), and start a runner unless one is active (start: false to leave it).
+    at: "22:00" or an ISO time for an overnight run. Importer options as for "import"."""
+    spec = params.get("weeks", params.get("week"))
+    try:
+        weeks = sorted(_parse_range(str(spec))) if spec is not None else []
+    except ValueError:
+        raise _RpcError(-32602, f"Invalid weeks: {spec!r}")
+    if not weeks:
+        raise _RpcError(-32602, 'Expected "week" or "weeks" parameter')
+    try:
+        not_before = parse_start_time(str(params["at"])) if params.get("at") else None
+    except ValueError:
+        raise _RpcError(-32602, f"Invalid start time: {params['at']!r}")
+    selected = _serve_selected(params)
+    options = {k: params[k] for k in JOB_OPTIONS if params.get(k)}
+    jobs = _serve_jobs(state)
+    added = [jobs.add(str(params.get("workbook") or EXCEL_PATH), week, sorted(selected) if selected else None, options, not_before)
+             for week in weeks]
+    JobStatusTable(_serve_client(state), emit=lambda line: print(line, file=sys.stderr)).publish(*added)
+    runner_pid = None
+    if params.get("start", True) and not jobs.runner_alive():
+        runner_pid = start_runner(jobs, int(params.get("job_workers") or JOB_WORKERS))
+    return {"jobs": added, "runner_started": runner_pid is not None, "runner_pid": runner_pid}
+
+
+def _rpc_jobs(state: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Latest jobs of the local queue (the status table has the same, for screens on other machines)."""
+    jobs = _serve_jobs(state)
+    return {"jobs": jobs.jobs(int(params.get("limit") or 50)), "runner_active": jobs.runner_alive()}
+
+
+def _rpc_cancel_job(state: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    jobs = _serve_jobs(state)
+    try:
+        job = jobs.find(str(params.get("id") or ""))
+    except KeyError as e:
+        raise _RpcError(-32602, e.args[0])
+    job = jobs.cancel(job["id"])
+    JobStatusTable(_serve_client(state), emit=lambda line: print(line, file=sys.stderr)).publish(job)
+    return {"job": job}
+
+
+def _rpc_refresh(state: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    state["refs"] = None
+    state["refresh_refs"] = True
+    state["sheets"].clear()
+    state["user_cache"].clear()
+    state["previews"].clear()
+    return {"ok": True}
+
+
+_RPC_METHODS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = {
+    "list_employees": _rpc_list_employees,
+    "preview": _rpc_preview,
+    "diagnose": lambda state, params: _rpc_run(state, params, diagnose=True),
+    "import": lambda state, params: _rpc_run(state, params, diagnose=False),
+    "changes": _rpc_changes,
+    "refresh": _rpc_refresh,
+    "queue_import": _rpc_queue_import,
+    "jobs": _rpc_jobs,
+    "cancel_job": _rpc_cancel_job,
+    "ping": lambda state, params: {"ok": True},
+}
+
+
+def _serve() -> None:
+    """Answer newline-delimited JSON-RPC 2.0 requests from stdin on stdout until EOF or "shutdown".
+    Request: {"jsonrpc": "2.0", "id": 1, "method": "list_employees", "params": {"week": 1}}.
+    The client, reference tables, resolved users and loaded sheets stay warm between requests."""
+    out = sys.stdout
+    # Anything printed outside a response (library warnings etc.) must not corrupt the protocol stream
+    sys.stdout = sys.stderr
+    state: Dict[str, Any] = {
+        "sb": None, "refs": None, "reference_cache": None, "refresh_refs": False, "user_cache": {}, "sheets": {}, "ledger": None, "previews": {},
+        "jobs": None,
+    }
+
+    def reply(msg: Dict[str, Any]) -> None:
+        out.write(json.dumps(msg, default=str) + "\n")
+        out.flush()
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            req = json.loads(line)
+        except ValueError as e:
+            reply({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": f"Parse error: {e}"}})
+            continue
+        req_id = req.get("id") if isinstance(req, dict) else None
+        method = req.get("method") if isinstance(req, dict) else None
+        params = (req.get("params") if isinstance(req, dict) else None) or {}
+        if method == "shutdown":
+            reply({"jsonrpc": "2.0", "id": req_id, "result": {"ok": True}})
+            break
+        handler = _RPC_METHODS.get(method) if isinstance(method, str) else None
+        if handler is None:
+            reply({"jsonrpc": "2.0", "id": req_id, "error": {"code": -32601, "message": f"Method not found: {method}"}})
+            continue
+        if not isinstance(params, dict):
+            reply({"jsonrpc": "2.0", "id": req_id, "error": {"code": -32602, "message": "params must be an object"}})
+            continue
+        try:
+            result = handler(state, params)
+        except _RpcError as e:
+            reply({"jsonrpc": "2.0", "id": req_id, "error": {"code": e.code, "message": e.message}})
+            continue
+        except Exception as e:
+            reply({"jsonrpc": "2.0", "id": req_id, "error": {"code": -32000, "message": _format_api_error(e)}})
+            continue
+        reply({"jsonrpc": "2.0", "id": req_id, "result": result})
+    if state["ledger"] is not None:
+        state["ledger"].close()
+    if state["reference_cache"] is not None:
+        state["reference_cache"].close()
+    if state["jobs"] is not None:
+        state["jobs"].close()
+
+
+# --workbooks / --years: several Staff Hours workbooks (e.g. historical years) in one run. Each workbook is read
+# and parsed in its own process (openpyxl and _parse_columns are CPU-bound); the main process resolves and writes
+# each workbook's sheets as soon as it arrives, with one reference load, one resolved-user cache and one set of
+# import keys for the whole run.
+WORKBOOK_TEMPLATE = os.environ.get("STAFF_HOURS_EXCEL_TEMPLATE", r"W:\Master Files\{year}\Staff Hours ({year}).xlsm")
+WORKBOOK_PROCESSES = os.cpu_count() or 1  # workbooks parsed at once (--processes N)
+
+
+def _year_workbooks(spec: str) -> List[str]:
+    """WORKBOOK_TEMPLATE for each year of "2019-2025" (or "2019,2021")."""
+    return [WORKBOOK_TEMPLATE.format(year=year) for year in sorted(_parse_range(spec))]
+
+
+def _parse_workbook(path: str, weeks: Optional[set]) -> Tuple[List[Tuple[int, str, SheetRows, Dict[str, Any]]], float]:
+    """Process pool task: (week, source id, rows, _parse_columns result) of each Allocated Week sheet of a
+    workbook, and the seconds it took."""
+    started = monotonic()
+    sheets = [(week, source, rows, _parse_columns(rows)) for week, source, rows in _iter_week_sheets(path, weeks) if rows]
+    return sheets, monotonic() - started
+
+
+def _run_workbooks(
+    sb: Any,
+    paths: List[str],
+    refs: Dict[str, Any],
+    *,
+    weeks: Optional[set] = None,
+    processes: int = WORKBOOK_PROCESSES,
+    emit: Callable[[str], None] = print,
+    **import_options: Any,
+) -> Dict[str, Any]:
+    """Import every Allocated Week sheet of several workbooks, parsed in parallel processes, through _run_import
+    (import_options: selected_employees, diagnose, use_rpc, workers, in_flight, ledger, resume, profile, ...).
+    Progress is reported per workbook as it is parsed and written. Same result shape as _run_import."""
+    counters = _new_counters()
+    errors: List[str] = []
+    user_cache: Dict[str, str] = {}
+    seen_keys: set = set()
+    n_processes = max(1, min(processes, len(paths)))
+    emit(f"Parsing {len(paths)} workbook(s) with {n_processes} process(es)")
+    with ProcessPoolExecutor(max_workers=n_processes) as pool:
+        futures = {pool.submit(_parse_workbook, path, weeks): path for path in paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                sheets, seconds = future.result()
+            except Exception as e:
+                errors.append(f"{path}: not read: {e}")
+                emit(f"[{done}/{len(paths)}] {path}: not read: {e}")
+                continue
+            emit(f"[{done}/{len(paths)}] {path}: {len(sheets)} sheet(s), {sum(len(r) for _, _, r, _ in sheets)} row(s) parsed in {seconds:.1f}s")
+            started = monotonic()
+            book = _new_counters()
+            book_errors = 0
+            for week, source, rows, cols in sheets:
+                result = _run_import(
+                    sb, rows, refs, week_num=week, source=source, user_cache=user_cache, cols=cols, seen_keys=seen_keys,
+                    emit=lambda line: emit(f"    {line}"), **import_options,
+                )
+                for k, v in result["counters"].items():
+                    book[k] += v
+                book_errors += len(result["errors"])
+                errors.extend(f"{source}: {e}" for e in result["errors"])
+                emit(f"  Week {week}: {result['counters']['inserted']} inserted, {result['counters']['skipped_duplicate']} duplicate(s)"
+                     + (f", {len(result['errors'])} error(s)" if result["errors"] else ""))
+            for k, v in book.items():
+                counters[k] += v
+            emit(f"  {path}: {book['inserted']} inserted, {book['skipped_duplicate']} duplicate(s), {book_errors} error(s) "
+                 f"in {monotonic() - started:.1f}s")
+    return {"counters": counters, "errors": errors, "user_found": True}
+
+
+def _reconcile_week(sb: Any, week_num: int, reference_cache: Optional[ReferenceCache] = None) -> None:
+    """After a --week import: compare the week's periods with the workbook's Week (n) tab (payroll_reconcile.py)."""
+    import payroll_reconcile
+
+    out = Path(f"Reconcile Week ({week_num}).csv")
+    print(f"Reconciling with Week ({week_num}) ...")
+    payroll_reconcile.reconcile(sb, [week_num], out, hours_path=EXCEL_PATH, reference_cache=reference_cache)
+
+
+def _report_profile(profile: Optional[ImportProfile], trace_path: Optional[str]) -> None:
+    """--profile: stage and Supabase call tables; --profile-json PATH: also the JSON trace."""
+    if profile is None:
+        return
+    for line in profile.summary_lines():
+        print(line)
+    if trace_path:
+        profile.write_trace(trace_path)
+        print(f"Profile trace written to {trace_path}")
+
+
+def main() -> None:
+    if "--serve" in sys.argv:
+        _serve()
+        return
+    diagnose = "--diagnose" in sys.argv
+    minimal_payload = "--minimal" in sys.argv
+    use_rpc = "--rpc" in sys.argv
+    accept_fuzzy = "--accept-fuzzy" in sys.argv
+    fix_imported = "--fix-imported" in sys.argv
+    list_employees = "--list-employees" in sys.argv
+    use_ledger = "--no-ledger" not in sys.argv
+    reference_cache = None if "--no-reference-cache" in sys.argv else ReferenceCache()
+    if reference_cache is not None:
+        atexit.register(reference_cache.close)  # lets a background revalidation finish
+    refresh_reference = "--refresh-reference" in sys.argv
+    resume = "--resume" in sys.argv
+    show_changes = "--changes" in sys.argv
+    incremental = "--incremental" in sys.argv
+    delete_removed = "--delete-removed" in sys.argv
+    reconcile = "--reconcile" in sys.argv
+    week_num: Optional[int] = None
+    employees_arg: Optional[str] = None
+    workers = IMPORT_WORKERS
+    in_flight = ASYNC_IN_FLIGHT if "--async" in sys.argv else 0
+    preview = "--preview" in sys.argv
+    page_offset, page_limit = 0, PREVIEW_PAGE_SIZE
+    workbooks: List[str] = []
+    weeks: Optional[set] = None
+    processes = WORKBOOK_PROCESSES
+    profile_json: Optional[str] = None
+    option_values: set = set()  # argv indexes of option values (not the CSV path)
+    i = 1
+    while i < len(sys.argv):
+        a = sys.argv[i]
+        if a in ("--week", "--employees", "--workers", "--in-flight", "--profile-json", "--years", "--weeks", "--processes", "--offset", "--limit") and i + 1 < len(sys.argv):
+            option_values.add(i + 1)
+        if a in ("--offset", "--limit") and i + 1 < len(sys.argv):
+            try:
+                if a == "--offset":
+                    page_offset = max(0, int(sys.argv[i + 1]))
+                else:
+                    page_limit = max(1, int(sys.argv[i + 1]))
+            except ValueError:
+                pass
+            i += 2
+            continue
+        if a == "--workbooks":
+            # every following argument up to the next option
+            i += 1
+            while i < len(sys.argv) and not sys.argv[i].startswith("--"):
+                workbooks.append(sys.argv[i])
+                option_values.add(i)
+                i += 1
+            continue
+        if a == "--years" and i + 1 < len(sys.argv):
+            workbooks.extend(_year_workbooks(sys.argv[i + 1]))
+            i += 2
+            continue
+        if a == "--weeks" and i + 1 < len(sys.argv):
+            weeks = _parse_range(sys.argv[i + 1])
+            i += 2
+            continue
+        if a == "--processes" and i + 1 < len(sys.argv):
+            try:
+                processes = max(1, int(sys.argv[i + 1]))
+            except ValueError:
+                pass
+            i += 2
+            continue
+        if a == "--week" and i + 1 < len(sys.argv):
+            try:
+                week_num = int(sys.argv[i + 1])
+            except ValueError:
+                pass
+            i += 2
+            continue
+        if a == "--employees" and i + 1 < len(sys.argv):
+            employees_arg = sys.argv[i + 1]
+            i += 2
+            continue
+        if a == "--workers" and i + 1 < len(sys.argv):
+            try:
+                workers = max(1, int(sys.argv[i + 1]))
+            except ValueError:
+                pass
+            i += 2
+            continue
+        if a == "--in-flight" and i + 1 < len(sys.argv):
+            try:
+                in_flight = max(1, int(sys.argv[i + 1]))
+            except ValueError:
+                pass
+            i += 2
+            continue
+        if a == "--profile-json" and i + 1 < len(sys.argv):
+            profile_json = sys.argv[i + 1]
+            i += 2
+            continue
+        i += 1
+    profile = ImportProfile() if "--profile" in sys.argv or profile_json else None
+    csv_path = None
+    for i, a in enumerate(sys.argv[1:], 1):
+        if i not in option_values and not a.startswith("-") and not a.isdigit():
+            csv_path = a
+            break
+    if csv_path is None and Path(PROJECTS_CSV).exists() and not week_num:
+        csv_path = PROJECTS_CSV
+
+    if list_employees and week_num is not None:
+        _list_employees_for_week(week_num)
+        return
+
+    if fix_imported:
+        sb = create_client(SUPABASE_URL, SUPABASE_KEY)
+        _fix_imported_project_to_plant(profile.client(sb) if profile is not None else sb, reference_cache)
+        _report_profile(profile, profile_json)
+        return
+
+    # Selected employees filter (from --employees "Name1,Name2" or "Name1|Name2" for names containing commas)
+    selected_employees: Optional[set] = None
+    if employees_arg:
+        sep = "|" if "|" in employees_arg else ","
+        selected_employees = {n.strip() for n in employees_arg.split(sep) if n.strip()}
+
+    if workbooks:
+        missing = [p for p in workbooks if not Path(p).exists()]
+        if missing:
+            print(f"Workbook(s) not found: {', '.join(missing)}")
+            return
+        ledger = ImportLedger() if use_ledger else None
+        sb = create_client(SUPABASE_URL, SUPABASE_KEY)
+        if profile is not None:
+            sb = profile.client(sb)
+        with stage(profile, "reference loads"):
+            refs = _load_reference_data(sb, reference_cache, refresh_reference)
+        result = _run_workbooks(
+            sb, workbooks, refs, weeks=weeks, processes=processes,
+            selected_employees=selected_employees, diagnose=diagnose, minimal_payload=minimal_payload, use_rpc=use_rpc,
+            workers=workers, in_flight=in_flight, ledger=ledger, resume=resume, profile=profile, accept_fuzzy=accept_fuzzy,
+        )
+        if ledger is not None:
+            ledger.close()
+        for line in _summary_lines(result, diagnose=diagnose):
+            print(line)
+        _report_profile(profile, profile_json)
+        return
+
+    rows: Sequence[Tuple[Any, ...]] = []
+    source: Optional[str] = None
+    with stage(profile, "workbook load"):
+        if week_num is not None and Path(EXCEL_PATH).exists():
+            rows = _load_rows_from_excel_week(week_num)
+            source = source_id(EXCEL_PATH, f"Allocated Week ({week_num})")
+            print(f"Loaded {len(rows)} data row(s) from Excel week {week_num}: {EXCEL_PATH}")
+        if not rows and csv_path and Path(csv_path).exists():
+            rows = _load_rows_from_csv(csv_path)
+            source = source_id(csv_path)
+            print(f"Loaded {len(rows)} data row(s) from CSV: {csv_path}")
+        if not rows and Path(EXCEL_PATH).exists() and week_num is None:
+            wb = openpyxl.load_workbook(EXCEL_PATH, read_only=True, data_only=True)
+            if SHEET_NAME in wb.sheetnames:
+                ws = wb[SHEET_NAME]
+                rows = SheetRows(MAX_COL - MIN_COL + 1, ws.iter_rows(min_row=MIN_ROW, max_row=MAX_ROW_DEFAULT, min_col=MIN_COL, max_col=MAX_COL, values_only=True))
+                wb.close()
+                source = source_id(EXCEL_PATH, SHEET_NAME)
+                print(f"Loaded {len(rows)} data row(s) from Excel: {EXCEL_PATH}")
+            else:
+                print(f"Sheet '{SHEET_NAME}' not found. Available: {wb.sheetnames}")
+                wb.close()
+                return
+    if not rows:
+        if week_num is not None:
+            print(f"No data for week {week_num}. Check Excel path and sheet 'Allocated Week ({week_num})'.")
+        elif csv_path or Path(PROJECTS_CSV).exists():
+            print(f"No data rows in {csv_path or PROJECTS_CSV}")
+        else:
+            print(f"File not found: {EXCEL_PATH} (and no {PROJECTS_CSV})")
+        return
+
+    ledger = ImportLedger() if use_ledger or show_changes or incremental else None
+    if show_changes:
+        # Local only: which sheet rows differ from the last import of this sheet
+        changes = ledger.changes(source, sheet_row_hashes(source, rows, MIN_ROW))
+        print(json.dumps({"source": source, **{k: v for k, v in changes.items() if k not in ("unchanged", "same")}, "unchanged": len(changes["unchanged"])}))
+        ledger.close()
+        return
+
+    sb = create_client(SUPABASE_URL, SUPABASE_KEY)
+    if profile is not None:
+        sb = profile.client(sb)
+    with stage(profile, "reference loads"):
+        refs = _load_reference_data(sb, reference_cache, refresh_reference)
+    if preview:
+        if ledger is not None:
+            ledger.close()
+        with stage(profile, "preview"):
+            cursor = _PreviewCursor(
+                sb, rows, refs, {}, week_num=week_num, selected_employees=selected_employees, accept_fuzzy=accept_fuzzy,
+            )
+            page = cursor.page(page_offset, page_limit) if cursor.resolve_user_id is not None else {"rows": [], "output": cursor.output}
+        print(json.dumps(page, default=str))
+        _report_profile(profile, profile_json)
+        return
+    if incremental:
+        result = _run_incremental(
+            sb,
+            rows,
+            refs,
+            ledger=ledger,
+            source=source,
+            week_num=week_num,
+            selected_employees=selected_employees,
+            diagnose=diagnose,
+            minimal_payload=minimal_payload,
+            delete_removed=delete_removed,
+            use_rpc=use_rpc,
+            workers=workers,
+            profile=profile,
+            in_flight=in_flight,
+            accept_fuzzy=accept_fuzzy,
+        )
+        ledger.close()
+        for line in _summary_lines(result, diagnose=diagnose):
+            print(line)
+        if reconcile and week_num is not None:
+            with stage(profile, "reconcile"):
+                _reconcile_week(sb, week_num, reference_cache)
+        _report_profile(profile, profile_json)
+        return
+    result = _run_import(
+        sb,
+        rows,
+        refs,
+        week_num=week_num,
+        selected_employees=selected_employees,
+        diagnose=diagnose,
+        minimal_payload=minimal_payload,
+        use_rpc=use_rpc,
+        workers=workers,
+        ledger=ledger,
+        source=source,
+        resume=resume,
+        profile=profile,
+        in_flight=in_flight,
+        accept_fuzzy=accept_fuzzy,
+    )
+    if ledger is not None:
+        ledger.close()
+    if result["user_found"]:
+        for line in _summary_lines(result, diagnose=diagnose):
+            print(line)
+        if reconcile and week_num is not None:
+            with stage(profile, "reconcile"):
+                _reconcile_week(sb, week_num, reference_cache)
+    _report_profile(profile, profile_json)
 
 
 if __name__ == "__main__":
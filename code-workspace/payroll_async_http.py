@@ -0,0 +1,95 @@
+"""
+Async PostgREST access for import_payroll_bland_david.py --async.
+
+One httpx.AsyncClient is shared by every request of a run: a keep-alive pool of at most `in_flight`
+connections, multiplexed over HTTP/2 when the h2 package is installed (pip install "httpx[http2]"), so a
+request costs one round trip instead of a TCP + TLS handshake. A semaphore caps the requests in flight at the
+same number, which keeps a high-latency link from a site office busy without putting more concurrent
+statements on the database than that.
+
+AsyncPostgrest.table() / rpc() return postgrest-py's async request builders (the same filters and verbs as the
+sync client); send(builder) executes one under the limit. summary() gives requests sent, peak in flight and
+the HTTP versions seen.
+"""
+
+import asyncio
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from payroll_profile import ImportProfile
+
+try:
+    import h2  # noqa: F401  (optional: HTTP/2 in httpx)
+except ImportError:
+    h2 = None
+
+ASYNC_IN_FLIGHT = 8  # requests in flight (--in-flight N)
+ASYNC_TIMEOUT_SECONDS = 120  # per request, as the sync client's postgrest timeout
+ASYNC_CONNECT_TIMEOUT_SECONDS = 10
+ASYNC_KEEPALIVE_SECONDS = 60  # idle pooled connections are closed after this
+
+
+class AsyncPostgrest:
+    """Async PostgREST client on one pooled HTTP/2 connection set, with at most in_flight requests at a time.
+    Create and use it inside one event loop; close with aclose() (or async with)."""
+
+    def __init__(self, url: str, key: str, in_flight: int = ASYNC_IN_FLIGHT, profile: Optional[ImportProfile] = None) -> None:
+        self.in_flight = max(1, in_flight)
+        self._sem = asyncio.Semaphore(self.in_flight)
+        self._active = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.http_versions: Counter = Counter()
+        self._http = httpx.AsyncClient(
+            http2=h2 is not None,
+            limits=httpx.Limits(
+                max_connections=self.in_flight,
+                max_keepalive_connections=self.in_flight,
+                keepalive_expiry=ASYNC_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(ASYNC_TIMEOUT_SECONDS, connect=ASYNC_CONNECT_TIMEOUT_SECONDS),
+            follow_redirects=True,
+            event_hooks={"response": [self._on_response]},
+        )
+        db = AsyncPostgrestClient(
+            f"{url.rstrip('/')}/rest/v1",
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            http_client=self._http,
+        )
+        self._db = profile.async_client(db) if profile is not None else db
+
+    async def _on_response(self, response: httpx.Response) -> None:
+        self.http_versions[response.http_version] += 1
+
+    def table(self, name: str) -> Any:
+        return self._db.table(name)
+
+    def rpc(self, fn: str, params: Dict[str, Any]) -> Any:
+        return self._db.rpc(fn, params)
+
+    async def send(self, builder: Any) -> Any:
+        """builder.execute(), waiting for a free slot first."""
+        async with self._sem:
+            self._active += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._active)
+            self.requests += 1
+            try:
+                return await builder.execute()
+            finally:
+                self._active -= 1
+
+    def summary(self) -> str:
+        versions = ", ".join(f"{v} {n}" for v, n in self.http_versions.most_common()) or "none"
+        return f"{self.requests} request(s), at most {self.peak_in_flight} of {self.in_flight} in flight ({versions})"
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    async def __aenter__(self) -> "AsyncPostgrest":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
@@ -0,0 +1,95 @@
+"""
+Break placement for the payroll import (PAYROLL_IMPORT_MAPPING.md, Breaks): the Allocated Week Break column is a
+duration; this turns (start, finish, break minutes) into time_period_breaks intervals.
+
+Rule (all times in minutes after midnight of the work date, rounded to the nearest 15 minutes):
+  - 15-30 min: one break at 13:00, else 10:00 (13:00 takes priority), when the period holds it;
+  - 45 min or more: two breaks, the larger half (whole quarter hours) at 13:00 and the smaller at 10:00;
+  - a break whose slot is not inside the period goes at the period's start or end, whichever is closer to
+    10:00 or 13:00; two breaks that land on the same edge are placed back to back;
+  - no start / finish: breaks go at their slots.
+A finish before the start is a shift over midnight (finish on the next day, so minutes can exceed 1440).
+
+place_breaks() is pure and memoized (a sheet repeats a handful of shift patterns thousands of times);
+place_breaks_column() places whole parsed columns at once.
+"""
+
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+BREAK_SLOTS = (13 * 60, 10 * 60)  # in priority order: 13:00, then 10:00
+BREAK_ROUND_MINUTES = 15
+BREAK_CACHE_SIZE = 4096  # distinct (start, finish, break) patterns kept
+
+Interval = Tuple[int, int]
+
+
+def _round15(minutes: int) -> int:
+    return round(minutes / BREAK_ROUND_MINUTES) * BREAK_ROUND_MINUTES
+
+
+def _at_edge(start: int, finish: int, length: int, slots: Iterable[int]) -> Interval:
+    """Break of length at the period start or end, whichever is closer to one of slots (start on a tie)."""
+    slots = tuple(slots)
+    to_start = min(abs(start - s) for s in slots)
+    to_end = min(abs(finish - s) for s in slots)
+    if to_end < to_start:
+        return (finish - length, finish)
+    return (start, start + length)
+
+
+def _place_one(start: int, finish: int, length: int, slots: Sequence[int]) -> Interval:
+    for slot in slots:
+        if start <= slot and slot + length <= finish:
+            return (slot, slot + length)
+    return _at_edge(start, finish, length, slots)
+
+
+@lru_cache(maxsize=BREAK_CACHE_SIZE)
+def place_breaks(start: Optional[int], finish: Optional[int], break_min: int) -> Tuple[Interval, ...]:
+    """Break intervals (start, finish minutes after midnight, in time order) for a period; () for no break.
+    start / finish are minutes after midnight or None."""
+    total = _round15(break_min) if break_min and break_min > 0 else 0
+    if total <= 0:
+        return ()
+    if start is not None and finish is not None:
+        start, finish = _round15(start), _round15(finish)
+        if finish < start:
+            finish += 1440
+    if total <= 30:
+        if start is None or finish is None:
+            return ((BREAK_SLOTS[0], BREAK_SLOTS[0] + total),)
+        return (_place_one(start, finish, total, BREAK_SLOTS),)
+
+    larger = -(-total // (2 * BREAK_ROUND_MINUTES)) * BREAK_ROUND_MINUTES  # half, rounded up to a quarter hour
+    smaller = total - larger
+    late, early = BREAK_SLOTS  # larger at 13:00, smaller at 10:00
+    if start is None or finish is None:
+        return ((early, early + smaller), (late, late + larger))
+    first = _place_one(start, finish, smaller, (early,))
+    second = _place_one(start, finish, larger, (late,))
+    if first[0] < second[1] and second[0] < first[1]:  # same edge: back to back, smaller first
+        if first[0] == start or second[0] == start:
+            first, second = (start, start + smaller), (start + smaller, start + total)
+        else:
+            first, second = (finish - total, finish - larger), (finish - larger, finish)
+    return tuple(sorted((first, second)))
+
+
+def place_breaks_column(
+    starts: Sequence[Optional[int]], finishes: Sequence[Optional[int]], break_mins: Sequence[int]
+) -> List[Tuple[Interval, ...]]:
+    """place_breaks for whole columns (row i = starts[i], finishes[i], break_mins[i]). NumPy arrays from the
+    importer's _parse_columns are accepted: -1 in start / finish means no time."""
+    out: List[Tuple[Interval, ...]] = []
+    append = out.append
+    for s, f, b in zip(_ints(starts), _ints(finishes), _ints(break_mins)):
+        if b <= 0:
+            append(())
+            continue
+        append(place_breaks(None if s is None or s < 0 else s, None if f is None or f < 0 else f, b))
+    return out
+
+
+def _ints(values: Any) -> List[Any]:
+    return values.tolist() if hasattr(values, "tolist") else list(values)
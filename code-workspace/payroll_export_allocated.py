@@ -0,0 +1,300 @@
+"""
+Export Payroll: write time_periods back in the Allocated Week layout (projects.csv, the 33 columns
+import_payroll_bland_david.py reads), so the spreadsheet can be re-seeded from the app and re-imported as no-ops.
+
+One row per time period, by date, employee and start: Date, Contract / Location / Section (project, or
+"Fleet No <plant_no>" / workshop task for plant and workshop periods), Employee, Start, Break (total of
+time_period_breaks), Finish, Hours, Plant 1-6 / Mob 1-4 (used / mobilised fleet by display_order; Mob 4 holds
+concrete_ticket_no when set), Material, Quantity, FT / TH / DT (time_period_pay_rates), Travel, On Call, Misc. Cells are written at the importer's COL_*
+indices, so whatever it reads back is what was exported.
+
+Each page is one PostgREST select with breaks, fleet and pay rates embedded (no per-period child queries);
+projects, plant, workshop tasks and employee names come from reference maps built once per run from the local
+reference cache (payroll_reference_cache.py). Weeks are read day by day in parallel (payroll_export_hours.submit_week)
+and written as they complete.
+
+Usage:
+  python code-workspace/payroll_export_allocated.py --from 2026-01-05 --out projects_export.csv   # one week
+  python code-workspace/payroll_export_allocated.py --from 2026-01-05 --to 2026-12-27 --out projects_export.csv   # <name> Week (n).csv per week
+  python code-workspace/payroll_export_allocated.py --from 2026-01-05 --to 2026-12-27 --out Allocated.xlsx   # sheet Allocated Week (n) per week
+"""
+
+import csv
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from time import monotonic
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import payroll_export_hours as hours_export
+import payroll_pay_rates as pay_rates
+from payroll_reference_cache import ReferenceCache
+from import_payroll_bland_david import (
+    COL_BREAK,
+    COL_CONCRETE_TICKET,
+    COL_CONTRACT,
+    COL_DATE,
+    COL_EMPLOYEE,
+    COL_FINISH,
+    COL_HOURS,
+    COL_LOCATION,
+    COL_MATERIAL,
+    COL_MISC,
+    COL_MOB_END,
+    COL_MOB_START,
+    COL_ON_CALL,
+    COL_PLANT_END,
+    COL_PLANT_START,
+    COL_QTY,
+    COL_SECTION,
+    COL_START,
+    COL_TRAVEL,
+    CSV_HEADERS,
+)
+
+COL_FT, COL_TH, COL_DT = 21, 22, 23
+WIDTH = len(CSV_HEADERS)
+REFERENCE_PAGE_SIZE = 1000
+_PERIOD_COLUMNS = (
+    "id, user_id, work_date, start_time, finish_time, status, project_id, large_plant_id, workshop_tasks_id, "
+    "concrete_mix_type, concrete_qty, concrete_ticket_no, travel_to_site_min, travel_from_site_min, on_call, misc_allowance_min, "
+    "time_period_breaks(break_start, break_finish), "
+    "time_period_used_fleet(large_plant_id, display_order), "
+    "time_period_mobilised_fleet(large_plant_id, display_order), "
+    "time_period_pay_rates(pay_rate_type, hours, minutes)"
+)
+
+
+def _read_table(sb: Any, table: str, columns: str, key: str) -> List[Dict[str, Any]]:
+    """Whole reference table in keyset pages on key."""
+    out: List[Dict[str, Any]] = []
+    last: Optional[str] = None
+    while True:
+        q = sb.table(table).select(columns)
+        if last is not None:
+            q = q.gt(key, last)
+        page = q.order(key).limit(REFERENCE_PAGE_SIZE).execute().data or []
+        out.extend(page)
+        if len(page) < REFERENCE_PAGE_SIZE:
+            return out
+        last = page[-1][key]
+
+
+def load_reference_maps(sb: Any, cache: Optional[ReferenceCache] = None) -> Dict[str, Dict[str, Any]]:
+    """id -> sheet text maps: projects (client_name, town, short_description), plant (plant_no, description),
+    workshop tasks (task) and users (display_name). From the reference cache when one is given."""
+    if cache is not None:
+        tables = cache.load(sb)
+    else:
+        tables = {
+            "projects": _read_table(sb, "projects", "id, client_name, town, short_description", "id"),
+            "large_plant": _read_table(sb, "large_plant", "id, plant_no, plant_description", "id"),
+            "workshop_tasks": _read_table(sb, "workshop_tasks", "id, task", "id"),
+            "users_setup": _read_table(sb, "users_setup", "user_id, display_name", "user_id"),
+        }
+    return {
+        "projects": {
+            str(p["id"]): (p.get("client_name") or "", p.get("town") or "", p.get("short_description") or "")
+            for p in tables["projects"]
+        },
+        "plant": {
+            str(p["id"]): (str(p.get("plant_no") or "").strip(), str(p.get("plant_description") or "").strip())
+            for p in tables["large_plant"]
+        },
+        "workshop": {str(w["id"]): str(w.get("task") or "").strip() for w in tables["workshop_tasks"]},
+        "users": {str(u["user_id"]): str(u.get("display_name") or "").strip() for u in tables["users_setup"]},
+    }
+
+
+def _hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _fleet_slots(fleet: List[Dict[str, Any]], first: int, last: int, plant: Dict[str, Tuple[str, str]], row: List[Any]) -> None:
+    """Put fleet plant numbers in columns first..last by display_order (out-of-range orders take the next free slot)."""
+    leftovers = []
+    for f in sorted(fleet, key=lambda f: f.get("display_order") or 0):
+        plant_no = plant.get(str(f.get("large_plant_id")), ("", ""))[0]
+        if not plant_no:
+            continue
+        col = first + int(f.get("display_order") or 0)
+        if first <= col <= last and row[col] is None:
+            row[col] = plant_no
+        else:
+            leftovers.append(plant_no)
+    for plant_no in leftovers:
+        free = next((c for c in range(first, last + 1) if row[c] is None), None)
+        if free is not None:
+            row[free] = plant_no
+
+
+def period_row(p: Dict[str, Any], refs: Dict[str, Dict[str, Any]]) -> List[Any]:
+    """One Allocated Week row (text cells, None = empty) for a period with embedded children."""
+    row: List[Any] = [None] * WIDTH
+    wd = date.fromisoformat(str(p["work_date"])[:10])
+    row[COL_DATE] = wd.strftime("%d/%m/%Y")
+    if p.get("large_plant_id"):
+        plant_no, description = refs["plant"].get(str(p["large_plant_id"]), ("", ""))
+        row[COL_SECTION] = f"Fleet No {plant_no}" if plant_no else description or None
+    elif p.get("workshop_tasks_id"):
+        row[COL_SECTION] = refs["workshop"].get(str(p["workshop_tasks_id"])) or None
+    elif p.get("project_id"):
+        contract, location, section = refs["projects"].get(str(p["project_id"]), ("", "", ""))
+        row[COL_CONTRACT], row[COL_LOCATION], row[COL_SECTION] = contract or None, location or None, section or None
+    row[COL_EMPLOYEE] = refs["users"].get(str(p.get("user_id")), str(p.get("user_id") or ""))
+
+    start = pay_rates._epoch_minutes(p.get("start_time"))
+    finish = pay_rates._epoch_minutes(p.get("finish_time"))
+    break_min = 0
+    for b in p.get("time_period_breaks") or []:
+        bs = pay_rates._epoch_minutes(b.get("break_start"))
+        bf = pay_rates._epoch_minutes(b.get("break_finish"))
+        if bs is not None and bf is not None and bf > bs:
+            break_min += bf - bs
+    if start is not None:
+        row[COL_START] = _hhmm(start % 1440)
+    if finish is not None:
+        row[COL_FINISH] = _hhmm(finish % 1440)
+    if break_min:
+        row[COL_BREAK] = _hhmm(break_min)
+    rates = {
+        r.get("pay_rate_type"): int(float(r.get("hours") or 0) * 60) + int(r.get("minutes") or 0)
+        for r in p.get("time_period_pay_rates") or []
+    }
+    if any(rates.get(t) for t in pay_rates.PAY_RATE_TYPES):
+        worked = sum(rates.get(t, 0) for t in pay_rates.PAY_RATE_TYPES)
+    elif start is not None and finish is not None:
+        worked = (finish - start) % 1440 - break_min if finish != start else 0
+    else:
+        worked = 0
+    row[COL_HOURS] = _hhmm(max(worked, 0))
+    for col, t in ((COL_FT, "ft"), (COL_TH, "th"), (COL_DT, "dt")):
+        if rates.get(t):
+            row[col] = _hhmm(rates[t])
+
+    _fleet_slots(p.get("time_period_used_fleet") or [], COL_PLANT_START, COL_PLANT_END, refs["plant"], row)
+    if p.get("concrete_ticket_no") is not None:
+        row[COL_CONCRETE_TICKET] = str(int(p["concrete_ticket_no"]))  # before the fleet, which then fills Mob 1-3
+    _fleet_slots(p.get("time_period_mobilised_fleet") or [], COL_MOB_START, COL_MOB_END, refs["plant"], row)
+    if p.get("concrete_mix_type"):
+        row[COL_MATERIAL] = str(p["concrete_mix_type"])
+    if p.get("concrete_qty") is not None:
+        row[COL_QTY] = f"{float(p['concrete_qty']):g}"
+    travel = int(p.get("travel_to_site_min") or 0) + int(p.get("travel_from_site_min") or 0)
+    if travel:
+        row[COL_TRAVEL] = _hhmm(travel)
+    if p.get("on_call"):
+        row[COL_ON_CALL] = "1"
+    if p.get("misc_allowance_min"):
+        row[COL_MISC] = str(int(p["misc_allowance_min"]))
+    return row
+
+
+def iter_weeks(
+    sb: Any, date_from: date, date_to: date, refs: Dict[str, Dict[str, Any]], exclude_statuses: List[str]
+) -> Iterator[Tuple[date, List[Tuple[Dict[str, Any], List[Any]]]]]:
+    """(Monday, [(period, row)] by date / employee / start) per week; the next week loads meanwhile."""
+    monday = hours_export.week_monday(date_from)
+    last = hours_export.week_monday(date_to)
+    with ThreadPoolExecutor(max_workers=hours_export.EXPORT_WORKERS) as pool:
+        pending = hours_export.submit_week(pool, sb, monday, exclude_statuses, _PERIOD_COLUMNS)
+        while monday <= last:
+            periods = [p for f in pending for p in f.result() if date_from <= date.fromisoformat(str(p["work_date"])[:10]) <= date_to]
+            if monday + timedelta(days=7) <= last:
+                pending = hours_export.submit_week(pool, sb, monday + timedelta(days=7), exclude_statuses, _PERIOD_COLUMNS)
+            rows = [(p, period_row(p, refs)) for p in periods]
+            rows.sort(key=lambda r: (r[1][COL_DATE][6:] + r[1][COL_DATE][3:5] + r[1][COL_DATE][:2], r[1][COL_EMPLOYEE].lower(), r[1][COL_START] or ""))
+            yield monday, rows
+            monday += timedelta(days=7)
+
+
+def _header(row_count: int) -> List[str]:
+    """CSV_HEADERS plus the row-count cell (AH1 in the sheet: last row number with data)."""
+    return list(CSV_HEADERS) + [str(row_count + 1)]
+
+
+def export(
+    sb: Any, date_from: date, date_to: date, out: Path, exclude_statuses: Optional[List[str]] = None,
+    reference_cache: Optional[ReferenceCache] = None,
+) -> List[Path]:
+    """Write the periods from date_from to date_to to out: .xlsx = one "Allocated Week (n)" sheet per week
+    (openpyxl write-only), otherwise CSV (one file, or "<name> Week (n).csv" per week for several weeks)."""
+    if exclude_statuses is None:
+        exclude_statuses = pay_rates.DEFAULT_RULES["exclude_statuses"]
+    t0 = monotonic()
+    refs = load_reference_maps(sb, reference_cache)
+    several = hours_export.week_monday(date_from) != hours_export.week_monday(date_to)
+    written: List[Path] = []
+    total = 0
+    if out.suffix.lower() == ".xlsx":
+        import openpyxl
+
+        wb = openpyxl.Workbook(write_only=True)
+        for monday, rows in iter_weeks(sb, date_from, date_to, refs, exclude_statuses):
+            n = hours_export.week_number(monday)
+            ws = wb.create_sheet(f"Allocated Week ({n})")
+            ws.append(_header(len(rows)))
+            for _, row in rows:
+                ws.append(row)
+            total += len(rows)
+            print(f"  Allocated Week ({n}) from {monday}: {len(rows)} row(s)")
+        wb.save(out)
+        written.append(out)
+    else:
+        for monday, rows in iter_weeks(sb, date_from, date_to, refs, exclude_statuses):
+            n = hours_export.week_number(monday)
+            path = out.with_name(f"{out.stem} Week ({n}){out.suffix or '.csv'}") if several else out
+            with open(path, "w", encoding="utf-8-sig", newline="") as f:
+                w = csv.writer(f, lineterminator="\n")
+                w.writerow(_header(len(rows)))
+                w.writerows([["" if v is None else v for v in row] for _, row in rows])
+            written.append(path)
+            total += len(rows)
+            print(f"  Allocated Week ({n}) from {monday}: {len(rows)} row(s) -> {path}")
+    elapsed = monotonic() - t0
+    print(f"Exported {total} time period(s) to {len(written)} file(s) in {elapsed:.1f}s"
+          f" ({total / elapsed if elapsed > 0 else 0:,.0f} rows/s).")
+    return written
+
+
+def main() -> None:
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    out = Path("projects_export.csv")
+    i = 1
+    while i < len(sys.argv):
+        a = sys.argv[i]
+        if a in ("--from", "--to", "--out") and i + 1 < len(sys.argv):
+            v = sys.argv[i + 1]
+            if a == "--out":
+                out = Path(v)
+            else:
+                try:
+                    d = date.fromisoformat(v)
+                except ValueError:
+                    print(f"{a}: expected YYYY-MM-DD, got {v!r}")
+                    return
+                if a == "--from":
+                    date_from = d
+                else:
+                    date_to = d
+            i += 2
+            continue
+        i += 1
+    if date_from is None:
+        print("Usage: payroll_export_allocated.py --from YYYY-MM-DD [--to YYYY-MM-DD] [--out projects_export.csv|Allocated.xlsx]")
+        return
+    if date_to is None:
+        date_to = hours_export.week_monday(date_from) + timedelta(days=6)
+
+    from supabase import create_client
+    from import_payroll_bland_david import SUPABASE_KEY, SUPABASE_URL
+
+    reference_cache = ReferenceCache()
+    export(create_client(SUPABASE_URL, SUPABASE_KEY), date_from, date_to, out, reference_cache=reference_cache)
+    reference_cache.close()
+
+
+if __name__ == "__main__":
+    main()
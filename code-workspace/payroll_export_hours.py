@@ -0,0 +1,351 @@
+"""
+Export Payroll: write time_periods back in the layout of the Hours tab ("Week (n)", example Hours.csv):
+two header rows, Start / Break / Finish per weekday, Worked Hours, the FT / TH / DT / allowance blocks
+(Monday .. Sunday + Total) and Hours / Paid / Type per weekday. One row per employee per week.
+
+Sources per employee-day: Start = first start, Finish = last finish, Break = time_period_breaks within the
+periods; FT / TH / DT, Holidays and Non Worked from time_period_pay_rates (days with a period not yet in
+time_period_pay_rates are split by payroll_pay_rates with the default rules); Extra Travel = travel to + from
+site, On Call = 1 per day, Misc = misc_allowance_min. Extra TH, TH Break, Paperwork, Eating Allowance,
+Country Money, Paid / Type and Note have no source in the database and stay empty.
+
+Weeks run Monday .. Sunday (n = ISO week, as in Allocated Week (n)). Each week is read with one keyset-paged
+query per day in parallel (breaks and pay rates embedded), aggregated and written before the next week is
+needed, so memory stays at about two weeks of periods however long the range.
+
+Usage:
+  python code-workspace/payroll_export_hours.py --from 2026-01-05 --out Hours.csv   # one week
+  python code-workspace/payroll_export_hours.py --from 2026-01-05 --to 2026-03-29 --out Hours.csv   # Hours Week (n).csv per week
+  python code-workspace/payroll_export_hours.py --from 2026-01-05 --to 2026-12-27 --out Hours.xlsx   # sheet Week (n) per week
+"""
+
+import csv
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, time, timedelta
+from pathlib import Path
+from time import monotonic
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import payroll_pay_rates as pay_rates
+from payroll_reference_cache import ReferenceCache
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+# Blocks of 8 columns (Monday .. Sunday, Total) after Start / Break / Finish, in sheet order
+BLOCKS = (
+    "Worked Hours",
+    "Flat Time (FT) Hours",
+    "Time & Half (TH) Hours",
+    "Extra Time & Half (TH) Hours",
+    "Time & Half (TH) Break Hours",
+    "Double Time (DT) Hours",
+    "Extra Travel (ET)",
+    "On Call (OC)",
+    "Miscellaneous Allowance (MS)",
+    "Holidays",
+    "Non Worked Flat Time (NW FT)",
+    "Non Worked Time & Half (NW TH)",
+    "Non Worked Double Time (NW DT)",
+    "Paperwork (PW)",
+    "Eating Allowance (EA)",
+    "Country Money (CM)",
+)
+FIRST_BLOCK_COL = 1 + 3 * len(DAYS)
+PAID_COL = FIRST_BLOCK_COL + 8 * len(BLOCKS)
+NOTE_COL = PAID_COL + 3 * len(DAYS)
+WIDTH = NOTE_COL + 1
+# Block -> per-day value in the aggregate (blocks not listed are left empty); counts are summed as integers
+_BLOCK_SOURCE = {
+    "Worked Hours": "worked",
+    "Flat Time (FT) Hours": "ft",
+    "Time & Half (TH) Hours": "th",
+    "Double Time (DT) Hours": "dt",
+    "Extra Travel (ET)": "travel",
+    "On Call (OC)": "on_call",
+    "Miscellaneous Allowance (MS)": "misc",
+    "Holidays": "holiday_hours",
+    "Non Worked Flat Time (NW FT)": "ft_non_worked",
+    "Non Worked Time & Half (NW TH)": "th_non_worked",
+    "Non Worked Double Time (NW DT)": "dt_non_worked",
+}
+_COUNT_BLOCKS = {"On Call (OC)"}
+_DAY_FIELDS = ("worked", "ft", "th", "dt", "travel", "on_call", "misc", "holiday_hours", "ft_non_worked", "th_non_worked", "dt_non_worked", "break")
+
+EXPORT_PAGE_SIZE = 1000  # time_periods per keyset page (PostgREST max-rows)
+EXPORT_WORKERS = 7  # one query per day of the week
+EXPORT_USER_CHUNK = 100  # user_ids per users_setup in_() read
+_PERIOD_COLUMNS = (
+    "id, user_id, work_date, start_time, finish_time, status, travel_to_site_min, travel_from_site_min, on_call, "
+    "misc_allowance_min, time_period_breaks(break_start, break_finish), time_period_pay_rates(pay_rate_type, hours, minutes)"
+)
+
+
+def header_rows() -> List[List[str]]:
+    """The two header rows of the Hours tab (category row, then Start / Break / Finish, weekdays, Hours / Paid / Type)."""
+    top = [""] * WIDTH
+    sub = [""] * WIDTH
+    for d, day in enumerate(DAYS):
+        top[2 if d == 0 else 1 + 3 * d] = day  # the sheet centres Monday over Break, the other days sit over Start
+        sub[1 + 3 * d:4 + 3 * d] = ["Start", "Break", "Finish"]
+        top[PAID_COL + 3 * d] = day
+        sub[PAID_COL + 3 * d:PAID_COL + 3 * d + 3] = ["Hours", "Paid", "Type"]
+    for b, block in enumerate(BLOCKS):
+        col = FIRST_BLOCK_COL + 8 * b
+        top[col] = block
+        sub[col:col + 8] = list(DAYS) + ["Total"]
+    top[NOTE_COL] = "Note"
+    return [top, sub]
+
+
+def week_monday(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def week_number(monday: date) -> int:
+    return monday.isocalendar()[1]
+
+
+def load_day_periods(sb: Any, day: date, exclude_statuses: List[str], columns: str = _PERIOD_COLUMNS) -> List[Dict[str, Any]]:
+    """time_periods of one work_date (columns may embed child tables), in keyset pages on id."""
+    periods: List[Dict[str, Any]] = []
+    last_id: Optional[str] = None
+    while True:
+        q = sb.table("time_periods").select(columns).eq("work_date", day.isoformat())
+        if last_id is not None:
+            q = q.gt("id", last_id)
+        page = q.order("id").limit(EXPORT_PAGE_SIZE).execute().data or []
+        periods.extend(p for p in page if p.get("status") not in exclude_statuses)
+        if len(page) < EXPORT_PAGE_SIZE:
+            return periods
+        last_id = page[-1]["id"]
+
+
+def submit_week(
+    pool: ThreadPoolExecutor, sb: Any, monday: date, exclude_statuses: List[str], columns: str = _PERIOD_COLUMNS
+) -> List[Future]:
+    """Start loading the 7 days of the week (one load_day_periods per day); results in day order."""
+    return [pool.submit(load_day_periods, sb, monday + timedelta(days=d), exclude_statuses, columns) for d in range(7)]
+
+
+def user_names(sb: Any, user_ids: List[str], cache: Dict[str, str]) -> None:
+    """Fill cache with users_setup.display_name for user_ids not in it yet (unknown users keep their id)."""
+    missing = [u for u in user_ids if u not in cache]
+    for i in range(0, len(missing), EXPORT_USER_CHUNK):
+        chunk = missing[i:i + EXPORT_USER_CHUNK]
+        r = sb.table("users_setup").select("user_id, display_name").in_("user_id", chunk).execute()
+        for u in r.data or []:
+            if u.get("display_name"):
+                cache[str(u["user_id"])] = str(u["display_name"]).strip()
+        for u in chunk:
+            cache.setdefault(u, u)
+
+
+def aggregate_week(periods: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """{user_id: [per-day totals, Monday .. Sunday]} in one pass over the week's periods."""
+    # Days with a period not in time_period_pay_rates yet: split with the engine (whole day, so FT is shared right)
+    unsplit_days = {
+        (str(p.get("user_id")), p.get("work_date"))
+        for p in periods
+        if not any(r.get("pay_rate_type") in pay_rates.PAY_RATE_TYPES for r in p.get("time_period_pay_rates") or [])
+    }
+    computed: Dict[str, Dict[str, int]] = {}
+    if unsplit_days:
+        cols = pay_rates.periods_to_columns([p for p in periods if (str(p.get("user_id")), p.get("work_date")) in unsplit_days])
+        split = pay_rates.split_pay_rates(cols)
+        for i, tp_id in enumerate(cols["id"]):
+            computed[tp_id] = {t: split[t][i] for t in pay_rates.PAY_RATE_TYPES}
+
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for p in periods:
+        wd = p.get("work_date")
+        if not wd:
+            continue
+        user_days = out.get(str(p.get("user_id")))
+        if user_days is None:
+            user_days = out[str(p.get("user_id"))] = [dict.fromkeys(_DAY_FIELDS, 0) for _ in DAYS]
+        day = user_days[date.fromisoformat(str(wd)[:10]).weekday()]
+        start = pay_rates._epoch_minutes(p.get("start_time"))
+        finish = pay_rates._epoch_minutes(p.get("finish_time"))
+        if start is not None and (day.get("start") is None or start < day["start"]):
+            day["start"] = start
+        if finish is not None and (day.get("finish") is None or finish > day["finish"]):
+            day["finish"] = finish
+        if start is not None and finish is not None:
+            for b in p.get("time_period_breaks") or []:
+                bs = pay_rates._epoch_minutes(b.get("break_start"))
+                bf = pay_rates._epoch_minutes(b.get("break_finish"))
+                if bs is not None and bf is not None:
+                    day["break"] += max(0, min(bf, finish) - max(bs, start))
+        rates = {
+            r.get("pay_rate_type"): int(float(r.get("hours") or 0) * 60) + int(r.get("minutes") or 0)
+            for r in p.get("time_period_pay_rates") or []
+        }
+        rates.update(computed.get(p["id"], {}))
+        for t, minutes in rates.items():
+            if t in day:
+                day[t] += minutes
+        day["worked"] += sum(rates.get(t, 0) for t in pay_rates.PAY_RATE_TYPES)
+        day["travel"] += int(p.get("travel_to_site_min") or 0) + int(p.get("travel_from_site_min") or 0)
+        day["misc"] += int(p.get("misc_allowance_min") or 0)
+        if p.get("on_call"):
+            day["on_call"] = 1
+    return out
+
+
+def employee_row(name: str, days: List[Dict[str, Any]]) -> List[Any]:
+    """One sheet row: time / timedelta / float (decimal hours total) / int values, None for an empty cell."""
+    row: List[Any] = [None] * WIDTH
+    row[0] = name
+    for d, day in enumerate(days):
+        if day.get("start") is not None:
+            row[1 + 3 * d] = time(*divmod(day["start"] % 1440, 60))
+        if day["break"]:
+            row[2 + 3 * d] = timedelta(minutes=day["break"])
+        if day.get("finish") is not None:
+            row[3 + 3 * d] = time(*divmod(day["finish"] % 1440, 60))
+    for b, block in enumerate(BLOCKS):
+        field = _BLOCK_SOURCE.get(block)
+        if field is None:
+            continue
+        col = FIRST_BLOCK_COL + 8 * b
+        values = [day[field] for day in days]
+        for d, v in enumerate(values):
+            if v:
+                row[col + d] = v if block in _COUNT_BLOCKS else timedelta(minutes=v)
+        if any(values):
+            row[col + 7] = sum(values) if block in _COUNT_BLOCKS else round(sum(values) / 60, 2)
+    return row
+
+
+def _csv_cell(v: Any) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, time):
+        return f"{v.hour}:{v.minute:02d}"
+    if isinstance(v, timedelta):
+        minutes = int(v.total_seconds()) // 60
+        return f"{minutes // 60}:{minutes % 60:02d}"
+    if isinstance(v, float):
+        return f"{v:.2f}"
+    return str(v)
+
+
+def iter_weeks(
+    sb: Any, date_from: date, date_to: date, exclude_statuses: List[str], names: Optional[Dict[str, str]] = None
+) -> Iterator[Tuple[date, List[List[Any]]]]:
+    """(Monday, employee rows sorted by name) per week; the next week is read while the current one is written.
+    names: user_id -> display_name already known (e.g. from the reference cache); others are queried as met."""
+    names = dict(names or {})
+    monday = week_monday(date_from)
+    last = week_monday(date_to)
+    with ThreadPoolExecutor(max_workers=EXPORT_WORKERS) as pool:
+        pending = submit_week(pool, sb, monday, exclude_statuses)
+        while monday <= last:
+            periods = [p for f in pending for p in f.result()]
+            if monday + timedelta(days=7) <= last:
+                pending = submit_week(pool, sb, monday + timedelta(days=7), exclude_statuses)
+            per_user = aggregate_week(periods)
+            user_names(sb, sorted(per_user), names)
+            rows = sorted((employee_row(names[u], days) for u, days in per_user.items()), key=lambda r: r[0].lower())
+            yield monday, rows
+            monday += timedelta(days=7)
+
+
+def _write_csv(path: Path, rows: Iterator[List[Any]]) -> None:
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f, lineterminator="\n")
+        w.writerows(header_rows())
+        for row in rows:
+            w.writerow([_csv_cell(v) for v in row])
+
+
+def export(
+    sb: Any, date_from: date, date_to: date, out: Path, exclude_statuses: Optional[List[str]] = None,
+    reference_cache: Optional[ReferenceCache] = None,
+) -> List[Path]:
+    """Write the weeks from date_from to date_to (whole weeks) to out: .xlsx = one sheet per week (openpyxl
+    write-only), otherwise CSV (one file, or "<name> Week (n).csv" per week when the range spans several)."""
+    if exclude_statuses is None:
+        exclude_statuses = pay_rates.DEFAULT_RULES["exclude_statuses"]
+    names: Dict[str, str] = {}
+    if reference_cache is not None:
+        for u in reference_cache.load(sb, ("users_setup",))["users_setup"]:
+            if u.get("display_name"):
+                names[str(u["user_id"])] = str(u["display_name"]).strip()
+    several = week_monday(date_from) != week_monday(date_to)
+    written: List[Path] = []
+    t0 = monotonic()
+    if out.suffix.lower() == ".xlsx":
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+
+        wb = openpyxl.Workbook(write_only=True)
+        for monday, rows in iter_weeks(sb, date_from, date_to, exclude_statuses, names):
+            ws = wb.create_sheet(f"Week ({week_number(monday)})")
+            for header in header_rows():
+                ws.append(header)
+            for row in rows:
+                cells = []
+                for v in row:
+                    cell = WriteOnlyCell(ws, value=v)
+                    if isinstance(v, time):
+                        cell.number_format = "h:mm"
+                    elif isinstance(v, timedelta):
+                        cell.number_format = "[h]:mm"
+                    elif isinstance(v, float):
+                        cell.number_format = "0.00"
+                    cells.append(cell)
+                ws.append(cells)
+            print(f"  Week ({week_number(monday)}) from {monday}: {len(rows)} employee(s)")
+        wb.save(out)
+        written.append(out)
+    else:
+        for monday, rows in iter_weeks(sb, date_from, date_to, exclude_statuses, names):
+            path = out.with_name(f"{out.stem} Week ({week_number(monday)}){out.suffix or '.csv'}") if several else out
+            _write_csv(path, iter(rows))
+            written.append(path)
+            print(f"  Week ({week_number(monday)}) from {monday}: {len(rows)} employee(s) -> {path}")
+    print(f"Exported {len(written)} file(s) in {monotonic() - t0:.1f}s.")
+    return written
+
+
+def main() -> None:
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    out = Path("Hours export.csv")
+    i = 1
+    while i < len(sys.argv):
+        a = sys.argv[i]
+        if a in ("--from", "--to", "--out") and i + 1 < len(sys.argv):
+            v = sys.argv[i + 1]
+            if a == "--out":
+                out = Path(v)
+            else:
+                try:
+                    d = date.fromisoformat(v)
+                except ValueError:
+                    print(f"{a}: expected YYYY-MM-DD, got {v!r}")
+                    return
+                if a == "--from":
+                    date_from = d
+                else:
+                    date_to = d
+            i += 2
+            continue
+        i += 1
+    if date_from is None:
+        print("Usage: payroll_export_hours.py --from YYYY-MM-DD [--to YYYY-MM-DD] [--out Hours.csv|Hours.xlsx]")
+        return
+    if date_to is None:
+        date_to = date_from
+
+    from supabase import create_client
+    from import_payroll_bland_david import SUPABASE_KEY, SUPABASE_URL
+
+    reference_cache = ReferenceCache()
+    export(create_client(SUPABASE_URL, SUPABASE_KEY), date_from, date_to, out, reference_cache=reference_cache)
+    reference_cache.close()
+
+
+if __name__ == "__main__":
+    main()
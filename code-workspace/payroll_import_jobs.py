@@ -0,0 +1,656 @@
+"""
+Import job queue for unattended payroll loads (SQLite queue, no server needed; status mirrored to Supabase).
+
+A job is one Allocated Week sheet of a workbook: workbook path, week, optional employees and importer options
+(rpc, workers, in_flight, minimal, incremental, resume, accept_fuzzy). Jobs wait in the local queue until a runner takes them;
+the runner works through them JOB_WORKERS at a time (several weeks at once), all sharing one Supabase client,
+one reference cache, one import ledger and one resolved-user cache. Each job's status, rows done, counters and
+errors are kept in the queue and mirrored to public.payroll_import_jobs
+(supabase/migrations/20260224000000_payroll_import_jobs.sql), which the Import Payroll screen polls.
+
+A job queued with --at 22:00 (or an ISO date and time) is not started before then, so an overnight load can be
+queued during the day; the runner waits for it, then exits once the queue is empty (--watch: keeps polling).
+The runner lowers its own CPU priority where the OS allows. Jobs left running by a runner that stopped are queued
+again by the next runner and resume from the import ledger, so rows already written are not sent again.
+
+Queue file: PAYROLL_IMPORT_JOBS env var, default payroll_import_jobs.sqlite next to this script. A runner started
+by the Import Payroll screen logs to payroll_import_jobs.log beside it.
+
+Usage:
+  python code-workspace/payroll_import_jobs.py --add --weeks 1-4   # queue weeks 1-4 of STAFF_HOURS_EXCEL
+  python code-workspace/payroll_import_jobs.py --add --workbook "Staff Hours (2025).xlsm" --weeks 1-52 --at 22:00 --rpc
+  python code-workspace/payroll_import_jobs.py --add --years 2019-2025 --weeks 1-52   # STAFF_HOURS_EXCEL_TEMPLATE for each year
+  python code-workspace/payroll_import_jobs.py --add --week 3 --employees "Bland, David|Smith, John"
+  python code-workspace/payroll_import_jobs.py --run --workers 3   # run queued jobs, 3 at a time, until the queue is empty
+  python code-workspace/payroll_import_jobs.py --run --watch   # keep waiting for new jobs
+  python code-workspace/payroll_import_jobs.py   # status of the latest jobs (--json for JSON)
+  python code-workspace/payroll_import_jobs.py --cancel 3f2a   # cancel a queued or running job (id prefix)
+  python code-workspace/payroll_import_jobs.py --retry 3f2a   # queue a failed or cancelled job again
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time as time_mod
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+JOBS_PATH = os.environ.get("PAYROLL_IMPORT_JOBS", str(Path(__file__).with_name("payroll_import_jobs.sqlite")))
+
+JOB_WORKERS = 2  # jobs run at once (--workers N); each job writes its employees with its own "workers" option
+JOB_POLL_SECONDS = 30  # queue checks while waiting for a job's start time or (--watch) for new jobs
+JOB_HEARTBEAT_SECONDS = 30
+JOB_STALE_SECONDS = 300  # a runner silent for this long has stopped; its running jobs are queued again
+JOB_STATUS_INTERVAL_SECONDS = 5  # progress written to the queue and status table at most this often per job
+JOB_ERRORS_KEPT = 50  # errors stored per job (error_count has them all)
+JOB_NICE = 10  # CPU priority increment of the runner (Unix); a runner started on Windows runs below normal
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+# Importer options a job can carry (as in the --serve "import" method)
+JOB_OPTIONS = ("rpc", "workers", "in_flight", "minimal", "incremental", "delete_removed", "resume", "accept_fuzzy")
+
+STATUS_TABLE = "payroll_import_jobs"
+STATUS_TABLE_MIGRATION = "supabase/migrations/20260224000000_payroll_import_jobs.sql"
+# 42P01 / PGRST205: table not found; 42703 / PGRST204: column not found
+_STATUS_TABLE_MISSING_CODES = ("42P01", "PGRST205", "42703", "PGRST204")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_jobs (
+  id TEXT PRIMARY KEY,
+  workbook TEXT NOT NULL,
+  week INTEGER NOT NULL,
+  employees TEXT NULL,
+  options TEXT NOT NULL,
+  status TEXT NOT NULL,
+  not_before REAL NULL,
+  rows_total INTEGER NULL,
+  rows_done INTEGER NOT NULL DEFAULT 0,
+  counters TEXT NOT NULL DEFAULT '{}',
+  errors TEXT NOT NULL DEFAULT '[]',
+  error_count INTEGER NOT NULL DEFAULT 0,
+  message TEXT NULL,
+  runner TEXT NULL,
+  cancel_requested INTEGER NOT NULL DEFAULT 0,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  queued_at REAL NOT NULL,
+  started_at REAL NULL,
+  finished_at REAL NULL,
+  updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS import_jobs_status ON import_jobs (status, queued_at);
+CREATE TABLE IF NOT EXISTS runners (
+  id TEXT PRIMARY KEY,
+  started_at REAL NOT NULL,
+  heartbeat_at REAL NOT NULL
+);
+"""
+
+_JSON_COLUMNS = ("employees", "options", "counters", "errors")
+
+
+def _api_code(e: Exception) -> str:
+    return str(getattr(e, "code", "") or "")
+
+
+def parse_start_time(text: str, now: Optional[datetime] = None) -> float:
+    """Epoch seconds of "22:00" (the next time the clock shows it) or of an ISO date and time (local time unless
+    it has an offset)."""
+    now = now or datetime.now()
+    text = text.strip()
+    try:
+        clock = datetime.strptime(text, "%H:%M")
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+    start = now.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+    if start <= now:
+        start += timedelta(days=1)
+    return start.timestamp()
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts is not None else None
+
+
+class JobQueue:
+    """Queued, running and finished import jobs (one row per Allocated Week sheet) and the runners working on
+    them. Safe to share between threads and between processes (a job is claimed by one runner only)."""
+
+    def __init__(self, path: str = JOBS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for col in _JSON_COLUMNS:
+            job[col] = json.loads(job[col]) if job[col] is not None else None
+        return job
+
+    def _select(self, where: str = "", params: Sequence[Any] = (), limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        sql = "SELECT * FROM import_jobs" + (f" WHERE {where}" if where else "") + " ORDER BY queued_at DESC, rowid DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, tuple(params)).fetchall()
+        return [self._job(r) for r in rows]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        found = self._select("id = ?", (job_id,))
+        return found[0] if found else None
+
+    def find(self, prefix: str) -> Dict[str, Any]:
+        """The job whose id starts with prefix (as shown by the status list); KeyError if none or several."""
+        found = self._select("id LIKE ?", (prefix.strip().lower() + "%",), limit=2)
+        if len(found) != 1:
+            raise KeyError(f"{'No' if not found else 'More than one'} job with id {prefix!r}")
+        return found[0]
+
+    def jobs(self, limit: int = 50, statuses: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Latest jobs first."""
+        if statuses:
+            return self._select(f"status IN ({','.join('?' * len(statuses))})", statuses, limit)
+        return self._select(limit=limit)
+
+    # -- queueing -----------------------------------------------------------
+
+    def add(
+        self,
+        workbook: str,
+        week: int,
+        employees: Optional[Sequence[str]] = None,
+        options: Optional[Dict[str, Any]] = None,
+        not_before: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        now = time_mod.time()
+        job_id = str(uuid.uuid4())
+        unknown = set(options or {}) - set(JOB_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown job option(s): {', '.join(sorted(unknown))}")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO import_jobs (id, workbook, week, employees, options, status, not_before, queued_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, str(workbook), int(week), json.dumps(sorted(employees)) if employees else None,
+                 json.dumps(options or {}), STATUS_QUEUED, not_before, now, now),
+            )
+        return self.get(job_id)
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """A queued job is cancelled at once; a running one stops after its current write (cancel_requested)."""
+        now = time_mod.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE import_jobs SET status = ?, finished_at = ?, updated_at = ?, message = 'Cancelled before it started' "
+                "WHERE id = ? AND status = ?",
+                (STATUS_CANCELLED, now, now, job_id, STATUS_QUEUED),
+            )
+            self._conn.execute("UPDATE import_jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, STATUS_RUNNING))
+        return self.get(job_id)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def retry(self, job_id: str) -> Dict[str, Any]:
+        """Queue a failed or cancelled job again; it resumes from the import ledger."""
+        now = time_mod.time()
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE import_jobs SET status = ?, rows_total = NULL, rows_done = 0, counters = '{}', errors = '[]', "
+                "error_count = 0, message = NULL, runner = NULL, cancel_requested = 0, started_at = NULL, finished_at = NULL, "
+                "not_before = NULL, queued_at = ?, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                (STATUS_QUEUED, now, now, job_id, STATUS_FAILED, STATUS_CANCELLED),
+            )
+        if cur.rowcount == 0:
+            raise KeyError(f"Job {job_id} is not failed or cancelled")
+        return self.get(job_id)
+
+    # -- running ------------------------------------------------------------
+
+    def claim(self, runner: str) -> Optional[Dict[str, Any]]:
+        """Oldest queued job that may start now, marked running for runner; None if there is none."""
+        while True:
+            now = time_mod.time()
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT id FROM import_jobs WHERE status = ? AND (not_before IS NULL OR not_before <= ?) "
+                    "ORDER BY queued_at, rowid LIMIT 1",
+                    (STATUS_QUEUED, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                # Another runner process may have taken it between the two statements
+                cur = self._conn.execute(
+                    "UPDATE import_jobs SET status = ?, runner = ?, started_at = ?, updated_at = ?, message = 'Started', "
+                    "attempts = attempts + 1 "
+                    "WHERE id = ? AND status = ?",
+                    (STATUS_RUNNING, runner, now, now, row[0], STATUS_QUEUED),
+                )
+            if cur.rowcount:
+                return self.get(row[0])
+
+    def next_start(self) -> Optional[float]:
+        """When the next queued job may start (now or later); None when nothing is queued."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), MIN(COALESCE(not_before, 0)) FROM import_jobs WHERE status = ?", (STATUS_QUEUED,)
+            ).fetchone()
+        return max(row[1], 0.0) if row[0] else None
+
+    def update(self, job_id: str, **fields: Any) -> Dict[str, Any]:
+        """Set columns of a job (JSON columns from Python values); returns the job."""
+        fields["updated_at"] = time_mod.time()
+        values = [json.dumps(v) if k in _JSON_COLUMNS else v for k, v in fields.items()]
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE import_jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?", (*values, job_id)
+            )
+        return self.get(job_id)
+
+    def register_runner(self, runner: str) -> None:
+        now = time_mod.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO runners (id, started_at, heartbeat_at) VALUES (?, ?, ?)", (runner, now, now))
+
+    def heartbeat(self, runner: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runners SET heartbeat_at = ? WHERE id = ?", (time_mod.time(), runner))
+
+    def unregister_runner(self, runner: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM runners WHERE id = ?", (runner,))
+
+    def runner_alive(self, stale_seconds: float = JOB_STALE_SECONDS) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM runners WHERE heartbeat_at > ?", (time_mod.time() - stale_seconds,)
+            ).fetchone()
+        return bool(row[0])
+
+    def requeue_stale(self, stale_seconds: float = JOB_STALE_SECONDS) -> List[Dict[str, Any]]:
+        """Queue again the running jobs of runners that stopped (no heartbeat for stale_seconds); they resume from
+        the import ledger. Returns those jobs."""
+        now = time_mod.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM runners WHERE heartbeat_at <= ?", (now - stale_seconds,))
+            rows = self._conn.execute(
+                "SELECT id FROM import_jobs WHERE status = ? AND (runner IS NULL OR runner NOT IN (SELECT id FROM runners))",
+                (STATUS_RUNNING,),
+            ).fetchall()
+            for (job_id,) in rows:
+                self._conn.execute(
+                    "UPDATE import_jobs SET status = ?, runner = NULL, updated_at = ?, "
+                    "message = 'Queued again (runner stopped)' WHERE id = ?",
+                    (STATUS_QUEUED, now, job_id),
+                )
+        return [self.get(job_id) for (job_id,) in rows]
+
+
+class JobStatusTable:
+    """Mirror of job rows in public.payroll_import_jobs for the Import Payroll screen. Best effort: an import never
+    fails because its status could not be written; without the table (migration not applied) it is turned off
+    after one warning."""
+
+    def __init__(self, sb: Any, emit: Callable[[str], None] = print):
+        self.sb = sb
+        self.emit = emit
+        self.enabled = True
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def row(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": job["id"],
+            "workbook": Path(job["workbook"]).name,
+            "week": job["week"],
+            "employees": job["employees"],
+            "options": job["options"],
+            "status": job["status"],
+            "not_before": _iso(job["not_before"]),
+            "rows_total": job["rows_total"],
+            "rows_done": job["rows_done"],
+            "counters": job["counters"],
+            "errors": job["errors"],
+            "error_count": job["error_count"],
+            "message": job["message"],
+            "host": (job["runner"] or "").rsplit(":", 1)[0] or None,
+            "queued_at": _iso(job["queued_at"]),
+            "started_at": _iso(job["started_at"]),
+            "finished_at": _iso(job["finished_at"]),
+            "updated_at": _iso(job["updated_at"]),
+        }
+
+    def publish(self, *jobs: Dict[str, Any]) -> None:
+        if not self.enabled or not jobs:
+            return
+        try:
+            self.sb.table(STATUS_TABLE).upsert([self.row(j) for j in jobs], on_conflict="id").execute()
+        except Exception as e:
+            code = _api_code(e)
+            with self._lock:
+                if code in _STATUS_TABLE_MISSING_CODES and self.enabled:
+                    self.enabled = False
+                    self.emit(f"{STATUS_TABLE} not found ({code}); apply {STATUS_TABLE_MIGRATION}. Job status is kept locally only.")
+                elif self.enabled:
+                    self.emit(f"Job status not written to {STATUS_TABLE}: {getattr(e, 'message', None) or e}")
+
+
+class _JobProgress:
+    """Progress of one running job: rows settled (from the importer's progress callback, any thread), the last
+    output line, and the status written to the queue and status table at most every JOB_STATUS_INTERVAL_SECONDS.
+    A cancel request is noticed before the job's next batch is written (cancelled(), the importer's should_stop)."""
+
+    def __init__(self, queue: JobQueue, status: JobStatusTable, job: Dict[str, Any], emit: Callable[[str], None]):
+        self.queue = queue
+        self.status = status
+        self.job = job
+        self.short_id = job["id"][:8]
+        self._emit = emit
+        self._lock = threading.Lock()
+        self._rows_done = 0
+        self._message: Optional[str] = None
+        self._written_at = 0.0
+
+    def emit(self, line: str) -> None:
+        self._emit(f"[{self.short_id}] {line}")
+        if line.strip():
+            self._message = line.strip()[:500]
+
+    def advance(self, rows: int) -> None:
+        with self._lock:
+            self._rows_done += rows
+            due = time_mod.monotonic() - self._written_at >= JOB_STATUS_INTERVAL_SECONDS
+            if due:
+                self._written_at = time_mod.monotonic()
+        if due:
+            self.write(rows_done=self._rows_done, message=self._message)
+
+    def cancelled(self) -> bool:
+        return self.queue.cancel_requested(self.job["id"])  # a local read per batch
+
+    def write(self, **fields: Any) -> None:
+        self.job = self.queue.update(self.job["id"], **fields)
+        self.status.publish(self.job)
+
+    def finish(self, status: str, message: str, result: Optional[Dict[str, Any]] = None) -> None:
+        errors = (result or {}).get("errors") or []
+        fields: Dict[str, Any] = {"status": status, "message": message, "finished_at": time_mod.time()}
+        if result is not None:
+            fields.update(counters=result["counters"], errors=errors[:JOB_ERRORS_KEPT], error_count=len(errors))
+        if status == STATUS_DONE and self.job["rows_total"] is not None:
+            fields["rows_done"] = self.job["rows_total"]
+        else:
+            fields["rows_done"] = self._rows_done
+        self.write(**fields)
+        self._emit(f"[{self.short_id}] {Path(self.job['workbook']).name} week {self.job['week']}: {status}, {message}")
+
+
+def _run_job(
+    job: Dict[str, Any],
+    queue: JobQueue,
+    status: JobStatusTable,
+    shared: Dict[str, Any],
+    emit: Callable[[str], None],
+) -> str:
+    """Run one claimed job through the importer; returns its final status."""
+    import import_payroll_bland_david as imp
+
+    progress = _JobProgress(queue, status, job, emit)
+    status.publish(job)
+    options = job["options"] or {}
+    workbook, week = job["workbook"], job["week"]
+    progress.emit(f"{Path(workbook).name} week {week}" + (f", {len(job['employees'])} employee(s)" if job["employees"] else ""))
+    result = None
+    try:
+        if not Path(workbook).exists():
+            progress.finish(STATUS_FAILED, f"Workbook not found: {workbook}")
+            return STATUS_FAILED
+        sheets = list(imp._iter_week_sheets(workbook, {week}))
+        if not sheets:
+            progress.finish(STATUS_DONE, f"No Allocated Week ({week}) sheet in the workbook")
+            return STATUS_DONE
+        _, source, rows = sheets[0]
+        progress.write(rows_total=len(rows), message=f"{len(rows)} sheet row(s) read")
+        refs = imp._load_reference_data(shared["sb"], shared["reference_cache"])
+        run_options: Dict[str, Any] = dict(
+            week_num=week,
+            selected_employees=set(job["employees"]) if job["employees"] else None,
+            minimal_payload=bool(options.get("minimal")),
+            use_rpc=bool(options.get("rpc")),
+            workers=int(options.get("workers") or imp.IMPORT_WORKERS),
+            in_flight=int(options.get("in_flight") or 0),
+            user_cache=shared["user_cache"],
+            accept_fuzzy=bool(options.get("accept_fuzzy")),
+            emit=progress.emit,
+            progress=progress.advance,
+            should_stop=progress.cancelled,
+        )
+        if options.get("incremental"):
+            result = imp._run_incremental(
+                shared["sb"], rows, refs, ledger=shared["ledger"], source=source,
+                delete_removed=bool(options.get("delete_removed")), **run_options,
+            )
+        else:
+            # A job that ran before (runner stopped, or retried) starts at the first row not in the ledger
+            resume = bool(options.get("resume")) or job["attempts"] > 1
+            result = imp._run_import(shared["sb"], rows, refs, ledger=shared["ledger"], source=source, resume=resume, **run_options)
+    except Exception as e:
+        progress.finish(STATUS_FAILED, imp._format_api_error(e))
+        return STATUS_FAILED
+    c = result["counters"]
+    if not result["user_found"]:
+        progress.finish(STATUS_FAILED, "No employee of the sheet found in users_setup", result)
+        return STATUS_FAILED
+    settled = c["inserted"] + c["updated"] + c["skipped_duplicate"] + c["skipped_unchanged"]
+    if result.get("stopped"):
+        # The batches written are complete (breaks and fleet included) and in the ledger; --retry resumes after them
+        progress.finish(STATUS_CANCELLED, f"Cancelled while running, {c['inserted']} inserted", result)
+        return STATUS_CANCELLED
+    final = STATUS_FAILED if result["errors"] and settled == 0 else STATUS_DONE
+    summary = f"{c['inserted']} inserted, {c['skipped_duplicate']} already imported"
+    if c["updated"] or c["deleted"]:
+        summary += f", {c['updated']} updated, {c['deleted']} deleted"
+    if result["errors"]:
+        summary += f", {len(result['errors'])} error(s)"
+    progress.finish(final, summary, result)
+    return final
+
+
+def run_jobs(
+    queue: JobQueue,
+    workers: int = JOB_WORKERS,
+    *,
+    watch: bool = False,
+    emit: Callable[[str], None] = print,
+) -> Dict[str, int]:
+    """Run queued jobs, workers at a time, until none is left (watch: forever). Jobs whose start time has not come
+    are waited for. Returns the number of jobs finished per status."""
+    from supabase import create_client
+    import import_payroll_bland_david as imp
+    from payroll_import_ledger import ImportLedger
+    from payroll_reference_cache import ReferenceCache
+
+    runner = f"{socket.gethostname()}:{os.getpid()}"
+    queue.register_runner(runner)
+    requeued = queue.requeue_stale()
+    if requeued:
+        emit(f"Queued again {len(requeued)} job(s) of a runner that stopped")
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            queue.heartbeat(runner)
+
+    threading.Thread(target=beat, name="job-heartbeat", daemon=True).start()
+    sb = create_client(imp.SUPABASE_URL, imp.SUPABASE_KEY)
+    status = JobStatusTable(sb, emit)
+    status.publish(*requeued)
+    shared = {"sb": sb, "reference_cache": ReferenceCache(), "ledger": ImportLedger(), "user_cache": {}}
+    finished: Dict[str, int] = {}
+    workers = max(1, workers)
+    emit(f"Runner {runner}: {workers} job(s) at a time, queue {queue.path}")
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import-job") as pool:
+            active: set = set()
+            while True:
+                while len(active) < workers:
+                    job = queue.claim(runner)
+                    if job is None:
+                        break
+                    active.add(pool.submit(_run_job, job, queue, status, shared, emit))
+                if active:
+                    done, active = wait(active, timeout=JOB_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        final = future.result()
+                        finished[final] = finished.get(final, 0) + 1
+                    continue
+                next_start = queue.next_start()
+                if next_start is None and not watch:
+                    break
+                if next_start is not None and next_start > time_mod.time():
+                    emit(f"Next job starts at {datetime.fromtimestamp(next_start):%Y-%m-%d %H:%M}")
+                time_mod.sleep(JOB_POLL_SECONDS if next_start is None else min(max(next_start - time_mod.time(), 1), JOB_POLL_SECONDS))
+    finally:
+        stop.set()
+        queue.unregister_runner(runner)
+        shared["ledger"].close()
+        shared["reference_cache"].close()
+    emit("Runner finished: " + (", ".join(f"{n} {s}" for s, n in sorted(finished.items())) or "no jobs"))
+    return finished
+
+
+def start_runner(queue: JobQueue, workers: int = JOB_WORKERS) -> int:
+    """Start `--run` as a detached background process (it outlives the caller, e.g. the Import Payroll screen's
+    --serve process) logging to payroll_import_jobs.log beside the queue. Returns its pid."""
+    args = [sys.executable, str(Path(__file__).resolve()), "--run", "--workers", str(workers)]
+    env = dict(os.environ, PAYROLL_IMPORT_JOBS=queue.path)
+    kwargs: Dict[str, Any] = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = (
+            subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        )
+    else:
+        kwargs["start_new_session"] = True
+    with open(Path(queue.path).with_suffix(".log"), "a", encoding="utf-8") as log:
+        p = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, env=env, **kwargs)
+    return p.pid
+
+
+def _job_line(job: Dict[str, Any]) -> str:
+    progress = f"{job['rows_done']}/{job['rows_total']} rows" if job["rows_total"] is not None else ""
+    when = ""
+    if job["status"] == STATUS_QUEUED and job["not_before"]:
+        when = f"from {datetime.fromtimestamp(job['not_before']):%Y-%m-%d %H:%M}"
+    errors = f"{job['error_count']} error(s)" if job["error_count"] else ""
+    detail = ", ".join(x for x in (progress, when, errors, job["message"] or "") if x)
+    return f"  {job['id'][:8]}  {job['status']:<9} {Path(job['workbook']).name} week {job['week']:<3} {detail}"
+
+
+def main() -> None:
+    from supabase import create_client
+    import import_payroll_bland_david as imp
+
+    argv = sys.argv[1:]
+    workbooks: List[str] = []
+    weeks: set = set()
+    employees: Optional[List[str]] = None
+    options: Dict[str, Any] = {}
+    not_before: Optional[float] = None
+    workers = JOB_WORKERS
+    target: Optional[str] = None
+    i = 0
+    while i < len(argv):
+        a = argv[i]
+        value = argv[i + 1] if i + 1 < len(argv) else None
+        if a == "--workbook" and value:
+            workbooks.append(value)
+        elif a == "--years" and value:
+            workbooks.extend(imp._year_workbooks(value))
+        elif a in ("--week", "--weeks") and value:
+            weeks |= imp._parse_range(value)
+        elif a == "--employees" and value:
+            sep = "|" if "|" in value else ","
+            employees = [n.strip() for n in value.split(sep) if n.strip()]
+        elif a == "--at" and value:
+            not_before = parse_start_time(value)
+        elif a in ("--workers", "--import-workers", "--in-flight") and value:
+            try:
+                n = max(1, int(value))
+            except ValueError:
+                n = None
+            if n is not None and a == "--workers":
+                workers = n
+            elif n is not None:
+                options["workers" if a == "--import-workers" else "in_flight"] = n
+        elif a in ("--cancel", "--retry") and value:
+            target = value
+        else:
+            if a in ("--rpc", "--minimal", "--incremental", "--delete-removed", "--resume", "--accept-fuzzy"):
+                options[a[2:].replace("-", "_")] = True
+            elif a == "--async":
+                options.setdefault("in_flight", imp.ASYNC_IN_FLIGHT)
+            i += 1
+            continue
+        i += 2
+
+    queue = JobQueue()
+    if "--add" in argv:
+        if not weeks:
+            print("Give the weeks to import: --week N or --weeks 1-26")
+            return
+        workbooks = workbooks or [imp.EXCEL_PATH]
+        added = [queue.add(path, week, employees, options, not_before) for path in workbooks for week in sorted(weeks)]
+        status = JobStatusTable(create_client(imp.SUPABASE_URL, imp.SUPABASE_KEY))
+        status.publish(*added)
+        print(f"Queued {len(added)} job(s)" + (f", not before {datetime.fromtimestamp(not_before):%Y-%m-%d %H:%M}" if not_before else ""))
+        for job in added:
+            print(_job_line(job))
+        if not queue.runner_alive():
+            print("No runner is active: start one with --run (or schedule it).")
+    elif "--run" in argv:
+        if hasattr(os, "nice"):
+            os.nice(JOB_NICE)
+        run_jobs(queue, workers, watch="--watch" in argv)
+    elif target and ("--cancel" in argv or "--retry" in argv):
+        try:
+            job = queue.find(target)
+            job = queue.cancel(job["id"]) if "--cancel" in argv else queue.retry(job["id"])
+        except KeyError as e:
+            print(e.args[0])
+            queue.close()
+            sys.exit(1)
+        JobStatusTable(create_client(imp.SUPABASE_URL, imp.SUPABASE_KEY)).publish(job)
+        print(_job_line(job))
+    else:
+        jobs = queue.jobs()
+        if "--json" in argv:
+            print(json.dumps({"runner_active": queue.runner_alive(), "jobs": jobs}, default=str))
+        else:
+            print(f"{queue.path}: {len(jobs)} latest job(s), runner {'active' if queue.runner_alive() else 'not running'}")
+            for job in jobs:
+                print(_job_line(job))
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
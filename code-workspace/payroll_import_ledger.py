@@ -0,0 +1,190 @@
+"""
+Local import ledger for import_payroll_bland_david.py (SQLite, no server needed).
+
+Maps a stable hash of each source row (workbook/CSV, sheet, row contents) to the outcome of importing it and the
+time_periods.id it created. The importer skips rows already in the ledger without any network call, --resume
+starts at the first row not in the ledger, and changes() lists which rows of a sheet differ from the last import.
+
+Ledger file: PAYROLL_IMPORT_LEDGER env var, default payroll_import_ledger.sqlite next to this script.
+"""
+
+import difflib
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LEDGER_PATH = os.environ.get("PAYROLL_IMPORT_LEDGER", str(Path(__file__).with_name("payroll_import_ledger.sqlite")))
+
+# Outcomes recorded per row. "skipped" = never importable from its contents (Site 1-20, no date, no hours);
+# rows skipped for run-dependent reasons (unknown employee, not selected, API error) are not recorded.
+OUTCOME_INSERTED = "inserted"
+OUTCOME_DUPLICATE = "duplicate"
+OUTCOME_SKIPPED = "skipped"
+
+# Allocated Week Date and Employee columns: an edited row is only matched to a recorded row with the same pair
+KEY_COLUMNS = (0, 4)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS imported_rows (
+  source TEXT NOT NULL,
+  row_number INTEGER NOT NULL,
+  row_hash TEXT NOT NULL,
+  row_key TEXT NOT NULL,
+  outcome TEXT NOT NULL,
+  time_period_id TEXT NULL,
+  imported_at TEXT NOT NULL,
+  PRIMARY KEY (source, row_number)
+);
+CREATE INDEX IF NOT EXISTS imported_rows_source_hash ON imported_rows (source, row_hash);
+"""
+
+
+def source_id(path: str, sheet: Optional[str] = None) -> str:
+    """Ledger source of a workbook sheet ("Staff Hours (2026).xlsm|Allocated Week (3)") or a CSV file."""
+    name = Path(path).name
+    return f"{name}|{sheet}" if sheet else name
+
+
+def _canonical_cell(v: Any) -> str:
+    """Cell value as text that does not depend on how it was read (openpyxl vs CSV, 7 vs 7.0, trailing spaces)."""
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "1" if v else "0"
+    if isinstance(v, float):
+        return str(int(v)) if v.is_integer() else repr(v)
+    if isinstance(v, datetime):
+        return v.date().isoformat() if v.time() == time(0, 0) else v.isoformat()
+    if isinstance(v, (date, time)):
+        return v.isoformat()
+    return str(v).strip()
+
+
+def row_hash(source: str, row: Tuple[Any, ...]) -> str:
+    """Stable content hash of one sheet row (trailing empty cells ignored)."""
+    cells = [_canonical_cell(v) for v in row]
+    while cells and not cells[-1]:
+        cells.pop()
+    return hashlib.sha1((source + "\x1e" + "\x1f".join(cells)).encode("utf-8")).hexdigest()
+
+
+def row_key(row: Tuple[Any, ...]) -> str:
+    """Date + Employee of a row (identity used to pair an edited row with its recorded version)."""
+    return "\x1f".join(_canonical_cell(row[i]) if i < len(row) else "" for i in KEY_COLUMNS)
+
+
+def row_hashes(source: str, rows: List[Tuple[Any, ...]]) -> List[Tuple[str, str]]:
+    """(row_hash, row_key) per row."""
+    return [(row_hash(source, row), row_key(row)) for row in rows]
+
+
+def sheet_row_hashes(source: str, rows: List[Tuple[Any, ...]], first_row_number: int) -> Dict[int, Tuple[str, str]]:
+    """{sheet row number: (row_hash, row_key)} of the non-empty rows (the current side of ImportLedger.changes)."""
+    return {
+        first_row_number + i: (row_hash(source, row), row_key(row))
+        for i, row in enumerate(rows)
+        if any(_canonical_cell(v) for v in row)
+    }
+
+
+class ImportLedger:
+    """Per-source snapshot of the last import: (source, row_number) -> row_hash, outcome, time_period_id.
+    Safe to share between the importer's worker threads."""
+
+    def __init__(self, path: str = LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def known_hashes(self, source: str) -> Dict[str, Optional[str]]:
+        """row_hash -> time_periods.id (None for duplicate / skipped rows) of every recorded row of source."""
+        with self._lock:
+            cur = self._conn.execute("SELECT row_hash, time_period_id FROM imported_rows WHERE source = ?", (source,))
+            return {h: tp_id for h, tp_id in cur.fetchall()}
+
+    def snapshot(self, source: str) -> Dict[int, Tuple[str, str, str, Optional[str]]]:
+        """row_number -> (row_hash, row_key, outcome, time_period_id) as of the last import of source."""
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT row_number, row_hash, row_key, outcome, time_period_id FROM imported_rows WHERE source = ?", (source,)
+            )
+            return {n: (h, k, o, tp_id) for n, h, k, o, tp_id in cur.fetchall()}
+
+    def record(self, source: str, entries: Iterable[Tuple[int, Tuple[str, str], str, Optional[str]]]) -> None:
+        """Store (row_number, (row_hash, row_key), outcome, time_period_id) entries, replacing what was recorded
+        for those row numbers."""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO imported_rows (source, row_number, row_hash, row_key, outcome, time_period_id, imported_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(source, n, h, k, o, tp_id, now) for n, (h, k), o, tp_id in entries],
+                )
+
+    def replace_source(self, source: str, entries: Iterable[Tuple[int, Tuple[str, str], str, Optional[str]]]) -> None:
+        """Make entries the whole snapshot of source (after rows moved, e.g. an incremental re-import)."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM imported_rows WHERE source = ?", (source,))
+        self.record(source, entries)
+
+    def forget(self, source: str, row_numbers: Iterable[int]) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "DELETE FROM imported_rows WHERE source = ? AND row_number = ?",
+                    [(source, n) for n in row_numbers],
+                )
+
+    def changes(self, source: str, current: Dict[int, Tuple[str, str]]) -> Dict[str, Any]:
+        """Compare the current sheet {row_number: (row_hash, row_key)} with the last import of source.
+        Both sides are aligned as sequences of hashes (difflib), so inserting or deleting rows does not make
+        every later row look edited; within an edited block a current row is paired with a recorded row of the
+        same Date + Employee. Returns row numbers new / changed / unchanged (current sheet) and removed (last
+        import), plus replaces {changed row: its row number in the last import} and same {unchanged row: its
+        row number in the last import}. Content recorded anywhere in the last import counts as unchanged
+        (moved rows)."""
+        snap = self.snapshot(source)
+        old_numbers = sorted(snap)
+        new_numbers = sorted(current)
+        old_hashes = [snap[n][0] for n in old_numbers]
+        new_hashes = [current[n][0] for n in new_numbers]
+        recorded: Dict[str, int] = {}
+        for n, h in zip(old_numbers, old_hashes):
+            recorded.setdefault(h, n)
+        present = set(new_hashes)
+        out: Dict[str, Any] = {"new": [], "changed": [], "removed": [], "unchanged": [], "replaces": {}, "same": {}}
+        matcher = difflib.SequenceMatcher(a=old_hashes, b=new_hashes, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                out["unchanged"].extend(new_numbers[j1:j2])
+                out["same"].update(zip(new_numbers[j1:j2], old_numbers[i1:i2]))
+                continue
+            old_block = [n for n in old_numbers[i1:i2] if snap[n][0] not in present]
+            for n in new_numbers[j1:j2]:
+                h, key = current[n]
+                if h in recorded:
+                    out["unchanged"].append(n)  # moved
+                    out["same"][n] = recorded[h]
+                    continue
+                match = next((o for o in old_block if snap[o][1] == key), None)
+                if match is None:
+                    out["new"].append(n)
+                    continue
+                old_block.remove(match)
+                out["changed"].append(n)
+                out["replaces"][n] = match
+            out["removed"].extend(old_block)
+        for key in ("new", "changed", "removed", "unchanged"):
+            out[key].sort()
+        return out
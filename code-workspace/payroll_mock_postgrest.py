@@ -0,0 +1,541 @@
+"""
+Local mock of the Supabase REST API (PostgREST) for exercising import_payroll_bland_david.py offline.
+
+Serves /rest/v1/<table> for time_periods, time_period_breaks, time_period_used_fleet,
+time_period_mobilised_fleet, time_period_revisions, projects, large_plant, workshop_tasks and users_setup from
+in-memory tables, plus /rest/v1/rpc/import_time_periods_batch (the --rpc path). Covers what the importer sends
+through supabase-py: select with column lists, eq / neq / gt / gte / lt / lte / in / is filters (and not.),
+order, limit / offset, Prefer count=exact (Content-Range), insert, upsert with on_conflict (ignore / merge
+duplicates), update and delete, return=representation. Responses are capped at MOCK_MAX_ROWS rows like
+Supabase's max-rows, and unique keys (the time_periods import key, the fleet tables' (period, plant)) are
+enforced, so paging, duplicate skipping and the 42P10 fallback behave as against the real project. Embedded
+(joined) selects are not supported.
+
+Latency (fixed + random jitter per request) and failures can be injected: a random fraction of requests
+answered 503, and rules TABLE:VERB:CODE[:TIMES] that fail matching requests with a PostgREST / Postgres error
+code (e.g. time_periods:upsert:42P10 for an unmigrated import key; 503 / 500 for a server error). Every request
+is counted by table and verb. /_mock/stats (GET), /_mock/reset and /_mock/config (POST, JSON) control a running
+server; benchmark_payroll_import.py drives it in-process.
+
+Usage:
+  python code-workspace/payroll_mock_postgrest.py   # http://127.0.0.1:54321, empty tables
+  python code-workspace/payroll_mock_postgrest.py --seed mock_tables.json --latency-ms 40 --jitter-ms 20
+  python code-workspace/payroll_mock_postgrest.py --fail-rate 0.01 --fail time_periods:upsert:42P10
+
+then run the importer against it:
+  SUPABASE_URL=http://127.0.0.1:54321 python code-workspace/import_payroll_bland_david.py --week 1 --profile
+"""
+
+import json
+import random
+import sys
+import threading
+import time as time_mod
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+MOCK_HOST = "127.0.0.1"
+MOCK_PORT = 54321
+MOCK_MAX_ROWS = 1000  # PostgREST max-rows on Supabase
+MOCK_TABLES = (
+    "time_periods",
+    "time_period_breaks",
+    "time_period_used_fleet",
+    "time_period_mobilised_fleet",
+    "time_period_revisions",
+    "projects",
+    "large_plant",
+    "workshop_tasks",
+    "users_setup",
+)
+# Unique keys per table (rows with a NULL in the key never conflict, as in Postgres)
+MOCK_UNIQUE = {
+    "time_periods": [("id",), ("user_id", "work_date", "start_time", "import_source")],
+    "time_period_breaks": [("id",)],
+    "time_period_used_fleet": [("id",), ("time_period_id", "large_plant_id")],
+    "time_period_mobilised_fleet": [("id",), ("time_period_id", "large_plant_id")],
+    "time_period_revisions": [("id",)],
+    "projects": [("id",)],
+    "large_plant": [("id",)],
+    "workshop_tasks": [("id",)],
+    "users_setup": [("user_id",)],
+}
+MOCK_RPC = "import_time_periods_batch"
+_RPC_CHILDREN = ("breaks", "used_fleet", "mobilised_fleet")  # p_rows keys -> time_period_<key>
+_QUERY_PARAMS = ("select", "order", "limit", "offset", "on_conflict", "columns")
+
+
+class MockError(Exception):
+    """A PostgREST error response: HTTP status and {"code", "message", "details", "hint"}."""
+
+    def __init__(self, status: int, code: str, message: str, details: Optional[str] = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.details = details
+
+    def body(self) -> Dict[str, Any]:
+        return {"code": self.code, "message": str(self), "details": self.details, "hint": None}
+
+
+def _split_list(s: str) -> List[str]:
+    """Items of an in.(a,"b,c") list, quotes removed."""
+    items, cur, quoted = [], "", False
+    for ch in s:
+        if ch == '"':
+            quoted = not quoted
+        elif ch == "," and not quoted:
+            items.append(cur)
+            cur = ""
+        else:
+            cur += ch
+    if cur or items:
+        items.append(cur)
+    return items
+
+
+def _text(v: Any) -> Optional[str]:
+    """Value as PostgREST compares it in a filter (text form; None stays None)."""
+    if v is None:
+        return None
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    return str(v)
+
+
+def _compare(v: Any, arg: str) -> Optional[int]:
+    """-1 / 0 / 1 of v against a filter argument (numbers numerically, else as text); None when v is NULL."""
+    if v is None:
+        return None
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        try:
+            a = float(arg)
+            return (v > a) - (v < a)
+        except ValueError:
+            pass
+    t = _text(v)
+    return (t > arg) - (t < arg)
+
+
+def _row_filter(column: str, expr: str):
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[4:]
+    op, _, arg = expr.partition(".")
+    if op == "in":
+        values = set(_split_list(arg.strip()[1:-1]))
+
+        def test(r: Dict[str, Any]) -> bool:
+            return _text(r.get(column)) in values
+    elif op == "is":
+        want = {"null": None, "true": True, "false": False}.get(arg.lower(), arg)
+
+        def test(r: Dict[str, Any]) -> bool:
+            return r.get(column) is want if want is None or isinstance(want, bool) else _text(r.get(column)) == want
+    elif op in ("eq", "neq", "gt", "gte", "lt", "lte"):
+        ok = {"eq": (0,), "neq": (-1, 1), "gt": (1,), "gte": (0, 1), "lt": (-1,), "lte": (-1, 0)}[op]
+
+        def test(r: Dict[str, Any]) -> bool:
+            return _compare(r.get(column), arg) in ok
+    else:
+        raise MockError(400, "PGRST100", f"mock: unsupported operator {op!r}")
+    return (lambda r: not test(r)) if negate else test
+
+
+def _sort_key(v: Any) -> Tuple[int, Any]:
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return (0, v)
+    return (1, _text(v))
+
+
+class MockPostgrest:
+    """In-memory tables behind a PostgREST-shaped request handler. Thread-safe (one lock for all writes)."""
+
+    def __init__(
+        self,
+        tables: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        *,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        fail_rate: float = 0.0,
+        fail_rules: Optional[List[str]] = None,
+        max_rows: int = MOCK_MAX_ROWS,
+        seed: Optional[int] = None,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self.max_rows = max_rows
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_rate = fail_rate
+        self.fail_rules: List[List[Any]] = []
+        for rule in fail_rules or []:
+            self.add_fail_rule(rule)
+        self.reset(tables or {})
+
+    # -- state -------------------------------------------------------------
+
+    def reset(self, tables: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Replace every table (copies of the rows) and clear the stats."""
+        with self._lock:
+            self.tables: Dict[str, List[Dict[str, Any]]] = {t: [] for t in MOCK_TABLES}
+            self._unique: Dict[str, Dict[Tuple[str, ...], Dict[Tuple[Any, ...], Dict[str, Any]]]] = {}
+            for name, rows in tables.items():
+                self.tables[name] = []
+                for row in rows:
+                    self._add(name, dict(row))
+            self.calls: Counter = Counter()  # (table, verb) -> requests
+            self.statuses: Counter = Counter()  # HTTP status -> responses
+            self.requests = 0
+
+    def add_fail_rule(self, rule: str) -> None:
+        """TABLE:VERB:CODE[:TIMES]; TABLE / VERB may be *. CODE 500-599 answers that HTTP status."""
+        parts = rule.split(":")
+        if len(parts) < 3:
+            raise ValueError(f"fail rule {rule!r}: expected TABLE:VERB:CODE[:TIMES]")
+        times = int(parts[3]) if len(parts) > 3 and parts[3] else None
+        self.fail_rules.append([parts[0], parts[1], parts[2], times])
+
+    def configure(self, config: Dict[str, Any]) -> None:
+        for key in ("latency_ms", "jitter_ms", "fail_rate", "max_rows"):
+            if key in config:
+                setattr(self, key, type(getattr(self, key))(config[key]))
+        if "fail" in config:
+            self.fail_rules = []
+            for rule in config["fail"] or []:
+                self.add_fail_rule(rule)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "calls": [{"table": t, "verb": v, "calls": n} for (t, v), n in sorted(self.calls.items())],
+                "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+                "rows": {t: len(rows) for t, rows in self.tables.items()},
+            }
+
+    # -- rows and unique keys (call with the lock held) ---------------------
+
+    def _index(self, table: str) -> Dict[Tuple[str, ...], Dict[Tuple[Any, ...], Dict[str, Any]]]:
+        idx = self._unique.get(table)
+        if idx is None:
+            idx = self._unique[table] = {cols: {} for cols in MOCK_UNIQUE.get(table, [("id",)])}
+            for row in self.tables.setdefault(table, []):
+                for cols, keys in idx.items():
+                    k = self._key(row, cols)
+                    if k is not None:
+                        keys[k] = row
+        return idx
+
+    @staticmethod
+    def _key(row: Dict[str, Any], cols: Tuple[str, ...]) -> Optional[Tuple[Any, ...]]:
+        k = tuple(_text(row.get(c)) for c in cols)
+        return None if any(v is None for v in k) else k
+
+    def _conflict(self, table: str, row: Dict[str, Any], cols: Optional[Tuple[str, ...]] = None) -> Optional[Dict[str, Any]]:
+        for key_cols, keys in self._index(table).items():
+            if cols is not None and key_cols != cols:
+                continue
+            k = self._key(row, key_cols)
+            if k is not None and k in keys:
+                return keys[k]
+        return None
+
+    def _add(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        if table != "users_setup" and "id" not in row:
+            row["id"] = str(uuid.uuid4())
+        self.tables.setdefault(table, []).append(row)
+        for cols, keys in self._index(table).items():
+            k = self._key(row, cols)
+            if k is not None:
+                keys[k] = row
+        return row
+
+    def _reindex(self, table: str) -> None:
+        self._unique.pop(table, None)
+
+    # -- requests ----------------------------------------------------------
+
+    def _inject(self, table: str, verb: str) -> None:
+        for rule in self.fail_rules:
+            with self._lock:
+                r_table, r_verb, code, times = rule
+                if r_table not in ("*", table) or r_verb not in ("*", verb) or times == 0:
+                    continue
+                if times is not None:
+                    rule[3] = times - 1
+            if code.isdigit() and 500 <= int(code) < 600:
+                raise MockError(int(code), "MOCK", f"mock: injected {code} on {verb} {table}")
+            status = {"42P10": 400, "42703": 400, "PGRST204": 400, "42883": 404, "PGRST202": 404, "23505": 409}.get(code, 400)
+            raise MockError(status, code, f"mock: injected {code} on {verb} {table}")
+        if self.fail_rate and self._random.random() < self.fail_rate:
+            raise MockError(503, "MOCK", f"mock: random failure on {verb} {table}")
+
+    def handle(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        """One HTTP request -> (status, headers, body)."""
+        url = urlsplit(target)
+        path = url.path.rstrip("/")
+        params = parse_qsl(url.query, keep_blank_values=True)
+        if path.startswith("/_mock/"):
+            return self._admin(method, path[len("/_mock/"):], body)
+        if not path.startswith("/rest/v1/"):
+            return self._json(404, {"code": "PGRST125", "message": f"mock: no route {path}"})
+        name = path[len("/rest/v1/"):]
+        prefer = {p.strip() for p in headers.get("prefer", "").split(",") if p.strip()}
+        if name.startswith("rpc/"):
+            table, verb = f"rpc:{name[4:]}", "rpc"
+        else:
+            table = name
+            verb = {"GET": "select", "HEAD": "select", "PATCH": "update", "DELETE": "delete"}.get(method, "insert")
+            if method == "POST" and any(p.startswith("resolution=") for p in prefer):
+                verb = "upsert"
+        with self._lock:
+            self.requests += 1
+            self.calls[(table, verb)] += 1
+        delay = self.latency_ms + (self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time_mod.sleep(delay / 1000)
+        try:
+            self._inject(table, verb)
+            payload = json.loads(body) if body else None
+            if verb == "rpc":
+                return self._json(200, self._rpc(name[4:], payload))
+            if table not in self.tables:
+                raise MockError(404, "42P01", f'relation "public.{table}" does not exist')
+            query = {k: v for k, v in params if k in _QUERY_PARAMS}
+            filters = [_row_filter(k, v) for k, v in params if k not in _QUERY_PARAMS]
+            if verb == "select":
+                return self._select(table, filters, query, prefer)
+            with self._lock:
+                if verb in ("insert", "upsert"):
+                    rows = self._insert(table, payload, query, prefer, upsert=verb == "upsert")
+                elif verb == "update":
+                    rows = self._update(table, filters, payload or {})
+                else:
+                    rows = self._delete(table, filters)
+            if "return=representation" not in prefer:
+                return self._respond(201 if verb in ("insert", "upsert") else 204, b"")
+            return self._json(201 if verb in ("insert", "upsert") else 200, self._project(rows, query.get("select")))
+        except MockError as e:
+            return self._json(e.status, e.body())
+        except (ValueError, TypeError) as e:
+            return self._json(400, {"code": "PGRST100", "message": f"mock: bad request: {e}", "details": None, "hint": None})
+
+    def _select(self, table: str, filters: List[Any], query: Dict[str, str], prefer: set) -> Tuple[int, Dict[str, str], bytes]:
+        with self._lock:
+            rows = [r for r in self.tables[table] if all(f(r) for f in filters)]
+        for term in reversed([t for t in query.get("order", "").split(",") if t]):
+            column, _, direction = term.partition(".")
+            present = [r for r in rows if r.get(column) is not None]
+            nulls = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: _sort_key(r[column]), reverse=direction.startswith("desc"))
+            rows = present + nulls if not direction.startswith("desc") else nulls + present
+        total = len(rows)
+        offset = int(query.get("offset") or 0)
+        limit = min(int(query["limit"]), self.max_rows) if query.get("limit") else self.max_rows
+        page = rows[offset:offset + limit]
+        extra = {"Content-Range": f"{offset}-{offset + len(page) - 1}/{total if 'count=exact' in prefer else '*'}" if page else f"*/{total}"}
+        return self._json(200, self._project(page, query.get("select")), extra)
+
+    def _insert(self, table: str, payload: Any, query: Dict[str, str], prefer: set, upsert: bool) -> List[Dict[str, Any]]:
+        rows = payload if isinstance(payload, list) else [payload]
+        conflict_cols: Optional[Tuple[str, ...]] = None
+        if upsert:
+            conflict_cols = tuple(c.strip() for c in (query.get("on_conflict") or "id").split(","))
+            if conflict_cols not in MOCK_UNIQUE.get(table, [("id",)]):
+                raise MockError(400, "42P10", "there is no unique or exclusion constraint matching the ON CONFLICT specification")
+        ignore = "resolution=ignore-duplicates" in prefer
+        out: List[Dict[str, Any]] = []
+        pending: List[Tuple[str, Optional[Dict[str, Any]], Dict[str, Any]]] = []
+        seen: Dict[Tuple[str, ...], set] = {cols: set() for cols in MOCK_UNIQUE.get(table, [("id",)])}
+        for row in rows:
+            row = dict(row)
+            existing = self._conflict(table, row, conflict_cols) if upsert else self._conflict(table, row)
+            duplicate_in_batch = any(self._key(row, c) in s for c, s in seen.items() if self._key(row, c) is not None)
+            if upsert and (existing is not None or duplicate_in_batch):
+                if ignore:
+                    continue
+                if duplicate_in_batch:
+                    raise MockError(400, "21000", "ON CONFLICT DO UPDATE command cannot affect row a second time")
+                pending.append(("merge", existing, row))
+                continue
+            if existing is not None or duplicate_in_batch:
+                raise MockError(409, "23505", f'duplicate key value violates unique constraint on "{table}"')
+            for c, s in seen.items():
+                k = self._key(row, c)
+                if k is not None:
+                    s.add(k)
+            pending.append(("add", None, row))
+        for action, existing, row in pending:  # all checks passed: the statement is applied as a whole
+            if action == "merge":
+                existing.update(row)
+                out.append(existing)
+            else:
+                out.append(self._add(table, row))
+        if any(action == "merge" for action, _, _ in pending):
+            self._reindex(table)
+        return out
+
+    def _update(self, table: str, filters: List[Any], values: Dict[str, Any]) -> List[Dict[str, Any]]:
+        rows = [r for r in self.tables[table] if all(f(r) for f in filters)]
+        for r in rows:
+            r.update(values)
+        if rows:
+            self._reindex(table)
+        return rows
+
+    def _delete(self, table: str, filters: List[Any]) -> List[Dict[str, Any]]:
+        keep, gone = [], []
+        for r in self.tables[table]:
+            (gone if all(f(r) for f in filters) else keep).append(r)
+        self.tables[table] = keep
+        if gone:
+            self._reindex(table)
+        return gone
+
+    def _rpc(self, fn: str, payload: Any) -> List[Dict[str, Any]]:
+        if fn != MOCK_RPC:
+            raise MockError(404, "PGRST202", f"Could not find the function public.{fn} in the schema cache")
+        out = []
+        with self._lock:  # one transaction: checked in full before anything is added
+            key_cols = MOCK_UNIQUE["time_periods"][1]
+            # NOT EXISTS guard: any period at that start, whatever its import_source
+            slot_cols = key_cols[:3]
+            slots = {self._key(r, slot_cols) for r in self.tables.get("time_periods", [])}
+            batch_keys: set = set()
+            plan = []
+            for item in (payload or {}).get("p_rows") or []:
+                period = dict(item.get("period") or {})
+                period.setdefault("status", "imported")
+                k = self._key(period, key_cols)
+                duplicate = k is not None and (k in batch_keys or self._conflict("time_periods", period, key_cols) is not None)
+                duplicate = duplicate or self._key(period, slot_cols) in slots - {None}
+                if k is not None:
+                    batch_keys.add(k)
+                plan.append((item, period, duplicate))
+            for item, period, duplicate in plan:
+                if duplicate:
+                    out.append({"source_row": item.get("row"), "period_id": None, "outcome": "duplicate"})
+                    continue
+                new = self._add("time_periods", period)
+                for child in _RPC_CHILDREN:
+                    table = f"time_period_{child}"
+                    for c in item.get(child) or []:
+                        c = {**c, "time_period_id": new["id"]}
+                        c.setdefault("display_order", 0)
+                        if self._conflict(table, c) is None:
+                            self._add(table, c)
+                out.append({"source_row": item.get("row"), "period_id": new["id"], "outcome": "inserted"})
+        return out
+
+    def _admin(self, method: str, action: str, body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        data = json.loads(body) if body else {}
+        if action == "stats":
+            return self._json(200, self.stats())
+        if action == "reset" and method == "POST":
+            self.reset(data.get("tables") or {})
+            return self._json(200, self.stats())
+        if action == "config" and method == "POST":
+            self.configure(data)
+            return self._json(200, {"latency_ms": self.latency_ms, "jitter_ms": self.jitter_ms, "fail_rate": self.fail_rate})
+        return self._json(404, {"code": "MOCK", "message": f"mock: unknown admin action {action}"})
+
+    @staticmethod
+    def _project(rows: List[Dict[str, Any]], select: Optional[str]) -> List[Dict[str, Any]]:
+        if not select or select == "*":
+            return [dict(r) for r in rows]
+        cols = [c.strip() for c in select.split(",") if c.strip()]
+        if any("(" in c for c in cols):
+            raise MockError(400, "PGRST100", "mock: embedded selects are not supported")
+        return [{c: r.get(c) for c in cols} for r in rows]
+
+    def _respond(self, status: int, body: bytes, extra: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        with self._lock:
+            self.statuses[status] += 1
+        return status, {"Content-Type": "application/json", **(extra or {})}, body
+
+    def _json(self, status: int, data: Any, extra: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        return self._respond(status, json.dumps(data).encode("utf-8"), extra)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as httpx expects
+    wbufsize = 1 << 16  # headers and body in one send (flushed per request), no Nagle / delayed-ACK stall
+    disable_nagle_algorithm = True
+    mock: MockPostgrest
+
+    def _handle(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        status, headers, out = self.mock.handle(self.command, self.path, {k.lower(): v for k, v in self.headers.items()}, body)
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(out)
+
+    do_GET = do_HEAD = do_POST = do_PATCH = do_DELETE = _handle
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def serve(mock: MockPostgrest, host: str = MOCK_HOST, port: int = MOCK_PORT) -> ThreadingHTTPServer:
+    """Start mock on host:port (0 = any free port) in a daemon thread; server.server_address has the port.
+    Call server.shutdown() to stop it."""
+    handler = type("MockHandler", (_Handler,), {"mock": mock})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def mock_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def main() -> None:
+    host, port = MOCK_HOST, MOCK_PORT
+    seed_path: Optional[str] = None
+    kwargs: Dict[str, Any] = {"fail_rules": []}
+    i = 1
+    while i < len(sys.argv):
+        a = sys.argv[i]
+        value = sys.argv[i + 1] if i + 1 < len(sys.argv) else None
+        if a == "--host" and value:
+            host = value
+        elif a == "--port" and value:
+            port = int(value)
+        elif a == "--seed" and value:
+            seed_path = value
+        elif a == "--latency-ms" and value:
+            kwargs["latency_ms"] = float(value)
+        elif a == "--jitter-ms" and value:
+            kwargs["jitter_ms"] = float(value)
+        elif a == "--fail-rate" and value:
+            kwargs["fail_rate"] = float(value)
+        elif a == "--fail" and value:
+            kwargs["fail_rules"].append(value)
+        else:
+            i += 1
+            continue
+        i += 2
+    tables = json.loads(Path(seed_path).read_text(encoding="utf-8")) if seed_path else {}
+    mock = MockPostgrest(tables, **kwargs)
+    server = serve(mock, host, port)
+    print(f"Mock PostgREST on {mock_url(server)} ({', '.join(f'{t} {n}' for t, n in mock.stats()['rows'].items() if n) or 'empty'}); Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Employee-name index for import_payroll_bland_david.py: sheet Employee cells -> users_setup.user_id.
+
+Built once from users_setup (user_id, display_name); every lookup is in memory. A name resolves by:
+  exact       display_name as typed
+  alias       the name is in the alias map (confirmed spellings, see below)
+  normalised  "Surname, Forename" with case, accents, punctuation and spacing folded; without a comma both
+              "Forename Surname" and "Surname Forename" are tried, e.g. "O'Brien,  Seán" = "Sean OBrien"
+Near misses are only proposed, never imported on their own (they can be another employee's name):
+  initials    same surname and one forename an initial of the other ("Tracey, P" / "P." = "Paul"), when exactly
+              one user fits
+  fuzzy       trigram candidates ranked by edit distance; the best is proposed when it is close enough and
+              clearly ahead of the next ("Blank, David" -> "Bland, David")
+A proposal resolves only with resolve(name, accept_proposed=True) (the importer's --accept-fuzzy); otherwise
+the name stays unresolved and review_lines() lists it with the proposal, until it is confirmed in the alias map:
+a JSON object of sheet name -> users_setup display_name (or user_id), PAYROLL_NAME_ALIASES env var, default
+payroll_name_aliases.json next to this script. Unresolved names are listed with their closest candidates.
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+NAME_ALIASES_PATH = os.environ.get("PAYROLL_NAME_ALIASES", str(Path(__file__).with_name("payroll_name_aliases.json")))
+
+NAME_FUZZY_MIN_SCORE = 0.85  # 1 - edit distance / length of the longer normalised name
+NAME_FUZZY_MARGIN = 0.05  # the best candidate must beat the next by this much
+NAME_CANDIDATES = 8  # trigram candidates scored by edit distance per name
+
+_DROP = re.compile(r"[.'’`]")  # O'Brien = OBrien, "J." = "J"
+_SEPARATORS = re.compile(r"[^\w,]+")
+
+
+class NameMatch(NamedTuple):
+    name: str  # as in the sheet
+    user_id: str
+    display_name: str  # users_setup.display_name
+    how: str  # exact / alias / normalised (resolved); initials / fuzzy (proposed)
+    score: float
+
+    @property
+    def proposed(self) -> bool:
+        """Near miss: only used when accepted (--accept-fuzzy) or confirmed in the alias map."""
+        return self.how in PROPOSED_MATCHES
+
+
+PROPOSED_MATCHES = ("initials", "fuzzy")
+
+
+def _fold(name: Any) -> str:
+    s = unicodedata.normalize("NFKD", str(name or ""))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch)).casefold()
+    return _SEPARATORS.sub(" ", _DROP.sub("", s))
+
+
+def name_orders(name: Any) -> List[Tuple[str, str]]:
+    """Folded (surname, forename) readings: one for "Surname, Forename"; without a comma "Forename Surname"
+    (last word as surname) first, then "Surname Forename"."""
+    s = _fold(name)
+    if "," in s:
+        surname, _, forename = s.partition(",")
+        return [(" ".join(surname.split()), " ".join(forename.replace(",", " ").split()))]
+    words = s.split()
+    if len(words) < 2:
+        return [(" ".join(words), "")]
+    return [(words[-1], " ".join(words[:-1])), (words[0], " ".join(words[1:]))]
+
+
+def name_parts(name: Any) -> Tuple[str, str]:
+    """(surname, forename) folded, first reading of name_orders."""
+    return name_orders(name)[0]
+
+
+def _initials(name: Any) -> Set[str]:
+    """Folded words of name written as an initial: one letter, or ending in "." ("P", "P.", "Chris.")."""
+    return {
+        folded
+        for word in re.split(r"[\s,]+", unicodedata.normalize("NFKC", str(name or "")))
+        for folded in [_fold(word).strip()]
+        if folded and (len(folded) == 1 or word.endswith("."))
+    }
+
+
+def load_aliases(path: str = NAME_ALIASES_PATH) -> Dict[str, str]:
+    """Alias map (sheet name -> display_name or user_id); empty when the file does not exist."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object of sheet name -> users_setup display_name")
+    return {str(k).strip(): str(v).strip() for k, v in data.items() if str(k).strip() and str(v).strip()}
+
+
+def _key(surname: str, forename: str) -> str:
+    return f"{surname}, {forename}" if forename else surname
+
+
+def normalize_name(name: Any) -> str:
+    """Folded "surname, forename" (the index key)."""
+    return _key(*name_parts(name))
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 once it must exceed limit (only the band |i - j| <= limit is filled)."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        row_best = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            v = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < v:
+                v = previous[j] + 1
+            if current[j - 1] + 1 < v:
+                v = current[j - 1] + 1
+            current[j] = v
+            if v < row_best:
+                row_best = v
+        if row_best > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+class NameIndex:
+    """In-memory index of users_setup names. resolve() is safe to call from the importer's worker threads.
+    aliases: sheet name -> display_name or user_id (default: load_aliases())."""
+
+    def __init__(self, users: Iterable[Dict[str, Any]], aliases: Optional[Dict[str, str]] = None) -> None:
+        self.exact: Dict[str, str] = {}
+        self.display: Dict[str, str] = {}  # user_id -> display_name
+        self._by_key: Dict[str, Set[str]] = {}
+        self._by_surname: Dict[str, List[Tuple[str, str, bool]]] = {}  # surname -> [(forename, user_id, initial)]
+        self._keys: List[Tuple[str, str]] = []  # (normalised key, user_id)
+        self._postings: Dict[str, List[int]] = {}  # trigram -> positions in _keys
+        for u in users:
+            display = str(u.get("display_name") or "").strip()
+            user_id = u.get("user_id")
+            if not display or not user_id:
+                continue
+            user_id = str(user_id)
+            self.exact.setdefault(display, user_id)
+            self.display[user_id] = display
+            key = normalize_name(display)
+            self._by_key.setdefault(key, set()).add(user_id)
+            surname, forename = name_parts(display)
+            self._by_surname.setdefault(surname, []).append((forename, user_id, forename in _initials(display)))
+            for gram in _trigrams(key):
+                self._postings.setdefault(gram, []).append(len(self._keys))
+            self._keys.append((key, user_id))
+        by_display = {d: u for u, d in self.display.items()}
+        self.aliases: Dict[str, str] = {}  # sheet name -> user_id
+        for name, target in (load_aliases() if aliases is None else aliases).items():
+            user_id = target if target in self.display else by_display.get(target)
+            if user_id is not None:
+                self.aliases[name] = user_id
+        self._lock = threading.Lock()
+        self._resolved: Dict[str, Optional[NameMatch]] = {}
+
+    def __len__(self) -> int:
+        return len(self.display)
+
+    def _match(self, name: str, user_id: str, how: str, score: float = 1.0) -> NameMatch:
+        return NameMatch(name, user_id, self.display[user_id], how, score)
+
+    def candidates(self, name: Any, limit: int = 3, min_score: float = 0.0) -> List[NameMatch]:
+        """Closest users by edit distance among those sharing the most trigrams with a reading of the name;
+        scores below min_score are not computed exactly (the edit distance stops early)."""
+        scored: Dict[str, NameMatch] = {}
+        for surname, forename in name_orders(name):
+            key = _key(surname, forename)
+            shared = Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in _trigrams(key)))
+            for pos, _ in shared.most_common(NAME_CANDIDATES):
+                other, user_id = self._keys[pos]
+                longest = max(len(key), len(other)) or 1
+                limit_distance = int(longest * (1 - min_score))
+                score = max(0.0, 1 - _edit_distance(key, other, limit_distance) / longest)
+                if user_id not in scored or score > scored[user_id].score:
+                    scored[user_id] = self._match(str(name).strip(), user_id, "fuzzy", round(score, 3))
+        return sorted(scored.values(), key=lambda m: (-m.score, m.display_name))[:limit]
+
+    def _lookup(self, name: str) -> Optional[NameMatch]:
+        if name in self.exact:
+            return self._match(name, self.exact[name], "exact")
+        if name in self.aliases:
+            return self._match(name, self.aliases[name], "alias")
+        orders = name_orders(name)
+        for surname, forename in orders:
+            ids = self._by_key.get(_key(surname, forename))
+            if ids is not None and len(ids) == 1:
+                return self._match(name, next(iter(ids)), "normalised")
+            if ids:
+                return None  # several users with the same normalised name: not guessable
+        # Initials: the shorter forename must be written as an initial ("P", "P."), not any prefix ("Paul" is
+        # not "Pauline")
+        initials = _initials(name)
+        for surname, forename in orders:
+            fits = {
+                user_id
+                for other, user_id, other_initial in self._by_surname.get(surname, ())
+                if forename and other and forename != other and (
+                    (other.startswith(forename) and forename in initials) or (forename.startswith(other) and other_initial)
+                )
+            }
+            if len(fits) == 1:
+                return self._match(name, fits.pop(), "initials")
+            if fits:
+                return None
+        found = self.candidates(name, limit=2, min_score=NAME_FUZZY_MIN_SCORE - NAME_FUZZY_MARGIN)
+        if found and found[0].score >= NAME_FUZZY_MIN_SCORE and (
+            len(found) == 1 or found[0].score - found[1].score >= NAME_FUZZY_MARGIN
+        ):
+            return found[0]
+        return None
+
+    def lookup(self, name: Any) -> Optional[NameMatch]:
+        """Best match for a sheet Employee cell, proposals included, or None (remembered for review_lines)."""
+        name = str(name or "").strip()
+        if not name:
+            return None
+        match = self._resolved.get(name, False)
+        if match is False:
+            match = self._lookup(name)
+            with self._lock:
+                self._resolved[name] = match
+        return match
+
+    def resolve(self, name: Any, accept_proposed: bool = False) -> Optional[NameMatch]:
+        """Match for a sheet Employee cell, or None; initials / fuzzy proposals only with accept_proposed."""
+        match = self.lookup(name)
+        if match is not None and match.proposed and not accept_proposed:
+            return None
+        return match
+
+    def proposals(self, names: Iterable[Any]) -> List[NameMatch]:
+        """Initials / fuzzy proposals among names, for confirmation (e.g. the --serve preview)."""
+        found = [self.lookup(n) for n in {str(n).strip() for n in names if str(n).strip()}]
+        return sorted((m for m in found if m is not None and m.proposed), key=lambda m: m.name)
+
+    def review_lines(self, names: Optional[Iterable[str]] = None, accept_proposed: bool = False) -> List[str]:
+        """Non-exact matches, proposals and unresolved names (with candidates) among names (default: all looked
+        up). accept_proposed: as passed to resolve(), for the wording of proposals."""
+        if names is not None:
+            names = {str(n).strip() for n in names if str(n).strip()}
+            for name in names:
+                self.lookup(name)
+        with self._lock:
+            looked_up = dict(self._resolved)
+        lines = []
+        for name in sorted(looked_up if names is None else names):
+            match = looked_up[name]
+            if match is None:
+                closest = ", ".join(f"{m.display_name!r} ({m.score:.2f})" for m in self.candidates(name))
+                lines.append(f"  Unknown employee {name!r}" + (f"; closest: {closest}" if closest else ""))
+            elif match.proposed:
+                how = match.how + (f" {match.score:.2f}" if match.how == "fuzzy" else "")
+                lines.append(f"  {name!r} -> {match.display_name!r}? ({how}) "
+                             + ("accepted (--accept-fuzzy)" if accept_proposed else "not imported; confirm in the alias map or use --accept-fuzzy"))
+            elif match.how not in ("exact", "alias"):
+                lines.append(f"  {name!r} -> {match.display_name!r} ({match.how})")
+        return lines
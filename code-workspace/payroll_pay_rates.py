@@ -0,0 +1,288 @@
+"""
+Pay-rate engine: split worked time of time_periods into Flat Time / Time & Half / Double Time and write
+time_period_pay_rates (the FT/TH/DT columns of the Hours tab, so far worked out in the spreadsheet).
+
+Rules (DEFAULT_RULES, override with --rules rules.json):
+  - worked = finish - start - breaks (time_period_breaks clipped to the period; paid_breaks counts them as worked),
+    rounded to round_minutes;
+  - per employee and day, periods in start order fill ft_daily_minutes[weekday] of FT (Mon-Thu 8:00, Fri 7:00),
+    the rest is paid at overtime_rate[weekday] (TH Mon-Sat, DT Sunday: Sat/Sun have no FT).
+Periods are processed as NumPy columns (scalar fallback without NumPy): hundreds of employees x 52 weeks in seconds.
+
+Usage:
+  python code-workspace/payroll_pay_rates.py --from 2026-01-05 --to 2026-01-11
+  python code-workspace/payroll_pay_rates.py --from 2026-01-01 --to 2026-12-31 --diagnose   # totals only, no DB write
+  python code-workspace/payroll_pay_rates.py --from 2026-01-05 --to 2026-01-11 --rules rules.json
+
+Rows are upserted on (time_period_id, pay_rate_type) for ft, th and dt (0 hours included, so a recomputed period
+keeps no stale rate). hours = whole hours, minutes = 15 / 30 / 45 or NULL, as savePayRates writes them.
+"""
+
+import json
+import sys
+from datetime import date, datetime, timedelta
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np  # optional: vectorized split; the scalar fallback gives the same result
+except ImportError:
+    np = None
+
+PAY_RATE_TYPES = ("ft", "th", "dt")  # types owned by the engine (non-worked / holiday stay manual)
+
+DEFAULT_RULES: Dict[str, Any] = {
+    # Monday .. Sunday
+    "ft_daily_minutes": [480, 480, 480, 480, 420, 0, 0],
+    "overtime_rate": ["th", "th", "th", "th", "th", "th", "dt"],
+    "paid_breaks": False,
+    "round_minutes": 15,
+    "exclude_statuses": ["draft"],
+}
+
+PAY_RATES_PAGE_SIZE = 1000  # time_periods per keyset page (PostgREST max-rows)
+PAY_RATES_UPSERT_BATCH = 1000  # time_period_pay_rates rows per upsert
+
+
+def load_rules(path: Optional[str] = None) -> Dict[str, Any]:
+    """DEFAULT_RULES, with the keys of a JSON file on top. Raises ValueError for rules the schema cannot store."""
+    rules = dict(DEFAULT_RULES)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            rules.update(json.load(f))
+    step = int(rules["round_minutes"])
+    if len(rules["ft_daily_minutes"]) != 7 or len(rules["overtime_rate"]) != 7:
+        raise ValueError("ft_daily_minutes and overtime_rate need 7 entries (Monday .. Sunday)")
+    if step <= 0 or 60 % step or any(int(m) % step for m in rules["ft_daily_minutes"]):
+        raise ValueError("round_minutes must divide 60 and every ft_daily_minutes (pay rates are stored in quarter hours)")
+    if step % 15:
+        raise ValueError("round_minutes must be a multiple of 15 (time_period_pay_rates minutes are 0/15/30/45)")
+    if any(r not in ("th", "dt") for r in rules["overtime_rate"]):
+        raise ValueError("overtime_rate entries must be 'th' or 'dt'")
+    return rules
+
+
+_EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+def _epoch_minutes(value: Any) -> Optional[int]:
+    """Timestamp (ISO text from PostgREST or datetime) as minutes since the epoch; None if unparseable."""
+    if value is None:
+        return None
+    if isinstance(value, str) and len(value) >= 16 and value[10] in "T " and (len(value) == 16 or value[16] == ":") \
+            and (len(value) <= 19 or value[19:] in ("Z", "+00:00", "+00") or value[19] == "." and value[-1] == "Z"):
+        # Fast path for the UTC forms PostgREST and the importer write (seconds ignored)
+        try:
+            day = date(int(value[0:4]), int(value[5:7]), int(value[8:10])).toordinal() - _EPOCH_DAY
+            return day * 1440 + int(value[11:13]) * 60 + int(value[14:16])
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return int((value - datetime(1970, 1, 1)).total_seconds()) // 60
+
+
+def periods_to_columns(periods: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Columns of the periods the engine can split (id, user_id, work_date, start/finish in epoch minutes) and the
+    breaks as (period index, start, finish). Periods without a date or times are left out."""
+    cols: Dict[str, Any] = {"id": [], "user_id": [], "day": [], "start": [], "finish": [], "break_of": [], "break_start": [], "break_finish": []}
+    for p in periods:
+        start = _epoch_minutes(p.get("start_time"))
+        finish = _epoch_minutes(p.get("finish_time"))
+        wd = p.get("work_date")
+        if start is None or finish is None or not wd:
+            continue
+        if finish < start:
+            finish += 1440  # finish stored on the start day for a shift over midnight
+        i = len(cols["id"])
+        cols["id"].append(p["id"])
+        cols["user_id"].append(str(p.get("user_id") or ""))
+        cols["day"].append((wd if isinstance(wd, date) else date.fromisoformat(str(wd)[:10])).toordinal())
+        cols["start"].append(start)
+        cols["finish"].append(finish)
+        for b in p.get("time_period_breaks") or []:
+            bs = _epoch_minutes(b.get("break_start"))
+            bf = _epoch_minutes(b.get("break_finish"))
+            if bs is not None and bf is not None and bf > bs:
+                cols["break_of"].append(i)
+                cols["break_start"].append(bs)
+                cols["break_finish"].append(bf)
+    return cols
+
+
+def split_pay_rates(cols: Dict[str, Any], rules: Dict[str, Any] = DEFAULT_RULES) -> Dict[str, List[int]]:
+    """Minutes of ft / th / dt per period (same order as cols["id"])."""
+    if np is None:
+        return _split_pay_rates_scalar(cols, rules)
+    n = len(cols["id"])
+    if n == 0:
+        return {t: [] for t in PAY_RATE_TYPES}
+    start = np.asarray(cols["start"], dtype=np.int64)
+    finish = np.asarray(cols["finish"], dtype=np.int64)
+    worked = finish - start
+    if cols["break_of"] and not rules["paid_breaks"]:
+        of = np.asarray(cols["break_of"], dtype=np.int64)
+        overlap = np.minimum(np.asarray(cols["break_finish"], dtype=np.int64), finish[of]) - np.maximum(np.asarray(cols["break_start"], dtype=np.int64), start[of])
+        np.subtract.at(worked, of, np.clip(overlap, 0, None))
+    step = int(rules["round_minutes"])
+    worked = (np.clip(worked, 0, None) + step // 2) // step * step
+
+    # Employee-days: order periods by (user, day, start); FT fills the day's allowance in that order
+    codes: Dict[str, int] = {}
+    user_codes = np.fromiter((codes.setdefault(u, len(codes)) for u in cols["user_id"]), dtype=np.int64, count=n)
+    day = np.asarray(cols["day"], dtype=np.int64)
+    order = np.lexsort((start, day, user_codes))
+    w = worked[order]
+    d = day[order]
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = (user_codes[order][1:] != user_codes[order][:-1]) | (d[1:] != d[:-1])
+    cum = np.cumsum(w)
+    group_base = np.maximum.accumulate(np.where(new_group, cum - w, 0))
+    before = cum - w - group_base  # minutes worked earlier that day
+    weekday = (d - 1) % 7  # date.toordinal(): 1 = Monday 1 Jan 0001
+    allowance = np.asarray(rules["ft_daily_minutes"], dtype=np.int64)[weekday]
+    ft = np.clip(allowance - before, 0, w)
+    over = w - ft
+    is_dt = np.asarray([r == "dt" for r in rules["overtime_rate"]])[weekday]
+    out = {"ft": np.empty(n, dtype=np.int64), "th": np.empty(n, dtype=np.int64), "dt": np.empty(n, dtype=np.int64)}
+    out["ft"][order] = ft
+    out["th"][order] = np.where(is_dt, 0, over)
+    out["dt"][order] = np.where(is_dt, over, 0)
+    return {t: out[t].tolist() for t in PAY_RATE_TYPES}
+
+
+def _split_pay_rates_scalar(cols: Dict[str, Any], rules: Dict[str, Any]) -> Dict[str, List[int]]:
+    n = len(cols["id"])
+    worked = [cols["finish"][i] - cols["start"][i] for i in range(n)]
+    if not rules["paid_breaks"]:
+        for i, bs, bf in zip(cols["break_of"], cols["break_start"], cols["break_finish"]):
+            worked[i] -= max(0, min(bf, cols["finish"][i]) - max(bs, cols["start"][i]))
+    step = int(rules["round_minutes"])
+    worked = [(max(m, 0) + step // 2) // step * step for m in worked]
+    out: Dict[str, List[int]] = {t: [0] * n for t in PAY_RATE_TYPES}
+    used: Dict[Tuple[str, int], int] = {}
+    for i in sorted(range(n), key=lambda i: (cols["user_id"][i], cols["day"][i], cols["start"][i])):
+        key = (cols["user_id"][i], cols["day"][i])
+        weekday = (cols["day"][i] - 1) % 7
+        ft = min(max(rules["ft_daily_minutes"][weekday] - used.get(key, 0), 0), worked[i])
+        used[key] = used.get(key, 0) + worked[i]
+        out["ft"][i] = ft
+        out[rules["overtime_rate"][weekday]][i] = worked[i] - ft
+    return out
+
+
+def pay_rate_rows(ids: List[str], split: Dict[str, List[int]]) -> List[Dict[str, Any]]:
+    """time_period_pay_rates rows (one per period and engine type)."""
+    rows = []
+    for t in PAY_RATE_TYPES:
+        for tp_id, minutes in zip(ids, split[t]):
+            rows.append({
+                "time_period_id": tp_id,
+                "pay_rate_type": t,
+                "hours": minutes // 60,
+                "minutes": minutes % 60 or None,
+            })
+    return rows
+
+
+def load_periods(sb: Any, date_from: date, date_to: date, rules: Dict[str, Any] = DEFAULT_RULES) -> List[Dict[str, Any]]:
+    """time_periods in the date range with their breaks (embedded), in keyset pages on id."""
+    periods: List[Dict[str, Any]] = []
+    last_id: Optional[str] = None
+    while True:
+        q = (
+            sb.table("time_periods")
+            .select("id, user_id, work_date, start_time, finish_time, status, time_period_breaks(break_start, break_finish)")
+            .gte("work_date", date_from.isoformat())
+            .lte("work_date", date_to.isoformat())
+        )
+        if last_id is not None:
+            q = q.gt("id", last_id)
+        page = q.order("id").limit(PAY_RATES_PAGE_SIZE).execute().data or []
+        periods.extend(p for p in page if p.get("status") not in rules["exclude_statuses"])
+        if len(page) < PAY_RATES_PAGE_SIZE:
+            return periods
+        last_id = page[-1]["id"]
+
+
+def write_pay_rates(sb: Any, rows: List[Dict[str, Any]]) -> Tuple[int, List[str]]:
+    """Upsert rows in batches. Returns (rows written, errors)."""
+    written = 0
+    errors: List[str] = []
+    for i in range(0, len(rows), PAY_RATES_UPSERT_BATCH):
+        batch = rows[i:i + PAY_RATES_UPSERT_BATCH]
+        try:
+            sb.table("time_period_pay_rates").upsert(batch, on_conflict="time_period_id,pay_rate_type").execute()
+            written += len(batch)
+        except Exception as e:
+            errors.append(f"Rows {i + 1}-{i + len(batch)}: {e}")
+    return written, errors
+
+
+def main() -> None:
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    rules_path: Optional[str] = None
+    diagnose = "--diagnose" in sys.argv
+    i = 1
+    while i < len(sys.argv):
+        a = sys.argv[i]
+        if a in ("--from", "--to", "--rules") and i + 1 < len(sys.argv):
+            v = sys.argv[i + 1]
+            if a == "--rules":
+                rules_path = v
+            else:
+                try:
+                    d = date.fromisoformat(v)
+                except ValueError:
+                    print(f"{a}: expected YYYY-MM-DD, got {v!r}")
+                    return
+                if a == "--from":
+                    date_from = d
+                else:
+                    date_to = d
+            i += 2
+            continue
+        i += 1
+    if date_from is None:
+        print("Usage: payroll_pay_rates.py --from YYYY-MM-DD [--to YYYY-MM-DD] [--rules rules.json] [--diagnose]")
+        return
+    if date_to is None:
+        date_to = date_from + timedelta(days=6)
+    try:
+        rules = load_rules(rules_path)
+    except (OSError, ValueError) as e:
+        print(f"Rules: {e}")
+        return
+
+    from supabase import create_client
+    from import_payroll_bland_david import SUPABASE_KEY, SUPABASE_URL
+
+    sb = create_client(SUPABASE_URL, SUPABASE_KEY)
+    t0 = monotonic()
+    periods = load_periods(sb, date_from, date_to, rules)
+    t1 = monotonic()
+    cols = periods_to_columns(periods)
+    split = split_pay_rates(cols, rules)
+    rows = pay_rate_rows(cols["id"], split)
+    t2 = monotonic()
+    print(f"Loaded {len(periods)} time period(s) {date_from} .. {date_to} in {t1 - t0:.1f}s; "
+          f"split {len(cols['id'])} in {t2 - t1:.2f}s ({len(periods) - len(cols['id'])} without times skipped).")
+    for t in PAY_RATE_TYPES:
+        print(f"  {t.upper()}: {sum(split[t]) / 60:.2f} h")
+    if diagnose:
+        print(f"Would upsert {len(rows)} time_period_pay_rates row(s). (diagnose: no DB write)")
+        return
+    written, errors = write_pay_rates(sb, rows)
+    print(f"Upserted {written} time_period_pay_rates row(s) in {monotonic() - t2:.1f}s.")
+    for e in errors:
+        print(f"  API error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Profiling for import_payroll_bland_david.py --profile: wall time per import stage and every Supabase round trip,
+counted by table and verb.
+
+ImportProfile.stage(name) times a stage (workbook load, parse, reference loads, user resolution, duplicate
+prefetch, writes); stages can repeat and are summed. ImportProfile.client(sb) wraps a supabase client so each
+.execute() is recorded: table (or rpc:function), verb (select / insert / upsert / update / delete / rpc),
+seconds, rows returned and whether it raised; async_client(db) does the same for an async postgrest client
+(--async, awaited execute()). Both are safe to use from the importer's worker threads.
+
+summary_lines() gives the tables printed at the end of a run; write_trace(path) writes a JSON trace in the
+Chrome trace event format (chrome://tracing, https://ui.perfetto.dev) with one event per stage and call on its
+thread, plus the same summary under "summary".
+"""
+
+import json
+import threading
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from time import perf_counter
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+# Builder methods that set the request's verb; anything else (filters, order, limit, not_) keeps it
+VERBS = ("select", "insert", "upsert", "update", "delete")
+
+
+class ImportProfile:
+    """Stage timers and Supabase call counts for one importer run."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._t0 = perf_counter()
+        self.stages: Dict[str, List[float]] = {}  # name -> [seconds, runs]
+        self.calls: Dict[Tuple[str, str], List[float]] = {}  # (table, verb) -> [calls, rows, errors, seconds]
+        self._events: List[Dict[str, Any]] = []
+
+    def _event(self, name: str, cat: str, start: float, seconds: float, args: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round((start - self._t0) * 1e6),
+            "dur": round(seconds * 1e6),
+            "pid": 1,
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            seconds = perf_counter() - start
+            with self._lock:
+                totals = self.stages.setdefault(name, [0.0, 0])
+                totals[0] += seconds
+                totals[1] += 1
+                self._events.append(self._event(name, "stage", start, seconds, {}))
+
+    def record_call(self, table: str, verb: str, start: float, seconds: float, rows: int, error: Optional[str]) -> None:
+        with self._lock:
+            totals = self.calls.setdefault((table, verb), [0, 0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += rows
+            totals[2] += error is not None
+            totals[3] += seconds
+            args: Dict[str, Any] = {"rows": rows}
+            if error is not None:
+                args["error"] = error
+            self._events.append(self._event(f"{verb} {table}", "supabase", start, seconds, args))
+
+    def client(self, sb: Any) -> "ProfiledClient":
+        return ProfiledClient(sb, self)
+
+    def async_client(self, db: Any) -> "ProfiledClient":
+        return ProfiledClient(db, self, _ProfiledAsyncQuery)
+
+    def total_seconds(self) -> float:
+        return perf_counter() - self._t0
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = [{"stage": k, "seconds": round(v[0], 6), "runs": v[1]} for k, v in self.stages.items()]
+            calls = [
+                {"table": t, "verb": v, "calls": c[0], "rows": c[1], "errors": c[2], "seconds": round(c[3], 6)}
+                for (t, v), c in sorted(self.calls.items())
+            ]
+        return {
+            "total_seconds": round(self.total_seconds(), 6),
+            "stages": stages,
+            "calls": calls,
+            "round_trips": sum(c["calls"] for c in calls),
+        }
+
+    def summary_lines(self) -> List[str]:
+        s = self.summary()
+        total = s["total_seconds"] or 1e-9
+        lines = [f"Profile: {s['total_seconds']:.3f}s, {s['round_trips']} Supabase round trip(s)"]
+        lines.append(f"  {'Stage':<24} {'Seconds':>9} {'%':>6} {'Runs':>5}")
+        for st in s["stages"]:
+            lines.append(f"  {st['stage']:<24} {st['seconds']:9.3f} {100 * st['seconds'] / total:6.1f} {st['runs']:5d}")
+        if s["calls"]:
+            lines.append(f"  {'Table':<32} {'Verb':<7} {'Calls':>6} {'Rows':>7} {'Errors':>6} {'Seconds':>9}")
+            for c in s["calls"]:
+                lines.append(
+                    f"  {c['table']:<32} {c['verb']:<7} {c['calls']:6d} {c['rows']:7d} {c['errors']:6d} {c['seconds']:9.3f}"
+                )
+            lines.append("  (call seconds are summed over worker threads, so they can exceed the stage they ran in)")
+        return lines
+
+    def write_trace(self, path: str) -> None:
+        with self._lock:
+            events = sorted(self._events, key=lambda e: e["ts"])
+        trace = {"traceEvents": events, "displayTimeUnit": "ms", "summary": self.summary()}
+        Path(path).write_text(json.dumps(trace, indent=1), encoding="utf-8")
+
+
+def stage(profile: Optional[ImportProfile], name: str) -> ContextManager[None]:
+    """profile.stage(name), or a no-op without a profile."""
+    return profile.stage(name) if profile is not None else nullcontext()
+
+
+class _ProfiledQuery:
+    """A postgrest request builder whose execute() is recorded; chained calls stay wrapped."""
+
+    __slots__ = ("_builder", "_profile", "_table", "_verb")
+
+    def __init__(self, builder: Any, profile: ImportProfile, table: str, verb: str) -> None:
+        self._builder = builder
+        self._profile = profile
+        self._table = table
+        self._verb = verb
+
+    def _wrap(self, out: Any, verb: str) -> Any:
+        return type(self)(out, self._profile, self._table, verb) if hasattr(out, "execute") else out
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._builder, name)
+        verb = name if name in VERBS else self._verb
+        if not callable(attr):
+            return self._wrap(attr, verb)  # e.g. .not_
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            return self._wrap(attr(*args, **kwargs), verb)
+        return call
+
+    def execute(self) -> Any:
+        start = perf_counter()
+        try:
+            res = self._builder.execute()
+        except Exception as e:
+            self._failed(start, e)
+            raise
+        return self._done(start, res)
+
+    def _failed(self, start: float, e: Exception) -> None:
+        code = getattr(e, "code", None)
+        self._profile.record_call(self._table, self._verb, start, perf_counter() - start, 0, str(code or type(e).__name__))
+
+    def _done(self, start: float, res: Any) -> Any:
+        data = getattr(res, "data", None)
+        rows = len(data) if isinstance(data, list) else int(data is not None)
+        self._profile.record_call(self._table, self._verb, start, perf_counter() - start, rows, None)
+        return res
+
+
+class _ProfiledAsyncQuery(_ProfiledQuery):
+    """_ProfiledQuery for async builders: the awaited execute() is recorded (seconds include waiting for the
+    response only, not for a free slot)."""
+
+    __slots__ = ()
+
+    async def execute(self) -> Any:
+        start = perf_counter()
+        try:
+            res = await self._builder.execute()
+        except Exception as e:
+            self._failed(start, e)
+            raise
+        return self._done(start, res)
+
+
+class ProfiledClient:
+    """Supabase (or postgrest) client proxy: table() / from_() / rpc() requests are recorded in the profile."""
+
+    def __init__(self, sb: Any, profile: ImportProfile, query: type = _ProfiledQuery) -> None:
+        self._sb = sb
+        self._profile = profile
+        self._query = query
+
+    def table(self, name: str) -> _ProfiledQuery:
+        return self._query(self._sb.table(name), self._profile, name, "select")
+
+    from_ = table
+
+    def rpc(self, fn: str, *args: Any, **kwargs: Any) -> _ProfiledQuery:
+        return self._query(self._sb.rpc(fn, *args, **kwargs), self._profile, f"rpc:{fn}", "rpc")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._sb, name)
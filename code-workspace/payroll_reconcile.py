@@ -0,0 +1,361 @@
+"""
+Reconcile imported time_periods with the Hours tab ("Week (n)" in Staff Hours (2026).xlsm, example Hours.csv).
+
+For every employee and day of each week: Worked Hours (finish - start - breaks, rounded like the pay-rate
+engine) and FT / TH / DT (split by payroll_pay_rates with the default rules) from the database, against the
+Monday .. Sunday columns of the same blocks in the Week (n) tab. Employees are matched on
+users_setup.display_name (case and spacing ignored). Every day / measure that differs by more than the
+tolerance is written to a mismatch table (CSV), including employees found on one side only.
+
+Each week is read with one keyset-paged query per day in parallel while the previous week is compared;
+the per-employee-day sums and the comparison are NumPy array operations (scalar fallback without NumPy),
+so a full year for the whole workforce costs little more than reading the periods.
+
+Usage:
+  python code-workspace/payroll_reconcile.py --week 2   # Week (2) of STAFF_HOURS_EXCEL -> Reconcile Week (2).csv
+  python code-workspace/payroll_reconcile.py --weeks 1-52 --out Reconcile.csv   # whole year, one table
+  python code-workspace/payroll_reconcile.py --week 2 --hours Hours.csv --year 2026   # Week tab saved as CSV
+  python code-workspace/payroll_reconcile.py --weeks 1-52 --tolerance 15   # ignore differences up to 15 minutes
+  python code-workspace/import_payroll_bland_david.py --week 2 --reconcile   # import, then reconcile that week
+
+Exit status 1 when there are mismatches.
+"""
+
+import csv
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from time import monotonic
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import payroll_export_hours as hours_export
+import payroll_pay_rates as pay_rates
+from payroll_reference_cache import ReferenceCache
+
+try:
+    import numpy as np  # optional: per-employee-day sums and comparison as array operations
+except ImportError:
+    np = None
+
+HOURS_YEAR = int(os.environ.get("PAYROLL_YEAR") or date.today().year)  # year of the workbook's Week (n) tabs
+MEASURES = ("worked", "ft", "th", "dt")
+# Measure -> Hours tab block (Monday .. Sunday, Total)
+_MEASURE_BLOCKS = {
+    "worked": "Worked Hours",
+    "ft": "Flat Time (FT) Hours",
+    "th": "Time & Half (TH) Hours",
+    "dt": "Double Time (DT) Hours",
+}
+MISMATCH_HEADER = ["Week", "Employee", "Date", "Day", "Measure", "Sheet", "App", "Difference", "Note"]
+RECONCILE_USER_PAGE_SIZE = 1000  # users_setup rows per keyset page
+_PERIOD_COLUMNS = "id, user_id, work_date, start_time, finish_time, status, time_period_breaks(break_start, break_finish)"
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+
+def week_monday(year: int, week_num: int) -> date:
+    """Monday of Week (n): n is the ISO week, as in the Allocated Week (n) and Week (n) tabs."""
+    return date.fromisocalendar(year, week_num, 1)
+
+
+def _name_key(name: Any) -> str:
+    return " ".join(str(name or "").lower().split())
+
+
+def _cell_minutes(v: Any) -> int:
+    """Hours tab cell as minutes: time / timedelta / datetime ([h]:mm over 24h), a number (Excel day fraction)
+    or text "H:MM" / decimal hours; empty or unreadable = 0."""
+    if v is None:
+        return 0
+    if isinstance(v, datetime):
+        return round((v - _EXCEL_EPOCH).total_seconds() / 60)
+    if isinstance(v, time):
+        return v.hour * 60 + v.minute
+    if isinstance(v, timedelta):
+        return round(v.total_seconds() / 60)
+    if isinstance(v, (int, float)):
+        return round(v * 1440)
+    s = str(v).strip()
+    if not s:
+        return 0
+    h, sep, m = s.partition(":")
+    try:
+        if sep:
+            return int(h) * 60 + int(m[:2])
+        return round(float(s) * 60)
+    except ValueError:
+        return 0
+
+
+def parse_hours_tab(rows: Iterable[Sequence[Any]]) -> Dict[str, Tuple[str, List[List[int]]]]:
+    """{name key: (employee, minutes[measure][day])} from the tab's rows (two header rows, then one row per
+    employee). Blocks are found by their header text, else at the export layout's columns; an employee on
+    several rows is summed."""
+    it = iter(rows)
+    top = list(next(it, None) or [])
+    next(it, None)
+    cols: Dict[str, int] = {}
+    for i, v in enumerate(top):
+        if isinstance(v, str) and v.strip() and v.strip() not in cols:
+            cols[v.strip()] = i
+    first_col = {
+        m: cols.get(block, hours_export.FIRST_BLOCK_COL + 8 * hours_export.BLOCKS.index(block))
+        for m, block in _MEASURE_BLOCKS.items()
+    }
+    out: Dict[str, Tuple[str, List[List[int]]]] = {}
+    for row in it:
+        if not row or row[0] is None or not str(row[0]).strip():
+            continue
+        employee = str(row[0]).strip()
+        entry = out.get(_name_key(employee))
+        if entry is None:
+            entry = out[_name_key(employee)] = (employee, [[0] * 7 for _ in MEASURES])
+        for k, m in enumerate(MEASURES):
+            c = first_col[m]
+            for d in range(7):
+                if c + d < len(row):
+                    entry[1][k][d] += _cell_minutes(row[c + d])
+    return out
+
+
+def read_hours_csv(path: Path) -> List[List[str]]:
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.reader(f))
+
+
+def iter_hours_tabs(path: str, week_nums: List[int]) -> Iterator[Tuple[int, Optional[List[Tuple[Any, ...]]]]]:
+    """(n, rows of sheet Week (n)) per week, None when the workbook has no such sheet; read-only, values only."""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for n in week_nums:
+            name = f"Week ({n})"
+            if name not in wb.sheetnames:
+                yield n, None
+                continue
+            yield n, list(wb[name].iter_rows(max_col=hours_export.WIDTH, values_only=True))
+    finally:
+        wb.close()
+
+
+def app_minutes(periods: List[Dict[str, Any]], monday: date, names: Dict[str, str]) -> Dict[str, Tuple[str, List[List[int]]]]:
+    """Same shape as parse_hours_tab for the week's periods: worked / ft / th / dt minutes per employee-day,
+    keyed by users_setup.display_name (the user_id when a user has no name)."""
+    cols = pay_rates.periods_to_columns(periods)
+    split = pay_rates.split_pay_rates(cols)
+    per_user: Dict[str, List[List[int]]] = {}
+    if np is not None and cols["id"]:
+        users: Dict[str, int] = {}
+        n = len(cols["id"])
+        user_codes = np.fromiter((users.setdefault(u, len(users)) for u in cols["user_id"]), dtype=np.int64, count=n)
+        day = np.asarray(cols["day"], dtype=np.int64) - monday.toordinal()
+        key = user_codes * 7 + day
+        ft, th, dt = (np.asarray(split[t], dtype=np.int64) for t in ("ft", "th", "dt"))
+        sums = np.stack([
+            np.bincount(key, weights=values, minlength=len(users) * 7) for values in (ft + th + dt, ft, th, dt)
+        ]).astype(np.int64).reshape(len(MEASURES), len(users), 7)
+        for u, code in users.items():
+            per_user[u] = sums[:, code, :].tolist()
+    else:
+        for i, u in enumerate(cols["user_id"]):
+            minutes = per_user.setdefault(u, [[0] * 7 for _ in MEASURES])
+            d = cols["day"][i] - monday.toordinal()
+            ft, th, dt = split["ft"][i], split["th"][i], split["dt"][i]
+            for k, v in enumerate((ft + th + dt, ft, th, dt)):
+                minutes[k][d] += v
+    out: Dict[str, Tuple[str, List[List[int]]]] = {}
+    for u, minutes in per_user.items():
+        employee = names.get(u) or u
+        entry = out.get(_name_key(employee))
+        if entry is None:
+            out[_name_key(employee)] = (employee, minutes)
+        else:
+            for k in range(len(MEASURES)):
+                for d in range(7):
+                    entry[1][k][d] += minutes[k][d]
+    return out
+
+
+def _hhmm(minutes: int, signed: bool = False) -> str:
+    sign = "-" if minutes < 0 else ("+" if signed and minutes > 0 else "")
+    return f"{sign}{abs(minutes) // 60}:{abs(minutes) % 60:02d}"
+
+
+def compare_week(
+    week_num: int,
+    monday: date,
+    sheet: Dict[str, Tuple[str, List[List[int]]]],
+    app: Dict[str, Tuple[str, List[List[int]]]],
+    known_names: Iterable[str] = (),
+    tolerance: int = 0,
+) -> List[List[str]]:
+    """Mismatch table rows (MISMATCH_HEADER) for one week, by employee, day and measure."""
+    keys = sorted(set(sheet) | set(app))
+    if not keys:
+        return []
+    known = set(known_names)
+    zero = [[0] * 7 for _ in MEASURES]
+    sheet_m = [sheet[k][1] if k in sheet else zero for k in keys]
+    app_m = [app[k][1] if k in app else zero for k in keys]
+    if np is not None:
+        s = np.asarray(sheet_m, dtype=np.int64)
+        a = np.asarray(app_m, dtype=np.int64)
+        found = np.argwhere(np.abs(a - s) > tolerance).tolist()  # (employee, measure, day), in that order
+    else:
+        found = [
+            [e, k, d]
+            for e in range(len(keys))
+            for k in range(len(MEASURES))
+            for d in range(7)
+            if abs(app_m[e][k][d] - sheet_m[e][k][d]) > tolerance
+        ]
+    out: List[List[str]] = []
+    for e, k, d in sorted(found, key=lambda f: (f[0], f[2], f[1])):
+        key = keys[e]
+        if key not in app:
+            note = "no time periods" if key in known else "not in users_setup"
+        elif key not in sheet:
+            note = f"not in Week ({week_num})"
+        else:
+            note = ""
+        employee = (sheet.get(key) or app[key])[0]
+        day = monday + timedelta(days=d)
+        want, got = sheet_m[e][k][d], app_m[e][k][d]
+        out.append([
+            str(week_num), employee, day.isoformat(), hours_export.DAYS[d], MEASURES[k],
+            _hhmm(want), _hhmm(got), _hhmm(got - want, signed=True), note,
+        ])
+    return out
+
+
+def load_user_names(sb: Any, cache: Optional[ReferenceCache] = None) -> Dict[str, str]:
+    """users_setup.user_id -> display_name, from the reference cache when one is given, else in keyset pages."""
+    names: Dict[str, str] = {}
+    if cache is not None:
+        for u in cache.load(sb, ("users_setup",))["users_setup"]:
+            if u.get("display_name"):
+                names[str(u["user_id"])] = str(u["display_name"]).strip()
+        return names
+    last: Optional[str] = None
+    while True:
+        q = sb.table("users_setup").select("user_id, display_name")
+        if last is not None:
+            q = q.gt("user_id", last)
+        page = q.order("user_id").limit(RECONCILE_USER_PAGE_SIZE).execute().data or []
+        for u in page:
+            if u.get("display_name"):
+                names[str(u["user_id"])] = str(u["display_name"]).strip()
+        if len(page) < RECONCILE_USER_PAGE_SIZE:
+            return names
+        last = page[-1]["user_id"]
+
+
+def reconcile(
+    sb: Any,
+    week_nums: List[int],
+    out: Path,
+    *,
+    year: int = HOURS_YEAR,
+    hours_path: Optional[str] = None,
+    tolerance: int = 0,
+    exclude_statuses: Optional[List[str]] = None,
+    reference_cache: Optional[ReferenceCache] = None,
+) -> Dict[str, int]:
+    """Compare each week's periods with its Week (n) tab (workbook at hours_path, default STAFF_HOURS_EXCEL; a
+    .csv is one saved tab, for a single week) and write the mismatch table to out. Returns the counts."""
+    from import_payroll_bland_david import EXCEL_PATH
+
+    if exclude_statuses is None:
+        exclude_statuses = pay_rates.DEFAULT_RULES["exclude_statuses"]
+    hours_path = hours_path or EXCEL_PATH
+    if hours_path.lower().endswith(".csv"):
+        if len(week_nums) != 1:
+            raise ValueError("a Hours CSV holds one Week (n) tab; give a single --week")
+        tabs: Iterator[Tuple[int, Optional[List[Any]]]] = iter([(week_nums[0], read_hours_csv(Path(hours_path)))])
+    else:
+        tabs = iter_hours_tabs(hours_path, week_nums)
+    names = load_user_names(sb, reference_cache)
+    known = {_name_key(n) for n in names.values()}
+    counts = {"weeks": 0, "missing_tabs": 0, "employees": 0, "periods": 0, "mismatches": 0}
+    t0 = monotonic()
+    with open(out, "w", encoding="utf-8-sig", newline="") as f, ThreadPoolExecutor(max_workers=hours_export.EXPORT_WORKERS) as pool:
+        w = csv.writer(f, lineterminator="\n")
+        w.writerow(MISMATCH_HEADER)
+        pending = hours_export.submit_week(pool, sb, week_monday(year, week_nums[0]), exclude_statuses, _PERIOD_COLUMNS)
+        for i, (n, rows) in enumerate(tabs):
+            monday = week_monday(year, n)
+            periods = [p for fut in pending for p in fut.result()]
+            if i + 1 < len(week_nums):
+                pending = hours_export.submit_week(pool, sb, week_monday(year, week_nums[i + 1]), exclude_statuses, _PERIOD_COLUMNS)
+            if rows is None:
+                counts["missing_tabs"] += 1
+                print(f"  Week ({n}): sheet not found, skipped")
+                continue
+            sheet = parse_hours_tab(rows)
+            app = app_minutes(periods, monday, names)
+            mismatches = compare_week(n, monday, sheet, app, known, tolerance)
+            w.writerows(mismatches)
+            counts["weeks"] += 1
+            counts["employees"] += len(set(sheet) | set(app))
+            counts["periods"] += len(periods)
+            counts["mismatches"] += len(mismatches)
+            print(f"  Week ({n}) from {monday}: {len(sheet)} employee(s) in the tab, {len(app)} with periods, "
+                  f"{len(mismatches)} mismatch(es)")
+    print(f"Reconciled {counts['weeks']} week(s), {counts['periods']} period(s) in {monotonic() - t0:.1f}s: "
+          f"{counts['mismatches']} mismatch(es) -> {out}")
+    return counts
+
+
+def main() -> None:
+    from import_payroll_bland_david import SUPABASE_KEY, SUPABASE_URL, _parse_range
+
+    week_nums: List[int] = []
+    out: Optional[Path] = None
+    hours_path: Optional[str] = None
+    year = HOURS_YEAR
+    tolerance = 0
+    i = 1
+    while i < len(sys.argv):
+        a = sys.argv[i]
+        if a in ("--week", "--weeks", "--out", "--hours", "--year", "--tolerance") and i + 1 < len(sys.argv):
+            v = sys.argv[i + 1]
+            try:
+                if a in ("--week", "--weeks"):
+                    week_nums = sorted(_parse_range(v))
+                elif a == "--out":
+                    out = Path(v)
+                elif a == "--hours":
+                    hours_path = v
+                elif a == "--year":
+                    year = int(v)
+                else:
+                    tolerance = int(v)
+            except ValueError:
+                print(f"{a}: invalid value {v!r}")
+                return
+            i += 2
+            continue
+        i += 1
+    if not week_nums:
+        print("Usage: payroll_reconcile.py --week N | --weeks 1-52 [--hours Staff Hours.xlsm|Hours.csv] [--year YYYY] "
+              "[--tolerance MIN] [--out Reconcile.csv]")
+        return
+    if out is None:
+        out = Path(f"Reconcile Week ({week_nums[0]}).csv" if len(week_nums) == 1 else "Reconcile.csv")
+
+    from supabase import create_client
+
+    reference_cache = ReferenceCache()
+    counts = reconcile(
+        create_client(SUPABASE_URL, SUPABASE_KEY), week_nums, out, year=year, hours_path=hours_path, tolerance=tolerance,
+        reference_cache=reference_cache,
+    )
+    reference_cache.close()
+    if counts["mismatches"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+Local cache of the reference tables (projects, large_plant, workshop_tasks, users_setup) shared by the payroll
+scripts (SQLite, no server needed).
+
+Each table's rows are kept with the lookups built from them (plant_no -> id, Section -> plant / workshop task,
+project_number -> project, ...), so a run that finds the cache fresh makes no reference requests at all.
+
+Freshness (stale-while-revalidate):
+  - younger than REFERENCE_CACHE_TTL_SECONDS: served as is;
+  - older, up to REFERENCE_CACHE_MAX_STALE_SECONDS: served as is and revalidated in a background thread;
+  - older than that, missing, or load(refresh=True): revalidated before it is served.
+A stale table can lack rows added since, so the importer revalidates the tables behind a sheet's lookup misses
+(unknown employee names, Sections, plant numbers) before counting those rows unresolved.
+Revalidating a table reads only the rows with updated_at after the newest one cached (keyset pages), then
+compares an exact row count with the cache: a difference (deleted rows) reloads the table. Tables without an
+updated_at column (42703, or no values in it) are reloaded whole, and every table is reloaded whole at least
+every REFERENCE_CACHE_FULL_RELOAD_SECONDS, which bounds how long an edit that did not bump updated_at can hide.
+Scripts that write a table call invalidate(table), so the next load reloads it whole.
+
+Cache file: PAYROLL_REFERENCE_CACHE env var, default payroll_reference_cache.sqlite next to this script.
+
+Usage:
+  python code-workspace/payroll_reference_cache.py            # age, rows and watermark of each cached table
+  python code-workspace/payroll_reference_cache.py --refresh  # revalidate every table now
+  python code-workspace/payroll_reference_cache.py --clear    # drop the cache (the next load reads every table)
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time as time_mod
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+CACHE_PATH = os.environ.get("PAYROLL_REFERENCE_CACHE", str(Path(__file__).with_name("payroll_reference_cache.sqlite")))
+
+REFERENCE_CACHE_TTL_SECONDS = 300  # served without any request
+REFERENCE_CACHE_MAX_STALE_SECONDS = 7 * 24 * 3600  # served while revalidating in the background
+REFERENCE_CACHE_FULL_RELOAD_SECONDS = 24 * 3600
+REFERENCE_CACHE_PAGE_SIZE = 1000  # rows per page (PostgREST max-rows)
+
+WATERMARK_COLUMN = "updated_at"
+
+
+class ReferenceTable(NamedTuple):
+    key: str
+    columns: str  # union of the columns the scripts read
+
+
+REFERENCE_TABLES: Dict[str, ReferenceTable] = {
+    "projects": ReferenceTable("id", "id, project_name, project_number, client_name, town, short_description"),
+    "large_plant": ReferenceTable("id", "id, plant_no, plant_description"),
+    "workshop_tasks": ReferenceTable("id", "id, task"),
+    "users_setup": ReferenceTable("user_id", "user_id, display_name"),
+}
+
+_WHOLE_NUMBER = re.compile(r"^[+]?(\d+)(?:\.0*)?$")
+
+
+def plant_no_key(value: Any) -> str:
+    """Key a plant number is matched on: "0382", "382", 382 and 382.0 (Excel floats) are all "382";
+    other text is stripped and case-folded ("ex12 " -> "EX12")."""
+    if value is None or isinstance(value, bool):
+        return ""
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    if isinstance(value, int):
+        return str(value)
+    text = str(value).strip()
+    m = _WHOLE_NUMBER.match(text)
+    if m:
+        return m.group(1).lstrip("0") or "0"
+    return text.upper()
+
+
+def _stripped(value: Any) -> str:
+    return str(value or "").strip()
+
+
+# Prebuilt lookups: name -> (table, key columns, value column, key function). A later row (in key order) wins over
+# an earlier one with the same key, as in the importer's own lookups. Loading a cache written before an index was
+# added builds it from the cached rows.
+REFERENCE_INDEXES: Dict[str, Tuple[str, Tuple[str, ...], str, Callable[[Any], str]]] = {
+    "plant_by_no": ("large_plant", ("plant_no",), "id", _stripped),
+    "plant_by_no_key": ("large_plant", ("plant_no",), "id", plant_no_key),
+    "section_to_plant_id": ("large_plant", ("plant_no", "plant_description"), "id", _stripped),
+    "section_to_workshop_id": ("workshop_tasks", ("task",), "id", _stripped),
+    "project_by_number": ("projects", ("project_number",), "id", _stripped),
+    "project_by_name": ("projects", ("project_name",), "id", _stripped),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reference_rows (
+  table_name TEXT NOT NULL,
+  row_key TEXT NOT NULL,
+  row_json TEXT NOT NULL,
+  PRIMARY KEY (table_name, row_key)
+);
+CREATE TABLE IF NOT EXISTS reference_tables (
+  table_name TEXT PRIMARY KEY,
+  columns TEXT NOT NULL,
+  watermark TEXT NULL,
+  incremental INTEGER NULL,
+  row_count INTEGER NOT NULL,
+  fetched_at REAL NOT NULL,
+  full_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reference_indexes (
+  name TEXT PRIMARY KEY,
+  table_name TEXT NOT NULL,
+  index_json TEXT NOT NULL
+);
+"""
+
+
+class _Meta(NamedTuple):
+    columns: str
+    watermark: Optional[str]
+    incremental: Optional[bool]  # None = not known yet
+    row_count: int
+    fetched_at: float
+    full_at: float
+
+
+def build_index(
+    rows: Iterable[Dict[str, Any]], key_columns: Sequence[str], value_column: str, key: Callable[[Any], str] = _stripped,
+) -> Dict[str, Any]:
+    """{key(cell): value} over rows, for each of key_columns (empty keys left out)."""
+    index: Dict[str, Any] = {}
+    for r in rows:
+        value = r.get(value_column)
+        if not value:
+            continue
+        for column in key_columns:
+            k = key(r.get(column))
+            if k:
+                index[k] = value
+    return index
+
+
+def _api_code(e: Exception) -> str:
+    return str(getattr(e, "code", "") or "")
+
+
+class ReferenceCache:
+    """The reference tables and their lookups, cached in SQLite. Safe to share between threads; requests counts the
+    Supabase requests its revalidations made."""
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl: float = REFERENCE_CACHE_TTL_SECONDS,
+        max_stale: float = REFERENCE_CACHE_MAX_STALE_SECONDS,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # one revalidation at a time
+        self._background: Optional[threading.Thread] = None
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.wait()
+        with self._lock:
+            self._conn.close()
+
+    # -- reading ------------------------------------------------------------
+
+    def load(self, sb: Any, tables: Sequence[str] = tuple(REFERENCE_TABLES), *, refresh: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+        """{table: rows} for tables, revalidated first (or in the background) as the module docstring describes."""
+        now = time_mod.time()
+        metas = {t: self._meta(t) for t in tables}
+        stale = [t for t, m in metas.items() if m is not None and now - m.fetched_at > self.ttl]
+        must = [t for t, m in metas.items() if refresh or m is None or m.columns != REFERENCE_TABLES[t].columns
+                or now - m.fetched_at > self.max_stale]
+        if must:
+            self.revalidate(sb, must)
+        background = [t for t in stale if t not in must]
+        if background:
+            self._revalidate_in_background(sb, background)
+        self._ensure_indexes(tables)
+        return {t: self.rows(t) for t in tables}
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        """Cached rows of table in key order (no request)."""
+        with self._lock:
+            cur = self._conn.execute("SELECT row_json FROM reference_rows WHERE table_name = ? ORDER BY row_key", (table,))
+            return [json.loads(j) for (j,) in cur.fetchall()]
+
+    def index(self, name: str) -> Dict[str, Any]:
+        """Prebuilt lookup `name` of REFERENCE_INDEXES (empty until its table has been loaded)."""
+        with self._lock:
+            row = self._conn.execute("SELECT index_json FROM reference_indexes WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def indexes(self, names: Iterable[str] = tuple(REFERENCE_INDEXES)) -> Dict[str, Dict[str, Any]]:
+        return {name: self.index(name) for name in names}
+
+    def _ensure_indexes(self, tables: Sequence[str]) -> None:
+        with self._lock:
+            have = {name for (name,) in self._conn.execute("SELECT name FROM reference_indexes").fetchall()}
+        for table in tables:
+            if any(spec[0] == table and name not in have for name, spec in REFERENCE_INDEXES.items()):
+                self._store_indexes(table)
+
+    def _meta(self, table: str) -> Optional[_Meta]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT columns, watermark, incremental, row_count, fetched_at, full_at FROM reference_tables WHERE table_name = ?",
+                (table,),
+            ).fetchone()
+        if row is None:
+            return None
+        columns, watermark, incremental, row_count, fetched_at, full_at = row
+        return _Meta(columns, watermark, None if incremental is None else bool(incremental), row_count, fetched_at, full_at)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Per cached table: rows, age in seconds, watermark and whether it refreshes incrementally."""
+        now = time_mod.time()
+        out = []
+        for table in REFERENCE_TABLES:
+            m = self._meta(table)
+            if m is not None:
+                out.append({"table": table, "rows": m.row_count, "age_seconds": round(now - m.fetched_at),
+                            "watermark": m.watermark, "incremental": m.incremental})
+        return out
+
+    # -- writing ------------------------------------------------------------
+
+    def invalidate(self, *tables: str) -> None:
+        """Make the next load reload tables (all when none given) whole, before serving them."""
+        tables = tables or tuple(REFERENCE_TABLES)
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE reference_tables SET fetched_at = 0, full_at = 0, watermark = NULL WHERE table_name = ?",
+                    [(t,) for t in tables],
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.executescript("DELETE FROM reference_rows; DELETE FROM reference_tables; DELETE FROM reference_indexes;")
+
+    def revalidate(self, sb: Any, tables: Sequence[str] = tuple(REFERENCE_TABLES), *, full: bool = False) -> Dict[str, str]:
+        """Bring tables up to date now; returns {table: "full" | "incremental"} (how each was refreshed)."""
+        with self._refresh_lock:
+            return {t: self._refresh_table(sb, t, full) for t in tables}
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Wait for a background revalidation started by load()."""
+        thread = self._background
+        if thread is not None:
+            thread.join(timeout)
+
+    def _revalidate_in_background(self, sb: Any, tables: List[str]) -> None:
+        if self._background is not None and self._background.is_alive():
+            return
+
+        def run() -> None:
+            try:
+                self.revalidate(sb, tables)
+            except Exception as e:
+                # The stale rows stay in place; the next load tries again
+                print(f"Reference cache: background refresh failed: {e}", file=sys.stderr)
+
+        self._background = threading.Thread(target=run, name="reference-cache-refresh", daemon=True)
+        self._background.start()
+
+    def _refresh_table(self, sb: Any, table: str, full: bool) -> str:
+        spec = REFERENCE_TABLES[table]
+        meta = self._meta(table)
+        now = time_mod.time()
+        if (
+            full or meta is None or meta.columns != spec.columns or not meta.incremental or meta.watermark is None
+            or now - meta.full_at > REFERENCE_CACHE_FULL_RELOAD_SECONDS
+        ):
+            self._reload(sb, table, None if meta is None or meta.columns != spec.columns else meta.incremental)
+            return "full"
+        changed = self._read_changed(sb, table, meta.watermark)
+        watermark = max([meta.watermark] + [str(r[WATERMARK_COLUMN]) for r in changed if r.get(WATERMARK_COLUMN)])
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO reference_rows (table_name, row_key, row_json) VALUES (?, ?, ?)",
+                    [(table, str(r[spec.key]), json.dumps(_without_watermark(r))) for r in changed if r.get(spec.key) is not None],
+                )
+                count = self._conn.execute("SELECT count(*) FROM reference_rows WHERE table_name = ?", (table,)).fetchone()[0]
+        if self._server_count(sb, table) != count:
+            # Rows were deleted (or inserted with an older updated_at): start over
+            self._reload(sb, table, True)
+            return "full"
+        self._store_meta(table, watermark, True, count, now, meta.full_at)
+        if changed:
+            self._store_indexes(table)
+        return "incremental"
+
+    def _reload(self, sb: Any, table: str, incremental: Optional[bool]) -> None:
+        """Read table whole (keyset pages) and replace its cached rows and lookups."""
+        spec = REFERENCE_TABLES[table]
+        now = time_mod.time()
+        rows: Optional[List[Dict[str, Any]]] = None
+        if incremental is not False:
+            try:
+                rows = self._read_all(sb, table, f"{spec.columns}, {WATERMARK_COLUMN}")
+            except Exception as e:
+                if _api_code(e) != "42703":
+                    raise
+            watermarks = [str(r[WATERMARK_COLUMN]) for r in rows or [] if r.get(WATERMARK_COLUMN)]
+            incremental = bool(watermarks) and len(watermarks) == len(rows)
+        else:
+            watermarks = []
+        if rows is None:
+            rows = self._read_all(sb, table, spec.columns)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM reference_rows WHERE table_name = ?", (table,))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO reference_rows (table_name, row_key, row_json) VALUES (?, ?, ?)",
+                    [(table, str(r[spec.key]), json.dumps(_without_watermark(r))) for r in rows if r.get(spec.key) is not None],
+                )
+        self._store_meta(table, max(watermarks) if incremental else None, incremental, len(rows), now, now)
+        self._store_indexes(table)
+
+    def _read_all(self, sb: Any, table: str, columns: str) -> List[Dict[str, Any]]:
+        key = REFERENCE_TABLES[table].key
+        out: List[Dict[str, Any]] = []
+        last: Optional[str] = None
+        while True:
+            q = sb.table(table).select(columns)
+            if last is not None:
+                q = q.gt(key, last)
+            page = q.order(key).limit(REFERENCE_CACHE_PAGE_SIZE).execute().data or []
+            self.requests += 1
+            out.extend(page)
+            if len(page) < REFERENCE_CACHE_PAGE_SIZE:
+                return out
+            last = page[-1][key]
+
+    def _read_changed(self, sb: Any, table: str, watermark: str) -> List[Dict[str, Any]]:
+        """Rows with updated_at after watermark, in (updated_at, key) pages."""
+        spec = REFERENCE_TABLES[table]
+        out: List[Dict[str, Any]] = []
+        while True:
+            page = (
+                sb.table(table).select(f"{spec.columns}, {WATERMARK_COLUMN}")
+                .gt(WATERMARK_COLUMN, watermark)
+                .order(WATERMARK_COLUMN).order(spec.key)
+                .range(len(out), len(out) + REFERENCE_CACHE_PAGE_SIZE - 1)
+                .execute().data or []
+            )
+            self.requests += 1
+            out.extend(page)
+            if len(page) < REFERENCE_CACHE_PAGE_SIZE:
+                return out
+
+    def _server_count(self, sb: Any, table: str) -> Optional[int]:
+        key = REFERENCE_TABLES[table].key
+        r = sb.table(table).select(key, count="exact").limit(1).execute()
+        self.requests += 1
+        return r.count
+
+    def _store_meta(self, table: str, watermark: Optional[str], incremental: Optional[bool], row_count: int, fetched_at: float, full_at: float) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO reference_tables (table_name, columns, watermark, incremental, row_count, fetched_at, full_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (table, REFERENCE_TABLES[table].columns, watermark, None if incremental is None else int(incremental),
+                     row_count, fetched_at, full_at),
+                )
+
+    def _store_indexes(self, table: str) -> None:
+        rows = self.rows(table)
+        built = [
+            (name, table, json.dumps(build_index(rows, key_columns, value_column, key)))
+            for name, (index_table, key_columns, value_column, key) in REFERENCE_INDEXES.items() if index_table == table
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO reference_indexes (name, table_name, index_json) VALUES (?, ?, ?)", built)
+
+
+def _without_watermark(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in row.items() if k != WATERMARK_COLUMN}
+
+
+def main() -> None:
+    cache = ReferenceCache()
+    if "--clear" in sys.argv:
+        cache.clear()
+        print(f"Cleared {cache.path}")
+    elif "--refresh" in sys.argv:
+        from supabase import create_client
+        from import_payroll_bland_david import SUPABASE_KEY, SUPABASE_URL
+
+        how = cache.revalidate(create_client(SUPABASE_URL, SUPABASE_KEY))
+        print(f"Refreshed in {cache.requests} request(s): " + ", ".join(f"{t} {h}" for t, h in how.items()))
+    status = cache.status()
+    if not status:
+        print(f"{cache.path}: empty")
+    for s in status:
+        print(f"  {s['table']:<15} {s['rows']:6d} row(s), {s['age_seconds']}s old, "
+              + (f"incremental from {s['watermark']}" if s["incremental"] else "full reloads (no updated_at)"))
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
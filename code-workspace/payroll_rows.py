@@ -0,0 +1,180 @@
+"""
+Column store for spreadsheet rows read by import_payroll_bland_david.py (Allocated Week sheets, projects.csv).
+
+A row kept as a tuple holds 33 boxed cells, so a full-year workbook (52 sheets x up to 20,000 rows) is millions
+of Python objects. SheetRows keeps each column dictionary-encoded instead: a typed array of codes (1, 2 or 4
+bytes a cell, widened as the column gains distinct values) and the column's distinct cell values, each stored
+once (strings interned). Dates, times, minutes and plant numbers repeat heavily within a sheet, and most of the
+33 columns are empty on most rows, so a row costs tens of bytes. Cell values keep their exact type (7 and 7.0,
+"07:00" and time(7, 0) stay distinct), so parsing and the import ledger's row hashes are unchanged.
+
+rows[i] is a RowView (__slots__: the store and the row index) that reads like the tuple: view[idx], len(view),
+iteration, tuple(view). SheetRows.column(idx) gives a column's codes and distinct values, so the importer's
+_parse_columns parses each distinct cell once without scanning the rows.
+"""
+
+import sys
+from array import array
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+# Code array typecodes, narrowest first, with the largest code each can hold
+_TYPECODES = (("B", 0xFF), ("H", 0xFFFF), ("I", 0xFFFFFFFF))
+EXTEND_CHUNK_ROWS = 8192  # rows transposed and encoded per step by extend()
+_NONE_KEY = (type(None), None)
+_NUMBER_TYPES = frozenset((int, float, bool))  # their values can compare equal across types
+
+
+def _key(v: Any) -> Tuple[Any, ...]:
+    """Dictionary key of a cell: the type is part of it (1, 1.0 and True differ) and 0.0 / -0.0 stay apart."""
+    if v.__class__ is float and v == 0:
+        return (float, repr(v))
+    return (v.__class__, v)
+
+
+class RowView:
+    """One row of a SheetRows, read like the tuple it replaces."""
+
+    __slots__ = ("_rows", "_i")
+
+    def __init__(self, rows: "SheetRows", i: int) -> None:
+        self._rows = rows
+        self._i = i
+
+    def __len__(self) -> int:
+        return self._rows.width
+
+    def __getitem__(self, idx: Union[int, slice]) -> Any:
+        if isinstance(idx, slice):
+            return tuple(self)[idx]
+        rows = self._rows
+        if idx < 0:
+            idx += rows.width
+        if not 0 <= idx < rows.width:
+            raise IndexError("row index out of range")
+        return rows._values[idx][rows._codes[idx][self._i]]
+
+    def __iter__(self) -> Iterator[Any]:
+        rows = self._rows
+        i = self._i
+        for values, codes in zip(rows._values, rows._codes):
+            yield values[codes[i]]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (RowView, tuple, list)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __repr__(self) -> str:
+        return f"RowView({tuple(self)!r})"
+
+
+class SheetRows:
+    """Rows of one sheet, column by column. Sequence of RowView; append / extend take tuples or lists (cells
+    beyond width are dropped, missing ones are None)."""
+
+    __slots__ = ("width", "_codes", "_values", "_index", "_count")
+
+    def __init__(self, width: int, rows: Iterable[Sequence[Any]] = ()) -> None:
+        self.width = width
+        self._codes: List[array] = [array(_TYPECODES[0][0]) for _ in range(width)]
+        self._values: List[List[Any]] = [[None] for _ in range(width)]  # code 0 = empty cell
+        self._index: List[Dict[Tuple[Any, ...], int]] = [{_NONE_KEY: 0} for _ in range(width)]
+        self._count = 0
+        self.extend(rows)
+
+    def append(self, row: Sequence[Any]) -> None:
+        n = len(row)
+        for c in range(self.width):
+            v = row[c] if c < n else None
+            codes = self._codes[c]
+            if v is None:
+                codes.append(0)
+                continue
+            key = _key(v)
+            code = self._index[c].get(key)
+            if code is None:
+                values = self._values[c]
+                code = self._index[c][key] = len(values)
+                values.append(sys.intern(v) if v.__class__ is str else v)
+                for typecode, largest in _TYPECODES:
+                    if code <= largest:
+                        break
+                if typecode != codes.typecode:
+                    codes = self._codes[c] = array(typecode, codes)
+            codes.append(code)
+        self._count += 1
+
+    def extend(self, rows: Iterable[Sequence[Any]]) -> None:
+        """Append rows, EXTEND_CHUNK_ROWS at a time: each chunk is transposed and every column encoded in bulk
+        (distinct cells found with a dict, codes looked up with map), so the work per cell runs in C rather than
+        in append()'s loop. Codes come out as append() would give them."""
+        width = self.width
+        rows = iter(rows)
+        while True:
+            chunk = [
+                row if len(row) == width else (tuple(row) + (None,) * width)[:width]
+                for row in islice(rows, EXTEND_CHUNK_ROWS)
+            ]
+            if not chunk:
+                return
+            for c, cells in enumerate(zip(*chunk)):
+                self._extend_column(c, cells)
+            self._count += len(chunk)
+
+    def _extend_column(self, c: int, cells: Tuple[Any, ...]) -> None:
+        if cells.count(None) == len(cells):
+            codes = self._codes[c]
+            codes.extend(array(codes.typecode, bytes(codes.itemsize * len(cells))))  # all empty: code 0
+            return
+        numbers = _NUMBER_TYPES.intersection(map(type, cells))
+        if len(numbers) > 1 or (float in numbers and 0.0 in cells):
+            # Cells equal across types (1, 1.0, True) or signs (0.0, -0.0) would share a raw key: key them by _key()
+            keys: Sequence[Any] = [_key(v) for v in cells]
+            distinct = dict(zip(keys, cells))  # key -> a cell with it, in order of first appearance
+        else:
+            keys = cells
+            distinct = dict(zip(cells, cells))
+        index = self._index[c]
+        values = self._values[c]
+        code_of: Dict[Any, int] = {}
+        for key, v in distinct.items():
+            k = _key(v) if keys is cells else key
+            code = index.get(k)
+            if code is None:
+                code = index[k] = len(values)
+                values.append(sys.intern(v) if v.__class__ is str else v)
+            code_of[key] = code
+        codes = self._codes[c]
+        for typecode, largest in _TYPECODES:
+            if len(values) - 1 <= largest:
+                break
+        if typecode != codes.typecode:
+            codes = self._codes[c] = array(typecode, codes)
+        codes.fromlist(list(map(code_of.__getitem__, keys)))
+
+    def column(self, idx: int) -> Tuple[array, List[Any]]:
+        """(code per row, distinct values) of column idx; values[codes[i]] is row i's cell, values[0] is None."""
+        return self._codes[idx], self._values[idx]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: Union[int, slice]) -> Any:
+        if isinstance(i, slice):
+            return [RowView(self, j) for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("row index out of range")
+        return RowView(self, i)
+
+    def __iter__(self) -> Iterator[RowView]:
+        for i in range(self._count):
+            yield RowView(self, i)
+
+    def __repr__(self) -> str:
+        return f"SheetRows({self._count} rows x {self.width} columns)"
@@ -0,0 +1,184 @@
+"""
+Synthetic Allocated Week sheets and matching reference tables, for running import_payroll_bland_david.py against
+payroll_mock_postgrest.py (benchmark_payroll_import.py) without the real workbook or Supabase project.
+
+A week of n rows is spread over enough employees that each works 1-4 back-to-back periods a day, Monday to
+Sunday, so no two rows share the import key (employee, date, start); rows are sorted by date, employee and
+start as the sheet is kept. Cells are what openpyxl returns for the real sheet: datetime dates, time Start /
+Break / Finish / Hours / FT / Travel, int plant numbers (a few as floats or zero-padded text), concrete ticket
+numbers in Mob 4 of concrete rows. Sections resolve like the real data: mostly projects
+(Contract / Location / Section = client_name / town / short_description), some "Fleet No <plant_no>" and
+workshop tasks, a few unmatched; about 2% of rows are Site 1-20 placeholders and 2% have no hours (both
+skipped by the importer). synthetic_reference() gives the projects, large_plant, workshop_tasks and
+users_setup rows those cells resolve against.
+
+Usage:
+  python code-workspace/payroll_synthetic_week.py 5000 --out "Synthetic Staff Hours.xlsx"   # Allocated Week (1)
+  python code-workspace/payroll_synthetic_week.py 20000 --week 7 --out synthetic.xlsx --tables mock_tables.json
+"""
+
+import json
+import random
+import sys
+import uuid
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+SYNTHETIC_YEAR = 2026
+SYNTHETIC_SIZES = (500, 5000, 20000)
+SYNTHETIC_PROJECTS = 400
+SYNTHETIC_PLANT = 900
+SYNTHETIC_TASKS = ("Workshop", "Servicing", "Yard", "Training", "Tyres", "Welding", "Stores", "Cleaning")
+_WIDTH = 33  # A:AG, as the importer reads
+_SURNAMES = (
+    "Bland", "Murphy", "Kelly", "Walsh", "Byrne", "Ryan", "OBrien", "Doyle", "Smith", "McCarthy", "Lynch",
+    "Gallagher", "Doherty", "Kennedy", "Quinn", "Brennan", "Burke", "Collins", "Campbell", "Clarke", "Daly",
+    "Dunne", "Farrell", "Fitzgerald", "Foley", "Hayes", "Hughes", "Keane", "Kavanagh", "Lee", "Maguire",
+    "Martin", "Moore", "Nolan", "Power", "Regan", "Reilly", "Sheehan", "Sweeney", "Tracey", "Ward", "White",
+)
+_FORENAMES = (
+    "David", "Sean", "John", "Patrick", "Michael", "James", "Mark", "Paul", "Tom", "Brian", "Ciaran", "Declan",
+    "Eoin", "Fergal", "Gerry", "Kevin", "Liam", "Niall", "Owen", "Peter", "Ronan", "Shane", "Tony", "Aidan",
+)
+
+
+def employee_count(n_rows: int) -> int:
+    """Employees for an n-row week (about 2.5 periods a day each, with room to spare)."""
+    return max(6, -(-n_rows // 12))
+
+
+def employee_names(count: int) -> List[str]:
+    names = []
+    for i in range(count):
+        surname = _SURNAMES[i % len(_SURNAMES)]
+        forename = _FORENAMES[(i // len(_SURNAMES)) % len(_FORENAMES)]
+        suffix = i // (len(_SURNAMES) * len(_FORENAMES))
+        names.append(f"{surname}{suffix or ''}, {forename}")
+    return names
+
+
+def synthetic_reference(n_employees: int, seed: int = 1) -> Dict[str, List[Dict[str, Any]]]:
+    """projects, large_plant, workshop_tasks and users_setup rows (what the mock serves)."""
+    rng = random.Random(seed)
+    uid = lambda: str(uuid.UUID(int=rng.getrandbits(128), version=4))  # noqa: E731 (repeatable ids)
+    return {
+        "projects": [
+            {"id": uid(), "client_name": f"Client {i % 60}", "town": f"Town {i % 120}", "short_description": f"Section {i}"}
+            for i in range(SYNTHETIC_PROJECTS)
+        ],
+        "large_plant": [
+            {"id": uid(), "plant_no": str(100 + i), "plant_description": f"Plant {100 + i}"} for i in range(SYNTHETIC_PLANT)
+        ],
+        "workshop_tasks": [{"id": uid(), "task": task} for task in SYNTHETIC_TASKS],
+        "users_setup": [{"user_id": uid(), "display_name": name} for name in employee_names(n_employees)],
+    }
+
+
+def _clock(minutes: int) -> time:
+    return time(*divmod(max(0, min(minutes, 1439)), 60))
+
+
+def synthetic_week(n_rows: int, week: int = 1, seed: int = 1) -> Tuple[List[Tuple[Any, ...]], int]:
+    """(rows, importable rows) of an Allocated Week sheet for ISO week `week` of SYNTHETIC_YEAR."""
+    rng = random.Random(seed * 1000 + week)
+    monday = date.fromisocalendar(SYNTHETIC_YEAR, week, 1)
+    names = employee_names(employee_count(n_rows))
+    rows: List[Tuple[Any, ...]] = []
+    importable = 0
+    slots = [(e, d) for d in range(7) for e in range(len(names))]
+    rng.shuffle(slots)
+    for e, d in slots:
+        if len(rows) >= n_rows:
+            break
+        minute = rng.choice([360, 390, 420, 450, 480])
+        for _ in range(rng.randint(1, 4)):
+            if len(rows) >= n_rows or minute > 1200:
+                break
+            length = 15 * rng.randint(4, 16)
+            brk = rng.choice([0, 0, 0, 15, 30, 30, 45, 60]) if length >= 240 else 0
+            row: List[Any] = [None] * _WIDTH
+            row[0] = datetime.combine(monday + timedelta(days=d), time(0, 0))
+            kind = rng.random()
+            if kind < 0.70:
+                p = rng.randrange(SYNTHETIC_PROJECTS)
+                row[1], row[2], row[3] = f"Client {p % 60}", f"Town {p % 120}", f"Section {p}"
+            elif kind < 0.85:
+                row[3] = f"Fleet No {100 + rng.randrange(SYNTHETIC_PLANT)}"
+            elif kind < 0.92:
+                row[3] = rng.choice(SYNTHETIC_TASKS)
+            else:
+                row[1], row[3] = "Client X", f"Unlisted {rng.randrange(50)}"
+            site = rng.random() < 0.02
+            row[4] = f"Site {rng.randint(1, 20)}" if site else names[e]
+            row[5] = _clock(minute)
+            row[6] = _clock(brk) if brk else None
+            row[7] = _clock(minute + length)
+            no_hours = rng.random() < 0.02
+            row[8] = None if no_hours else _clock(length - brk)
+            for c in range(9, 9 + rng.choice([0, 0, 1, 1, 2, 3])):
+                plant_no = 100 + rng.randrange(SYNTHETIC_PLANT)
+                cell = rng.random()
+                row[c] = float(plant_no) if cell < 0.05 else (f"0{plant_no}" if cell < 0.08 else plant_no)
+            if rng.random() < 0.15:
+                row[15] = 100 + rng.randrange(SYNTHETIC_PLANT)
+            if rng.random() < 0.05:
+                row[19] = rng.choice(["C30", "C35", "Lean mix"])
+                row[20] = rng.choice([1.0, 2.5, 6.0])
+                row[18] = rng.randint(10000, 999999)  # Mob 4: concrete ticket number
+            row[21] = _clock(min(length - brk, 480))
+            if rng.random() < 0.3:
+                row[26] = _clock(rng.choice([15, 30, 45]))
+            rows.append(tuple(row))
+            importable += not site and not no_hours and length - brk > 0
+            minute += length
+    rows.sort(key=lambda r: (r[0], r[4], r[5]))  # by date, employee, start, as the sheet is kept
+    return rows, importable
+
+
+def write_workbook(path: str, sheets: Dict[int, List[Tuple[Any, ...]]]) -> None:
+    """Write {week: rows} as Allocated Week (n) sheets, header in row 1 and the last data row in AH1."""
+    import openpyxl
+    from import_payroll_bland_david import CSV_HEADERS
+
+    wb = openpyxl.Workbook(write_only=True)
+    for week, rows in sorted(sheets.items()):
+        ws = wb.create_sheet(f"Allocated Week ({week})")
+        ws.append(list(CSV_HEADERS) + [len(rows) + 1])  # AH1
+        for row in rows:
+            ws.append(list(row))
+    wb.save(path)
+
+
+def main() -> None:
+    n = SYNTHETIC_SIZES[0]
+    week = 1
+    out = "Synthetic Staff Hours.xlsx"
+    tables_path = None
+    i = 1
+    while i < len(sys.argv):
+        a = sys.argv[i]
+        if a in ("--week", "--out", "--tables") and i + 1 < len(sys.argv):
+            value = sys.argv[i + 1]
+            if a == "--week":
+                week = int(value)
+            elif a == "--out":
+                out = value
+            else:
+                tables_path = value
+            i += 2
+            continue
+        if a.isdigit():
+            n = int(a)
+        i += 1
+    rows, importable = synthetic_week(n, week)
+    write_workbook(out, {week: rows})
+    print(f"Wrote {len(rows)} row(s) ({importable} importable) to {out}, sheet Allocated Week ({week})")
+    if tables_path:
+        tables = synthetic_reference(employee_count(n))
+        Path(tables_path).write_text(json.dumps(tables), encoding="utf-8")
+        print(f"Reference tables ({', '.join(f'{t} {len(r)}' for t, r in tables.items())}) written to {tables_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,8 @@ import sys
 import logging
 from pathlib import Path
 
+from payroll_reference_cache import ReferenceCache
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -315,13 +317,17 @@ def sync_to_supabase(projects: List[Dict[str, Any]], mode: str = "upsert"):
         projects: List of project dictionaries
         mode: "upsert" (update existing, insert new) or "replace" (delete all and insert)
     """
+    reference_cache: Optional[ReferenceCache] = None
     try:
         supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        # project_name -> id from the local reference cache (revalidated now), instead of one select per project
+        reference_cache = ReferenceCache()
         
         if mode == "replace":
             # Delete all existing projects (use with caution!)
             print("⚠️  Deleting all existing projects...")
             supabase.table("projects").delete().neq("id", "00000000-0000-0000-0000-000000000000").execute()
+            reference_cache.invalidate("projects")
             print("✅ Deleted existing projects")
         
         # Map and filter projects
@@ -342,6 +348,11 @@ def sync_to_supabase(projects: List[Dict[str, Any]], mode: str = "upsert"):
             print("⚠️  No valid projects to sync")
             return
         
+        project_ids: Dict[str, Any] = {}
+        if mode == "upsert":
+            reference_cache.load(supabase, ("projects",), refresh=True)
+            project_ids = reference_cache.index("project_by_name")
+        
         # Process projects in batches
         batch_size = 100
         total = len(mapped_projects)
@@ -359,12 +370,11 @@ def sync_to_supabase(projects: List[Dict[str, Any]], mode: str = "upsert"):
                         continue
                     
                     try:
-                        # Try to find existing project by project_name
-                        existing = supabase.table("projects").select("id").eq("project_name", project_name).execute()
+                        # Find existing project by project_name
+                        project_id = project_ids.get(str(project_name).strip())
                         
-                        if existing.data and len(existing.data) > 0:
+                        if project_id:
                             # Update existing
-                            project_id = existing.data[0]["id"]
                             # Remove project_name from update to avoid conflicts
                             update_data = {k: v for k, v in project.items() if k != "project_name"}
                             supabase.table("projects").update(update_data).eq("id", project_id).execute()
@@ -373,7 +383,9 @@ def sync_to_supabase(projects: List[Dict[str, Any]], mode: str = "upsert"):
                                 print(f"  Processed {updated_count + inserted_count}/{total}...")
                         else:
                             # Insert new
-                            supabase.table("projects").insert(project).execute()
+                            r = supabase.table("projects").insert(project).execute()
+                            if r.data:
+                                project_ids[str(project_name).strip()] = r.data[0]["id"]
                             inserted_count += 1
                             if (updated_count + inserted_count) % 10 == 0:
                                 print(f"  Processed {updated_count + inserted_count}/{total}...")
@@ -399,6 +411,12 @@ def sync_to_supabase(projects: List[Dict[str, Any]], mode: str = "upsert"):
         import traceback
         traceback.print_exc()
         raise
+    finally:
+        if reference_cache is not None:
+            # Edits may not bump updated_at, and a sync stopped part-way has written some: reload projects whole
+            # on the next read of the cache
+            reference_cache.invalidate("projects")
+            reference_cache.close()
 
 
 def main():
@@ -35,6 +35,8 @@ import logging
 import argparse
 from pathlib import Path
 
+from payroll_reference_cache import ReferenceCache
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -333,12 +335,16 @@ def sync_to_supabase(projects: List[Dict[str, Any]], mode: str = "upsert") -> Tu
     Returns:
         Tuple of (updated_count, inserted_count, error_count)
     """
+    reference_cache: Optional[ReferenceCache] = None
     try:
         supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        # project_number -> id from the local reference cache (revalidated now), instead of one select per project
+        reference_cache = ReferenceCache()
         
         if mode == "replace":
             logger.warning("⚠️  Deleting all existing projects...")
             supabase.table("projects").delete().neq("id", "00000000-0000-0000-0000-000000000000").execute()
+            reference_cache.invalidate("projects")
             logger.info("✅ Deleted existing projects")
         
         # Map and filter projects
@@ -359,6 +365,11 @@ def sync_to_supabase(projects: List[Dict[str, Any]], mode: str = "upsert") -> Tu
             logger.warning("⚠️  No valid projects to sync")
             return (0, 0, 0)
         
+        project_ids: Dict[str, Any] = {}
+        if mode == "upsert":
+            reference_cache.load(supabase, ("projects",), refresh=True)
+            project_ids = reference_cache.index("project_by_number")
+        
         # Process projects in batches
         batch_size = 100
         total = len(mapped_projects)
@@ -383,13 +394,12 @@ def sync_to_supabase(projects: List[Dict[str, Any]], mode: str = "upsert") -> Tu
                         continue
                     
                     try:
-                        # Try to find existing project by project_number (stable identifier)
-                        existing = supabase.table("projects").select("id").eq("project_number", project_number).execute()
+                        # Find existing project by project_number (stable identifier)
+                        project_id = project_ids.get(str(project_number).strip())
                         
-                        if existing.data and len(existing.data) > 0:
+                        if project_id:
                             # Update existing project (project_number matched)
                             # This will update project_name if it changed (e.g., typo correction)
-                            project_id = existing.data[0]["id"]
                             # Update all fields including project_name (since it can change)
                             update_data = {k: v for k, v in project.items() if k != "project_number"}  # Don't update project_number itself
                             supabase.table("projects").update(update_data).eq("id", project_id).execute()
@@ -398,7 +408,9 @@ def sync_to_supabase(projects: List[Dict[str, Any]], mode: str = "upsert") -> Tu
                                 logger.info(f"  Processed {updated_count + inserted_count}/{total}...")
                         else:
                             # Insert new project (project_number doesn't exist yet)
-                            supabase.table("projects").insert(project).execute()
+                            r = supabase.table("projects").insert(project).execute()
+                            if r.data:
+                                project_ids[str(project_number).strip()] = r.data[0]["id"]
                             inserted_count += 1
                             if (updated_count + inserted_count) % 50 == 0:
                                 logger.info(f"  Processed {updated_count + inserted_count}/{total}...")
@@ -430,6 +442,12 @@ def sync_to_supabase(projects: List[Dict[str, Any]], mode: str = "upsert") -> Tu
         import traceback
         logger.debug("Full traceback:", exc_info=True)
         raise
+    finally:
+        if reference_cache is not None:
+            # Edits may not bump updated_at, and a sync stopped part-way has written some: reload projects whole
+            # on the next read of the cache
+            reference_cache.invalidate("projects")
+            reference_cache.close()
 
 
 def main(project_number: Optional[str] = None) -> int:
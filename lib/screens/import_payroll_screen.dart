@@ -1,4 +1,6 @@
-import 'dart:convert';
+import 'dart:async';
+
+import 'package:dwce_time_tracker/config/supabase_config.dart';
 import 'package:flutter/foundation.dart';
 import 'package:flutter/material.dart';
 
@@ -8,6 +10,8 @@ import '../utils/run_import_script_stub.dart' if (dart.library.io) '../utils/run
 /// Import Payroll: select week, load employees from Excel (Allocated Week sheet),
 /// select employees and run the Python import script. Duplicates and "Site 1"-"Site 20" rows are skipped.
 /// Requires desktop (Python script); CSV file import is hidden for now.
+/// "Queue in background" hands the week to the import job runner (code-workspace/payroll_import_jobs.py)
+/// instead; queued jobs and their progress are read from payroll_import_jobs, polled while the screen is open.
 class ImportPayrollScreen extends StatefulWidget {
   const ImportPayrollScreen({super.key});
 
@@ -18,6 +22,8 @@ class ImportPayrollScreen extends StatefulWidget {
 class _ImportPayrollScreenState extends State<ImportPayrollScreen> {
   static const int _minWeek = 1;
   static const int _maxWeek = 52;
+  static const Duration _jobsPollInterval = Duration(seconds: 15);
+  static const String _overnightStart = '22:00';
 
   int _selectedWeek = 1;
   List<String> _employeeNames = [];
@@ -26,9 +32,53 @@ class _ImportPayrollScreenState extends State<ImportPayrollScreen> {
   bool _importing = false;
   String? _error;
   String? _importOutput;
+  bool _queueing = false;
+  bool _startOvernight = false;
+  List<Map<String, dynamic>> _jobs = [];
+  String? _jobsError;
+  Timer? _jobsTimer;
 
   bool get _canRunScript => !kIsWeb;
 
+  /// Pass empty so the IO implementation uses current directory (project root when run from IDE).
+  String get _workingDirectory => '';
+
+  /// Script runs with `--serve` for the lifetime of the screen, so only the first request pays startup and loading.
+  late final run_import.ImportScriptServer _server = run_import.ImportScriptServer(_workingDirectory);
+
+  @override
+  void initState() {
+    super.initState();
+    _loadJobs();
+    _jobsTimer = Timer.periodic(_jobsPollInterval, (_) => _loadJobs());
+  }
+
+  @override
+  void dispose() {
+    _jobsTimer?.cancel();
+    _server.dispose();
+    super.dispose();
+  }
+
+  /// Latest import jobs from the status table the job runner writes (all machines' runs).
+  Future<void> _loadJobs() async {
+    try {
+      final response = await SupabaseService.client
+          .from('payroll_import_jobs')
+          .select('id, workbook, week, status, rows_total, rows_done, error_count, message, not_before, queued_at')
+          .order('queued_at', ascending: false)
+          .limit(20);
+      if (!mounted) return;
+      setState(() {
+        _jobs = List<Map<String, dynamic>>.from(response as List);
+        _jobsError = null;
+      });
+    } catch (e) {
+      if (!mounted) return;
+      setState(() => _jobsError = 'Import job status not available: $e');
+    }
+  }
+
   Future<void> _loadEmployees() async {
     if (!_canRunScript) return;
     setState(() {
@@ -39,41 +89,19 @@ class _ImportPayrollScreenState extends State<ImportPayrollScreen> {
       _selected.clear();
     });
     try {
-      final result = await run_import.runImportScript(
-        [
-          'code-workspace/import_payroll_bland_david.py',
-          '--list-employees',
-          '--week',
-          '$_selectedWeek',
-        ],
-        _workingDirectory,
-      );
-      final stdout = result.stdout;
-      final stderr = result.stderr;
-      List<String> names = [];
-      try {
-        // Last line or only line may be JSON
-        final lines = stdout.trim().split('\n');
-        for (final line in lines.reversed) {
-          final trimmed = line.trim();
-          if (trimmed.isEmpty) continue;
-          final decoded = jsonDecode(trimmed) as Map<String, dynamic>?;
-          if (decoded != null && decoded['employees'] != null) {
-            names = List<String>.from(decoded['employees'] as List);
-            break;
-          }
-        }
-      } catch (_) {
-        names = [];
-      }
+      final result = await _server.request('list_employees', {'week': _selectedWeek});
+      final names = List<String>.from(result['employees'] as List? ?? const []);
       setState(() {
         _loadingEmployees = false;
         _employeeNames = names;
         for (final n in names) {
           _selected[n] = true;
         }
-        if (names.isEmpty && stderr.isNotEmpty) _error = stderr.split('\n').first;
-        if (names.isEmpty && stdout.isEmpty && stderr.isEmpty) _error = 'No employees found. Check Excel path and sheet "Allocated Week ($_selectedWeek)".';
+        if (names.isEmpty) {
+          _error = result['error'] != null
+              ? '${result['error']}. Check Excel path and sheet "Allocated Week ($_selectedWeek)".'
+              : 'No employees found. Check Excel path and sheet "Allocated Week ($_selectedWeek)".';
+        }
       });
     } catch (e) {
       setState(() {
@@ -84,9 +112,6 @@ class _ImportPayrollScreenState extends State<ImportPayrollScreen> {
     }
   }
 
-  /// Pass empty so the IO implementation uses current directory (project root when run from IDE).
-  String get _workingDirectory => '';
-
   Future<void> _runImport() async {
     if (!_canRunScript) return;
     final chosen = _selected.entries.where((e) => e.value).map((e) => e.key).toList();
@@ -100,24 +125,14 @@ class _ImportPayrollScreenState extends State<ImportPayrollScreen> {
       _importing = true;
     });
     try {
-      // Pass names with comma; if a name contains comma, script splits by comma so we need a safe separator or quote. Script uses split(",") so "Surname, Forename" would break. Use a different separator for the app->script contract, e.g. | or \t. So we'll use | and update the script to accept --employees with | as separator when from app. Actually the script says --employees "Name1,Name2" - so "Tracey, Paul" would become two names if we join with comma. So we need to pass in a way that preserves commas in names. Option: pass multiple --employees args, or use a separator that won't appear in names (e.g. | or \x00). Let me use | and update the Python script to split by | when the string contains |.
-      final employeesArg = chosen.join('|');
-      final result = await run_import.runImportScript(
-        [
-          'code-workspace/import_payroll_bland_david.py',
-          '--week',
-          '$_selectedWeek',
-          '--employees',
-          employeesArg,
-        ],
-        _workingDirectory,
-      );
-      final stdout = result.stdout;
-      final stderr = result.stderr;
+      // Names go as a JSON list, so "Surname, Forename" needs no separator escaping.
+      final result = await _server.request('import', {'week': _selectedWeek, 'employees': chosen});
+      final output = List<String>.from(result['output'] as List? ?? const []).join('\n').trim();
+      final errors = result['errors'] as List? ?? const [];
       setState(() {
         _importing = false;
-        _importOutput = [stdout, if (stderr.isNotEmpty) stderr].join('\n').trim();
-        if (result.exitCode != 0) _error = _importOutput;
+        _importOutput = output;
+        if (errors.isNotEmpty) _error = output;
       });
     } catch (e) {
       setState(() {
@@ -127,6 +142,74 @@ class _ImportPayrollScreenState extends State<ImportPayrollScreen> {
     }
   }
 
+  /// Queue the selected week and employees for the background job runner (started if none is running).
+  Future<void> _queueImport() async {
+    if (!_canRunScript) return;
+    final chosen = _selected.entries.where((e) => e.value).map((e) => e.key).toList();
+    if (chosen.isEmpty) {
+      setState(() => _error = 'Select at least one employee.');
+      return;
+    }
+    setState(() {
+      _error = null;
+      _importOutput = null;
+      _queueing = true;
+    });
+    try {
+      final result = await _server.request('queue_import', {
+        'week': _selectedWeek,
+        // All employees selected: the job imports the whole sheet
+        if (chosen.length < _employeeNames.length) 'employees': chosen,
+        if (_startOvernight) 'at': _overnightStart,
+      });
+      final started = result['runner_started'] == true;
+      setState(() {
+        _queueing = false;
+        _importOutput = 'Week $_selectedWeek queued (${chosen.length} employee(s))'
+            '${_startOvernight ? ', starts at $_overnightStart' : ''}.'
+            '${started ? ' Background import started.' : ''} Progress is shown under Import jobs.';
+      });
+      await _loadJobs();
+    } catch (e) {
+      setState(() {
+        _queueing = false;
+        _error = 'Queueing failed: $e';
+      });
+    }
+  }
+
+  String _jobSubtitle(Map<String, dynamic> job) {
+    final status = job['status']?.toString() ?? '';
+    final total = job['rows_total'] as int?;
+    final done = job['rows_done'] as int? ?? 0;
+    final errors = job['error_count'] as int? ?? 0;
+    final parts = <String>[status];
+    if (status == 'queued' && job['not_before'] != null) {
+      final start = DateTime.tryParse(job['not_before'].toString())?.toLocal();
+      if (start != null) {
+        parts.add('from ${start.hour.toString().padLeft(2, '0')}:${start.minute.toString().padLeft(2, '0')}');
+      }
+    }
+    if (total != null) parts.add('$done / $total rows');
+    if (errors > 0) parts.add('$errors error(s)');
+    final message = job['message']?.toString();
+    if (message != null && message.isNotEmpty) parts.add(message);
+    return parts.join(' · ');
+  }
+
+  Color _jobColor(String? status) {
+    switch (status) {
+      case 'done':
+        return Colors.green.shade700;
+      case 'failed':
+        return Colors.red.shade700;
+      case 'running':
+        return const Color(0xFF0081FB);
+      default:
+        return Colors.grey.shade700;
+    }
+  }
+
   void _selectAll(bool value) {
     setState(() {
       for (final k in _selected.keys) {
@@ -264,14 +347,36 @@ class _ImportPayrollScreenState extends State<ImportPayrollScreen> {
                         ),
                       ),
                       const SizedBox(height: 16),
-                      ElevatedButton.icon(
-                        onPressed: _importing ? null : _runImport,
-                        icon: _importing ? const SizedBox(width: 20, height: 20, child: CircularProgressIndicator(strokeWidth: 2)) : const Icon(Icons.upload, size: 20),
-                        label: Text(_importing ? 'Importing…' : 'Import selected'),
-                        style: ElevatedButton.styleFrom(
-                          backgroundColor: const Color(0xFF0081FB),
-                          foregroundColor: Colors.white,
-                        ),
+                      Wrap(
+                        spacing: 16,
+                        runSpacing: 8,
+                        crossAxisAlignment: WrapCrossAlignment.center,
+                        children: [
+                          ElevatedButton.icon(
+                            onPressed: (_importing || _queueing) ? null : _runImport,
+                            icon: _importing ? const SizedBox(width: 20, height: 20, child: CircularProgressIndicator(strokeWidth: 2)) : const Icon(Icons.upload, size: 20),
+                            label: Text(_importing ? 'Importing…' : 'Import selected'),
+                            style: ElevatedButton.styleFrom(
+                              backgroundColor: const Color(0xFF0081FB),
+                              foregroundColor: Colors.white,
+                            ),
+                          ),
+                          OutlinedButton.icon(
+                            onPressed: (_importing || _queueing) ? null : _queueImport,
+                            icon: _queueing ? const SizedBox(width: 20, height: 20, child: CircularProgressIndicator(strokeWidth: 2)) : const Icon(Icons.schedule, size: 20),
+                            label: Text(_queueing ? 'Queueing…' : 'Queue in background'),
+                          ),
+                          Row(
+                            mainAxisSize: MainAxisSize.min,
+                            children: [
+                              Checkbox(
+                                value: _startOvernight,
+                                onChanged: _queueing ? null : (v) => setState(() => _startOvernight = v ?? false),
+                              ),
+                              const Text('Start at $_overnightStart'),
+                            ],
+                          ),
+                        ],
                       ),
                     ],
                   ),
@@ -279,6 +384,66 @@ class _ImportPayrollScreenState extends State<ImportPayrollScreen> {
               ),
             ],
             ],
+            const SizedBox(height: 24),
+            Card(
+              child: Padding(
+                padding: const EdgeInsets.all(16),
+                child: Column(
+                  crossAxisAlignment: CrossAxisAlignment.start,
+                  children: [
+                    Row(
+                      children: [
+                        Text(
+                          'Import jobs',
+                          style: Theme.of(context).textTheme.titleSmall?.copyWith(fontWeight: FontWeight.w600),
+                        ),
+                        const Spacer(),
+                        IconButton(
+                          tooltip: 'Refresh',
+                          icon: const Icon(Icons.refresh, size: 20),
+                          onPressed: _loadJobs,
+                        ),
+                      ],
+                    ),
+                    if (_jobsError != null)
+                      Text(_jobsError!, style: TextStyle(fontSize: 13, color: Colors.grey.shade700))
+                    else if (_jobs.isEmpty)
+                      const Text('No queued imports.', style: TextStyle(fontSize: 13))
+                    else
+                      ..._jobs.map((job) {
+                        final status = job['status']?.toString();
+                        final total = job['rows_total'] as int?;
+                        final done = job['rows_done'] as int? ?? 0;
+                        return ListTile(
+                          dense: true,
+                          contentPadding: EdgeInsets.zero,
+                          leading: Icon(
+                            status == 'done'
+                                ? Icons.check_circle
+                                : status == 'failed'
+                                    ? Icons.error
+                                    : status == 'running'
+                                        ? Icons.sync
+                                        : Icons.schedule,
+                            color: _jobColor(status),
+                          ),
+                          title: Text('Week ${job['week']} · ${job['workbook']}'),
+                          subtitle: Column(
+                            crossAxisAlignment: CrossAxisAlignment.start,
+                            children: [
+                              Text(_jobSubtitle(job)),
+                              if (status == 'running' && total != null && total > 0) ...[
+                                const SizedBox(height: 4),
+                                LinearProgressIndicator(value: (done / total).clamp(0.0, 1.0)),
+                              ],
+                            ],
+                          ),
+                        );
+                      }),
+                  ],
+                ),
+              ),
+            ),
             if (_error != null) ...[
               const SizedBox(height: 16),
               Card(
@@ -1,11 +1,17 @@
+import 'dart:async';
+import 'dart:convert';
 import 'dart:io';
 
-import 'run_import_script_stub.dart';
+import 'run_import_script_stub.dart' show RunScriptResult;
 
-Future<RunScriptResult> runImportScript(List<String> args, String workingDirectory) async {
-  final cwd = workingDirectory.isEmpty || workingDirectory == '.'
+String _resolveWorkingDirectory(String workingDirectory) {
+  return workingDirectory.isEmpty || workingDirectory == '.'
       ? Directory.current.path
       : workingDirectory;
+}
+
+Future<RunScriptResult> runImportScript(List<String> args, String workingDirectory) async {
+  final cwd = _resolveWorkingDirectory(workingDirectory);
   final result = await Process.run(
     'python',
     args,
@@ -18,3 +24,93 @@ Future<RunScriptResult> runImportScript(List<String> args, String workingDirecto
     stderr: (result.stderr as String? ?? ''),
   );
 }
+
+/// Long-running `import_payroll_bland_david.py --serve` process. Requests are newline-delimited
+/// JSON-RPC over stdin/stdout; the script keeps the workbook and reference tables loaded between
+/// calls, so only the first request pays Python startup and Supabase/Excel loading.
+class ImportScriptServer {
+  ImportScriptServer(this.workingDirectory);
+
+  static const String script = 'code-workspace/import_payroll_bland_david.py';
+
+  final String workingDirectory;
+  Process? _process;
+  Future<Process>? _starting;
+  int _nextId = 1;
+  final Map<int, Completer<Map<String, dynamic>>> _pending = {};
+  final List<String> _stderrTail = [];
+
+  Future<Process> _ensureStarted() {
+    final running = _process;
+    if (running != null) return Future.value(running);
+    return _starting ??= () async {
+      try {
+        final p = await Process.start(
+          'python',
+          [script, '--serve'],
+          runInShell: true,
+          workingDirectory: _resolveWorkingDirectory(workingDirectory),
+        );
+        p.stdout.transform(utf8.decoder).transform(const LineSplitter()).listen(_onLine, onDone: () => _onExit(p));
+        // Keep stderr drained (a full pipe would block the script); remember the tail for error messages.
+        p.stderr.transform(utf8.decoder).transform(const LineSplitter()).listen((line) {
+          _stderrTail.add(line);
+          if (_stderrTail.length > 20) _stderrTail.removeAt(0);
+        });
+        _process = p;
+        return p;
+      } finally {
+        _starting = null;
+      }
+    }();
+  }
+
+  /// Send [method] with [params]; completes with the JSON-RPC `result` object or throws with the error message.
+  Future<Map<String, dynamic>> request(String method, [Map<String, dynamic> params = const {}]) async {
+    final p = await _ensureStarted();
+    final id = _nextId++;
+    final completer = Completer<Map<String, dynamic>>();
+    _pending[id] = completer;
+    p.stdin.writeln(jsonEncode({'jsonrpc': '2.0', 'id': id, 'method': method, 'params': params}));
+    await p.stdin.flush();
+    return completer.future;
+  }
+
+  void _onLine(String line) {
+    final trimmed = line.trim();
+    if (trimmed.isEmpty) return;
+    Map<String, dynamic> msg;
+    try {
+      msg = jsonDecode(trimmed) as Map<String, dynamic>;
+    } catch (_) {
+      return;
+    }
+    final id = msg['id'];
+    final completer = id is int ? _pending.remove(id) : null;
+    if (completer == null) return;
+    final error = msg['error'];
+    if (error is Map) {
+      completer.completeError(Exception(error['message'] ?? 'Import script error'));
+    } else {
+      completer.complete(Map<String, dynamic>.from(msg['result'] as Map? ?? const {}));
+    }
+  }
+
+  void _onExit(Process p) {
+    if (identical(_process, p)) _process = null;
+    final detail = _stderrTail.isNotEmpty ? _stderrTail.last : 'import script exited';
+    for (final completer in _pending.values) {
+      completer.completeError(Exception(detail));
+    }
+    _pending.clear();
+  }
+
+  /// Stop the script (it exits on `shutdown` or when stdin closes).
+  Future<void> dispose() async {
+    final p = _process;
+    _process = null;
+    if (p == null) return;
+    p.stdin.writeln(jsonEncode({'jsonrpc': '2.0', 'id': _nextId++, 'method': 'shutdown'}));
+    await p.stdin.close();
+  }
+}
@@ -10,3 +10,16 @@ class RunScriptResult {
   final String stderr;
   RunScriptResult({required this.exitCode, required this.stdout, required this.stderr});
 }
+
+/// Stub for the `--serve` import script process; every request fails on this platform.
+class ImportScriptServer {
+  ImportScriptServer(this.workingDirectory);
+
+  final String workingDirectory;
+
+  Future<Map<String, dynamic>> request(String method, [Map<String, dynamic> params = const {}]) async {
+    throw UnsupportedError('Not available on this platform.');
+  }
+
+  Future<void> dispose() async {}
+}
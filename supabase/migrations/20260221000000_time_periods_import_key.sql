@@ -0,0 +1,33 @@
+-- Idempotent payroll import: time_periods rows written by code-workspace/import_payroll_bland_david.py carry
+-- import_source ('allocated_week'), and (user_id, work_date, start_time, import_source) is unique.
+-- The importer inserts with ON CONFLICT DO NOTHING on this key (PostgREST upsert, ignore duplicates), so
+-- repeated or concurrent imports of the same week skip rows already imported without reading them first.
+-- Periods entered in the app keep import_source NULL; NULLs are distinct, so the key never affects them.
+
+ALTER TABLE public.time_periods
+  ADD COLUMN IF NOT EXISTS import_source TEXT NULL;
+
+COMMENT ON COLUMN public.time_periods.import_source IS 'Source of imported rows (e.g. allocated_week for the payroll importer); NULL for periods entered in the app.';
+
+-- Mark periods already imported by the payroll script (still status imported). Where the same
+-- (user_id, work_date, start_time) was imported more than once, only the oldest row is marked so the
+-- constraint can be created; the extra copies are left unmarked for review.
+WITH ranked AS (
+  SELECT id,
+         row_number() OVER (PARTITION BY user_id, work_date, start_time ORDER BY created_at, id) AS rn
+  FROM public.time_periods
+  WHERE status = 'imported'
+    AND import_source IS NULL
+    AND start_time IS NOT NULL
+)
+UPDATE public.time_periods tp
+SET import_source = 'allocated_week'
+FROM ranked
+WHERE ranked.id = tp.id
+  AND ranked.rn = 1;
+
+ALTER TABLE public.time_periods
+  DROP CONSTRAINT IF EXISTS time_periods_import_key;
+
+ALTER TABLE public.time_periods
+  ADD CONSTRAINT time_periods_import_key UNIQUE (user_id, work_date, start_time, import_source);
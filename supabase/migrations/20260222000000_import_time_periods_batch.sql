@@ -0,0 +1,86 @@
+-- import_time_periods_batch: transactional batch import for code-workspace/import_payroll_bland_david.py --rpc.
+-- p_rows is a JSON array of parsed sheet rows:
+--   [{"row": 12, "period": {time_periods columns}, "breaks": [{break_start, break_finish, display_order}],
+--     "used_fleet": [{large_plant_id, display_order}], "mobilised_fleet": [{large_plant_id, display_order}]}, ...]
+-- Each period is inserted with its breaks and fleet rows in the same transaction as the rest of the batch:
+-- any error rolls back the whole call, so a period is never left without its children.
+-- Rows whose import key already exists (time_periods_import_key, 20260221000000) are skipped.
+-- Returns one row per input row: source_row, period_id (NULL when skipped), outcome ('inserted' | 'duplicate').
+
+CREATE OR REPLACE FUNCTION public.import_time_periods_batch(p_rows jsonb)
+RETURNS TABLE (source_row integer, period_id uuid, outcome text)
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  r jsonb;
+  p jsonb;
+  new_id uuid;
+BEGIN
+  FOR r IN SELECT value FROM jsonb_array_elements(p_rows) LOOP
+    p := r -> 'period';
+    new_id := NULL;
+
+    INSERT INTO public.time_periods (
+      user_id, work_date, start_time, finish_time, status, import_source,
+      submitted_by, submitted_at, travel_to_site_min, travel_from_site_min, on_call, misc_allowance_min,
+      revision_number, project_id, large_plant_id, workshop_tasks_id, concrete_mix_type, concrete_qty
+    ) VALUES (
+      (p->>'user_id')::uuid,
+      (p->>'work_date')::date,
+      (p->>'start_time')::timestamptz,
+      (p->>'finish_time')::timestamptz,
+      COALESCE(p->>'status', 'imported')::public.approval_status,
+      p->>'import_source',
+      (p->>'submitted_by')::uuid,
+      (p->>'submitted_at')::timestamptz,
+      COALESCE((p->>'travel_to_site_min')::integer, 0),
+      COALESCE((p->>'travel_from_site_min')::integer, 0),
+      COALESCE((p->>'on_call')::boolean, false),
+      COALESCE((p->>'misc_allowance_min')::integer, 0),
+      COALESCE((p->>'revision_number')::integer, 0),
+      (p->>'project_id')::uuid,
+      (p->>'large_plant_id')::uuid,
+      (p->>'workshop_tasks_id')::uuid,
+      p->>'concrete_mix_type',
+      (p->>'concrete_qty')::numeric
+    )
+    ON CONFLICT (user_id, work_date, start_time, import_source) DO NOTHING
+    RETURNING id INTO new_id;
+
+    source_row := (r->>'row')::integer;
+    period_id := new_id;
+    IF new_id IS NULL THEN
+      outcome := 'duplicate';
+      RETURN NEXT;
+      CONTINUE;
+    END IF;
+
+    INSERT INTO public.time_period_breaks (time_period_id, break_start, break_finish, display_order)
+    SELECT new_id, b.break_start, b.break_finish, COALESCE(b.display_order, 0)
+    FROM jsonb_to_recordset(COALESCE(r->'breaks', '[]'::jsonb))
+      AS b(break_start timestamptz, break_finish timestamptz, display_order integer);
+
+    INSERT INTO public.time_period_used_fleet (time_period_id, large_plant_id, display_order)
+    SELECT new_id, f.large_plant_id, COALESCE(f.display_order, 0)
+    FROM jsonb_to_recordset(COALESCE(r->'used_fleet', '[]'::jsonb))
+      AS f(large_plant_id uuid, display_order integer)
+    ON CONFLICT (time_period_id, large_plant_id) DO NOTHING;
+
+    INSERT INTO public.time_period_mobilised_fleet (time_period_id, large_plant_id, display_order)
+    SELECT new_id, f.large_plant_id, COALESCE(f.display_order, 0)
+    FROM jsonb_to_recordset(COALESCE(r->'mobilised_fleet', '[]'::jsonb))
+      AS f(large_plant_id uuid, display_order integer)
+    ON CONFLICT (time_period_id, large_plant_id) DO NOTHING;
+
+    outcome := 'inserted';
+    RETURN NEXT;
+  END LOOP;
+END;
+$$;
+
+COMMENT ON FUNCTION public.import_time_periods_batch(jsonb) IS 'Payroll import: insert a batch of time periods with breaks and fleet in one transaction; skips existing import keys. Returns per-row outcomes.';
+
+-- Import runs with the service role key; app users never call this.
+REVOKE ALL ON FUNCTION public.import_time_periods_batch(jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.import_time_periods_batch(jsonb) TO service_role;
@@ -0,0 +1,47 @@
+-- ============================================================================
+-- payroll_import_jobs: status of queued payroll imports (code-workspace/payroll_import_jobs.py)
+-- ============================================================================
+-- Import jobs (one workbook sheet each: workbook, week, employees) are queued on the machine that runs
+-- them, in a local SQLite file. The job runner mirrors each job's state here: queued, running (with rows
+-- done so far), then done / failed / cancelled with the importer's counters and errors. The Import Payroll
+-- screen polls this table, so an overnight run can be followed from any desktop.
+-- Rows are written by the runner with the service role key; admins (security 1) can read them.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS public.payroll_import_jobs (
+  id UUID PRIMARY KEY,
+  workbook TEXT NOT NULL,
+  week INTEGER NOT NULL,
+  employees TEXT[] NULL,
+  options JSONB NOT NULL DEFAULT '{}'::jsonb,
+  status TEXT NOT NULL DEFAULT 'queued'
+    CHECK (status IN ('queued', 'running', 'done', 'failed', 'cancelled')),
+  not_before TIMESTAMPTZ NULL,
+  rows_total INTEGER NULL,
+  rows_done INTEGER NOT NULL DEFAULT 0,
+  counters JSONB NOT NULL DEFAULT '{}'::jsonb,
+  errors JSONB NOT NULL DEFAULT '[]'::jsonb,
+  error_count INTEGER NOT NULL DEFAULT 0,
+  message TEXT NULL,
+  host TEXT NULL,
+  queued_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  started_at TIMESTAMPTZ NULL,
+  finished_at TIMESTAMPTZ NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+COMMENT ON TABLE public.payroll_import_jobs IS
+  'Queued payroll imports (one Allocated Week sheet each) and their progress, written by code-workspace/payroll_import_jobs.py.';
+COMMENT ON COLUMN public.payroll_import_jobs.not_before IS 'Job is not started before this time (e.g. an overnight run); NULL = as soon as a worker is free.';
+COMMENT ON COLUMN public.payroll_import_jobs.rows_done IS 'Sheet rows settled so far (written or already imported); rows_total when the job has finished.';
+COMMENT ON COLUMN public.payroll_import_jobs.errors IS 'First errors of the run (JSON array of text); error_count has the total.';
+
+CREATE INDEX IF NOT EXISTS payroll_import_jobs_queued_at ON public.payroll_import_jobs (queued_at DESC);
+
+ALTER TABLE public.payroll_import_jobs ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "payroll_import_jobs_select_admins" ON public.payroll_import_jobs;
+CREATE POLICY "payroll_import_jobs_select_admins"
+  ON public.payroll_import_jobs FOR SELECT
+  TO authenticated
+  USING (public.is_admin());
@@ -0,0 +1,134 @@
+-- Payroll import duplicates: the import key (20260221000000) includes import_source, and NULLs are distinct,
+-- so it never matches periods entered in the app (import_source NULL) or periods imported before the key
+-- whose status has since moved past 'imported' (that migration only marked rows still 'imported'). A
+-- re-import then inserted a second copy of such periods.
+--
+-- 1. Mark those older imported periods too: status changed from 'imported' per time_period_revisions (the
+--    approval screens record each status change there). Oldest copy per (user_id, work_date, start_time)
+--    only, and only where no period with that key is marked yet, as in 20260221000000. Skipped where the
+--    revisions table does not exist.
+-- 2. import_time_periods_batch skips a row when the user already has any period at that work_date and
+--    start_time (NOT EXISTS), like the importer's REST path (prefetched keys) and payroll_copy_loader.py.
+--    ON CONFLICT on the import key stays for rows written concurrently. Same arguments and result as
+--    20260223000000; replaces that definition.
+
+DO $$
+BEGIN
+  IF to_regclass('public.time_period_revisions') IS NOT NULL THEN
+    WITH ranked AS (
+      SELECT tp.id,
+             row_number() OVER (PARTITION BY tp.user_id, tp.work_date, tp.start_time ORDER BY tp.created_at, tp.id) AS rn
+      FROM public.time_periods tp
+      WHERE tp.import_source IS NULL
+        AND tp.start_time IS NOT NULL
+        AND tp.status <> 'imported'
+        AND EXISTS (
+          SELECT 1 FROM public.time_period_revisions r
+          WHERE r.time_period_id = tp.id
+            AND r.field_name = 'status'
+            AND r.old_value = 'imported'
+        )
+        AND NOT EXISTS (
+          SELECT 1 FROM public.time_periods m
+          WHERE m.user_id = tp.user_id
+            AND m.work_date = tp.work_date
+            AND m.start_time = tp.start_time
+            AND m.import_source = 'allocated_week'
+        )
+    )
+    UPDATE public.time_periods tp
+    SET import_source = 'allocated_week'
+    FROM ranked
+    WHERE ranked.id = tp.id
+      AND ranked.rn = 1;
+  END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.import_time_periods_batch(p_rows jsonb)
+RETURNS TABLE (source_row integer, period_id uuid, outcome text)
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  r jsonb;
+  p jsonb;
+  new_id uuid;
+BEGIN
+  FOR r IN SELECT value FROM jsonb_array_elements(p_rows) LOOP
+    p := r -> 'period';
+    new_id := NULL;
+
+    INSERT INTO public.time_periods (
+      user_id, work_date, start_time, finish_time, status, import_source,
+      submitted_by, submitted_at, travel_to_site_min, travel_from_site_min, on_call, misc_allowance_min,
+      revision_number, project_id, large_plant_id, workshop_tasks_id, concrete_mix_type, concrete_qty,
+      concrete_ticket_no
+    )
+    SELECT
+      (p->>'user_id')::uuid,
+      (p->>'work_date')::date,
+      (p->>'start_time')::timestamptz,
+      (p->>'finish_time')::timestamptz,
+      COALESCE(p->>'status', 'imported')::public.approval_status,
+      p->>'import_source',
+      (p->>'submitted_by')::uuid,
+      (p->>'submitted_at')::timestamptz,
+      COALESCE((p->>'travel_to_site_min')::integer, 0),
+      COALESCE((p->>'travel_from_site_min')::integer, 0),
+      COALESCE((p->>'on_call')::boolean, false),
+      COALESCE((p->>'misc_allowance_min')::integer, 0),
+      COALESCE((p->>'revision_number')::integer, 0),
+      (p->>'project_id')::uuid,
+      (p->>'large_plant_id')::uuid,
+      (p->>'workshop_tasks_id')::uuid,
+      p->>'concrete_mix_type',
+      (p->>'concrete_qty')::numeric,
+      (p->>'concrete_ticket_no')::integer
+    WHERE NOT EXISTS (
+      -- Any period of the user at that start, whatever its import_source (app-entered periods have NULL,
+      -- which never conflicts with the import key)
+      SELECT 1 FROM public.time_periods t
+      WHERE t.user_id = (p->>'user_id')::uuid
+        AND t.work_date = (p->>'work_date')::date
+        AND t.start_time = (p->>'start_time')::timestamptz
+    )
+    ON CONFLICT (user_id, work_date, start_time, import_source) DO NOTHING
+    RETURNING id INTO new_id;
+
+    source_row := (r->>'row')::integer;
+    period_id := new_id;
+    IF new_id IS NULL THEN
+      outcome := 'duplicate';
+      RETURN NEXT;
+      CONTINUE;
+    END IF;
+
+    INSERT INTO public.time_period_breaks (time_period_id, break_start, break_finish, display_order)
+    SELECT new_id, b.break_start, b.break_finish, COALESCE(b.display_order, 0)
+    FROM jsonb_to_recordset(COALESCE(r->'breaks', '[]'::jsonb))
+      AS b(break_start timestamptz, break_finish timestamptz, display_order integer);
+
+    INSERT INTO public.time_period_used_fleet (time_period_id, large_plant_id, display_order)
+    SELECT new_id, f.large_plant_id, COALESCE(f.display_order, 0)
+    FROM jsonb_to_recordset(COALESCE(r->'used_fleet', '[]'::jsonb))
+      AS f(large_plant_id uuid, display_order integer)
+    ON CONFLICT (time_period_id, large_plant_id) DO NOTHING;
+
+    INSERT INTO public.time_period_mobilised_fleet (time_period_id, large_plant_id, display_order)
+    SELECT new_id, f.large_plant_id, COALESCE(f.display_order, 0)
+    FROM jsonb_to_recordset(COALESCE(r->'mobilised_fleet', '[]'::jsonb))
+      AS f(large_plant_id uuid, display_order integer)
+    ON CONFLICT (time_period_id, large_plant_id) DO NOTHING;
+
+    outcome := 'inserted';
+    RETURN NEXT;
+  END LOOP;
+END;
+$$;
+
+COMMENT ON FUNCTION public.import_time_periods_batch(jsonb) IS 'Payroll import: insert a batch of time periods with breaks and fleet in one transaction; skips rows whose user already has a period at that work_date and start_time. Returns per-row outcomes.';
+
+-- Import runs with the service role key; app users never call this.
+REVOKE ALL ON FUNCTION public.import_time_periods_batch(jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.import_time_periods_batch(jsonb) TO service_role;